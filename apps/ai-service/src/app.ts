@@ -19,6 +19,9 @@ import { tryParseJsonObject } from './json_parse';
 
 type AiModel = Parameters<typeof generateText>[0]['model'];
 
+// Separates streamed text from its completion trailer (ASCII record separator; never in model text).
+const STREAM_TRAILER_SEP = '\u001e';
+
 function asTrimmedString(v: unknown): string {
   return typeof v === 'string' ? v.trim() : '';
 }
@@ -1494,31 +1497,15 @@ app.post('/quant/rank/explain', async (c) => {
   }
 });
 
-app.post('/strategy/daily-markdown', async (c) => {
-  const body = await c.req.json().catch(() => null);
-  const parsed = StrategyDailyRequestSchema.safeParse(body);
-  if (!parsed.success) {
-    return c.json({ error: 'Invalid request body', issues: parsed.error.issues }, 400);
-  }
-
-  let model: AiModel;
-  let fallbackModel: AiModel | null = null;
-  let modelId = '';
-  let fallbackModelId: string | null = null;
-  try {
-    const r = await getStrategyPrimaryAndFallbackModels();
-    model = r.model;
-    modelId = r.modelId;
-    fallbackModel = r.fallbackModel;
-    fallbackModelId = r.fallbackModelId;
-  } catch (err) {
-    const message = err instanceof Error ? err.message : 'Invalid AI configuration';
-    return c.json({ error: message }, 500);
-  }
-
-  const date = parsed.data.date.trim();
-  const accountTitle = (parsed.data.accountTitle ?? '').trim() || 'Account';
-  const accountPrompt = (parsed.data.accountPrompt ?? '').trim();
+function buildStrategyDailyMarkdownPrompt(data: z.infer<typeof StrategyDailyRequestSchema>): {
+  date: string;
+  accountTitle: string;
+  system: string;
+  instruction: string;
+} {
+  const date = data.date.trim();
+  const accountTitle = (data.accountTitle ?? '').trim() || 'Account';
+  const accountPrompt = (data.accountPrompt ?? '').trim();
 
   const system =
     'You are a swing trading strategy engine. ' +
@@ -1581,7 +1568,97 @@ app.post('/strategy/daily-markdown', async (c) => {
     '5. Avoid internal variable names (riskMode/ratio/premium/failedRate). Translate them into trader language.\n\n' +
     (accountPrompt ? `Account prompt:\n${accountPrompt}\n\n` : '') +
     'Context (markdown):\n' +
-    buildContextMarkdown(parsed.data.context);
+    buildContextMarkdown(data.context);
+  return { date, accountTitle, system, instruction };
+}
+
+// Same prompt as /strategy/daily-markdown, streamed as plain text chunks so callers can relay
+// tokens as they arrive. The resolved model id is returned in the X-Model-Id header.
+app.post('/strategy/daily-markdown/stream', async (c) => {
+  const body = await c.req.json().catch(() => null);
+  const parsed = StrategyDailyRequestSchema.safeParse(body);
+  if (!parsed.success) {
+    return c.json({ error: 'Invalid request body', issues: parsed.error.issues }, 400);
+  }
+
+  let model: AiModel;
+  let modelId = '';
+  try {
+    const r = await getStrategyPrimaryAndFallbackModels();
+    model = r.model;
+    modelId = r.modelId;
+  } catch (err) {
+    const message = err instanceof Error ? err.message : 'Invalid AI configuration';
+    return c.json({ error: message }, 500);
+  }
+
+  const { system, instruction } = buildStrategyDailyMarkdownPrompt(parsed.data);
+  const result = await streamText({
+    model,
+    system,
+    prompt: instruction,
+    temperature: 0,
+    maxOutputTokens: 3200,
+  });
+
+  // Markdown chunks, then one trailer: STREAM_TRAILER_SEP + JSON {finishReason, error?}.
+  // A mid-stream model error still ends the HTTP response cleanly, so clients only treat the
+  // text as a complete report when the trailer says finishReason "stop".
+  const encoder = new TextEncoder();
+  const stream = new ReadableStream<Uint8Array>({
+    async start(controller) {
+      let finishReason = 'unknown';
+      let error = '';
+      try {
+        for await (const part of result.fullStream) {
+          if (part.type === 'text-delta') {
+            controller.enqueue(encoder.encode(part.text.replaceAll(STREAM_TRAILER_SEP, '')));
+          } else if (part.type === 'finish') {
+            finishReason = part.finishReason;
+          } else if (part.type === 'error') {
+            error = part.error instanceof Error ? part.error.message : String(part.error);
+          }
+        }
+      } catch (e) {
+        error = e instanceof Error ? e.message : String(e);
+      }
+      if (error) finishReason = 'error';
+      controller.enqueue(
+        encoder.encode(STREAM_TRAILER_SEP + JSON.stringify(error ? { finishReason, error } : { finishReason })),
+      );
+      controller.close();
+    },
+  });
+
+  return c.body(stream, 200, {
+    'Content-Type': 'text/plain; charset=utf-8',
+    'X-Model-Id': modelId || 'unknown',
+  });
+});
+
+app.post('/strategy/daily-markdown', async (c) => {
+  const body = await c.req.json().catch(() => null);
+  const parsed = StrategyDailyRequestSchema.safeParse(body);
+  if (!parsed.success) {
+    return c.json({ error: 'Invalid request body', issues: parsed.error.issues }, 400);
+  }
+
+  let model: AiModel;
+  let fallbackModel: AiModel | null = null;
+  let modelId = '';
+  let fallbackModelId: string | null = null;
+  try {
+    const r = await getStrategyPrimaryAndFallbackModels();
+    model = r.model;
+    modelId = r.modelId;
+    fallbackModel = r.fallbackModel;
+    fallbackModelId = r.fallbackModelId;
+  } catch (err) {
+    const message = err instanceof Error ? err.message : 'Invalid AI configuration';
+    return c.json({ error: message }, 500);
+  }
+
+  const { date, accountTitle, system, instruction } = buildStrategyDailyMarkdownPrompt(parsed.data);
 
   const promptDebug = buildPromptDebug({
     system,
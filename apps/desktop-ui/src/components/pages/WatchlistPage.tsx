@@ -6,6 +6,7 @@ import { createPortal } from 'react-dom';
 
 import { Button } from '@/components/ui/button';
 import { QUANT_BASE_URL } from '@/lib/endpoints';
+import { subscribeQuantEvents } from '@/lib/quantEvents';
 import { loadJson, saveJson } from '@/lib/storage';
 import { useChatStore } from '@/lib/chat/store';
 
@@ -328,7 +329,7 @@ export function WatchlistPage({ onOpenStock }: { onOpenStock?: (symbol: string)
   }, [items]);
 
   const refreshTrend = React.useCallback(
-    async (reason: 'items_changed' | 'manual' | 'timer', opts: { forceMarket?: boolean } = {}) => {
+    async (reason: 'items_changed' | 'manual' | 'event', opts: { forceMarket?: boolean } = {}) => {
       const syms = items.map((x) => x.symbol).filter(Boolean);
       if (!syms.length) {
         setTrend({});
@@ -384,15 +385,21 @@ export function WatchlistPage({ onOpenStock }: { onOpenStock?: (symbol: string)
     void refreshTrend('items_changed');
   }, [refreshTrend]);
 
+  // Latest refreshTrend for the event stream, so watchlist edits don't reopen the EventSource.
+  const refreshTrendRef = React.useRef(refreshTrend);
   React.useEffect(() => {
-    // Auto refresh every 10 minutes to reflect DB updates without reloading the app.
-    if (!items.length) return;
-    const id = window.setInterval(() => {
-      // Auto refresh only recomputes from cache; manual refresh can force network sync.
-      void refreshTrend('timer', { forceMarket: false });
-    }, 10 * 60 * 1000);
-    return () => window.clearInterval(id);
-  }, [items.length, refreshTrend]);
+    refreshTrendRef.current = refreshTrend;
+  }, [refreshTrend]);
+
+  const hasItems = items.length > 0;
+  React.useEffect(() => {
+    // Refresh when the service reports new market data (or lost events), instead of polling.
+    if (!hasItems) return;
+    return subscribeQuantEvents(['market.sync', 'market.bars'], () => {
+      // Pushed refresh only recomputes from cache; manual refresh can force network sync.
+      void refreshTrendRef.current('event', { forceMarket: false });
+    });
+  }, [hasItems]);
 
   function onAdd() {
     setError(null);
@@ -0,0 +1,48 @@
+import { QUANT_BASE_URL } from '@/lib/endpoints';
+
+export type QuantEventTopic =
+  | 'rank.intraday'
+  | 'rank.next2d'
+  | 'leader.mainline'
+  | 'leader.daily'
+  | 'market.sync'
+  | 'market.bars'
+  | 'quotes';
+
+export type QuantEvent = {
+  // `resync` means events were lost: refetch everything the view shows.
+  topic: QuantEventTopic | 'resync';
+  data: Record<string, unknown>;
+};
+
+/**
+ * Listen to the quant service push channel (GET /events, SSE).
+ * EventSource reconnects on its own and resumes from the last event id.
+ * Returns an unsubscribe function.
+ */
+export function subscribeQuantEvents(
+  topics: QuantEventTopic[],
+  onEvent: (ev: QuantEvent) => void,
+  opts: { symbols?: string[] } = {},
+): () => void {
+  if (typeof window === 'undefined' || typeof EventSource === 'undefined') return () => {};
+  const sp = new URLSearchParams();
+  sp.set('topics', topics.join(','));
+  if (opts.symbols?.length) sp.set('symbols', opts.symbols.join(','));
+  const es = new EventSource(`${QUANT_BASE_URL}/events?${sp.toString()}`);
+  const handlers: Array<[string, (e: MessageEvent) => void]> = [...topics, 'resync'].map((topic) => [
+    topic,
+    (e: MessageEvent) => {
+      try {
+        onEvent({ topic: topic as QuantEvent['topic'], data: JSON.parse(String(e.data || '{}')) });
+      } catch {
+        // Ignore malformed frames.
+      }
+    },
+  ]);
+  for (const [topic, fn] of handlers) es.addEventListener(topic, fn);
+  return () => {
+    for (const [topic, fn] of handlers) es.removeEventListener(topic, fn);
+    es.close();
+  };
+}
@@ -0,0 +1,270 @@
+"""
+Benchmark the ranking, mainline and leader engines against a seeded synthetic database.
+
+    uv run python -m bench.run                      # full scale (5000 symbols x 250 days)
+    uv run python -m bench.run --symbols 500 --days 120 --only rank_build_and_score
+    uv run python -m bench.run --update-baseline    # store this run as the baseline
+
+The seeded database is reused across runs while the universe spec matches. Runs are compared to
+the stored baseline (same spec only); any case whose median exceeds baseline * (1 + threshold)
+is reported and the process exits non-zero.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .synthetic import SyntheticMarket, UniverseSpec
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = SERVICE_ROOT / "data" / "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+TRENDOK_WATCHLIST = 200
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    name: str
+    runs: int
+    medianMs: float
+    minMs: float
+    maxMs: float
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    baselineMs: float
+    medianMs: float
+    ratio: float
+
+
+def _cases(main: Any, market: SyntheticMarket) -> dict[str, Callable[[], Any]]:
+    d = market.spec.end_date
+    watchlist = [f"CN:{s.ticker}" for s in market.stocks[:TRENDOK_WATCHLIST]]
+    step1: list[Any] = []
+
+    def step1_top() -> list[Any]:
+        # Step 2 is timed on its own: resolve its Step 1 input once, outside the samples.
+        if not step1:
+            cands, _ = main._mainline_step1_candidates(trade_date=d, force_membership=False)
+            step1.append(cands[:12])
+        return step1[0]
+
+    return {
+        "rank_build_and_score": lambda: main._rank_build_and_score(
+            account_id="bench",
+            as_of_date=d,
+            limit=80,
+            universe_version="v0",
+            include_holdings=False,
+        ),
+        "rank_build_and_score_universe": lambda: main._rank_build_and_score(
+            account_id="bench",
+            as_of_date=d,
+            limit=80,
+            universe_version=main.RANK_UNIVERSE_ALL,
+            include_holdings=False,
+        ),
+        "intraday_rank_build_and_score": lambda: main._intraday_rank_build_and_score(
+            account_id="bench",
+            as_of_ts=f"{d}T02:15:00+00:00",
+            slot="0930_1030",
+            limit=30,
+            universe_version="v0",
+        ),
+        "mainline_step1_candidates": lambda: main._mainline_step1_candidates(
+            trade_date=d, force_membership=False
+        ),
+        "mainline_step2_structure": lambda: main._mainline_step2_structure(
+            trade_date=d, candidates=step1_top(), force_membership=False
+        ),
+        "market_stocks_trendok": lambda: main.market_stocks_trendok(
+            symbols=watchlist, refresh=False
+        ),
+        "dashboard_summary": lambda: main.dashboard_summary(),
+        "list_leader_stocks": lambda: main.list_leader_stocks(days=10, force=False),
+    }
+
+
+CASE_NAMES = (
+    "rank_build_and_score",
+    "rank_build_and_score_universe",
+    "intraday_rank_build_and_score",
+    "mainline_step1_candidates",
+    "mainline_step2_structure",
+    "market_stocks_trendok",
+    "dashboard_summary",
+    "list_leader_stocks",
+)
+
+
+def prepare(spec: UniverseSpec, db_path: Path) -> tuple[Any, SyntheticMarket]:
+    """
+    Point the service at `db_path`, seed it unless it already holds `spec`, and swap the upstream
+    providers for the synthetic ones. Any upstream call left unpatched fails fast (replay mode
+    with an empty fixture dir) instead of reaching the network.
+    """
+    os.environ["DATABASE_PATH"] = str(db_path)
+    os.environ["UPSTREAM_MODE"] = "replay"
+    os.environ["UPSTREAM_FIXTURES_DIR"] = str(db_path.parent / "bench_no_fixtures")
+    import main  # must follow the env setup above
+
+    market = SyntheticMarket(spec)
+    with main._connect() as conn:
+        if not market.seeded(conn):
+            t0 = time.perf_counter()
+            market.write(conn)
+            print(f"seeded {db_path} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    for name, fn in market.providers().items():
+        setattr(main, name, fn)
+    return main, market
+
+
+def run_cases(
+    main: Any,
+    market: SyntheticMarket,
+    *,
+    repeat: int = 5,
+    warmup: int = 1,
+    only: list[str] | None = None,
+) -> list[CaseResult]:
+    cases = _cases(main, market)
+    names = [n for n in CASE_NAMES if not only or n in only]
+    out: list[CaseResult] = []
+    for name in names:
+        fn = cases[name]
+        for _ in range(max(0, warmup)):
+            fn()
+        samples: list[float] = []
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        out.append(
+            CaseResult(
+                name=name,
+                runs=len(samples),
+                medianMs=round(statistics.median(samples), 3),
+                minMs=round(min(samples), 3),
+                maxMs=round(max(samples), 3),
+            )
+        )
+    return out
+
+
+def compare(
+    results: list[CaseResult], baseline: dict[str, Any], *, threshold: float
+) -> list[Regression]:
+    base = baseline.get("results") if isinstance(baseline.get("results"), dict) else {}
+    out: list[Regression] = []
+    for r in results:
+        b = base.get(r.name) if isinstance(base, dict) else None
+        if not isinstance(b, dict) or not b.get("medianMs"):
+            continue
+        ratio = r.medianMs / float(b["medianMs"])
+        if ratio > 1.0 + threshold:
+            out.append(
+                Regression(
+                    name=r.name,
+                    baselineMs=float(b["medianMs"]),
+                    medianMs=r.medianMs,
+                    ratio=round(ratio, 3),
+                )
+            )
+    return out
+
+
+def _load_baseline(path: Path) -> dict[str, Any]:
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return doc if isinstance(doc, dict) else {}
+
+
+def _report(results: list[CaseResult], base: dict[str, Any]) -> str:
+    lines = [f"{'case':<32} {'median ms':>11} {'min ms':>10} {'baseline':>10} {'delta':>8}"]
+    for r in results:
+        b = base.get(r.name) if isinstance(base, dict) else None
+        bms = float(b["medianMs"]) if isinstance(b, dict) and b.get("medianMs") else None
+        delta = f"{(r.medianMs / bms - 1.0) * 100.0:+.1f}%" if bms else "-"
+        bcol = f"{bms:.1f}" if bms else "-"
+        lines.append(f"{r.name:<32} {r.medianMs:>11.1f} {r.minMs:>10.1f} {bcol:>10} {delta:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.split("\n\n")[0])
+    ap.add_argument("--symbols", type=int, default=UniverseSpec.symbols)
+    ap.add_argument("--days", type=int, default=UniverseSpec.days)
+    ap.add_argument("--seed", type=int, default=UniverseSpec.seed)
+    ap.add_argument("--end-date", default="", help="last trade date (YYYY-MM-DD); default today")
+    ap.add_argument(
+        "--db", type=Path, default=None, help="seeded SQLite file (reused if it matches)"
+    )
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument(
+        "--only", default="", help=f"comma-separated subset of: {', '.join(CASE_NAMES)}"
+    )
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    spec = UniverseSpec(
+        symbols=args.symbols, days=args.days, seed=args.seed, end_date=args.end_date
+    ).resolved()
+    db_path = (
+        args.db or SERVICE_ROOT / "data" / f"bench-{spec.symbols}x{spec.days}-s{spec.seed}.sqlite3"
+    )
+    only = [x.strip() for x in args.only.split(",") if x.strip()]
+    unknown = sorted(set(only) - set(CASE_NAMES))
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+
+    svc, market = prepare(spec, db_path)
+    results = run_cases(svc, market, repeat=args.repeat, warmup=args.warmup, only=only or None)
+
+    baseline = _load_baseline(args.baseline)
+    # Timings are only comparable at the same scale (end date aside).
+    same_spec = {k: v for k, v in (baseline.get("spec") or {}).items() if k != "end_date"} == {
+        k: v for k, v in asdict(spec).items() if k != "end_date"
+    }
+    base_results = baseline.get("results") if same_spec else {}
+    print(_report(results, base_results if isinstance(base_results, dict) else {}))
+
+    if args.update_baseline:
+        merged = dict(base_results) if isinstance(base_results, dict) else {}
+        merged.update({r.name: asdict(r) for r in results})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps({"spec": asdict(spec), "results": merged}, indent=2), encoding="utf-8"
+        )
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not same_spec:
+        if baseline:
+            print("baseline spec differs from this run; not compared")
+        return 0
+    regressions = compare(results, baseline, threshold=args.threshold)
+    for g in regressions:
+        print(
+            f"REGRESSION {g.name}: {g.medianMs:.1f} ms vs baseline {g.baselineMs:.1f} ms "
+            f"(x{g.ratio:.2f}, threshold +{args.threshold:.0%})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,934 @@
+"""
+Deterministic synthetic CN/HK market: seeded series, fake upstream providers and a DB writer.
+
+    uv run python -m bench.synthetic --db data/load.sqlite3 --symbols 5000 --days 250
+
+writes a standalone database for load testing; point the service at it with
+DATABASE_PATH=<db> UPSTREAM_MODE=replay so no request reaches a real upstream.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from market.akshare_provider import BarRow, StockRow
+from storage import pack_json
+
+# Settings key recording which spec a database was seeded with (lets runs reuse a seeded file).
+SPEC_SETTING_KEY = "synthetic_universe_spec"
+
+INDUSTRIES = 30
+# A closing move of at least this much counts as limit-up (main board limit is 10%).
+LIMIT_UP_RATIO = 1.095
+SCREENER_ROWS = 120
+# Every upstream function `main` imports from market.akshare_provider has a fake here.
+PROVIDER_NAMES = (
+    "fetch_cn_a_spot",
+    "fetch_hk_spot",
+    "fetch_cn_a_daily_bars",
+    "fetch_hk_daily_bars",
+    "fetch_cn_a_chip_summary",
+    "fetch_cn_a_fund_flow",
+    "fetch_cn_a_minute_bars",
+    "fetch_cn_limitup_pool",
+    "fetch_cn_market_breadth_eod",
+    "fetch_cn_yesterday_limitup_premium",
+    "fetch_cn_failed_limitup_rate",
+    "fetch_cn_trade_dates",
+    "fetch_cn_industry_boards_spot",
+    "fetch_cn_concept_boards_spot",
+    "fetch_cn_industry_members",
+    "fetch_cn_concept_members",
+    "fetch_cn_industry_fund_flow_eod",
+    "fetch_cn_industry_fund_flow_hist",
+)
+# Symbols per executemany batch while seeding.
+_BATCH_SYMBOLS = 200
+
+
+@dataclass(frozen=True)
+class UniverseSpec:
+    """
+    Size and shape of a synthetic CN/HK universe. Same spec (incl. `end_date`) => same data.
+    """
+
+    symbols: int = 5000
+    hk_symbols: int = 500
+    days: int = 250
+    seed: int = 7
+    end_date: str = ""  # YYYY-MM-DD; defaults to today
+    screener_snapshots: int = 50
+    screeners: int = 10
+    themes: int = 500
+    leader_days: int = 10
+
+    def resolved(self) -> UniverseSpec:
+        if self.end_date:
+            return self
+        return UniverseSpec(**{**asdict(self), "end_date": date.today().isoformat()})
+
+
+def trade_dates(end_date: str, n: int) -> list[str]:
+    """
+    The last `n` weekdays up to and including `end_date` (ascending).
+    """
+    d = date.fromisoformat(end_date)
+    out: list[str] = []
+    while len(out) < n:
+        if d.weekday() < 5:
+            out.append(d.isoformat())
+        d -= timedelta(days=1)
+    return out[::-1]
+
+
+def _ticker(i: int) -> str:
+    # Spread across SH main board, SZ main board and ChiNext like the real universe.
+    if i % 3 == 0:
+        return f"{600000 + i // 3:06d}"
+    if i % 3 == 1:
+        return f"{1 + i // 3:06d}"
+    return f"{300001 + i // 3:06d}"
+
+
+@dataclass(frozen=True)
+class _Stock:
+    market: str
+    ticker: str
+    name: str
+    industry: str
+    price0: float
+    drift: float
+    vol: float
+    liquidity: float  # average daily amount (CNY)
+
+
+class _DailyAgg:
+    """
+    Cross-sectional per-date aggregates (breadth, limit-ups, industry flow) over the CN universe,
+    filled one symbol at a time so seeding never holds the whole market in memory.
+    """
+
+    def __init__(self) -> None:
+        self.up: dict[str, int] = {}
+        self.down: dict[str, int] = {}
+        self.flat: dict[str, int] = {}
+        self.turnover: dict[str, float] = {}
+        self.volume: dict[str, float] = {}
+        self.limitups: dict[str, list[str]] = {}  # closed limit-up
+        self.ever_limitup: dict[str, int] = {}  # touched limit-up intraday
+        self.premium_sum: dict[str, float] = {}  # today's change of yesterday's limit-ups
+        self.premium_n: dict[str, int] = {}
+        self.industry_flow: dict[tuple[str, str], float] = {}
+        self.symbols = 0
+
+    def add(self, s: _Stock, bars: list[dict[str, Any]], flows: list[dict[str, str]]) -> None:
+        self.symbols += 1
+        prev_close: float | None = None
+        prev_limitup = False
+        for b, f in zip(bars, flows, strict=True):
+            d = str(b["date"])
+            close = float(b["close"])
+            self.turnover[d] = self.turnover.get(d, 0.0) + float(b["amount"])
+            self.volume[d] = self.volume.get(d, 0.0) + float(b["volume"])
+            key = (d, s.industry)
+            self.industry_flow[key] = self.industry_flow.get(key, 0.0) + float(f["mainNetAmount"])
+            if prev_close is None:
+                prev_close = close
+                continue
+            chg = (close / prev_close - 1.0) * 100.0
+            bucket = self.up if chg > 0.005 else self.down if chg < -0.005 else self.flat
+            bucket[d] = bucket.get(d, 0) + 1
+            if prev_limitup:
+                self.premium_sum[d] = self.premium_sum.get(d, 0.0) + chg
+                self.premium_n[d] = self.premium_n.get(d, 0) + 1
+            limitup = close >= prev_close * LIMIT_UP_RATIO
+            if limitup:
+                self.limitups.setdefault(d, []).append(s.ticker)
+            if limitup or float(b["high"]) >= prev_close * LIMIT_UP_RATIO:
+                self.ever_limitup[d] = self.ever_limitup.get(d, 0) + 1
+            prev_close = close
+            prev_limitup = limitup
+
+    def breadth(self, d: str) -> tuple[int, int, int]:
+        return self.up.get(d, 0), self.down.get(d, 0), self.flat.get(d, 0)
+
+    def premium(self, d: str) -> float:
+        n = self.premium_n.get(d, 0)
+        return round(self.premium_sum.get(d, 0.0) / n, 3) if n else 0.0
+
+    def failed_rate(self, d: str) -> float:
+        ever = self.ever_limitup.get(d, 0)
+        closed = len(self.limitups.get(d, []))
+        return round(max(0, ever - closed) / ever * 100.0, 2) if ever else 0.0
+
+
+def _risk_mode(*, premium: float, failed_rate: float) -> tuple[str, list[str]]:
+    # The bearish gates of the sentiment sync rules (enough to spread days across modes).
+    if premium < 0.0 and failed_rate >= 70.0:
+        return "no_new_positions", ["premium<0 && failedLimitUpRate>=70 => no_new_positions"]
+    if failed_rate >= 70.0:
+        return "caution", ["failedLimitUpRate>=70 => caution"]
+    if premium < 0.0:
+        return "caution", ["premium<0 => caution"]
+    return "normal", []
+
+
+def _industry_code(i: int) -> str:
+    return f"BK{1001 + i:04d}"
+
+
+class SyntheticMarket:
+    """
+    Deterministic CN/HK universe: per-symbol geometric random walks with liquidity tiers, industry
+    and concept memberships, market-wide breadth/sentiment/industry flow derived from the CN
+    series, and TradingView screener snapshots.
+
+    Each symbol's series comes from its own RNG stream, so any symbol (or just its latest bar)
+    can be regenerated without materializing the whole market.
+    """
+
+    def __init__(self, spec: UniverseSpec) -> None:
+        self.spec = spec.resolved()
+        self.dates = trade_dates(self.spec.end_date, max(2, int(self.spec.days)))
+        rng = random.Random(self.spec.seed)
+        self.industries = [f"合成行业{i + 1:02d}" for i in range(INDUSTRIES)]
+        n_concepts = max(0, int(self.spec.themes) - INDUSTRIES)
+        self.concepts = [f"合成概念{i + 1:03d}" for i in range(n_concepts)]
+        self.stocks: list[_Stock] = []
+        for i in range(max(1, int(self.spec.symbols))):
+            self.stocks.append(
+                _Stock(
+                    market="CN",
+                    ticker=_ticker(i),
+                    name=f"合成{i:04d}",
+                    industry=self.industries[rng.randrange(INDUSTRIES)],
+                    price0=round(math.exp(rng.uniform(math.log(3.0), math.log(120.0))), 2),
+                    drift=rng.gauss(0.0003, 0.0015),
+                    vol=rng.uniform(0.012, 0.045),
+                    # Log-normal liquidity: most names trade 1e7-5e8 CNY a day, a few far more.
+                    liquidity=math.exp(rng.gauss(math.log(1.5e8), 1.1)),
+                )
+            )
+        self.hk_stocks: list[_Stock] = []
+        for i in range(max(0, int(self.spec.hk_symbols))):
+            self.hk_stocks.append(
+                _Stock(
+                    market="HK",
+                    ticker=f"{i + 1:05d}",
+                    name=f"合成港股{i:04d}",
+                    industry="",
+                    price0=round(math.exp(rng.uniform(math.log(0.5), math.log(300.0))), 2),
+                    drift=rng.gauss(0.0001, 0.0012),
+                    vol=rng.uniform(0.010, 0.040),
+                    liquidity=math.exp(rng.gauss(math.log(5e7), 1.4)),
+                )
+            )
+        self.by_ticker = {s.ticker: s for s in self.stocks}
+        self.hk_by_ticker = {s.ticker: s for s in self.hk_stocks}
+        self.concept_members: dict[str, list[str]] = {}
+        for c in self.concepts:
+            k = rng.randint(20, 80)
+            self.concept_members[c] = sorted(
+                s.ticker for s in rng.sample(self.stocks, min(k, len(self.stocks)))
+            )
+        self._last: dict[str, tuple[dict[str, Any], dict[str, Any]]] = {}
+        self._daily: _DailyAgg | None = None
+
+    def _stock(self, ticker: str) -> _Stock:
+        return self.by_ticker.get(ticker) or self.hk_by_ticker[ticker]
+
+    # --- Series ---
+
+    def bars(self, ticker: str) -> list[dict[str, Any]]:
+        s = self._stock(ticker)
+        rng = random.Random(f"{self.spec.seed}:bars:{s.market}:{ticker}")
+        out: list[dict[str, Any]] = []
+        close = s.price0
+        for d in self.dates:
+            ret = max(-0.1, min(0.1, rng.gauss(s.drift, s.vol)))
+            if s.market == "CN" and rng.random() < 0.012:
+                # Occasional limit-up day so limit-up pools and followers are populated.
+                ret = 0.1
+            open_ = close * (1.0 + rng.gauss(0.0, s.vol / 3.0))
+            close = max(0.5, close * (1.0 + ret))
+            high = max(open_, close) * (1.0 + abs(rng.gauss(0.0, s.vol / 2.0)))
+            low = min(open_, close) * (1.0 - abs(rng.gauss(0.0, s.vol / 2.0)))
+            amount = s.liquidity * math.exp(rng.gauss(0.0, 0.35)) * (1.0 + 8.0 * abs(ret))
+            out.append(
+                {
+                    "date": d,
+                    "open": round(open_, 2),
+                    "high": round(high, 2),
+                    "low": round(low, 2),
+                    "close": round(close, 2),
+                    "volume": round(amount / max(0.5, close) / 100.0),
+                    "amount": round(amount, 2),
+                    "changePct": round(ret * 100.0, 2),
+                }
+            )
+        if len(out) >= 2:
+            self._last[ticker] = (out[-2], out[-1])
+        return out
+
+    def last_two_bars(self, ticker: str) -> tuple[dict[str, Any], dict[str, Any]]:
+        if ticker not in self._last:
+            self.bars(ticker)
+        return self._last[ticker]
+
+    def chips(self, ticker: str, bars: list[dict[str, Any]]) -> list[dict[str, str]]:
+        rng = random.Random(f"{self.spec.seed}:chips:{ticker}")
+        out: list[dict[str, str]] = []
+        avg = float(bars[0]["close"])
+        for b in bars:
+            c = float(b["close"])
+            avg = avg * 0.95 + c * 0.05
+            spread = max(0.02, rng.uniform(0.06, 0.25))
+            out.append(
+                {
+                    "date": str(b["date"]),
+                    "profitRatio": f"{max(0.0, min(1.0, 0.5 + (c / avg - 1.0) * 4.0)):.4f}",
+                    "avgCost": f"{avg:.2f}",
+                    "cost90Low": f"{avg * (1 - spread):.2f}",
+                    "cost90High": f"{avg * (1 + spread):.2f}",
+                    "cost90Conc": f"{spread:.4f}",
+                    "cost70Low": f"{avg * (1 - spread * 0.6):.2f}",
+                    "cost70High": f"{avg * (1 + spread * 0.6):.2f}",
+                    "cost70Conc": f"{spread * 0.6:.4f}",
+                }
+            )
+        return out
+
+    def fund_flow(self, ticker: str, bars: list[dict[str, Any]]) -> list[dict[str, str]]:
+        rng = random.Random(f"{self.spec.seed}:flow:{ticker}")
+        out: list[dict[str, str]] = []
+        for b in bars:
+            amount = float(b["amount"])
+            # Main-force flow leans with the day's move.
+            main_ratio = max(-30.0, min(30.0, float(b["changePct"]) * 1.5 + rng.gauss(0.0, 4.0)))
+            super_ratio = main_ratio * rng.uniform(0.3, 0.7)
+            large_ratio = main_ratio - super_ratio
+            small_ratio = -main_ratio * rng.uniform(0.4, 0.8)
+            medium_ratio = -main_ratio - small_ratio
+            out.append(
+                {
+                    "date": str(b["date"]),
+                    "close": f"{b['close']}",
+                    "changePct": f"{b['changePct']}",
+                    "mainNetAmount": f"{amount * main_ratio / 100.0:.2f}",
+                    "mainNetRatio": f"{main_ratio:.2f}",
+                    "superNetAmount": f"{amount * super_ratio / 100.0:.2f}",
+                    "superNetRatio": f"{super_ratio:.2f}",
+                    "largeNetAmount": f"{amount * large_ratio / 100.0:.2f}",
+                    "largeNetRatio": f"{large_ratio:.2f}",
+                    "mediumNetAmount": f"{amount * medium_ratio / 100.0:.2f}",
+                    "mediumNetRatio": f"{medium_ratio:.2f}",
+                    "smallNetAmount": f"{amount * small_ratio / 100.0:.2f}",
+                    "smallNetRatio": f"{small_ratio:.2f}",
+                }
+            )
+        return out
+
+    def minute_bars(self, ticker: str, trade_date: str) -> list[dict[str, Any]]:
+        prev, last = self.last_two_bars(ticker)
+        rng = random.Random(f"{self.spec.seed}:min:{ticker}:{trade_date}")
+        s = self._stock(ticker)
+        price = float(prev["close"])
+        target = float(last["close"])
+        per_min = float(last["amount"]) / 240.0
+        t0 = datetime.fromisoformat(f"{trade_date}T09:30:00")
+        out: list[dict[str, Any]] = []
+        for k in range(240):
+            # Morning 09:31-11:30, afternoon 13:01-15:00; drift toward the day's close.
+            ts = t0 + timedelta(minutes=k + 1 + (90 if k >= 120 else 0))
+            left = 240 - k
+            step = (target - price) / left + rng.gauss(0.0, price * s.vol / 15.0)
+            o = price
+            price = max(0.5, price + step)
+            amt = per_min * math.exp(rng.gauss(0.0, 0.5)) * (1.6 if k < 30 or k >= 210 else 1.0)
+            out.append(
+                {
+                    "ts": ts.strftime("%Y-%m-%d %H:%M:00"),
+                    "open": round(o, 2),
+                    "high": round(max(o, price) * 1.001, 2),
+                    "low": round(min(o, price) * 0.999, 2),
+                    "close": round(price, 2),
+                    "volume": round(amt / price / 100.0),
+                    "amount": round(amt, 2),
+                }
+            )
+        return out
+
+    # --- Fake providers (same shapes as market.akshare_provider) ---
+
+    def daily(self) -> _DailyAgg:
+        """
+        Per-date CN aggregates; computed once (`write` fills them while seeding).
+        """
+        if self._daily is None or self._daily.symbols < len(self.stocks):
+            agg = _DailyAgg()
+            for st in self.stocks:
+                bars = self.bars(st.ticker)
+                agg.add(st, bars, self.fund_flow(st.ticker, bars))
+            self._daily = agg
+        return self._daily
+
+    def _spot_row(self, s: _Stock) -> StockRow:
+        prev, last = self.last_two_bars(s.ticker)
+        chg = (float(last["close"]) / float(prev["close"]) - 1.0) * 100.0
+        quote = {
+            "price": f"{last['close']}",
+            "change_pct": f"{chg:.2f}",
+            "open_pct": f"{(float(last['open']) / float(prev['close']) - 1.0) * 100.0:.2f}",
+            "vol_ratio": f"{float(last['amount']) / max(1.0, float(prev['amount'])):.2f}",
+            "volume": f"{last['volume']}",
+            "turnover": f"{last['amount']}",
+            "market_cap": f"{float(last['close']) * s.liquidity * 40.0:.0f}",
+        }
+        if s.market == "HK":
+            # HK spot carries no open/volume-ratio columns.
+            quote.pop("open_pct")
+            quote.pop("vol_ratio")
+        return StockRow(
+            symbol=f"{s.market}:{s.ticker}",
+            market=s.market,
+            ticker=s.ticker,
+            name=s.name,
+            currency="CNY" if s.market == "CN" else "HKD",
+            quote=quote,
+        )
+
+    def _bar_rows(self, ticker: str, days: int) -> list[BarRow]:
+        return [
+            BarRow(
+                date=str(b["date"]),
+                open=str(b["open"]),
+                high=str(b["high"]),
+                low=str(b["low"]),
+                close=str(b["close"]),
+                volume=str(b["volume"]),
+                amount=str(b["amount"]),
+            )
+            for b in self.bars(ticker)[-max(1, int(days)) :]
+        ]
+
+    # --- Fake providers (same signatures and shapes as market.akshare_provider) ---
+
+    def fetch_cn_a_spot(self) -> list[StockRow]:
+        return [self._spot_row(s) for s in self.stocks]
+
+    def fetch_hk_spot(self) -> list[StockRow]:
+        return [self._spot_row(s) for s in self.hk_stocks]
+
+    def fetch_cn_a_daily_bars(self, ticker: str, *, days: int = 60) -> list[BarRow]:
+        return self._bar_rows(ticker, days) if ticker in self.by_ticker else []
+
+    def fetch_hk_daily_bars(self, ticker: str, *, days: int = 60) -> list[BarRow]:
+        return self._bar_rows(ticker, days) if ticker in self.hk_by_ticker else []
+
+    def fetch_cn_a_chip_summary(
+        self, ticker: str, *, days: int = 60, adjust: str = ""
+    ) -> list[dict[str, str]]:
+        if ticker not in self.by_ticker:
+            return []
+        return self.chips(ticker, self.bars(ticker))[-max(1, int(days)) :]
+
+    def fetch_cn_a_fund_flow(self, ticker: str, *, days: int = 60) -> list[dict[str, str]]:
+        if ticker not in self.by_ticker:
+            return []
+        return self.fund_flow(ticker, self.bars(ticker))[-max(1, int(days)) :]
+
+    def fetch_cn_a_minute_bars(
+        self, ticker: str, *, trade_date: str, interval: str = "1"
+    ) -> list[dict[str, Any]]:
+        if ticker not in self.by_ticker:
+            return []
+        return self.minute_bars(ticker, trade_date)
+
+    def fetch_cn_limitup_pool(self, as_of: date) -> list[dict[str, Any]]:
+        tickers = self.daily().limitups.get(as_of.isoformat(), [])
+        return [{"ticker": t, "name": self.by_ticker[t].name, "raw": {"代码": t}} for t in tickers]
+
+    def fetch_cn_market_breadth_eod(self, as_of: date) -> dict[str, Any]:
+        d = as_of.isoformat()
+        agg = self.daily()
+        up, down, flat = agg.breadth(d)
+        return {
+            "date": d,
+            "up_count": up,
+            "down_count": down,
+            "flat_count": flat,
+            "total_count": up + down + flat,
+            "up_down_ratio": round(up / down, 4) if down else float(up),
+            "total_turnover_cny": agg.turnover.get(d, 0.0),
+            "total_volume": agg.volume.get(d, 0.0),
+            "raw": {"source": "synthetic", "rows": up + down + flat},
+        }
+
+    def fetch_cn_yesterday_limitup_premium(self, as_of: date) -> dict[str, Any]:
+        d = as_of.isoformat()
+        agg = self.daily()
+        return {
+            "date": d,
+            "premium": agg.premium(d),
+            "count": agg.premium_n.get(d, 0),
+            "raw": {"source": "synthetic"},
+        }
+
+    def fetch_cn_failed_limitup_rate(self, as_of: date) -> dict[str, Any]:
+        d = as_of.isoformat()
+        agg = self.daily()
+        return {
+            "date": d,
+            "failed_rate": agg.failed_rate(d),
+            "ever_count": agg.ever_limitup.get(d, 0),
+            "close_count": len(agg.limitups.get(d, [])),
+            "raw": {"method": "synthetic"},
+        }
+
+    def fetch_cn_trade_dates(self) -> list[str]:
+        return list(self.dates)
+
+    def fetch_cn_industry_fund_flow_eod(self, as_of: date) -> list[dict[str, Any]]:
+        d = as_of.isoformat()
+        flow = self.daily().industry_flow
+        return [
+            {
+                "date": d,
+                "industry_code": _industry_code(i),
+                "industry_name": name,
+                "net_inflow": round(flow.get((d, name), 0.0), 2),
+                "raw": {"f12": _industry_code(i), "f14": name},
+            }
+            for i, name in enumerate(self.industries)
+        ]
+
+    def fetch_cn_industry_fund_flow_hist(
+        self, industry_name: str, *, industry_code: str | None = None, days: int = 10
+    ) -> list[dict[str, Any]]:
+        codes = {_industry_code(i): n for i, n in enumerate(self.industries)}
+        name = codes.get((industry_code or "").split(".")[-1], industry_name)
+        if name not in codes.values():
+            return []
+        flow = self.daily().industry_flow
+        return [
+            {"date": d, "net_inflow": round(flow.get((d, name), 0.0), 2), "raw": {}}
+            for d in self.dates[-max(1, min(int(days), 60)) :]
+        ]
+
+    def _boards(self, names: list[str], members: dict[str, list[str]]) -> list[dict[str, Any]]:
+        rows: list[dict[str, Any]] = []
+        for name in names:
+            chg: list[float] = []
+            turnover = 0.0
+            for t in members.get(name, []):
+                prev, last = self.last_two_bars(t)
+                chg.append((float(last["close"]) / float(prev["close"]) - 1.0) * 100.0)
+                turnover += float(last["amount"])
+            avg = sum(chg) / len(chg) if chg else 0.0
+            rows.append(
+                {
+                    "name": name,
+                    "change_pct": f"{avg:.2f}",
+                    "turnover": f"{turnover:.0f}",
+                    "raw": {"板块名称": name},
+                }
+            )
+        rows.sort(key=lambda r: float(r["change_pct"]), reverse=True)
+        return rows
+
+    def industry_members(self) -> dict[str, list[str]]:
+        out: dict[str, list[str]] = {n: [] for n in self.industries}
+        for s in self.stocks:
+            out[s.industry].append(s.ticker)
+        return out
+
+    def fetch_cn_industry_boards_spot(self) -> list[dict[str, Any]]:
+        return self._boards(self.industries, self.industry_members())
+
+    def fetch_cn_concept_boards_spot(self) -> list[dict[str, Any]]:
+        return self._boards(self.concepts, self.concept_members)
+
+    def fetch_cn_industry_members(self, industry_name: str) -> list[str]:
+        return self.industry_members().get(industry_name, [])
+
+    def fetch_cn_concept_members(self, concept_name: str) -> list[str]:
+        return list(self.concept_members.get(concept_name, []))
+
+    def providers(self) -> dict[str, Any]:
+        """
+        Provider name -> fake, for patching the names `main` imports from market.akshare_provider.
+        """
+        return {name: getattr(self, name) for name in PROVIDER_NAMES}
+
+    # --- Database ---
+
+    def seeded(self, conn: sqlite3.Connection) -> bool:
+        row = conn.execute(
+            "SELECT value FROM settings WHERE key = ?", (SPEC_SETTING_KEY,)
+        ).fetchone()
+        return row is not None and str(row[0]) == json.dumps(asdict(self.spec), sort_keys=True)
+
+    def write(self, conn: sqlite3.Connection) -> None:
+        """
+        Seed every table the engines read. `conn` must already have the service schema
+        (i.e. come from `main._connect()`); existing rows for the same keys are replaced.
+        """
+        ts = datetime.now(tz=UTC).isoformat()
+        # Throwaway benchmark DB: trade durability for seeding speed.
+        conn.execute("PRAGMA synchronous=OFF")
+        agg = _DailyAgg()
+        for stocks in (self.stocks, self.hk_stocks):
+            for i in range(0, len(stocks), _BATCH_SYMBOLS):
+                self._write_symbols(conn, stocks[i : i + _BATCH_SYMBOLS], ts, agg)
+                conn.commit()
+        self._daily = agg
+        self._write_industry_flow(conn, agg, ts)
+        self._write_sentiment(conn, agg, ts)
+        self._write_themes(conn, ts)
+        self._write_screeners(conn, ts)
+        self._write_leaders(conn, ts)
+        conn.execute(
+            "INSERT OR REPLACE INTO settings(key, value) VALUES(?, ?)",
+            (SPEC_SETTING_KEY, json.dumps(asdict(self.spec), sort_keys=True)),
+        )
+        conn.commit()
+
+    def _write_symbols(
+        self, conn: sqlite3.Connection, stocks: list[_Stock], ts: str, agg: _DailyAgg
+    ) -> None:
+        stock_rows: list[tuple[Any, ...]] = []
+        quote_rows: list[tuple[Any, ...]] = []
+        bar_rows: list[tuple[Any, ...]] = []
+        chip_rows: list[tuple[Any, ...]] = []
+        flow_rows: list[tuple[Any, ...]] = []
+        for s in stocks:
+            sym = f"{s.market}:{s.ticker}"
+            bars = self.bars(s.ticker)
+            spot = self._spot_row(s)
+            stock_rows.append((sym, s.market, s.ticker, s.name, spot.currency, ts))
+            q = spot.quote
+            quote_rows.append(
+                (
+                    sym,
+                    q.get("price"),
+                    q.get("change_pct"),
+                    q.get("volume"),
+                    q.get("turnover"),
+                    q.get("market_cap"),
+                    ts,
+                    pack_json(q, dictionary="quote"),
+                )
+            )
+            for b in bars:
+                bar_rows.append(
+                    (
+                        sym,
+                        b["date"],
+                        str(b["open"]),
+                        str(b["high"]),
+                        str(b["low"]),
+                        str(b["close"]),
+                        str(b["volume"]),
+                        str(b["amount"]),
+                        ts,
+                    )
+                )
+            if s.market != "CN":
+                # HK: bars and quotes only (chips/fund flow are CN-only upstreams).
+                continue
+            flows = self.fund_flow(s.ticker, bars)
+            agg.add(s, bars, flows)
+            for c in self.chips(s.ticker, bars):
+                chip_rows.append(
+                    (
+                        sym,
+                        c["date"],
+                        c["profitRatio"],
+                        c["avgCost"],
+                        c["cost90Low"],
+                        c["cost90High"],
+                        c["cost90Conc"],
+                        c["cost70Low"],
+                        c["cost70High"],
+                        c["cost70Conc"],
+                        ts,
+                        pack_json(c, dictionary="chips"),
+                    )
+                )
+            for f in flows:
+                flow_rows.append(
+                    (
+                        sym,
+                        f["date"],
+                        f["close"],
+                        f["changePct"],
+                        f["mainNetAmount"],
+                        f["mainNetRatio"],
+                        f["superNetAmount"],
+                        f["superNetRatio"],
+                        f["largeNetAmount"],
+                        f["largeNetRatio"],
+                        f["mediumNetAmount"],
+                        f["mediumNetRatio"],
+                        f["smallNetAmount"],
+                        f["smallNetRatio"],
+                        ts,
+                        pack_json(f, dictionary="fund_flow"),
+                    )
+                )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_stocks(symbol, market, ticker, name, currency, updated_at)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            stock_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_quotes(symbol, price, change_pct, volume, turnover, market_cap, updated_at, raw_json)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            quote_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_bars(symbol, date, open, high, low, close, volume, amount, updated_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            bar_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_chips(
+              symbol, date, profit_ratio, avg_cost,
+              cost90_low, cost90_high, cost90_conc, cost70_low, cost70_high, cost70_conc,
+              updated_at, raw_json
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            chip_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_fund_flow(
+              symbol, date, close, change_pct,
+              main_net_amount, main_net_ratio, super_net_amount, super_net_ratio,
+              large_net_amount, large_net_ratio, medium_net_amount, medium_net_ratio,
+              small_net_amount, small_net_ratio, updated_at, raw_json
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            flow_rows,
+        )
+
+    def _write_industry_flow(self, conn: sqlite3.Connection, agg: _DailyAgg, ts: str) -> None:
+        rows: list[tuple[Any, ...]] = []
+        for d in self.dates:
+            for i, name in enumerate(self.industries):
+                code = _industry_code(i)
+                net = round(agg.industry_flow.get((d, name), 0.0), 2)
+                raw = {"f12": code, "f14": name, "f62": net}
+                rows.append((d, code, name, net, ts, json.dumps(raw, ensure_ascii=False)))
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_cn_industry_fund_flow_daily(date, industry_code, industry_name, net_inflow, updated_at, raw_json)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    def _write_sentiment(self, conn: sqlite3.Connection, agg: _DailyAgg, ts: str) -> None:
+        rows: list[tuple[Any, ...]] = []
+        # The first date has no previous close: no breadth to report.
+        for d in self.dates[1:]:
+            up, down, flat = agg.breadth(d)
+            premium = agg.premium(d)
+            failed = agg.failed_rate(d)
+            mode, rules = _risk_mode(premium=premium, failed_rate=failed)
+            raw = {
+                "source": "synthetic",
+                "limitUpCount": len(agg.limitups.get(d, [])),
+                "everLimitUpCount": agg.ever_limitup.get(d, 0),
+            }
+            rows.append(
+                (
+                    d,
+                    d,
+                    up,
+                    down,
+                    flat,
+                    up + down + flat,
+                    round(up / down, 4) if down else float(up),
+                    agg.turnover.get(d, 0.0),
+                    agg.volume.get(d, 0.0),
+                    premium,
+                    failed,
+                    mode,
+                    json.dumps(rules),
+                    ts,
+                    json.dumps(raw),
+                )
+            )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO market_cn_sentiment_daily(
+              date, as_of_date, up_count, down_count, flat_count, total_count, up_down_ratio,
+              market_turnover_cny, market_volume, yesterday_limitup_premium, failed_limitup_rate,
+              risk_mode, rules_json, updated_at, raw_json
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    def _write_themes(self, conn: sqlite3.Connection, ts: str) -> None:
+        rows: list[tuple[str, str, str, str]] = []
+        for name, members in self.industry_members().items():
+            rows.append((f"industry:{name}", self.spec.end_date, json.dumps(members), ts))
+        for name, members in self.concept_members.items():
+            rows.append((f"concept:{name}", self.spec.end_date, json.dumps(members), ts))
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO cn_theme_membership_cache(theme_key, trade_date, members_json, updated_at)
+            VALUES(?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    def _write_screeners(self, conn: sqlite3.Connection, ts: str) -> None:
+        n_screeners = max(1, int(self.spec.screeners))
+        for k in range(n_screeners):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO tv_screeners(id, name, url, enabled, created_at, updated_at)
+                VALUES(?, ?, ?, 1, ?, ?)
+                """,
+                (
+                    f"synthetic-{k + 1:02d}",
+                    f"Synthetic Screener {k + 1:02d}",
+                    f"https://www.tradingview.com/screener/synthetic{k + 1:02d}/",
+                    ts,
+                    ts,
+                ),
+            )
+        headers = ["Symbol", "Price", "Change %", "Sector"]
+        for j in range(max(0, int(self.spec.screener_snapshots))):
+            k = j % n_screeners
+            rng = random.Random(f"{self.spec.seed}:screener:{j}")
+            picks = rng.sample(self.stocks, min(SCREENER_ROWS, len(self.stocks)))
+            rows: list[dict[str, str]] = []
+            for s in picks:
+                prev, last = self.last_two_bars(s.ticker)
+                chg = (float(last["close"]) / float(prev["close"]) - 1.0) * 100.0
+                rows.append(
+                    {
+                        "Symbol": f"{s.ticker}\n{s.name}\nD",
+                        "Price": f"{last['close']} CNY",
+                        "Change %": f"{chg:.2f}%",
+                        "Sector": s.industry,
+                    }
+                )
+            # Older snapshots first; the engines read each screener's latest one.
+            captured = datetime.fromisoformat(f"{self.spec.end_date}T07:00:00+00:00") - timedelta(
+                hours=j // n_screeners
+            )
+            payload = {
+                "screenTitle": f"Synthetic Screener {k + 1:02d}",
+                "filters": [],
+                "url": "",
+                "headers": headers,
+                "rows": rows,
+            }
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO tv_screener_snapshots(id, screener_id, captured_at, row_count, headers_json, rows_json)
+                VALUES(?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    f"synthetic-snap-{j + 1:03d}",
+                    f"synthetic-{k + 1:02d}",
+                    captured.isoformat(),
+                    len(rows),
+                    json.dumps(headers),
+                    pack_json(payload),
+                ),
+            )
+
+    def _write_leaders(self, conn: sqlite3.Connection, ts: str) -> None:
+        rng = random.Random(f"{self.spec.seed}:leaders")
+        for d in self.dates[-max(0, int(self.spec.leader_days)) :]:
+            for s in rng.sample(self.stocks, min(2, len(self.stocks))):
+                close = next(b["close"] for b in self.bars(s.ticker) if b["date"] == d)
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO leader_stocks(
+                      id, date, symbol, market, ticker, name, entry_price, score, reason,
+                      why_bullets_json, source_signals_json, risk_points_json, created_at
+                    )
+                    VALUES(?, ?, ?, 'CN', ?, ?, ?, ?, ?, '[]', '{}', '[]', ?)
+                    """,
+                    (
+                        f"synthetic-{d}-{s.ticker}",
+                        d,
+                        f"CN:{s.ticker}",
+                        s.ticker,
+                        s.name,
+                        float(close),
+                        round(rng.uniform(60.0, 95.0), 1),
+                        "synthetic leader",
+                        ts,
+                    ),
+                )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m bench.synthetic", description=__doc__.split("\n\n")[0].strip()
+    )
+    ap.add_argument("--db", type=Path, required=True, help="SQLite file to create or reseed")
+    ap.add_argument("--symbols", type=int, default=UniverseSpec.symbols)
+    ap.add_argument("--hk-symbols", type=int, default=UniverseSpec.hk_symbols)
+    ap.add_argument("--days", type=int, default=UniverseSpec.days)
+    ap.add_argument("--seed", type=int, default=UniverseSpec.seed)
+    ap.add_argument("--end-date", default="", help="last trade date (YYYY-MM-DD); default today")
+    ap.add_argument("--themes", type=int, default=UniverseSpec.themes)
+    ap.add_argument("--screener-snapshots", type=int, default=UniverseSpec.screener_snapshots)
+    args = ap.parse_args(argv)
+
+    spec = UniverseSpec(
+        symbols=args.symbols,
+        hk_symbols=args.hk_symbols,
+        days=args.days,
+        seed=args.seed,
+        end_date=args.end_date,
+        themes=args.themes,
+        screener_snapshots=args.screener_snapshots,
+    ).resolved()
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    os.environ["DATABASE_PATH"] = str(args.db)
+    import main as svc  # schema lives in `_connect()`; must follow the env setup above
+
+    market = SyntheticMarket(spec)
+    with svc._connect() as conn:
+        if market.seeded(conn):
+            print(f"{args.db} already holds this spec")
+            return 0
+        t0 = time.perf_counter()
+        market.write(conn)
+    print(f"seeded {args.db} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,27 @@
+from .keys import canonical_json, content_key
+from .lru import LRUCache
+from .policy import (
+    DAILY_BAR,
+    LIVE_TTL_SEC,
+    MINUTE_BARS,
+    THEME_MEMBERS,
+    Freshness,
+    expected_daily_date,
+    is_fresh,
+)
+from .stats import CacheStats, cache_stats
+
+__all__ = [
+    "DAILY_BAR",
+    "LIVE_TTL_SEC",
+    "MINUTE_BARS",
+    "THEME_MEMBERS",
+    "CacheStats",
+    "Freshness",
+    "LRUCache",
+    "cache_stats",
+    "canonical_json",
+    "content_key",
+    "expected_daily_date",
+    "is_fresh",
+]
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+
+def canonical_json(value: Any) -> str:
+    """
+    Deterministic JSON: sorted keys, compact separators, non-JSON values stringified.
+    """
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def content_key(*parts: Any) -> str:
+    """
+    sha256 of the canonical JSON of `parts`; equal inputs always map to the same key.
+    """
+    return hashlib.sha256(canonical_json(list(parts)).encode("utf-8")).hexdigest()
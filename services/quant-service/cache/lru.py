@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from .stats import CacheStats, cache_stats
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU map. Hits and misses are reported to `stats` under `name`.
+    """
+
+    def __init__(self, maxsize: int, *, name: str, stats: CacheStats | None = None) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self.name = name
+        self._stats = stats if stats is not None else cache_stats
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            if key not in self._data:
+                value = None
+            else:
+                self._data.move_to_end(key)
+                value = self._data[key]
+        self._stats.record(self.name, value is not None)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> int:
+        """
+        Drop every key for which `match(key)` is true; returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [k for k in self._data if match(k)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
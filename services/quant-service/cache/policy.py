@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from market.calendar import TradingCalendar
+from market.session import (
+    CN_CLOSE,
+    CN_LUNCH_START,
+    CONTINUOUS,
+    HOLIDAY,
+    LUNCH_BREAK,
+    POST_CLOSE,
+    PRE_OPEN,
+    cn_at,
+    cn_session,
+    to_cn,
+)
+
+# Upstream EOD data lags the bell a little; data fetched after close + settle is treated as final.
+SETTLE = timedelta(minutes=5)
+
+# Kinds whose value for a trading day keeps changing until that day's close.
+MINUTE_BARS = "minute_bars"
+DAILY_BAR = "daily_bar"
+# Membership-style data that can change on any day but slowly.
+THEME_MEMBERS = "theme_members"
+
+# Seconds a value may be served while it can still change, per session phase.
+# Phases missing here fall back to the structural rules in `is_fresh` (e.g. "final after close").
+LIVE_TTL_SEC: dict[str, dict[str, float]] = {
+    MINUTE_BARS: {PRE_OPEN: 300.0, CONTINUOUS: 90.0},
+    DAILY_BAR: {PRE_OPEN: 600.0, CONTINUOUS: 600.0},
+    THEME_MEMBERS: {
+        PRE_OPEN: 3600.0,
+        CONTINUOUS: 3600.0,
+        LUNCH_BREAK: 6 * 3600.0,
+        POST_CLOSE: 6 * 3600.0,
+        HOLIDAY: 24 * 3600.0,
+    },
+}
+
+
+@dataclass(frozen=True)
+class Freshness:
+    fresh: bool
+    reason: str
+    session: str
+    age_sec: float
+
+
+def is_fresh(kind: str, *, data_date: date, updated_at: datetime, now: datetime, cal: TradingCalendar) -> Freshness:
+    """
+    Decide whether a cached value for `data_date` can be served at `now`.
+
+    Values for closed days, and values fetched after their day's close, can never change and are
+    always fresh. Values for the current trading day are only refreshed aggressively during the
+    continuous session; a lunch-break or post-close fetch is final for that half-day.
+    """
+    session = cn_session(now, cal)
+    age = max(0.0, (now - updated_at).total_seconds())
+    today = to_cn(now).date()
+    upd = to_cn(updated_at)
+
+    if kind == THEME_MEMBERS:
+        if data_date < today:
+            return Freshness(True, "past_date", session, age)
+        ttl = LIVE_TTL_SEC[THEME_MEMBERS].get(session, 3600.0)
+        return Freshness(age <= ttl, "ttl", session, age)
+
+    if not cal.is_trading_day(data_date):
+        return Freshness(True, "closed_day", session, age)
+    if data_date > today:
+        return Freshness(True, "future_date", session, age)
+    if data_date < today or session == POST_CLOSE:
+        final = upd >= cn_at(data_date, CN_CLOSE) + SETTLE
+        return Freshness(final, "final" if final else "before_close", session, age)
+    if session == LUNCH_BREAK:
+        final = upd >= cn_at(data_date, CN_LUNCH_START) + SETTLE
+        return Freshness(final, "lunch_final" if final else "before_lunch", session, age)
+    ttl = LIVE_TTL_SEC.get(kind, {}).get(session, 90.0)
+    return Freshness(age <= ttl, "ttl", session, age)
+
+
+def expected_daily_date(now: datetime, cal: TradingCalendar, *, eod_only: bool = False) -> date:
+    """
+    Latest daily row a cache should already contain at `now`.
+
+    Before the open, today's bar does not exist yet. EOD-only datasets (chips, fund flow) are only
+    published after the close, so during the session the previous trading day is the latest.
+    """
+    n = to_cn(now)
+    d = n.date()
+    if not cal.is_trading_day(d):
+        return cal.latest_trading_day(d)
+    session = cn_session(n, cal)
+    if session == PRE_OPEN:
+        return cal.prev_trading_day(d)
+    if eod_only and (session != POST_CLOSE or n < cn_at(d, CN_CLOSE) + SETTLE):
+        return cal.prev_trading_day(d)
+    return d
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+
+class CacheStats:
+    """
+    Thread-safe per-cache hit/miss counters.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: dict[str, list[int]] = {}
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            c = self._counts.setdefault(name, [0, 0])
+            c[0 if hit else 1] += 1
+
+    def hit(self, name: str) -> None:
+        self.record(name, True)
+
+    def miss(self, name: str) -> None:
+        self.record(name, False)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            items = {k: (v[0], v[1]) for k, v in self._counts.items()}
+        out: dict[str, dict[str, Any]] = {}
+        for name, (hits, misses) in sorted(items.items()):
+            total = hits + misses
+            out[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hitRatio": (hits / total) if total else None,
+            }
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+# Process-wide registry shared by every cache in the service.
+cache_stats = CacheStats()
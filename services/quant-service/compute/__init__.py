@@ -0,0 +1,15 @@
+from .pool import DEFAULT_BATCH_SIZE, ComputePool, default_workers
+from .shm import BAR_FIELDS, BarMatrix, BarMatrixRef, BarView, LocalBars, LocalBarView, pack_bar
+
+__all__ = [
+    "BAR_FIELDS",
+    "DEFAULT_BATCH_SIZE",
+    "BarMatrix",
+    "BarMatrixRef",
+    "BarView",
+    "ComputePool",
+    "LocalBarView",
+    "LocalBars",
+    "default_workers",
+    "pack_bar",
+]
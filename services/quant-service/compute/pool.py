@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from .shm import BarMatrix, BarMatrixRef, LocalBars
+
+DEFAULT_BATCH_SIZE = 32
+
+
+def default_workers() -> int:
+    # Leave one core for the API process (event loop, request threads, SQLite).
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _run_inline(fn: Callable[..., Any], *args: Any) -> Future[Any]:
+    fut: Future[Any] = Future()
+    try:
+        fut.set_result(fn(*args))
+    except BaseException as e:
+        fut.set_exception(e)
+    return fut
+
+
+class ComputePool:
+    """
+    Process pool for CPU-bound scoring, so heavy batches do not hold the API process's GIL.
+    Until `start()` (or with `workers=0`, or after the pool broke) work runs inline in the calling
+    thread, so results never depend on the pool. Workers are spawned lazily on first use (the
+    "spawn" start method: forking a threaded server is unsafe) and import the submitted
+    function's module once.
+    """
+
+    def __init__(self, workers: int, *, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.workers = max(0, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self._lock = threading.Lock()
+        self._enabled = False
+        self._executor: ProcessPoolExecutor | None = None
+        self._stats = {"batches": 0, "inlineBatches": 0, "restarts": 0, "sharedBytes": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._enabled and self.workers > 0
+
+    def start(self) -> None:
+        with self._lock:
+            self._enabled = True
+
+    def _get_executor(self) -> ProcessPoolExecutor | None:
+        if not self.running:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future[Any]:
+        """
+        Run `fn(*args)` in a worker (`fn` must be a module-level function; args are pickled).
+        """
+        ex = self._get_executor()
+        if ex is not None:
+            try:
+                fut = ex.submit(fn, *args)
+                with self._lock:
+                    self._stats["batches"] += 1
+                return fut
+            except (BrokenProcessPool, RuntimeError):
+                self._reset(ex)
+        with self._lock:
+            self._stats["inlineBatches"] += 1
+        return _run_inline(fn, *args)
+
+    def map_batches(
+        self,
+        fn: Callable[..., list[Any]],
+        items: Sequence[Any],
+        *args: Any,
+        batch_size: int | None = None,
+    ) -> list[Any]:
+        """
+        `fn(batch, *args)` over `items` split in batches, results concatenated in order (`fn`
+        returns one result per item). A batch lost to a crashed worker is recomputed inline.
+        """
+        size = max(1, int(batch_size or self.batch_size))
+        batches = [list(items[i : i + size]) for i in range(0, len(items), size)]
+        futures = [self.submit(fn, b, *args) for b in batches]
+        out: list[Any] = []
+        for b, fut in zip(batches, futures, strict=True):
+            try:
+                out.extend(fut.result())
+            except BrokenProcessPool:
+                ex = self._executor
+                if ex is not None:
+                    self._reset(ex)
+                out.extend(_run_inline(fn, b, *args).result())
+        return out
+
+    def map_bars(
+        self,
+        fn: Callable[..., list[Any]],
+        bars_by_symbol: dict[str, Any],
+        items: Sequence[Any],
+        *args: Any,
+        batch_size: int | None = None,
+    ) -> list[Any]:
+        """
+        `map_batches` over bars shared through a `BarMatrix`: `fn(ref, batch, *args)` gets a
+        `BarMatrixRef` instead of the bars themselves. Without running workers the batches run
+        inline anyway, so the bars are handed over as they are (`LocalBars`).
+        """
+        if not items:
+            return []
+        if not self.running:
+            return self.map_batches(
+                _with_ref, items, fn, LocalBars(bars_by_symbol), *args, batch_size=batch_size
+            )
+        with BarMatrix(bars_by_symbol) as matrix:
+            with self._lock:
+                self._stats["sharedBytes"] += matrix.nbytes
+            return self.map_batches(_with_ref, items, fn, matrix.ref, *args, batch_size=batch_size)
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._enabled and self.workers > 0,
+                "spawned": self._executor is not None,
+                **self._stats,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._enabled = False
+            ex, self._executor = self._executor, None
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _with_ref(
+    batch: list[Any], fn: Callable[..., list[Any]], ref: BarMatrixRef | LocalBars, *args: Any
+) -> list[Any]:
+    return fn(ref, batch, *args)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import array
+import math
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, cast
+
+# Columns of a packed daily bar (the `market_bars` shape). Dates are stored as yyyymmdd.
+BAR_FIELDS = ("date", "open", "high", "low", "close", "volume", "amount")
+
+_ITEM = 8  # float64
+
+
+def _num(v: Any) -> float:
+    # float() already ignores surrounding whitespace; None and junk become NaN.
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return math.nan
+    return f if math.isfinite(f) else math.nan
+
+
+def _date_num(v: Any) -> float:
+    s = str(v or "").strip()
+    if len(s) != 10 or s[4] != "-" or s[7] != "-":
+        return math.nan
+    try:
+        return float(int(s[:4]) * 10000 + int(s[5:7]) * 100 + int(s[8:10]))
+    except ValueError:
+        return math.nan
+
+
+def _date_str(f: float) -> str:
+    if math.isnan(f):
+        return ""
+    n = int(f)
+    return f"{n // 10000:04d}-{n // 100 % 100:02d}-{n % 100:02d}"
+
+
+BarTuple = tuple[str, str | None, str | None, str | None, str | None, str | None]
+
+
+def pack_bar(bar: Mapping[str, Any] | Sequence[Any]) -> tuple[float, ...]:
+    """
+    One bar -> a row of `BAR_FIELDS` floats (NaN for missing/unparsable values). Accepts the
+    dict shape of `_load_cached_bars` and the (date, open, high, low, close, volume) tuples
+    used by TrendOK.
+    """
+    if isinstance(bar, Mapping):
+        vals = [bar.get(f) for f in BAR_FIELDS]
+    else:
+        vals = list(bar)[: len(BAR_FIELDS)]
+        vals += [None] * (len(BAR_FIELDS) - len(vals))
+    return (_date_num(vals[0]), *(_num(v) for v in vals[1:]))
+
+
+def _bar_dict(r: Sequence[float]) -> dict[str, str]:
+    return {
+        "date": _date_str(r[0]),
+        **{
+            f: ("" if math.isnan(v) else repr(v))
+            for f, v in zip(BAR_FIELDS[1:], r[1:], strict=True)
+        },
+    }
+
+
+def _bar_tuple(r: Sequence[float]) -> BarTuple:
+    o, h, lo, c, v = (None if math.isnan(x) else repr(x) for x in r[1:6])
+    return (_date_str(r[0]), o, h, lo, c, v)
+
+
+@dataclass(frozen=True)
+class BarMatrixRef:
+    """
+    Picklable handle to a `BarMatrix`: the shared-memory block name and the row range of every
+    symbol. This is all a worker process receives; bars are read in place.
+    """
+
+    name: str
+    index: tuple[tuple[str, int, int], ...]  # (symbol, first row, row count)
+
+    def attach(self) -> BarView:
+        return BarView(self)
+
+
+class BarView:
+    """
+    Read-only view of a `BarMatrix` from any process. Rows are rebuilt in the shapes the scoring
+    functions already take, so they run unchanged on shared bars.
+    """
+
+    def __init__(self, ref: BarMatrixRef) -> None:
+        self._shm = shared_memory.SharedMemory(name=ref.name, track=False)
+        self._data = self._shm.buf.cast("d")
+        self._index = {sym: (start, n) for sym, start, n in ref.index}
+
+    def __enter__(self) -> BarView:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.release()
+        self._shm.close()
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._index)
+
+    def rows(self, symbol: str) -> list[tuple[float, ...]]:
+        start, n = self._index.get(symbol, (0, 0))
+        w = len(BAR_FIELDS)
+        flat = self._data[start * w : (start + n) * w].tolist()
+        return [tuple(flat[i : i + w]) for i in range(0, len(flat), w)]
+
+    def bars(self, symbol: str) -> list[dict[str, str]]:
+        """
+        `_load_cached_bars` shape: dicts of strings, "" for missing values.
+        """
+        return [_bar_dict(r) for r in self.rows(symbol)]
+
+    def bar_tuples(self, symbol: str) -> list[BarTuple]:
+        """
+        TrendOK shape: (date, open, high, low, close, volume), None for missing values.
+        """
+        return [_bar_tuple(r) for r in self.rows(symbol)]
+
+
+class BarMatrix:
+    """
+    Daily bars of many symbols packed into one float64 shared-memory block, so process-pool
+    workers read them without pickling. The creating process owns the block: use it as a context
+    manager (or call `close()`) to free it once the workers are done.
+    """
+
+    def __init__(
+        self, bars_by_symbol: Mapping[str, Iterable[Mapping[str, Any] | Sequence[Any]]]
+    ) -> None:
+        flat = array.array("d")
+        index: list[tuple[str, int, int]] = []
+        row = 0
+        for sym, bars in bars_by_symbol.items():
+            n = 0
+            for b in bars:
+                flat.extend(pack_bar(b))
+                n += 1
+            index.append((sym, row, n))
+            row += n
+        self._shm = shared_memory.SharedMemory(create=True, size=max(_ITEM, len(flat) * _ITEM))
+        if flat:
+            self._shm.buf[: len(flat) * _ITEM] = flat.tobytes()
+        self.ref = BarMatrixRef(name=self._shm.name, index=tuple(index))
+        self.rows = row
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows * len(BAR_FIELDS) * _ITEM
+
+    def __enter__(self) -> BarMatrix:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class LocalBars:
+    """
+    In-process stand-in for a `BarMatrixRef`, used when work runs inline: nothing crosses a
+    process boundary, so the bars are served as given instead of round-tripping through shared
+    memory. Bars already in the shape an accessor asks for are returned unchanged.
+    """
+
+    def __init__(
+        self, bars_by_symbol: Mapping[str, Sequence[Mapping[str, Any] | Sequence[Any]]]
+    ) -> None:
+        self._bars = bars_by_symbol
+
+    def attach(self) -> LocalBarView:
+        return LocalBarView(self._bars)
+
+
+class LocalBarView:
+    """
+    `BarView` interface over in-process bars (see `LocalBars`).
+    """
+
+    def __init__(
+        self, bars_by_symbol: Mapping[str, Sequence[Mapping[str, Any] | Sequence[Any]]]
+    ) -> None:
+        self._bars = bars_by_symbol
+
+    def __enter__(self) -> LocalBarView:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._bars)
+
+    def rows(self, symbol: str) -> list[tuple[float, ...]]:
+        return [pack_bar(b) for b in self._bars.get(symbol, ())]
+
+    def bars(self, symbol: str) -> list[dict[str, str]]:
+        return [
+            dict(b) if isinstance(b, Mapping) else _bar_dict(pack_bar(b))
+            for b in self._bars.get(symbol, ())
+        ]
+
+    def bar_tuples(self, symbol: str) -> list[BarTuple]:
+        return [
+            _bar_tuple(pack_bar(b)) if isinstance(b, Mapping) else cast(BarTuple, tuple(b))
+            for b in self._bars.get(symbol, ())
+        ]
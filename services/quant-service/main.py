@@ -1,32 +1,57 @@
 from __future__ import annotations
 
 import base64
+import codecs
+import contextvars
+import functools
 import hashlib
 import http.client
+import itertools
 import json
 import math
 import os
+import queue
 import re
 import shutil
 import signal
 import sqlite3
 import subprocess
+import sys
 import threading
 import time
 import urllib.error
 import urllib.request
 import uuid
-from dataclasses import dataclass
-from datetime import UTC, datetime, timedelta
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
 from typing import Annotated, Any, cast
 from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-
+from starlette.routing import Match
+
+from cache import (
+    DAILY_BAR,
+    LIVE_TTL_SEC,
+    MINUTE_BARS,
+    THEME_MEMBERS,
+    Freshness,
+    LRUCache,
+    cache_stats,
+    content_key,
+    expected_daily_date,
+    is_fresh,
+)
+from compute import BarMatrixRef, ComputePool, default_workers
 from market.akshare_provider import (
     BarRow,
     StockRow,
@@ -44,10 +69,50 @@ from market.akshare_provider import (
     fetch_cn_industry_members,
     fetch_cn_limitup_pool,
     fetch_cn_market_breadth_eod,
+    fetch_cn_trade_dates,
     fetch_cn_yesterday_limitup_premium,
     fetch_hk_daily_bars,
     fetch_hk_spot,
 )
+from market.calendar import TradingCalendar, build_cn_calendar
+from market.collector import MinuteCollector
+from market.session import CONTINUOUS, LUNCH_BREAK, POST_CLOSE, cn_session, to_cn
+from metrics import (
+    HTTP_REQUEST_SECONDS,
+    SQLITE_SECONDS,
+    SYNC_STEP_SECONDS,
+    Span,
+    cache_stats_collector,
+    format_sample,
+    observe_upstream,
+    registry,
+    trace,
+    traced,
+)
+from metrics import (
+    annotate as annotate_trace,
+)
+from metrics import (
+    stage as trace_stage,
+)
+from metrics.profiler import ProfileStore, SamplingProfiler
+from push import QUOTES, EventBus, Subscription
+from quant.calibration import CalibrationState, find_bucket
+from quant.intraday import MinuteSeries
+from scheduler import Job, Scheduler, job
+from storage import (
+    RetentionManager,
+    RetentionPolicy,
+    WriteQueue,
+    blob_codec,
+    column_size,
+    database_size,
+    enable_incremental_vacuum,
+    pack_json,
+    prune,
+    recompress_column,
+    unpack_json,
+)
 from tv.capture import capture_screener_over_cdp_sync
 from tv.normalize import split_symbol_cell
 
@@ -79,11 +144,34 @@ app.add_middleware(
 )
 
 
+class _MeteredConnection(sqlite3.Connection):
+    """
+    Records the duration of each `with _connect() as conn:` block under the calling helper's name.
+    """
+
+    _metric_helper = "unknown"
+    _metric_t0 = 0.0
+
+    def __enter__(self) -> _MeteredConnection:
+        self._metric_helper = sys._getframe(1).f_code.co_name
+        self._metric_t0 = time.perf_counter()
+        return super().__enter__()
+
+    def __exit__(self, *exc: Any) -> Any:
+        try:
+            return super().__exit__(*exc)
+        finally:
+            SQLITE_SECONDS.observe(time.perf_counter() - self._metric_t0, helper=self._metric_helper)
+
+
 def _connect() -> sqlite3.Connection:
+    t0 = time.perf_counter()
     default_db = str(Path(__file__).with_name("karios.sqlite3"))
     db_path = os.getenv("DATABASE_PATH", default_db)
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, factory=_MeteredConnection)
+    # Takes effect only on a new (empty) file; existing ones convert via POST /storage/retention/run.
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute(
         """
@@ -173,6 +261,50 @@ def _connect() -> sqlite3.Connection:
         )
         """,
     )
+    # Per-symbol daily features derived from market_bars (see `_refresh_daily_features`). A row is
+    # only read for its symbol's latest bar date; bar upserts drop rows at or after the first
+    # date they touch.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS market_features_daily (
+          symbol TEXT NOT NULL,
+          date TEXT NOT NULL,
+          bar_count INTEGER NOT NULL,
+          close REAL,
+          sma5 REAL,
+          sma10 REAL,
+          sma20 REAL,
+          high10 REAL,
+          low10 REAL,
+          high20 REAL,
+          low20 REAL,
+          vol_sma10 REAL,
+          vol_sma20 REAL,
+          volume REAL,
+          amount REAL,
+          amount_avg5 REAL,
+          ret3d REAL,
+          ret5d REAL,
+          ema5 REAL,
+          ema20 REAL,
+          ema60 REAL,
+          ema20_prev REAL,
+          macd REAL,
+          macd_signal REAL,
+          macd_hist REAL,
+          macd_hist_l1 REAL,
+          macd_hist_l2 REAL,
+          macd_hist_l3 REAL,
+          rsi14 REAL,
+          close_high20 REAL,
+          avg_vol5 REAL,
+          avg_vol30 REAL,
+          atr14 REAL,
+          computed_at TEXT NOT NULL,
+          PRIMARY KEY(symbol, date)
+        )
+        """,
+    )
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS market_chips (
@@ -235,6 +367,20 @@ def _connect() -> sqlite3.Connection:
         "CREATE INDEX IF NOT EXISTS idx_cn_industry_fund_flow_date ON market_cn_industry_fund_flow_daily(date DESC)",
     )
 
+    # Trading calendar overrides: synced exchange trade dates + manual closures/openings.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS market_calendar_days (
+          market TEXT NOT NULL,
+          date TEXT NOT NULL,
+          is_open INTEGER NOT NULL,
+          source TEXT NOT NULL,
+          updated_at TEXT NOT NULL,
+          PRIMARY KEY(market, date, source)
+        )
+        """,
+    )
+
     # --- CN market breadth & sentiment (v0) ---
     conn.execute(
         """
@@ -335,6 +481,19 @@ def _connect() -> sqlite3.Connection:
     conn.execute(
         "CREATE UNIQUE INDEX IF NOT EXISTS ux_broker_snapshots_broker_account_sha256 ON broker_snapshots(broker, account_id, sha256)",
     )
+    # AI extraction results by image content hash: re-importing/re-syncing a known screenshot
+    # never calls the vision model again.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broker_extraction_cache (
+          broker TEXT NOT NULL,
+          sha256 TEXT NOT NULL,
+          extracted_json TEXT NOT NULL,
+          created_at TEXT NOT NULL,
+          PRIMARY KEY(broker, sha256)
+        )
+        """,
+    )
 
     # --- Strategy module (v0) ---
     conn.execute(
@@ -485,6 +644,27 @@ def _connect() -> sqlite3.Connection:
         )
         """,
     )
+    # Incrementally maintained calibration (versioned per lookback window).
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quant_2d_calibration_snapshots (
+          key TEXT NOT NULL,
+          version INTEGER NOT NULL,
+          account_id TEXT NOT NULL,
+          lookback_days INTEGER NOT NULL,
+          buckets INTEGER NOT NULL,
+          base_date TEXT NOT NULL,
+          stale INTEGER NOT NULL DEFAULT 0,
+          created_at TEXT NOT NULL,
+          state_json TEXT NOT NULL,
+          output_json TEXT NOT NULL,
+          PRIMARY KEY(key, version)
+        )
+        """,
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_quant_2d_calibration_snapshots_account ON quant_2d_calibration_snapshots(account_id)",
+    )
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS cn_intraday_rank_snapshots (
@@ -522,19 +702,47 @@ def _connect() -> sqlite3.Connection:
     conn.execute(
         "CREATE INDEX IF NOT EXISTS idx_cn_intraday_observations_trade_date ON cn_intraday_observations(trade_date DESC)",
     )
-    # Optional minute bars cache (only for small candidate pools).
+    # Minute bars cache (only for small candidate pools): typed rows appended as the session
+    # advances, plus per-(symbol, day) running feature state so rescoring never re-reads the day.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS market_cn_minute_bar_rows (
+          symbol TEXT NOT NULL,
+          trade_date TEXT NOT NULL,
+          interval TEXT NOT NULL,
+          ts TEXT NOT NULL,
+          open REAL NOT NULL,
+          high REAL NOT NULL,
+          low REAL NOT NULL,
+          close REAL NOT NULL,
+          volume REAL NOT NULL,
+          amount REAL NOT NULL,
+          UNIQUE(symbol, trade_date, interval, ts)
+        )
+        """,
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cn_minute_bar_rows_trade_date ON market_cn_minute_bar_rows(trade_date DESC)",
+    )
     conn.execute(
         """
-        CREATE TABLE IF NOT EXISTS market_cn_minute_bars (
+        CREATE TABLE IF NOT EXISTS market_cn_minute_state (
           symbol TEXT NOT NULL,
           trade_date TEXT NOT NULL,
           interval TEXT NOT NULL,
           updated_at TEXT NOT NULL,
-          bars_json TEXT NOT NULL,
+          last_ts TEXT NOT NULL,
+          bar_count INTEGER NOT NULL,
+          state_json TEXT NOT NULL,
           PRIMARY KEY(symbol, trade_date, interval)
         )
         """,
     )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cn_minute_state_trade_date ON market_cn_minute_state(trade_date DESC)",
+    )
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'market_cn_minute_bars'").fetchone():
+        _migrate_legacy_minute_bars(conn)
 
     conn.execute(
         """
@@ -574,6 +782,61 @@ def _connect() -> sqlite3.Connection:
     conn.execute(
         "CREATE INDEX IF NOT EXISTS idx_cn_theme_membership_cache_trade_date ON cn_theme_membership_cache(trade_date DESC)",
     )
+
+    # ai-service responses, content-addressed by (endpoint, payload, active system prompt).
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_response_cache (
+          key TEXT PRIMARY KEY,
+          endpoint TEXT NOT NULL,
+          size_bytes INTEGER NOT NULL,
+          response_json TEXT NOT NULL,
+          created_at TEXT NOT NULL,
+          last_used_at TEXT NOT NULL,
+          hits INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_last_used ON ai_response_cache(last_used_at)",
+    )
+    # Stage timing trees for rank/mainline/leader runs; `snapshot_id` links to the snapshot row
+    # the run produced (cn_rank_snapshots / cn_mainline_snapshots), when it has one.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_traces (
+          id TEXT PRIMARY KEY,
+          pipeline TEXT NOT NULL,
+          trade_date TEXT NOT NULL,
+          snapshot_id TEXT,
+          created_at TEXT NOT NULL,
+          duration_ms REAL NOT NULL,
+          trace_json TEXT NOT NULL
+        )
+        """,
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pipeline_traces_pipeline_created ON pipeline_traces(pipeline, created_at)",
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_runs (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          job TEXT NOT NULL,
+          scheduled_for TEXT NOT NULL,
+          trigger TEXT NOT NULL,
+          status TEXT NOT NULL,
+          started_at TEXT,
+          finished_at TEXT,
+          duration_ms REAL,
+          error TEXT,
+          result_json TEXT
+        )
+        """,
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_scheduler_runs_job_scheduled ON scheduler_runs(job, scheduled_for)",
+    )
     # Backward-compatible migration: add missing columns for existing DBs.
     try:
         cols = {str(r[1]) for r in conn.execute("PRAGMA table_info(leader_stocks)").fetchall()}
@@ -594,9 +857,50 @@ def _connect() -> sqlite3.Connection:
         "CREATE UNIQUE INDEX IF NOT EXISTS ux_strategy_reports_account_date ON strategy_reports(account_id, date)",
     )
     conn.commit()
+    # Open + schema check cost, paid by every helper before its own block.
+    SQLITE_SECONDS.observe(time.perf_counter() - t0, helper="_connect")
     return conn
 
 
+# --- Write queue ---
+# Hot write paths (minute bars, bar/chips/flow caches, live scores, 2D events/outcomes) go through
+# one writer thread that group-commits whatever is queued, instead of each caller taking the
+# database write lock for its own commit. Reads keep using `_connect()` (WAL: never blocked).
+_writes = WriteQueue(_connect)
+
+
+def _should_start_write_queue() -> bool:
+    # Tests write inline (`WriteQueue.submit` commits on the caller's thread until started).
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        return False
+    v = str(os.getenv("DISABLE_WRITE_QUEUE", "") or "").strip().lower()
+    return v not in ("1", "true", "yes", "on")
+
+
+def _start_write_queue() -> None:
+    if _should_start_write_queue():
+        _writes.start()
+
+
+def _write_queue_collector() -> list[str]:
+    st = _writes.status()
+    return [
+        "# HELP quant_sqlite_write_queue_depth Write ops waiting for the writer thread.",
+        "# TYPE quant_sqlite_write_queue_depth gauge",
+        format_sample("quant_sqlite_write_queue_depth", {}, st["queueDepth"]),
+        "# HELP quant_sqlite_write_ops_total Queued write ops by outcome.",
+        "# TYPE quant_sqlite_write_ops_total counter",
+        format_sample("quant_sqlite_write_ops_total", {"status": "ok"}, st["ops"] - st["failedOps"]),
+        format_sample("quant_sqlite_write_ops_total", {"status": "error"}, st["failedOps"]),
+        "# HELP quant_sqlite_write_commits_total Group commits (one per batch of queued ops).",
+        "# TYPE quant_sqlite_write_commits_total counter",
+        format_sample("quant_sqlite_write_commits_total", {}, st["batches"]),
+    ]
+
+
+registry.register_collector(_write_queue_collector)
+
+
 def get_setting(key: str) -> str | None:
     with _connect() as conn:
         row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
@@ -704,102 +1008,13 @@ def now_iso() -> str:
     return datetime.now(tz=UTC).isoformat()
 
 
-_intraday_scheduler_started = False
-_intraday_scheduler_lock = threading.Lock()
-
-
-def _should_start_intraday_scheduler() -> bool:
-    if os.getenv("PYTEST_CURRENT_TEST"):
-        return False
-    v = str(os.getenv("ENABLE_INTRADAY_RANK_SCHEDULER", "") or "").strip().lower()
-    return v in ("1", "true", "yes", "on")
-
-
-def _run_intraday_scheduler_loop() -> None:
-    """
-    A lightweight in-process scheduler for desktop usage.
-    It triggers intraday rank snapshots at configured clock times (Asia/Shanghai).
-    """
-    tz = ZoneInfo("Asia/Shanghai")
-    # Target times (HH:MM, local time)
-    targets = [
-        ("09:15", "preopen_intent"),
-        ("09:25", "opening_anchor"),
-        ("10:25", "hourly_prep"),
-        ("11:25", "hourly_prep"),
-        ("13:55", "hourly_prep"),
-        ("14:35", "hourly_prep"),
-    ]
-    fired: set[str] = set()
-    while True:
-        try:
-            now_cn = datetime.now(tz=tz)
-            trade_date = now_cn.strftime("%Y-%m-%d")
-            hhmm = now_cn.strftime("%H:%M")
-            for t, kind in targets:
-                key = f"{trade_date}|{t}|{kind}"
-                if key in fired:
-                    continue
-                # Fire within a small window to tolerate sleep jitter.
-                if hhmm == t:
-                    # Default account: first pingan account.
-                    accs = list_broker_accounts(broker="pingan")
-                    aid = accs[0].id if accs else ""
-                    if aid:
-                        try:
-                            as_of_ts = now_iso()
-                            slot = _infer_intraday_slot(now_cn)
-                            # Observation first (best-effort).
-                            _append_cn_intraday_observation(
-                                trade_date=trade_date,
-                                ts=as_of_ts,
-                                kind=kind,
-                                raw={"note": "scheduled", "slot": slot},
-                            )
-                            # Generate snapshot.
-                            out = _intraday_rank_build_and_score(
-                                account_id=aid,
-                                as_of_ts=as_of_ts,
-                                slot=slot,
-                                limit=30,
-                                universe_version="v0",
-                            )
-                            _upsert_cn_intraday_rank_snapshot(
-                                account_id=aid,
-                                as_of_ts=as_of_ts,
-                                trade_date=str(out.get("tradeDate") or trade_date),
-                                slot=str(out.get("slot") or slot),
-                                universe_version="v0",
-                                ts=as_of_ts,
-                                output=out,
-                            )
-                            _prune_cn_intraday_rank_snapshots(account_id=aid, keep_days=10)
-                        except Exception:
-                            # Do not crash the scheduler loop.
-                            pass
-                    fired.add(key)
-            # Reset fired set when a new trade_date begins.
-            fired = {k for k in fired if k.startswith(f"{trade_date}|")}
-        except Exception:
-            pass
-        time.sleep(20)
-
-
-def _start_intraday_scheduler() -> None:
-    global _intraday_scheduler_started
-    if not _should_start_intraday_scheduler():
-        return
-    with _intraday_scheduler_lock:
-        if _intraday_scheduler_started:
-            return
-        t = threading.Thread(target=_run_intraday_scheduler_loop, name="intraday-rank-scheduler", daemon=True)
-        t.start()
-        _intraday_scheduler_started = True
-
-
 @app.on_event("startup")
 def _on_startup() -> None:
-    _start_intraday_scheduler()
+    _start_write_queue()
+    _start_compute_pool()
+    _start_scheduler()
+    _start_retention_manager()
+    _start_minute_collector()
 
 
 def _finite_float(x: Any, default: float = 0.0) -> float:
@@ -816,37 +1031,73 @@ def _finite_float(x: Any, default: float = 0.0) -> float:
         return float(default)
 
 
+# Parsed snapshot payloads, keyed by (table, id, created_at). Rows are immutable once written
+# (upserts assign a new id), so entries never go stale; writers still drop their table's entries
+# to release memory early.
+_snapshot_payload_cache = LRUCache(64, name="snapshot_payloads")
+
+
+def _load_snapshot_payload(conn: sqlite3.Connection, *, table: str, row: Any) -> dict[str, Any] | None:
+    """
+    Resolve a `(id, created_at)` row to `{"id","createdAt","output","models"}`, parsing
+    `output_json` only on a cache miss. `models` memoizes validated response objects per payload.
+    """
+    if row is None:
+        return None
+    snap_id = str(row[0])
+    created_at = str(row[1])
+    key = (table, snap_id, created_at)
+    entry = _snapshot_payload_cache.get(key)
+    if entry is None:
+        r = conn.execute(f"SELECT output_json FROM {table} WHERE id = ?", (snap_id,)).fetchone()
+        if r is None:
+            return None
+        try:
+            out = unpack_json(r[0], empty="{}")
+        except Exception:
+            out = {}
+        entry = {"output": out, "models": {}}
+        _snapshot_payload_cache.put(key, entry)
+    return {"id": snap_id, "createdAt": created_at, "output": entry["output"], "models": entry["models"]}
+
+
+def _invalidate_snapshot_payloads(table: str) -> None:
+    _snapshot_payload_cache.invalidate(lambda k: isinstance(k, tuple) and k[0] == table)
+
+
+def _snapshot_models(cached: dict[str, Any], name: str, build: Callable[[dict[str, Any]], Any]) -> Any:
+    """
+    Build (once per cached payload) a derived object such as the validated item list.
+    """
+    models = cached.get("models")
+    if not isinstance(models, dict):
+        out0 = cached.get("output")
+        return build(out0 if isinstance(out0, dict) else {})
+    if name not in models:
+        out0 = cached.get("output")
+        models[name] = build(out0 if isinstance(out0, dict) else {})
+    return models[name]
+
+
 def _prune_cn_rank_snapshots(*, keep_days: int = 10) -> None:
     keep = max(1, min(int(keep_days), 60))
     with _connect() as conn:
-        # Keep by date string ordering (YYYY-MM-DD).
-        rows = conn.execute(
-            "SELECT DISTINCT as_of_date FROM cn_rank_snapshots ORDER BY as_of_date DESC",
-        ).fetchall()
-        dates = [str(r[0]) for r in rows if r and r[0]]
-        to_delete = dates[keep:]
-        for d in to_delete:
-            conn.execute("DELETE FROM cn_rank_snapshots WHERE as_of_date = ?", (d,))
-        conn.commit()
+        n = prune(conn, RetentionPolicy("cn_rank_snapshots", "as_of_date", keep))
+    if n:
+        _invalidate_snapshot_payloads("cn_rank_snapshots")
 
 
 def _get_cn_rank_snapshot(*, account_id: str, as_of_date: str, universe_version: str) -> dict[str, Any] | None:
     with _connect() as conn:
         row = conn.execute(
             """
-            SELECT id, created_at, output_json
+            SELECT id, created_at
             FROM cn_rank_snapshots
             WHERE account_id = ? AND as_of_date = ? AND universe_version = ?
             """,
             (account_id, as_of_date, universe_version),
         ).fetchone()
-    if row is None:
-        return None
-    try:
-        out = json.loads(str(row[2]) or "{}")
-    except Exception:
-        out = {}
-    return {"id": str(row[0]), "createdAt": str(row[1]), "output": out}
+        return _load_snapshot_payload(conn, table="cn_rank_snapshots", row=row)
 
 
 def _upsert_cn_rank_snapshot(*, account_id: str, as_of_date: str, universe_version: str, ts: str, output: dict[str, Any]) -> str:
@@ -861,9 +1112,14 @@ def _upsert_cn_rank_snapshot(*, account_id: str, as_of_date: str, universe_versi
               created_at = excluded.created_at,
               output_json = excluded.output_json
             """,
-            (snap_id, account_id, as_of_date, universe_version, ts, json.dumps(output or {}, ensure_ascii=False, default=str)),
+            (snap_id, account_id, as_of_date, universe_version, ts, pack_json(output or {}, default=str)),
         )
         conn.commit()
+    _invalidate_snapshot_payloads("cn_rank_snapshots")
+    _events.publish(
+        "rank.next2d",
+        {"id": snap_id, "accountId": account_id, "asOfDate": as_of_date, "universeVersion": universe_version},
+    )
     return snap_id
 
 
@@ -894,23 +1150,88 @@ def _get_market_bar_by_date(*, symbol: str, date: str) -> dict[str, Any] | None:
     }
 
 
+_trading_calendar_cache: dict[str, TradingCalendar] = {}
+_trading_calendar_lock = threading.Lock()
+
+
+@functools.cache
+def _hk_trading_calendar() -> TradingCalendar:
+    """
+    Shared weekends-only HK calendar (no HK holiday table yet); built on first use.
+    """
+    return TradingCalendar()
+
+
+def _cn_trading_calendar() -> TradingCalendar:
+    """
+    Shared CN trading calendar (embedded holidays + synced/manual overrides from SQLite).
+    Built once per database and rebuilt only when the overrides change.
+    """
+    db_key = os.getenv("DATABASE_PATH", "") or "default"
+    cal = _trading_calendar_cache.get(db_key)
+    if cal is not None:
+        return cal
+    with _trading_calendar_lock:
+        cal = _trading_calendar_cache.get(db_key)
+        if cal is not None:
+            return cal
+        with _connect() as conn:
+            rows = conn.execute(
+                "SELECT date, is_open, source FROM market_calendar_days WHERE market = 'CN'",
+            ).fetchall()
+        holidays: set[date] = set()
+        extra_open: set[date] = set()
+        trading_dates: set[date] = set()
+        for r in rows:
+            try:
+                d = date.fromisoformat(str(r[0]))
+            except ValueError:
+                continue
+            if str(r[2]) == "manual":
+                (extra_open if int(r[1] or 0) else holidays).add(d)
+            elif int(r[1] or 0):
+                trading_dates.add(d)
+        cal = build_cn_calendar(holidays=holidays, extra_open=extra_open, trading_dates=trading_dates)
+        _trading_calendar_cache[db_key] = cal
+        return cal
+
+
+def _invalidate_trading_calendar() -> None:
+    with _trading_calendar_lock:
+        _trading_calendar_cache.clear()
+
+
 def _cn_next_trade_dates(*, as_of_date: str, n: int) -> list[str]:
     """
-    Best-effort CN trading day forward steps (weekday-only; no holiday calendar).
+    CN trading day forward steps (exchange calendar; skips weekends and holidays).
     """
     n2 = max(1, min(int(n), 10))
     try:
         d0 = datetime.strptime(as_of_date, "%Y-%m-%d").date()
     except Exception:
         d0 = datetime.now(tz=UTC).date()
-    out: list[str] = []
-    cur = d0
-    while len(out) < n2:
-        cur = cur + timedelta(days=1)
-        if cur.weekday() >= 5:
-            continue
-        out.append(cur.isoformat())
-    return out
+    return [d.isoformat() for d in _cn_trading_calendar().next_trading_days(d0, n2)]
+
+
+def _cache_freshness(kind: str, *, data_date: str, updated_at: str) -> Freshness | None:
+    """
+    Session-aware freshness of a cached value (see cache/policy.py); None if unparseable.
+    """
+    try:
+        d = date.fromisoformat(str(data_date)[:10])
+        upd = datetime.fromisoformat(str(updated_at).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if upd.tzinfo is None:
+        upd = upd.replace(tzinfo=UTC)
+    return is_fresh(kind, data_date=d, updated_at=upd, now=datetime.now(tz=UTC), cal=_cn_trading_calendar())
+
+
+def _cn_expected_daily_date_str(*, eod_only: bool = False) -> str:
+    """
+    Latest daily row a CN cache should contain right now (session- and holiday-aware).
+    """
+    return expected_daily_date(datetime.now(tz=UTC), _cn_trading_calendar(), eod_only=eod_only).isoformat()
 
 
 def _upsert_quant_2d_rank_events(
@@ -924,7 +1245,8 @@ def _upsert_quant_2d_rank_events(
     Persist generated candidates (evidence + buy price) for later outcome labeling/calibration.
     """
     ts = now_iso()
-    with _connect() as conn:
+
+    def _write(conn: sqlite3.Connection) -> None:
         for r in rows:
             sym = _norm_str(r.get("symbol") or "")
             ticker = _norm_str(r.get("ticker") or "")
@@ -967,7 +1289,22 @@ def _upsert_quant_2d_rank_events(
                     ts,
                 ),
             )
-        conn.commit()
+
+    _writes.run(_write)
+
+
+def _insert_quant_2d_outcome(conn: sqlite3.Connection, *, params: tuple[Any, ...]) -> None:
+    conn.execute(
+        """
+        INSERT INTO quant_2d_outcomes(
+          event_id, account_id, as_of_ts, as_of_date, symbol, buy_price,
+          t1_date, t2_date, close_t1, close_t2, low_min,
+          ret2d_avg_pct, dd2d_pct, win, labeled_at
+        )
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        params,
+    )
 
 
 def _label_quant_2d_outcomes_best_effort(*, account_id: str, as_of_date: str | None = None, limit: int = 500) -> dict[str, Any]:
@@ -984,7 +1321,7 @@ def _label_quant_2d_outcomes_best_effort(*, account_id: str, as_of_date: str | N
     with _connect() as conn:
         rows = conn.execute(
             f"""
-            SELECT e.id, e.as_of_ts, e.as_of_date, e.symbol, e.buy_price
+            SELECT e.id, e.as_of_ts, e.as_of_date, e.symbol, e.buy_price, e.raw_score
             FROM quant_2d_rank_events e
             LEFT JOIN quant_2d_outcomes o ON o.event_id = e.id
             WHERE e.account_id = ?{where} AND o.event_id IS NULL
@@ -996,6 +1333,8 @@ def _label_quant_2d_outcomes_best_effort(*, account_id: str, as_of_date: str | N
 
     labeled = 0
     skipped = 0
+    observed: list[tuple[str, float, int, float, float]] = []
+    pending: list[Future[Any]] = []
     for r in rows:
         event_id = str(r[0])
         ts = str(r[1])
@@ -1028,83 +1367,136 @@ def _label_quant_2d_outcomes_best_effort(*, account_id: str, as_of_date: str | N
         dd = (low_min / buy - 1.0) if (low_min > 0 and buy > 0) else 0.0
         win = 1 if ret_avg > 0 else 0
         labeled_at = now_iso()
-        with _connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO quant_2d_outcomes(
-                  event_id, account_id, as_of_ts, as_of_date, symbol, buy_price,
-                  t1_date, t2_date, close_t1, close_t2, low_min,
-                  ret2d_avg_pct, dd2d_pct, win, labeled_at
-                )
-                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    event_id,
-                    account_id,
-                    ts,
-                    d0,
-                    sym,
-                    float(buy),
-                    t1,
-                    t2,
-                    float(c1),
-                    float(c2),
-                    float(low_min),
-                    float(ret_avg * 100.0),
-                    float(dd * 100.0),
-                    int(win),
-                    labeled_at,
-                ),
-            )
-            conn.commit()
+        params = (
+            event_id,
+            account_id,
+            ts,
+            d0,
+            sym,
+            float(buy),
+            t1,
+            t2,
+            float(c1),
+            float(c2),
+            float(low_min),
+            float(ret_avg * 100.0),
+            float(dd * 100.0),
+            int(win),
+            labeled_at,
+        )
+        # Queued rather than committed per row: the writer folds these into group commits.
+        pending.append(_writes.submit(functools.partial(_insert_quant_2d_outcome, params=params)))
         labeled += 1
+        observed.append((d0, float(r[5] or 0.0), int(win), float(ret_avg * 100.0), float(dd * 100.0)))
+    # Outcomes are durable before calibration observes them.
+    for f in pending:
+        f.result()
+    try:
+        _observe_quant_2d_outcomes(account_id=account_id, points=observed)
+    except Exception:
+        # Calibration is derived data; a rebuild will pick these outcomes up later.
+        pass
     return {"unlabeled": len(rows), "labeled": labeled, "skipped": skipped}
 
 
-def _get_quant_2d_calibration_cached(*, key: str) -> dict[str, Any] | None:
+_QUANT2D_CALIBRATION_KEEP_VERSIONS = 5
+_quant2d_calibration_refreshing: set[str] = set()
+_quant2d_calibration_lock = threading.Lock()
+
+
+def _quant2d_calibration_key(*, account_id: str, buckets: int, lookback_days: int) -> str:
+    return f"v1:{account_id}:quant2d:bucket{int(buckets)}:lb{int(lookback_days)}"
+
+
+def _get_quant_2d_calibration_snapshot(*, key: str) -> dict[str, Any] | None:
     k = (key or "").strip()
     if not k:
         return None
     with _connect() as conn:
         row = conn.execute(
-            "SELECT updated_at, output_json FROM quant_2d_calibration_cache WHERE key = ?",
+            """
+            SELECT version, base_date, stale, created_at, state_json, output_json
+            FROM quant_2d_calibration_snapshots
+            WHERE key = ?
+            ORDER BY version DESC
+            LIMIT 1
+            """,
             (k,),
         ).fetchone()
     if row is None:
         return None
     try:
-        out = json.loads(str(row[1]) or "{}")
+        state = json.loads(str(row[4]) or "{}")
+    except Exception:
+        state = {}
+    try:
+        out = json.loads(str(row[5]) or "{}")
     except Exception:
         out = {}
-    return {"updatedAt": str(row[0]), "output": out}
+    return {
+        "version": int(row[0] or 0),
+        "baseDate": str(row[1]),
+        "stale": bool(row[2]),
+        "createdAt": str(row[3]),
+        "state": state if isinstance(state, dict) else {},
+        "output": out if isinstance(out, dict) else {},
+    }
 
 
-def _upsert_quant_2d_calibration_cached(*, key: str, ts: str, output: dict[str, Any]) -> None:
-    k = (key or "").strip()
-    if not k:
-        return
+def _insert_quant_2d_calibration_snapshot(
+    *,
+    key: str,
+    account_id: str,
+    lookback_days: int,
+    buckets: int,
+    base_date: str,
+    stale: bool,
+    state: CalibrationState,
+) -> int:
+    """
+    Append a new calibration version (readers always see a complete snapshot) and drop old ones.
+    """
     with _connect() as conn:
         conn.execute(
             """
-            INSERT INTO quant_2d_calibration_cache(key, updated_at, output_json)
-            VALUES(?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET
-              updated_at = excluded.updated_at,
-              output_json = excluded.output_json
+            INSERT INTO quant_2d_calibration_snapshots(
+              key, version, account_id, lookback_days, buckets, base_date, stale, created_at, state_json, output_json
+            )
+            SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?, ?, ?, ?, ?
+            FROM quant_2d_calibration_snapshots
+            WHERE key = ?
             """,
-            (k, ts, json.dumps(output or {}, ensure_ascii=False, default=str)),
+            (
+                key,
+                account_id,
+                int(lookback_days),
+                int(buckets),
+                base_date,
+                1 if stale else 0,
+                now_iso(),
+                json.dumps(state.to_dict(), ensure_ascii=False),
+                json.dumps(state.to_output(), ensure_ascii=False),
+                key,
+            ),
+        )
+        row = conn.execute("SELECT MAX(version) FROM quant_2d_calibration_snapshots WHERE key = ?", (key,)).fetchone()
+        version = int(row[0] or 0) if row else 0
+        conn.execute(
+            "DELETE FROM quant_2d_calibration_snapshots WHERE key = ? AND version <= ?",
+            (key, version - _QUANT2D_CALIBRATION_KEEP_VERSIONS),
         )
         conn.commit()
+    return version
 
 
-def _build_quant_2d_calibration(
+def _quant_2d_calibration_points(
     *,
     account_id: str,
-    buckets: int = 20,
-    lookback_days: int = 180,
-) -> dict[str, Any]:
-    b = max(5, min(int(buckets), 50))
-    days = max(10, min(int(lookback_days), 720))
+    lookback_days: int,
+) -> tuple[str, list[tuple[float, int, float, float]]]:
+    """
+    Load (raw_score, win, ret2d, dd2d) for the lookback window ending at the latest labeled date.
+    """
     with _connect() as conn:
         latest_row = conn.execute(
             "SELECT MAX(as_of_date) FROM quant_2d_outcomes WHERE account_id = ?",
@@ -1119,7 +1511,7 @@ def _build_quant_2d_calibration(
         if base_date is None:
             base_date = datetime.now(tz=UTC).date()
         # Simple lookback by as_of_date string ordering (YYYY-MM-DD).
-        cutoff = (base_date - timedelta(days=days)).isoformat()
+        cutoff = (base_date - timedelta(days=lookback_days)).isoformat()
         rows = conn.execute(
             """
             SELECT e.raw_score, o.win, o.ret2d_avg_pct, o.dd2d_pct
@@ -1129,71 +1521,126 @@ def _build_quant_2d_calibration(
             """,
             (account_id, cutoff),
         ).fetchall()
+    pts = [(float(r[0] or 0.0), int(r[1] or 0), float(r[2] or 0.0), float(r[3] or 0.0)) for r in rows]
+    return base_date.isoformat(), pts
 
-    pts: list[tuple[float, int, float, float]] = []
-    for r in rows:
-        raw = float(r[0] or 0.0)
-        win = int(r[1] or 0)
-        ret = float(r[2] or 0.0)
-        dd = float(r[3] or 0.0)
-        pts.append((raw, win, ret, dd))
-    pts.sort(key=lambda x: x[0])
+
+def _build_quant_2d_calibration(
+    *,
+    account_id: str,
+    buckets: int = 20,
+    lookback_days: int = 180,
+) -> dict[str, Any]:
+    b = max(5, min(int(buckets), 50))
+    days = max(10, min(int(lookback_days), 720))
+    _, pts = _quant_2d_calibration_points(account_id=account_id, lookback_days=days)
     if not pts:
         return {"buckets": b, "n": 0, "items": []}
+    # Equal-frequency buckets from sketched edges; p10 per bucket from a streaming sketch.
+    return CalibrationState.build(pts, buckets=b).to_output()
 
-    # Equal-frequency buckets.
-    n = len(pts)
-    items: list[dict[str, Any]] = []
-    for i in range(b):
-        lo_idx = int(i * n / b)
-        hi_idx = int((i + 1) * n / b)
-        seg = pts[lo_idx:hi_idx] if hi_idx > lo_idx else []
-        if not seg:
-            continue
-        raws = [x[0] for x in seg]
-        wins = [x[1] for x in seg]
-        rets = [x[2] for x in seg]
-        dds = [x[3] for x in seg]
-        prob = float(sum(wins)) / float(len(wins)) if wins else 0.0
-        ev = float(sum(rets)) / float(len(rets)) if rets else 0.0
-        dd_mean = float(sum(dds)) / float(len(dds)) if dds else 0.0
-        # Conservative tail return (10th percentile).
-        rets_sorted = sorted(rets)
-        p10 = rets_sorted[int(0.10 * (len(rets_sorted) - 1))] if len(rets_sorted) >= 2 else (rets_sorted[0] if rets_sorted else 0.0)
-        items.append(
-            {
-                "minRawScore": float(min(raws)),
-                "maxRawScore": float(max(raws)),
-                "n": int(len(seg)),
-                "probWin": float(prob),  # 0..1
-                "ev2dPct": float(ev),
-                "p10Ret2dPct": float(p10),
-                "dd2dPct": float(dd_mean),
-            }
-        )
-    return {"buckets": b, "n": n, "items": items}
 
+def _refresh_quant_2d_calibration(*, account_id: str, buckets: int = 20, lookback_days: int = 180) -> int:
+    """
+    Full rebuild of one calibration window into a new snapshot version.
+    """
+    b = max(5, min(int(buckets), 50))
+    days = max(10, min(int(lookback_days), 720))
+    base_date, pts = _quant_2d_calibration_points(account_id=account_id, lookback_days=days)
+    state = CalibrationState.build(pts, buckets=b)
+    return _insert_quant_2d_calibration_snapshot(
+        key=_quant2d_calibration_key(account_id=account_id, buckets=b, lookback_days=days),
+        account_id=account_id,
+        lookback_days=days,
+        buckets=b,
+        base_date=base_date,
+        stale=False,
+        state=state,
+    )
 
-def _prune_cn_intraday_rank_snapshots(*, account_id: str, keep_days: int = 10) -> None:
-    keep = max(1, min(int(keep_days), 60))
+
+def _schedule_quant_2d_calibration_refresh(*, account_id: str, buckets: int = 20, lookback_days: int = 180) -> None:
+    """
+    Rebuild a calibration window off the request path (at most one rebuild in flight per key).
+    Tests run it inline so results are deterministic.
+    """
+    key = _quant2d_calibration_key(account_id=account_id, buckets=buckets, lookback_days=lookback_days)
+    with _quant2d_calibration_lock:
+        if key in _quant2d_calibration_refreshing:
+            return
+        _quant2d_calibration_refreshing.add(key)
+
+    def _run() -> None:
+        try:
+            _refresh_quant_2d_calibration(account_id=account_id, buckets=buckets, lookback_days=lookback_days)
+        except Exception:
+            pass
+        finally:
+            with _quant2d_calibration_lock:
+                _quant2d_calibration_refreshing.discard(key)
+
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        _run()
+        return
+    threading.Thread(target=_run, name="quant2d-calibration-refresh", daemon=True).start()
+
+
+def _observe_quant_2d_outcomes(*, account_id: str, points: list[tuple[str, float, int, float, float]]) -> None:
+    """
+    Fold newly labeled outcomes (as_of_date, raw_score, win, ret2d, dd2d) into every calibration
+    window of the account. Windows whose lookback slid or whose buckets drifted are marked stale
+    and rebuilt in the background; readers keep using the incrementally updated version meanwhile.
+    """
+    if not points:
+        return
     with _connect() as conn:
         rows = conn.execute(
             """
-            SELECT DISTINCT trade_date
-            FROM cn_intraday_rank_snapshots
+            SELECT DISTINCT key, lookback_days, buckets
+            FROM quant_2d_calibration_snapshots
             WHERE account_id = ?
-            ORDER BY trade_date DESC
             """,
             (account_id,),
         ).fetchall()
-        dates = [str(r[0]) for r in rows if r and r[0]]
-        to_delete = dates[keep:]
-        for d in to_delete:
-            conn.execute(
-                "DELETE FROM cn_intraday_rank_snapshots WHERE account_id = ? AND trade_date = ?",
-                (account_id, d),
-            )
-        conn.commit()
+    latest = max(p[0] for p in points)
+    for r in rows:
+        key = str(r[0])
+        days = int(r[1] or 180)
+        b = int(r[2] or 20)
+        snap = _get_quant_2d_calibration_snapshot(key=key)
+        if snap is None:
+            continue
+        state = CalibrationState.from_dict(snap["state"])
+        # An empty window is anchored at "today"; re-anchor it at the first labeled date instead.
+        base_date = str(snap["baseDate"]) if state.n > 0 else latest
+        try:
+            cutoff = (datetime.fromisoformat(base_date).date() - timedelta(days=days)).isoformat()
+        except ValueError:
+            cutoff = ""
+        for d, raw, win, ret, dd in points:
+            if d >= cutoff:
+                state.observe(raw, win, ret, dd)
+        stale = bool(snap["stale"]) or latest > base_date or state.needs_rebalance()
+        _insert_quant_2d_calibration_snapshot(
+            key=key,
+            account_id=account_id,
+            lookback_days=days,
+            buckets=b,
+            base_date=base_date,
+            stale=stale,
+            state=state,
+        )
+        if stale:
+            _schedule_quant_2d_calibration_refresh(account_id=account_id, buckets=b, lookback_days=days)
+
+
+def _prune_cn_intraday_rank_snapshots(*, account_id: str, keep_days: int = 10) -> None:
+    keep = max(1, min(int(keep_days), 60))
+    policy = RetentionPolicy("cn_intraday_rank_snapshots", "trade_date", keep, partition_by="account_id")
+    with _connect() as conn:
+        n = prune(conn, policy, partition=account_id, all_partitions=False)
+    if n:
+        _invalidate_snapshot_payloads("cn_intraday_rank_snapshots")
 
 
 def _get_cn_intraday_rank_snapshot_latest(
@@ -1204,7 +1651,7 @@ def _get_cn_intraday_rank_snapshot_latest(
     with _connect() as conn:
         row = conn.execute(
             """
-            SELECT id, created_at, output_json
+            SELECT id, created_at
             FROM cn_intraday_rank_snapshots
             WHERE account_id = ? AND universe_version = ?
             ORDER BY as_of_ts DESC
@@ -1212,13 +1659,7 @@ def _get_cn_intraday_rank_snapshot_latest(
             """,
             (account_id, universe_version),
         ).fetchone()
-    if row is None:
-        return None
-    try:
-        out = json.loads(str(row[2]) or "{}")
-    except Exception:
-        out = {}
-    return {"id": str(row[0]), "createdAt": str(row[1]), "output": out}
+        return _load_snapshot_payload(conn, table="cn_intraday_rank_snapshots", row=row)
 
 
 def _get_cn_intraday_rank_snapshot_latest_for(
@@ -1231,7 +1672,7 @@ def _get_cn_intraday_rank_snapshot_latest_for(
     with _connect() as conn:
         row = conn.execute(
             """
-            SELECT id, created_at, output_json
+            SELECT id, created_at
             FROM cn_intraday_rank_snapshots
             WHERE account_id = ? AND trade_date = ? AND slot = ? AND universe_version = ?
             ORDER BY as_of_ts DESC
@@ -1239,13 +1680,7 @@ def _get_cn_intraday_rank_snapshot_latest_for(
             """,
             (account_id, trade_date, slot, universe_version),
         ).fetchone()
-    if row is None:
-        return None
-    try:
-        out = json.loads(str(row[2]) or "{}")
-    except Exception:
-        out = {}
-    return {"id": str(row[0]), "createdAt": str(row[1]), "output": out}
+        return _load_snapshot_payload(conn, table="cn_intraday_rank_snapshots", row=row)
 
 
 def _upsert_cn_intraday_rank_snapshot(
@@ -1280,10 +1715,21 @@ def _upsert_cn_intraday_rank_snapshot(
                 slot,
                 universe_version,
                 ts,
-                json.dumps(output or {}, ensure_ascii=False, default=str),
+                pack_json(output or {}, default=str),
             ),
         )
         conn.commit()
+    _invalidate_snapshot_payloads("cn_intraday_rank_snapshots")
+    _events.publish(
+        "rank.intraday",
+        {
+            "id": snap_id,
+            "accountId": account_id,
+            "tradeDate": trade_date,
+            "slot": slot,
+            "universeVersion": universe_version,
+        },
+    )
     return snap_id
 
 
@@ -1332,12 +1778,15 @@ def _list_cn_intraday_observations(*, trade_date: str) -> list[dict[str, Any]]:
     return out
 
 
-def _get_cn_minute_bars_cached(*, symbol: str, trade_date: str, interval: str) -> dict[str, Any] | None:
+def _get_cn_minute_series(*, symbol: str, trade_date: str, interval: str) -> tuple[MinuteSeries, str] | None:
+    """
+    Stored running state for one symbol/day: `(series, updated_at)`, or None if never fetched.
+    """
     with _connect() as conn:
         row = conn.execute(
             """
-            SELECT updated_at, bars_json
-            FROM market_cn_minute_bars
+            SELECT updated_at, state_json
+            FROM market_cn_minute_state
             WHERE symbol = ? AND trade_date = ? AND interval = ?
             """,
             (symbol, trade_date, interval),
@@ -1345,47 +1794,132 @@ def _get_cn_minute_bars_cached(*, symbol: str, trade_date: str, interval: str) -
     if row is None:
         return None
     try:
-        bars = json.loads(str(row[1]) or "[]")
+        state = unpack_json(row[1], empty="{}")
     except Exception:
-        bars = []
-    return {"updatedAt": str(row[0]), "bars": bars if isinstance(bars, list) else []}
+        return None
+    return (MinuteSeries.from_dict(state if isinstance(state, dict) else {}), str(row[0]))
 
 
-def _upsert_cn_minute_bars_cached(*, symbol: str, trade_date: str, interval: str, ts: str, bars: list[dict[str, Any]]) -> None:
+def _get_cn_minute_series_many(
+    *, symbols: list[str], trade_date: str, interval: str
+) -> dict[str, tuple[MinuteSeries, str]]:
+    """
+    `_get_cn_minute_series` for a whole pool in one query; symbols never fetched are absent.
+    """
+    out: dict[str, tuple[MinuteSeries, str]] = {}
+    if not symbols:
+        return out
     with _connect() as conn:
-        conn.execute(
+        rows = conn.execute(
             """
-            INSERT INTO market_cn_minute_bars(symbol, trade_date, interval, updated_at, bars_json)
-            VALUES(?, ?, ?, ?, ?)
-            ON CONFLICT(symbol, trade_date, interval) DO UPDATE SET
-              updated_at = excluded.updated_at,
-              bars_json = excluded.bars_json
+            SELECT symbol, updated_at, state_json
+            FROM market_cn_minute_state
+            WHERE trade_date = ? AND interval = ?
             """,
-            (symbol, trade_date, interval, ts, json.dumps(bars or [], ensure_ascii=False, default=str)),
+            (trade_date, interval),
+        ).fetchall()
+    wanted = set(symbols)
+    for sym, updated_at, state_json in rows:
+        if sym not in wanted:
+            continue
+        try:
+            state = unpack_json(state_json, empty="{}")
+        except Exception:
+            continue
+        out[str(sym)] = (MinuteSeries.from_dict(state if isinstance(state, dict) else {}), str(updated_at))
+    return out
+
+
+def _write_cn_minute_bars(
+    conn: sqlite3.Connection,
+    *,
+    symbol: str,
+    trade_date: str,
+    interval: str,
+    ts: str,
+    series: MinuteSeries,
+    changed: list[dict[str, Any]],
+) -> None:
+    conn.executemany(
+        """
+        INSERT INTO market_cn_minute_bar_rows(symbol, trade_date, interval, ts, open, high, low, close, volume, amount)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, trade_date, interval, ts) DO UPDATE SET
+          open = excluded.open,
+          high = excluded.high,
+          low = excluded.low,
+          close = excluded.close,
+          volume = excluded.volume,
+          amount = excluded.amount
+        """,
+        [
+            (symbol, trade_date, interval, b["ts"], b["open"], b["high"], b["low"], b["close"], b["volume"], b["amount"])
+            for b in changed
+        ],
+    )
+    conn.execute(
+        """
+        INSERT INTO market_cn_minute_state(symbol, trade_date, interval, updated_at, last_ts, bar_count, state_json)
+        VALUES(?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, trade_date, interval) DO UPDATE SET
+          updated_at = excluded.updated_at,
+          last_ts = excluded.last_ts,
+          bar_count = excluded.bar_count,
+          state_json = excluded.state_json
+        """,
+        (symbol, trade_date, interval, ts, series.last_ts, series.count, pack_json(series.to_dict())),
+    )
+
+
+def _append_cn_minute_bars(
+    *, symbol: str, trade_date: str, interval: str, ts: str, series: MinuteSeries, bars: list[dict[str, Any]]
+) -> int:
+    """
+    Fold `bars` into `series` and persist only the minutes that are new (or revise the latest).
+    Returns the number of rows written.
+    """
+    changed = series.extend(bars)
+    _writes.run(
+        lambda conn: _write_cn_minute_bars(
+            conn, symbol=symbol, trade_date=trade_date, interval=interval, ts=ts, series=series, changed=changed
         )
-        conn.commit()
+    )
+    return len(changed)
+
+
+def _migrate_legacy_minute_bars(conn: sqlite3.Connection) -> None:
+    """
+    One-time move of the old one-blob-per-day cache (`market_cn_minute_bars`) into typed rows.
+    """
+    for symbol, trade_date, interval, updated_at, bars_json in conn.execute(
+        "SELECT symbol, trade_date, interval, updated_at, bars_json FROM market_cn_minute_bars",
+    ).fetchall():
+        try:
+            bars = unpack_json(bars_json, empty="[]")
+        except Exception:
+            continue
+        series = MinuteSeries()
+        changed = series.extend(bars if isinstance(bars, list) else [])
+        _write_cn_minute_bars(
+            conn,
+            symbol=str(symbol),
+            trade_date=str(trade_date),
+            interval=str(interval),
+            ts=str(updated_at),
+            series=series,
+            changed=changed,
+        )
+    conn.execute("DROP TABLE market_cn_minute_bars")
+    conn.commit()
 
 
 def _prune_cn_mainline_snapshots(*, account_id: str, keep_days: int = 10) -> None:
     keep = max(1, min(int(keep_days), 60))
+    policy = RetentionPolicy("cn_mainline_snapshots", "trade_date", keep, partition_by="account_id")
     with _connect() as conn:
-        rows = conn.execute(
-            """
-            SELECT DISTINCT trade_date
-            FROM cn_mainline_snapshots
-            WHERE account_id = ?
-            ORDER BY trade_date DESC
-            """,
-            (account_id,),
-        ).fetchall()
-        dates = [str(r[0]) for r in rows if r and r[0]]
-        to_delete = dates[keep:]
-        for d in to_delete:
-            conn.execute(
-                "DELETE FROM cn_mainline_snapshots WHERE account_id = ? AND trade_date = ?",
-                (account_id, d),
-            )
-        conn.commit()
+        n = prune(conn, policy, partition=account_id, all_partitions=False)
+    if n:
+        _invalidate_snapshot_payloads("cn_mainline_snapshots")
 
 
 def _get_cn_mainline_snapshot_latest(
@@ -1398,7 +1932,7 @@ def _get_cn_mainline_snapshot_latest(
         if trade_date:
             row = conn.execute(
                 """
-                SELECT id, created_at, output_json
+                SELECT id, created_at
                 FROM cn_mainline_snapshots
                 WHERE account_id = ? AND trade_date = ? AND universe_version = ?
                 ORDER BY as_of_ts DESC
@@ -1409,7 +1943,7 @@ def _get_cn_mainline_snapshot_latest(
         else:
             row = conn.execute(
                 """
-                SELECT id, created_at, output_json
+                SELECT id, created_at
                 FROM cn_mainline_snapshots
                 WHERE account_id = ? AND universe_version = ?
                 ORDER BY as_of_ts DESC
@@ -1417,13 +1951,7 @@ def _get_cn_mainline_snapshot_latest(
                 """,
                 (account_id, universe_version),
             ).fetchone()
-    if row is None:
-        return None
-    try:
-        out = json.loads(str(row[2]) or "{}")
-    except Exception:
-        out = {}
-    return {"id": str(row[0]), "createdAt": str(row[1]), "output": out}
+        return _load_snapshot_payload(conn, table="cn_mainline_snapshots", row=row)
 
 
 def _insert_cn_mainline_snapshot(
@@ -1442,9 +1970,14 @@ def _insert_cn_mainline_snapshot(
             INSERT INTO cn_mainline_snapshots(id, account_id, trade_date, as_of_ts, universe_version, created_at, output_json)
             VALUES(?, ?, ?, ?, ?, ?, ?)
             """,
-            (snap_id, account_id, trade_date, as_of_ts, universe_version, ts, json.dumps(output or {}, ensure_ascii=False, default=str)),
+            (snap_id, account_id, trade_date, as_of_ts, universe_version, ts, pack_json(output or {}, default=str)),
         )
         conn.commit()
+    _invalidate_snapshot_payloads("cn_mainline_snapshots")
+    _events.publish(
+        "leader.mainline",
+        {"id": snap_id, "accountId": account_id, "tradeDate": trade_date, "universeVersion": universe_version},
+    )
     return snap_id
 
 
@@ -1541,11 +2074,107 @@ def _ai_extract_pingan_screenshot(*, image_data_url: str) -> dict[str, Any]:
         headers={"Content-Type": "application/json"},
         method="POST",
     )
-    with urllib.request.urlopen(req, timeout=60) as resp:
+    with observe_upstream("ai-service", "/extract/broker/pingan"), urllib.request.urlopen(req, timeout=60) as resp:
         body = resp.read().decode("utf-8")
         return json.loads(body)
 
 
+def _broker_extract_concurrency() -> int:
+    try:
+        return max(1, min(int(os.getenv("BROKER_EXTRACT_CONCURRENCY", "4")), 8))
+    except ValueError:
+        return 4
+
+
+def _image_sha256(data_url: str) -> str:
+    try:
+        _, raw = _parse_data_url(data_url)
+    except ValueError:
+        raw = (data_url or "").encode("utf-8")
+    return _sha256_hex(raw)
+
+
+def _get_cached_broker_extraction(*, broker: str, sha256: str) -> dict[str, Any] | None:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT extracted_json FROM broker_extraction_cache WHERE broker = ? AND sha256 = ?",
+            (broker, sha256),
+        ).fetchone()
+        if row is None:
+            # Screenshots imported before the cache existed still carry their extraction.
+            row = conn.execute(
+                "SELECT extracted_json FROM broker_snapshots WHERE broker = ? AND sha256 = ? LIMIT 1",
+                (broker, sha256),
+            ).fetchone()
+    if row is None:
+        return None
+    try:
+        out = json.loads(str(row[0]) or "{}")
+    except Exception:
+        return None
+    if not isinstance(out, dict):
+        return None
+    out.pop("__meta", None)
+    return out
+
+
+def _put_cached_broker_extraction(*, broker: str, sha256: str, extracted: dict[str, Any]) -> None:
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO broker_extraction_cache(broker, sha256, extracted_json, created_at)
+            VALUES(?, ?, ?, ?)
+            ON CONFLICT(broker, sha256) DO UPDATE SET
+              extracted_json = excluded.extracted_json,
+              created_at = excluded.created_at
+            """,
+            (broker, sha256, json.dumps(extracted, ensure_ascii=False), now_iso()),
+        )
+        conn.commit()
+
+
+def _ai_extract_pingan_screenshots(images: list[tuple[str, str]]) -> dict[str, dict[str, Any] | Exception]:
+    """
+    Extract many screenshots at once. `images` is a list of (sha256, dataUrl).
+
+    Known hashes are served from `broker_extraction_cache`; the remaining unique images fan out to
+    ai-service on a bounded thread pool. Returns results (or the raised exception) by sha256 so
+    callers can keep their own ordered merge.
+    """
+    results: dict[str, dict[str, Any] | Exception] = {}
+    pending: dict[str, str] = {}
+    for sha, data_url in images:
+        if sha in results or sha in pending:
+            continue
+        cached = _get_cached_broker_extraction(broker="pingan", sha256=sha)
+        cache_stats.record("broker_extraction", cached is not None)
+        if cached is not None:
+            results[sha] = cached
+        else:
+            pending[sha] = data_url
+
+    def run(data_url: str) -> dict[str, Any] | Exception:
+        try:
+            return _ai_extract_pingan_screenshot(image_data_url=data_url)
+        except Exception as e:
+            return e
+
+    fetched: dict[str, dict[str, Any] | Exception] = {}
+    if len(pending) == 1:
+        sha, data_url = next(iter(pending.items()))
+        fetched[sha] = run(data_url)
+    elif pending:
+        workers = min(_broker_extract_concurrency(), len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futs = {sha: pool.submit(run, data_url) for sha, data_url in pending.items()}
+            fetched = {sha: f.result() for sha, f in futs.items()}
+    for sha, res in fetched.items():
+        if isinstance(res, dict):
+            _put_cached_broker_extraction(broker="pingan", sha256=sha, extracted=res)
+        results[sha] = res
+    return results
+
+
 def _seed_default_broker_account(broker: str) -> str:
     """
     Ensure a default account exists for the given broker and return its id.
@@ -2287,6 +2916,161 @@ class MarketStatusResponse(BaseModel):
     lastSyncAt: str | None
 
 
+class MarketCalendarResponse(BaseModel):
+    market: str
+    year: int
+    covered: bool
+    holidays: list[str]
+    today: str
+    isTradingDay: bool
+    latestTradeDate: str
+    nextTradeDate: str
+
+
+class MarketCalendarDaysRequest(BaseModel):
+    dates: list[str]
+    # false: mark as closed (ad-hoc closure); true: force open (correct a wrong closure).
+    isOpen: bool = False
+
+
+class MarketCalendarSyncResponse(BaseModel):
+    ok: bool
+    tradeDates: int
+    coveredYears: list[int]
+
+
+class CacheStatsResponse(BaseModel):
+    session: str
+    expectedDailyDate: str
+    caches: dict[str, dict[str, Any]]
+
+
+class AiResponseCacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int
+    sizeBytes: int
+    maxBytes: int
+    hits: int
+    byEndpoint: dict[str, dict[str, int]]
+
+
+class PipelineTraceSummary(BaseModel):
+    id: str
+    pipeline: str
+    tradeDate: str
+    snapshotId: str | None = None
+    createdAt: str
+    durationMs: float
+    stages: dict[str, float] = {}  # top-level stage -> duration (ms)
+
+
+class ListPipelineTracesResponse(BaseModel):
+    items: list[PipelineTraceSummary]
+
+
+class PipelineTraceResponse(PipelineTraceSummary):
+    trace: dict[str, Any]
+
+
+class RetentionPolicyItem(BaseModel):
+    table: str
+    column: str
+    keepDates: int
+    partitionBy: str | None = None
+
+
+class RetentionStatusResponse(BaseModel):
+    running: bool
+    intervalSec: float
+    policies: list[RetentionPolicyItem]
+    size: dict[str, Any]
+    lastRun: dict[str, Any] | None = None
+
+
+class SchedulerRun(BaseModel):
+    id: int
+    job: str
+    scheduledFor: str
+    trigger: str  # schedule | catchup | manual
+    status: str  # running | ok | error | skipped | missed
+    startedAt: str | None = None
+    finishedAt: str | None = None
+    durationMs: float | None = None
+    error: str | None = None
+    result: dict[str, Any] | None = None
+
+
+class SchedulerJobStatus(BaseModel):
+    name: str
+    description: str
+    schedule: list[str]
+    enabled: bool
+    misfireGraceSec: float
+    running: bool
+    nextRunAt: str | None = None
+    lastRun: SchedulerRun | None = None
+
+
+class SchedulerStatusResponse(BaseModel):
+    running: bool
+    timezone: str
+    jobs: list[SchedulerJobStatus]
+
+
+class SchedulerRunsResponse(BaseModel):
+    items: list[SchedulerRun]
+
+
+class BlobColumnStats(BaseModel):
+    table: str
+    column: str
+    rows: int
+    packedRows: int
+    bytes: int
+    # Set by a recompress run: rows rewritten and their stored size before/after.
+    rewrittenRows: int | None = None
+    bytesBefore: int | None = None
+    bytesAfter: int | None = None
+
+
+class BlobStatsResponse(BaseModel):
+    codec: str
+    items: list[BlobColumnStats]
+    totalBytes: int
+    savedBytes: int | None = None
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    name: str
+    kind: str
+    startedAt: str
+    durationMs: float
+    intervalMs: float
+    samples: int
+    stacks: int
+
+
+class ListProfilesResponse(BaseModel):
+    items: list[ProfileSummary]
+    operations: list[str]
+    enabledOperations: list[str]
+    windowActive: bool
+
+
+class ProfileCaptureRequest(BaseModel):
+    name: str = "window"
+    seconds: float = 10.0
+    intervalMs: float = 10.0
+
+
+class ProfileCaptureResponse(BaseModel):
+    status: str
+    name: str
+    seconds: float
+    endsAt: str
+
+
 class MarketStockRow(BaseModel):
     symbol: str
     market: str
@@ -2414,7 +3198,10 @@ class RankNext2dGenerateRequest(BaseModel):
     accountId: str | None = None
     asOfDate: str | None = None  # YYYY-MM-DD
     force: bool = False
+    # Skip the ai-service response cache (fresh LLM output even for identical evidence).
+    bypassAiCache: bool = False
     limit: int = 30
+    # "all" (RANK_UNIVERSE_ALL): score every liquid CN stock, not just the TradingView pool.
     universeVersion: str = "v0"
     includeHoldings: bool = False
 
@@ -2509,6 +3296,21 @@ class IntradayRankSnapshotResponse(BaseModel):
     debug: dict[str, Any] | None = None
 
 
+class MinuteCollectorStatusResponse(BaseModel):
+    running: bool
+    active: bool  # inside a collection window right now
+    intervalSec: float
+    workers: int
+    ratePerSec: float
+    universeSize: int
+    watchlist: list[str] = []
+    lastRun: dict[str, Any] | None = None
+
+
+class MinuteCollectorWatchlistRequest(BaseModel):
+    symbols: list[str] = []
+
+
 # --- CN morning radar (09-10) (v0) ---
 class MorningRadarTheme(BaseModel):
     kind: str  # industry | concept
@@ -2577,6 +3379,8 @@ class MainlineGenerateRequest(BaseModel):
     asOfTs: str | None = None
     universeVersion: str = "v0"
     force: bool = False
+    # Skip the ai-service response cache (fresh LLM output even for identical evidence).
+    bypassAiCache: bool = False
     topK: int = 3
 
 
@@ -2594,6 +3398,8 @@ class StrategyAccountPromptRequest(BaseModel):
 class StrategyDailyGenerateRequest(BaseModel):
     date: str | None = None  # YYYY-MM-DD, optional
     force: bool = False
+    # Skip the ai-service response cache (fresh LLM output even for identical evidence).
+    bypassAiCache: bool = False
     maxCandidates: int = 10
     # Context toggles (default ON). When OFF, the corresponding section is excluded or minimized
     # from the AI context to save tokens and isolate reasoning.
@@ -2715,6 +3521,8 @@ class ListTradeJournalsResponse(BaseModel):
 class LeaderDailyGenerateRequest(BaseModel):
     date: str | None = None  # YYYY-MM-DD
     force: bool = False
+    # Skip the ai-service response cache (fresh LLM output even for identical evidence).
+    bypassAiCache: bool = False
     maxCandidates: int = 20  # candidate universe cap from screener
     useMainline: bool = True
     mainlineTopK: int = 3
@@ -2967,7 +3775,7 @@ def _upsert_market_stock(conn: sqlite3.Connection, s: StockRow, ts: str) -> None
 
 
 def _upsert_market_quote(conn: sqlite3.Connection, s: StockRow, ts: str) -> None:
-    raw_json = json.dumps(s.quote, ensure_ascii=False)
+    raw_json = pack_json(s.quote, dictionary="quote")
     conn.execute(
         """
         INSERT INTO market_quotes(
@@ -2996,7 +3804,21 @@ def _upsert_market_quote(conn: sqlite3.Connection, s: StockRow, ts: str) -> None
     )
 
 
+# Bumped by every `_upsert_market_bars`, so the feature pipeline can drop rows it computed from
+# bars that were rewritten while it ran.
+_bars_write_seq = itertools.count(1)
+_bars_written_seq: dict[str, int] = {}
+
+
 def _upsert_market_bars(conn: sqlite3.Connection, symbol: str, bars: list[BarRow], ts: str) -> None:
+    dates = [b.date for b in bars if b.date]
+    if dates:
+        # Features of a date depend on every bar up to it.
+        conn.execute(
+            "DELETE FROM market_features_daily WHERE symbol = ? AND date >= ?",
+            (symbol, min(dates)),
+        )
+        _bars_written_seq[symbol] = next(_bars_write_seq)
     for b in bars:
         conn.execute(
             """
@@ -3034,7 +3856,7 @@ def _upsert_market_chips(
     ts: str,
 ) -> None:
     for it in items:
-        raw = json.dumps(it, ensure_ascii=False)
+        raw = pack_json(it, dictionary="chips")
         conn.execute(
             """
             INSERT INTO market_chips(
@@ -3081,7 +3903,7 @@ def _upsert_market_fund_flow(
     ts: str,
 ) -> None:
     for it in items:
-        raw = json.dumps(it, ensure_ascii=False)
+        raw = pack_json(it, dictionary="fund_flow")
         conn.execute(
             """
             INSERT INTO market_fund_flow(
@@ -3182,24 +4004,781 @@ def market_status() -> MarketStatusResponse:
     return MarketStatusResponse(stocks=total, lastSyncAt=last)
 
 
-@app.post("/market/sync")
-def market_sync() -> JSONResponse:
+def _market_calendar_response(year: int | None = None) -> MarketCalendarResponse:
+    cal = _cn_trading_calendar()
+    today = date.fromisoformat(_today_cn_date_str())
+    y = int(year or today.year)
+    d = date(y, 1, 1)
+    holidays: list[str] = []
+    while d.year == y:
+        if d.weekday() < 5 and not cal.is_trading_day(d):
+            holidays.append(d.isoformat())
+        d += timedelta(days=1)
+    return MarketCalendarResponse(
+        market="CN",
+        year=y,
+        covered=y in cal.covered_years,
+        holidays=holidays,
+        today=today.isoformat(),
+        isTradingDay=cal.is_trading_day(today),
+        latestTradeDate=cal.latest_trading_day(today).isoformat(),
+        nextTradeDate=cal.next_trading_day(today).isoformat(),
+    )
+
+
+@app.get("/market/calendar/cn", response_model=MarketCalendarResponse)
+def market_calendar_cn(year: int | None = None) -> MarketCalendarResponse:
+    return _market_calendar_response(year)
+
+
+@app.put("/market/calendar/cn/days", response_model=MarketCalendarResponse)
+def put_market_calendar_cn_days(req: MarketCalendarDaysRequest) -> MarketCalendarResponse:
     ts = now_iso()
-    hk_error: str | None = None
+    days: list[str] = []
+    for x in req.dates:
+        dt = _parse_yyyy_mm_dd(str(x or ""))
+        if dt is None:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {x} (expected YYYY-MM-DD).")
+        days.append(dt.date().isoformat())
+    with _connect() as conn:
+        for d in days:
+            conn.execute(
+                """
+                INSERT INTO market_calendar_days(market, date, is_open, source, updated_at)
+                VALUES('CN', ?, ?, 'manual', ?)
+                ON CONFLICT(market, date, source) DO UPDATE SET
+                  is_open = excluded.is_open,
+                  updated_at = excluded.updated_at
+                """,
+                (d, 1 if req.isOpen else 0, ts),
+            )
+        conn.commit()
+    _invalidate_trading_calendar()
+    return _market_calendar_response(date.fromisoformat(days[0]).year if days else None)
+
+
+@app.post("/market/calendar/cn/sync", response_model=MarketCalendarSyncResponse)
+def sync_market_calendar_cn() -> MarketCalendarSyncResponse:
+    """
+    Refresh the CN calendar from the upstream exchange trade-date list (authoritative for
+    every year it covers; the embedded table remains the fallback).
+    """
     try:
-        # CN is required for the core market universe.
-        cn = fetch_cn_a_spot()
+        trade_dates = fetch_cn_trade_dates()
     except Exception as e:
-        # Upstream data sources can occasionally return HTML/captcha or abort connections.
-        # If we already have a cached market universe, keep the app usable by falling back to cache.
-        err = f"{type(e).__name__}: {repr(e)}"
-        with _connect() as conn:
-            row = conn.execute("SELECT COUNT(1) FROM market_stocks").fetchone()
-            cached_total = int(row[0]) if row else 0
-        if cached_total > 0:
-            # Do not update lastSyncAt on skipped runs; the UI can still surface the error.
-            return JSONResponse(
-                {
+        raise HTTPException(status_code=500, detail=f"Trade calendar fetch failed: {e}") from e
+    ts = now_iso()
+    with _connect() as conn:
+        conn.execute("DELETE FROM market_calendar_days WHERE market = 'CN' AND source = 'akshare'")
+        conn.executemany(
+            "INSERT INTO market_calendar_days(market, date, is_open, source, updated_at) VALUES('CN', ?, 1, 'akshare', ?)",
+            [(d, ts) for d in trade_dates],
+        )
+        conn.commit()
+    _invalidate_trading_calendar()
+    return MarketCalendarSyncResponse(
+        ok=True,
+        tradeDates=len(trade_dates),
+        coveredYears=sorted({int(d[:4]) for d in trade_dates}),
+    )
+
+
+@app.get("/cache/stats", response_model=CacheStatsResponse)
+def get_cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(
+        session=cn_session(datetime.now(tz=UTC), _cn_trading_calendar()),
+        expectedDailyDate=_cn_expected_daily_date_str(),
+        caches=cache_stats.snapshot(),
+    )
+
+
+# --- Conditional GET (ETag / If-None-Match) ---
+# Each registered route has a cheap watermark (snapshot ids, updated_at maxima) that changes
+# whenever its payload could change. A matching If-None-Match short-circuits to 304 before
+# the endpoint runs, so unchanged dashboards and snapshot pages skip payload assembly.
+
+
+def _etag_symbols_watermark(conn: sqlite3.Connection, table: str, symbols: list[str]) -> list[Any]:
+    if not symbols:
+        return []
+    placeholders = ",".join(["?"] * len(symbols))
+    row = conn.execute(
+        f"SELECT COUNT(1), MAX(date), MAX(updated_at) FROM {table} WHERE symbol IN ({placeholders})",
+        tuple(symbols),
+    ).fetchone()
+    return list(row) if row else []
+
+
+def _etag_leader_symbols(conn: sqlite3.Connection) -> list[str]:
+    return [str(r[0]) for r in conn.execute("SELECT DISTINCT symbol FROM leader_stocks ORDER BY symbol").fetchall()]
+
+
+def _etag_leader_watermark(conn: sqlite3.Connection, symbols: list[str]) -> list[Any]:
+    lead = conn.execute("SELECT COUNT(1), MAX(created_at) FROM leader_stocks").fetchone()
+    scores = conn.execute("SELECT MAX(updated_at) FROM leader_stock_scores").fetchone()
+    return [list(lead or []), scores[0] if scores else None, _etag_symbols_watermark(conn, "market_bars", symbols)]
+
+
+def _etag_live_bucket() -> list[Any]:
+    """
+    Session phase plus a TTL-sized time bucket while daily bars are still live, so payloads that
+    may pull fresh bars on read are rebuilt at the same cadence as the daily-bar cache policy.
+    """
+    session = cn_session(datetime.now(tz=UTC), _cn_trading_calendar())
+    ttl = LIVE_TTL_SEC[DAILY_BAR].get(session)
+    bucket = int(time.time() // ttl) if ttl else None
+    return [session, bucket, _cn_expected_daily_date_str(), _cn_expected_daily_date_str(eod_only=True)]
+
+
+def _etag_parts_rank_next2d(q: Any) -> list[Any] | None:
+    as_of = (q.get("asOfDate") or "").strip() or _today_cn_date_str()
+    universe = q.get("universeVersion") or "v0"
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT id, created_at FROM cn_rank_snapshots WHERE account_id = ? AND as_of_date = ? AND universe_version = ?",
+            (_global_quant_account_id(), as_of, universe),
+        ).fetchone()
+    return [as_of, list(row) if row else None]
+
+
+def _etag_parts_leader_mainline(q: Any) -> list[Any] | None:
+    aid = (q.get("accountId") or "").strip()
+    if not aid:
+        accs = list_broker_accounts(broker="pingan")
+        aid = accs[0].id if accs else ""
+    if not aid:
+        return None
+    d = (q.get("tradeDate") or "").strip()
+    universe = (q.get("universeVersion") or "").strip() or "v0"
+    with _connect() as conn:
+        if d:
+            row = conn.execute(
+                """
+                SELECT id, created_at FROM cn_mainline_snapshots
+                WHERE account_id = ? AND trade_date = ? AND universe_version = ?
+                ORDER BY as_of_ts DESC LIMIT 1
+                """,
+                (aid, d, universe),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                """
+                SELECT id, created_at FROM cn_mainline_snapshots
+                WHERE account_id = ? AND universe_version = ?
+                ORDER BY as_of_ts DESC LIMIT 1
+                """,
+                (aid, universe),
+            ).fetchone()
+    return [_today_cn_date_str(), aid, list(row) if row else None]
+
+
+def _etag_parts_leader(q: Any) -> list[Any] | None:
+    if str(q.get("force") or "").lower() in ("1", "true", "yes", "on"):
+        return None
+    with _connect() as conn:
+        return _etag_leader_watermark(conn, _etag_leader_symbols(conn))
+
+
+def _etag_parts_trendok(q: Any) -> list[Any] | None:
+    if str(q.get("refresh") or "").lower() in ("1", "true", "yes", "on"):
+        return None
+    syms = [str(s or "").strip().upper() for s in q.getlist("symbols")]
+    syms = [s for s in syms if s][:200]
+    if not syms:
+        return []
+    placeholders = ",".join(["?"] * len(syms))
+    with _connect() as conn:
+        names = conn.execute(
+            f"SELECT MAX(updated_at) FROM market_stocks WHERE symbol IN ({placeholders})",
+            tuple(syms),
+        ).fetchone()
+        return [_etag_symbols_watermark(conn, "market_bars", syms), names[0] if names else None]
+
+
+def _etag_parts_dashboard_summary(q: Any) -> list[Any] | None:
+    with _connect() as conn:
+
+        def one(sql: str) -> list[Any]:
+            row = conn.execute(sql).fetchone()
+            return list(row) if row else []
+
+        syms = _etag_leader_symbols(conn)
+        return [
+            _today_cn_date_str(),
+            _etag_live_bucket(),
+            get_setting("market_last_sync_at"),
+            one("SELECT COUNT(1), MAX(updated_at) FROM broker_accounts"),
+            one("SELECT COUNT(1), MAX(updated_at) FROM broker_account_state"),
+            one("SELECT COUNT(1) FROM market_stocks"),
+            one("SELECT COUNT(1), MAX(date), MAX(updated_at) FROM market_cn_industry_fund_flow_daily"),
+            one("SELECT COUNT(1), MAX(date), MAX(updated_at) FROM market_cn_sentiment_daily"),
+            one("SELECT COUNT(1), MAX(updated_at) FROM tv_screeners"),
+            one("SELECT COUNT(1), MAX(captured_at) FROM tv_screener_snapshots"),
+            _etag_leader_watermark(conn, syms),
+            _etag_symbols_watermark(conn, "market_chips", syms),
+            _etag_symbols_watermark(conn, "market_fund_flow", syms),
+        ]
+
+
+_ETAG_ROUTES: dict[str, Callable[[Any], list[Any] | None]] = {
+    "/dashboard/summary": _etag_parts_dashboard_summary,
+    "/leader": _etag_parts_leader,
+    "/leader/mainline": _etag_parts_leader_mainline,
+    "/rank/cn/next2d": _etag_parts_rank_next2d,
+    "/market/stocks/trendok": _etag_parts_trendok,
+}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    for tag in if_none_match.split(","):
+        t = tag.strip()
+        if t.startswith("W/"):
+            t = t[2:]
+        if t == "*" or t == etag:
+            return True
+    return False
+
+
+@app.middleware("http")
+async def _conditional_get_middleware(request: Request, call_next: Callable[[Request], Any]) -> Any:
+    path = request.url.path
+    fn = _ETAG_ROUTES.get(path)
+    if request.method != "GET" or fn is None:
+        return await call_next(request)
+    try:
+        parts = await run_in_threadpool(fn, request.query_params)
+    except Exception:
+        parts = None
+    if parts is None:
+        return await call_next(request)
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(
+        json.dumps([path, query, parts], ensure_ascii=False, default=str).encode("utf-8"),
+    ).hexdigest()
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    inm = request.headers.get("if-none-match")
+    hit = bool(inm) and _etag_matches(str(inm), etag)
+    cache_stats.record(f"etag:{path}", hit)
+    if hit:
+        return Response(status_code=304, headers=headers)
+    resp = await call_next(request)
+    if resp.status_code == 200:
+        resp.headers.update(headers)
+    return resp
+
+
+# --- Metrics (Prometheus text format) ---
+registry.register_collector(cache_stats_collector(cache_stats.snapshot))
+
+
+def _route_template(scope: dict[str, Any]) -> str:
+    """
+    Route path template (e.g. /market/stocks/{symbol}/bars) to keep label cardinality bounded.
+    """
+    route = scope.get("route")
+    if route is None:
+        # Requests answered by middleware (e.g. 304s) never reach the router.
+        for r in app.router.routes:
+            match, _ = r.matches(scope)
+            if match == Match.FULL:
+                route = r
+                break
+    return str(getattr(route, "path", "") or "unmatched")
+
+
+# Registered after the conditional-GET middleware so it wraps it and also times 304s.
+@app.middleware("http")
+async def _metrics_middleware(request: Request, call_next: Callable[[Request], Any]) -> Any:
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        resp = await call_next(request)
+        status = resp.status_code
+        return resp
+    finally:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - t0,
+            method=request.method,
+            route=_route_template(request.scope),
+            status=str(status),
+        )
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- Sampling profiler (opt-in) ---
+# Three triggers, all writing folded stacks under the data dir:
+# - per request: `X-Profile: 1` header or `?profile=1` (the response carries `X-Profile-Id`);
+# - per named operation: PROFILE_OPERATIONS="rank_build_and_score,generate_leader_daily" (or "*");
+# - time window: POST /profiles/capture.
+PROFILED_OPERATIONS = ("rank_build_and_score", "mainline_step1_candidates", "generate_leader_daily")
+_profile_window_lock = threading.Lock()
+_profile_window: dict[str, Any] = {"active": False}
+
+
+def _profiles_dir() -> Path:
+    env = (os.getenv("PROFILES_DIR") or "").strip()
+    return Path(env) if env else Path(__file__).with_name("data").joinpath("profiles")
+
+
+def _profile_store() -> ProfileStore:
+    return ProfileStore(_profiles_dir())
+
+
+def _profile_interval_s() -> float:
+    try:
+        return max(1.0, min(float(os.getenv("PROFILE_INTERVAL_MS", "10")), 1000.0)) / 1000.0
+    except ValueError:
+        return 0.01
+
+
+def _profile_operation_enabled(name: str) -> bool:
+    raw = (os.getenv("PROFILE_OPERATIONS") or "").strip()
+    if not raw:
+        return False
+    names = {x.strip() for x in raw.split(",") if x.strip()}
+    return "*" in names or name in names
+
+
+def _save_profile(prof: SamplingProfiler, *, name: str, kind: str) -> str | None:
+    try:
+        return _profile_store().save(prof, name=name, kind=kind).id
+    except Exception:
+        # Best-effort: profiling must never fail the profiled work.
+        return None
+
+
+def _profiled(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Sample the calling thread for the duration of the wrapped call when `name` is enabled.
+    """
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _profile_operation_enabled(name):
+                return fn(*args, **kwargs)
+            prof = SamplingProfiler(thread_ids={threading.get_ident()}, interval_s=_profile_interval_s()).start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _save_profile(prof.stop(), name=name, kind="operation")
+
+        return wrapper
+
+    return deco
+
+
+def _profile_requested(request: Request) -> bool:
+    flag = request.headers.get("x-profile") or request.query_params.get("profile") or ""
+    return flag.strip().lower() in ("1", "true", "yes", "on")
+
+
+@app.middleware("http")
+async def _profile_middleware(request: Request, call_next: Callable[[Request], Any]) -> Any:
+    if not _profile_requested(request) or request.url.path.startswith("/profiles"):
+        return await call_next(request)
+    # Sync endpoints run on pool threads, so sample every thread and keep service-code stacks.
+    prof = SamplingProfiler(interval_s=_profile_interval_s()).start()
+    try:
+        resp = await call_next(request)
+    finally:
+        prof.stop()
+    name = f"{request.method} {_route_template(request.scope)}"
+    pid = await run_in_threadpool(_save_profile, prof, name=name, kind="request")
+    if pid:
+        resp.headers["X-Profile-Id"] = pid
+    return resp
+
+
+@app.get("/profiles", response_model=ListProfilesResponse)
+def list_profiles() -> ListProfilesResponse:
+    return ListProfilesResponse(
+        items=[ProfileSummary(**asdict(m)) for m in _profile_store().list()],
+        operations=list(PROFILED_OPERATIONS),
+        enabledOperations=[n for n in PROFILED_OPERATIONS if _profile_operation_enabled(n)],
+        windowActive=bool(_profile_window.get("active")),
+    )
+
+
+@app.get("/profiles/{profile_id}")
+def download_profile(profile_id: str) -> Response:
+    path = _profile_store().path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=path.read_text(encoding="utf-8"),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+    )
+
+
+@app.post("/profiles/capture", response_model=ProfileCaptureResponse)
+def capture_profile_window(req: ProfileCaptureRequest) -> ProfileCaptureResponse:
+    seconds = max(0.1, min(float(req.seconds), 300.0))
+    interval_s = max(1.0, min(float(req.intervalMs), 1000.0)) / 1000.0
+    name = _norm_str(req.name) or "window"
+    with _profile_window_lock:
+        if _profile_window.get("active"):
+            raise HTTPException(status_code=409, detail="A profile window is already being captured")
+        _profile_window["active"] = True
+    prof = SamplingProfiler(interval_s=interval_s).start()
+
+    def _finish() -> None:
+        try:
+            _save_profile(prof.stop(), name=name, kind="window")
+        finally:
+            with _profile_window_lock:
+                _profile_window["active"] = False
+
+    timer = threading.Timer(seconds, _finish)
+    timer.daemon = True
+    timer.start()
+    ends_at = datetime.now(tz=UTC) + timedelta(seconds=seconds)
+    return ProfileCaptureResponse(status="started", name=name, seconds=seconds, endsAt=ends_at.isoformat())
+
+
+# --- Pipeline traces ---
+# Rank/mainline/leader generation runs inside `trace(...)`; stage markers and upstream calls
+# (AkShare, Eastmoney, ai-service) become spans. Runs that produced no stages (cache hits) are not
+# stored; the rest are kept per pipeline for run-over-run comparison.
+PIPELINE_TRACES_KEEP = 200
+
+
+def _trace_stage_durations(tree: dict[str, Any]) -> dict[str, float]:
+    out: dict[str, float] = {}
+    for c in tree.get("children") or []:
+        if isinstance(c, dict) and c.get("durationMs") is not None:
+            name = str(c.get("name") or "")
+            out[name] = round(out.get(name, 0.0) + float(c["durationMs"]), 3)
+    return out
+
+
+def _store_pipeline_trace(sp: Span, *, pipeline: str, trade_date: str, snapshot_id: str | None) -> str:
+    trace_id = str(uuid.uuid4())
+    tree = sp.to_dict()
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO pipeline_traces(id, pipeline, trade_date, snapshot_id, created_at, duration_ms, trace_json)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                trace_id,
+                pipeline,
+                trade_date,
+                snapshot_id,
+                now_iso(),
+                float(sp.duration_ms or 0.0),
+                json.dumps(tree, ensure_ascii=False, default=str),
+            ),
+        )
+        conn.execute(
+            """
+            DELETE FROM pipeline_traces
+            WHERE pipeline = ? AND id NOT IN (
+              SELECT id FROM pipeline_traces WHERE pipeline = ? ORDER BY created_at DESC LIMIT ?
+            )
+            """,
+            (pipeline, pipeline, PIPELINE_TRACES_KEEP),
+        )
+        conn.commit()
+    return trace_id
+
+
+def _finish_pipeline_trace(sp: Span, *, pipeline: str, trade_date: str, snapshot_id: str | None) -> None:
+    if not sp.children:
+        return
+    try:
+        _store_pipeline_trace(sp, pipeline=pipeline, trade_date=trade_date, snapshot_id=snapshot_id)
+    except Exception:
+        # Best-effort: tracing must never fail a generation.
+        pass
+
+
+def _pipeline_trace_summary(r: tuple[Any, ...], tree: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": str(r[0]),
+        "pipeline": str(r[1]),
+        "tradeDate": str(r[2]),
+        "snapshotId": str(r[3]) if r[3] else None,
+        "createdAt": str(r[4]),
+        "durationMs": float(r[5]),
+        "stages": _trace_stage_durations(tree),
+    }
+
+
+@app.get("/traces", response_model=ListPipelineTracesResponse)
+def list_pipeline_traces(pipeline: str | None = None, limit: int = 30) -> ListPipelineTracesResponse:
+    limit2 = max(1, min(int(limit), 200))
+    p = (pipeline or "").strip()
+    with _connect() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT id, pipeline, trade_date, snapshot_id, created_at, duration_ms, trace_json
+            FROM pipeline_traces
+            {"WHERE pipeline = ?" if p else ""}
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (p, limit2) if p else (limit2,),
+        ).fetchall()
+    items: list[PipelineTraceSummary] = []
+    for r in rows:
+        try:
+            tree = json.loads(str(r[6]))
+        except Exception:
+            tree = {}
+        items.append(PipelineTraceSummary(**_pipeline_trace_summary(tuple(r), tree if isinstance(tree, dict) else {})))
+    return ListPipelineTracesResponse(items=items)
+
+
+@app.get("/traces/{trace_id}", response_model=PipelineTraceResponse)
+def get_pipeline_trace(trace_id: str) -> PipelineTraceResponse:
+    with _connect() as conn:
+        r = conn.execute(
+            """
+            SELECT id, pipeline, trade_date, snapshot_id, created_at, duration_ms, trace_json
+            FROM pipeline_traces
+            WHERE id = ?
+            """,
+            (trace_id,),
+        ).fetchone()
+    if r is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    tree0 = json.loads(str(r[6]))
+    tree: dict[str, Any] = tree0 if isinstance(tree0, dict) else {}
+    return PipelineTraceResponse(**_pipeline_trace_summary(tuple(r), tree), trace=tree)
+
+
+# --- Retention ---
+# Snapshot/cache tables are pruned by a background manager (batched range deletes + incremental
+# vacuum) instead of after every insert; writers only `request()` a pass for their table.
+RETENTION_POLICIES = (
+    RetentionPolicy("cn_rank_snapshots", "as_of_date", 10),
+    RetentionPolicy("cn_intraday_rank_snapshots", "trade_date", 10, partition_by="account_id"),
+    RetentionPolicy("cn_mainline_snapshots", "trade_date", 10, partition_by="account_id"),
+    RetentionPolicy("leader_stocks", "date", 10),
+    RetentionPolicy("strategy_reports", "date", 10, partition_by="account_id"),
+    # Each screener keeps its own recent history, so a rarely synced one never loses its latest.
+    RetentionPolicy("tv_screener_snapshots", "captured_at", 30, partition_by="screener_id", timestamp=True),
+    RetentionPolicy("market_cn_minute_bar_rows", "trade_date", 20),
+    RetentionPolicy("market_cn_minute_state", "trade_date", 20),
+    RetentionPolicy("cn_intraday_observations", "trade_date", 60),
+    # Only each symbol's latest row is read; a few dates cover late or holiday-skewed bars.
+    RetentionPolicy("market_features_daily", "date", 10),
+    # Calibration looks back up to 720 calendar days (~500 trade dates).
+    RetentionPolicy("quant_2d_rank_events", "as_of_date", 500),
+    RetentionPolicy("quant_2d_outcomes", "as_of_date", 500),
+    RetentionPolicy("scheduler_runs", "scheduled_for", 30, timestamp=True),
+)
+_SNAPSHOT_TABLES = ("cn_rank_snapshots", "cn_intraday_rank_snapshots", "cn_mainline_snapshots")
+
+
+def _on_retention_pruned(table: str, _n: int) -> None:
+    if table in _SNAPSHOT_TABLES:
+        _invalidate_snapshot_payloads(table)
+
+
+def _retention_interval_s() -> float:
+    try:
+        return max(60.0, float(os.getenv("RETENTION_INTERVAL_SEC") or 900.0))
+    except ValueError:
+        return 900.0
+
+
+_retention_manager = RetentionManager(
+    _connect,
+    RETENTION_POLICIES,
+    interval_s=_retention_interval_s(),
+    on_pruned=_on_retention_pruned,
+)
+
+
+def _should_start_retention_manager() -> bool:
+    # Tests prune inline (see `RetentionManager.request`).
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        return False
+    v = str(os.getenv("DISABLE_RETENTION_MANAGER", "") or "").strip().lower()
+    return v not in ("1", "true", "yes", "on")
+
+
+def _start_retention_manager() -> None:
+    if _should_start_retention_manager():
+        _retention_manager.start()
+
+
+def _retention_status() -> RetentionStatusResponse:
+    with _connect() as conn:
+        size = database_size(conn, per_table=True)
+    return RetentionStatusResponse(
+        running=_retention_manager.running,
+        intervalSec=_retention_manager.interval_s,
+        policies=[
+            RetentionPolicyItem(table=p.table, column=p.column, keepDates=p.keep_dates, partitionBy=p.partition_by)
+            for p in RETENTION_POLICIES
+        ],
+        size=size,
+        lastRun=_retention_manager.last_report,
+    )
+
+
+@app.get("/storage/retention", response_model=RetentionStatusResponse)
+def get_storage_retention() -> RetentionStatusResponse:
+    return _retention_status()
+
+
+@app.post("/storage/retention/run", response_model=RetentionStatusResponse)
+def run_storage_retention(compact: bool = False) -> RetentionStatusResponse:
+    """
+    Run a full retention pass now. `compact=true` first switches a database created before
+    incremental auto-vacuum to that mode (one full VACUUM; blocks writers while it runs).
+    """
+    if compact:
+        with _connect() as conn:
+            enable_incremental_vacuum(conn)
+    _retention_manager.run_once()
+    return _retention_status()
+
+
+def _db_size_collector() -> list[str]:
+    try:
+        with _connect() as conn:
+            size = database_size(conn)
+    except sqlite3.Error:
+        return []
+    return [
+        "# HELP quant_sqlite_bytes SQLite file size by page state.",
+        "# TYPE quant_sqlite_bytes gauge",
+        format_sample("quant_sqlite_bytes", {"state": "used"}, size["bytes"] - size["freeBytes"]),
+        format_sample("quant_sqlite_bytes", {"state": "free"}, size["freeBytes"]),
+    ]
+
+
+registry.register_collector(_db_size_collector)
+
+
+# --- Compute offload ---
+# CPU-bound scoring batches (TrendOK, rank bar metrics, leader kNN, mainline linkage) run in a
+# process pool over shared-memory bars, so a heavy generate call does not hold this process's GIL
+# and stall every other endpoint (the sidecar manager polls /healthz). Kernels are module-level
+# `_*_kernel(ref, batch)` functions: spawned workers import this module to run them.
+
+
+def _compute_workers() -> int:
+    raw = str(os.getenv("COMPUTE_WORKERS", "") or "").strip()
+    if not raw:
+        return default_workers()
+    try:
+        return max(0, min(16, int(raw)))
+    except ValueError:
+        return default_workers()
+
+
+_compute_pool = ComputePool(_compute_workers())
+
+
+def _should_start_compute_pool() -> bool:
+    # Tests score inline; COMPUTE_WORKERS=0 keeps it inline in production too.
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        return False
+    return _compute_pool.workers > 0
+
+
+def _start_compute_pool() -> None:
+    if _should_start_compute_pool():
+        _compute_pool.start()
+
+
+def _compute_collector() -> list[str]:
+    st = _compute_pool.status()
+    return [
+        "# HELP quant_compute_workers Process-pool workers for CPU-bound scoring (0 when inline).",
+        "# TYPE quant_compute_workers gauge",
+        format_sample("quant_compute_workers", {}, st["workers"] if st["running"] else 0),
+        "# HELP quant_compute_batches_total Scoring batches by where they ran.",
+        "# TYPE quant_compute_batches_total counter",
+        format_sample("quant_compute_batches_total", {"mode": "pool"}, st["batches"]),
+        format_sample("quant_compute_batches_total", {"mode": "inline"}, st["inlineBatches"]),
+        "# HELP quant_compute_pool_restarts_total Process pools replaced after a worker crash.",
+        "# TYPE quant_compute_pool_restarts_total counter",
+        format_sample("quant_compute_pool_restarts_total", {}, st["restarts"]),
+    ]
+
+
+registry.register_collector(_compute_collector)
+
+
+# --- Compressed JSON columns ---
+# Large/high-volume JSON columns are written packed (storage.blob); plain-text rows from before
+# stay readable, and POST /storage/blobs/recompress rewrites them.
+BLOB_COLUMNS: tuple[tuple[str, str, str | None], ...] = (
+    ("tv_screener_snapshots", "rows_json", None),
+    ("market_cn_minute_state", "state_json", None),
+    ("cn_rank_snapshots", "output_json", None),
+    ("cn_intraday_rank_snapshots", "output_json", None),
+    ("cn_mainline_snapshots", "output_json", None),
+    ("market_quotes", "raw_json", "quote"),
+    ("market_chips", "raw_json", "chips"),
+    ("market_fund_flow", "raw_json", "fund_flow"),
+)
+
+
+def _blob_stats(conn: sqlite3.Connection) -> list[BlobColumnStats]:
+    return [
+        BlobColumnStats(table=table, column=column, **column_size(conn, table, column))
+        for table, column, _ in BLOB_COLUMNS
+    ]
+
+
+@app.get("/storage/blobs", response_model=BlobStatsResponse)
+def get_storage_blobs() -> BlobStatsResponse:
+    with _connect() as conn:
+        items = _blob_stats(conn)
+    return BlobStatsResponse(codec=blob_codec(), items=items, totalBytes=sum(x.bytes for x in items))
+
+
+@app.post("/storage/blobs/recompress", response_model=BlobStatsResponse)
+def recompress_storage_blobs() -> BlobStatsResponse:
+    """
+    Pack plain-text JSON rows written before compression (or with BLOB_CODEC=none). Freed pages
+    go back to the filesystem on the next retention pass.
+    """
+    runs: dict[tuple[str, str], dict[str, int]] = {}
+    with _connect() as conn:
+        for table, column, dictionary in BLOB_COLUMNS:
+            runs[(table, column)] = recompress_column(conn, table, column, dictionary=dictionary)
+        items = _blob_stats(conn)
+    for it in items:
+        r = runs[(it.table, it.column)]
+        it.rewrittenRows, it.bytesBefore, it.bytesAfter = r["rows"], r["bytesBefore"], r["bytesAfter"]
+    # Content is unchanged, so cached snapshot payloads stay valid.
+    saved = sum((it.bytesBefore or 0) - (it.bytesAfter or 0) for it in items)
+    return BlobStatsResponse(codec=blob_codec(), items=items, totalBytes=sum(x.bytes for x in items), savedBytes=saved)
+
+
+@app.post("/market/sync")
+def market_sync() -> JSONResponse:
+    ts = now_iso()
+    hk_error: str | None = None
+    try:
+        # CN is required for the core market universe.
+        cn = fetch_cn_a_spot()
+    except Exception as e:
+        # Upstream data sources can occasionally return HTML/captcha or abort connections.
+        # If we already have a cached market universe, keep the app usable by falling back to cache.
+        err = f"{type(e).__name__}: {repr(e)}"
+        with _connect() as conn:
+            row = conn.execute("SELECT COUNT(1) FROM market_stocks").fetchone()
+            cached_total = int(row[0]) if row else 0
+        if cached_total > 0:
+            # Do not update lastSyncAt on skipped runs; the UI can still surface the error.
+            return JSONResponse(
+                {
                     "ok": True,
                     "stocks": cached_total,
                     "syncedAt": ts,
@@ -3245,6 +4824,8 @@ def market_sync() -> JSONResponse:
         conn.commit()
 
     set_setting("market_last_sync_at", ts)
+    _events.publish("market.sync", {"stocks": len(cn) + len(hk), "syncedAt": ts})
+    _events.publish_quotes({s.symbol: s.quote for s in cn + hk})
     return JSONResponse(
         {
             "ok": True,
@@ -3503,21 +5084,16 @@ def _parse_float_safe(v: Any) -> float | None:
         return None
 
 
-def _market_stock_trendok_one(
-    *,
-    symbol: str,
-    name: str | None,
-    bars: list[tuple[str, str | None, str | None, str | None, str | None, str | None]],
-) -> TrendOkResult:
+TrendOkBar = tuple[str, str | None, str | None, str | None, str | None, str | None]
+
+
+def _trendok_series(
+    bars: list[TrendOkBar],
+) -> tuple[list[str], list[float], list[float], list[float], list[float], list[float]]:
     """
-    Compute TrendOK for one CN symbol from daily bars.
-    bars: list of (date, open, high, low, close, volume) ordered by date ASC.
+    (dates, opens, highs, lows, closes, volumes) of the bars with a close; a missing open/high/low
+    falls back to the close, a missing volume to 0.
     """
-    res = TrendOkResult(symbol=symbol, name=name)
-    if not symbol.startswith("CN:"):
-        res.missingData.append("unsupported_market")
-        return res
-
     closes: list[float] = []
     vols: list[float] = []
     highs: list[float] = []
@@ -3538,7 +5114,73 @@ def _market_stock_trendok_one(
         lows.append(l2 if l2 is not None else c2)
         opens.append(o2 if o2 is not None else c2)
         dates.append(str(d))
+    return dates, opens, highs, lows, closes, vols
+
+
+def _trendok_indicators(
+    highs: list[float], lows: list[float], closes: list[float], vols: list[float]
+) -> dict[str, Any]:
+    """
+    Latest TrendOK indicator values over one bar window (None where the window is too short).
+    EMA/RSI/MACD are seeded at the window start, so values depend on the window, not just the date.
+    """
+    out: dict[str, Any] = {
+        "ema5": None,
+        "ema20": None,
+        "ema60": None,
+        "ema20Prev": None,
+        "macd": None,
+        "macdSignal": None,
+        "macdHist": None,
+        "macdHist4": None,
+        "rsi14": None,
+        "closeHigh20": None,
+        "avgVol5": None,
+        "avgVol30": None,
+        "atr14": None,
+    }
+    ema5s = _ema(closes, 5)
+    ema20s = _ema(closes, 20)
+    ema60s = _ema(closes, 60)
+    if ema5s and ema20s and ema60s:
+        out.update(ema5=ema5s[-1], ema20=ema20s[-1], ema60=ema60s[-1])
+        if len(ema20s) >= 2:
+            out["ema20Prev"] = ema20s[-2]
+    macd_line, sig_line, hist = _macd(closes, 12, 26, 9)
+    if macd_line and sig_line and hist:
+        out.update(macd=macd_line[-1], macdSignal=sig_line[-1], macdHist=hist[-1])
+        if len(hist) >= 4:
+            out["macdHist4"] = [float(x) for x in hist[-4:]]
+    rsi14s = _rsi(closes, 14)
+    if rsi14s:
+        out["rsi14"] = rsi14s[-1]
+    if len(closes) >= 20:
+        out["closeHigh20"] = max(closes[-20:])
+    if len(vols) >= 30:
+        out["avgVol5"] = sum(vols[-5:]) / 5.0
+        out["avgVol30"] = sum(vols[-30:]) / 30.0
+    out["atr14"] = _atr14(highs, lows, closes, 14)
+    return out
+
+
+def _market_stock_trendok_one(
+    *,
+    symbol: str,
+    name: str | None,
+    bars: list[TrendOkBar],
+    indicators: dict[str, Any] | None = None,
+) -> TrendOkResult:
+    """
+    Compute TrendOK for one CN symbol from daily bars.
+    bars: list of (date, open, high, low, close, volume) ordered by date ASC.
+    indicators: precomputed `_trendok_indicators` of the same bars (the daily feature store).
+    """
+    res = TrendOkResult(symbol=symbol, name=name)
+    if not symbol.startswith("CN:"):
+        res.missingData.append("unsupported_market")
+        return res
 
+    dates, opens, highs, lows, closes, vols = _trendok_series(bars)
     if not closes:
         res.missingData.append("no_bars")
         return res
@@ -3549,28 +5191,25 @@ def _market_stock_trendok_one(
         res.missingData.append("bars_lt_60")
         # still compute whatever is possible for display/debug
 
-    ema5s = _ema(closes, 5)
-    ema20s = _ema(closes, 20)
-    ema60s = _ema(closes, 60)
-    if ema5s and ema20s and ema60s:
-        res.values.ema5 = ema5s[-1]
-        res.values.ema20 = ema20s[-1]
-        res.values.ema60 = ema60s[-1]
-        res.checks.emaOrder = bool(ema5s[-1] > ema20s[-1] > ema60s[-1])
-
-    macd_line, sig_line, hist = _macd(closes, 12, 26, 9)
-    if macd_line and sig_line and hist:
-        res.values.macd = macd_line[-1]
-        res.values.macdSignal = sig_line[-1]
-        res.values.macdHist = hist[-1]
-        res.checks.macdPositive = bool(macd_line[-1] > 0.0)
-        if len(hist) >= 4:
+    ind = indicators if indicators is not None else _trendok_indicators(highs, lows, closes, vols)
+    if ind["ema5"] is not None and ind["ema20"] is not None and ind["ema60"] is not None:
+        res.values.ema5 = ind["ema5"]
+        res.values.ema20 = ind["ema20"]
+        res.values.ema60 = ind["ema60"]
+        res.checks.emaOrder = bool(ind["ema5"] > ind["ema20"] > ind["ema60"])
+
+    if ind["macd"] is not None and ind["macdSignal"] is not None and ind["macdHist"] is not None:
+        res.values.macd = ind["macd"]
+        res.values.macdSignal = ind["macdSignal"]
+        res.values.macdHist = ind["macdHist"]
+        res.checks.macdPositive = bool(ind["macd"] > 0.0)
+        if ind["macdHist4"]:
             # Use the last 4 histogram values and count day-over-day expansions.
             # Condition (bullish expansion):
             # - Latest histogram must be > 0
             # - In the last 3 comparisons, at least 2 are increasing,
             #   counting only the positive part (negative values are treated as 0).
-            h = hist[-4:]
+            h = ind["macdHist4"]
             res.values.macdHist4 = [float(x) for x in h]
             hpos = [max(0.0, float(x)) for x in h]
             inc = 0
@@ -3582,19 +5221,18 @@ def _market_stock_trendok_one(
                 inc += 1
             res.checks.macdHistExpanding = bool(hpos[3] > 0.0 and inc >= 2)
 
-    rsi14s = _rsi(closes, 14)
-    if rsi14s:
-        res.values.rsi14 = rsi14s[-1]
-        res.checks.rsiInRange = bool(50.0 <= rsi14s[-1] <= 75.0)
+    if ind["rsi14"] is not None:
+        res.values.rsi14 = ind["rsi14"]
+        res.checks.rsiInRange = bool(50.0 <= ind["rsi14"] <= 75.0)
 
-    if len(closes) >= 20:
-        high20 = max(closes[-20:])
+    if ind["closeHigh20"] is not None:
+        high20 = ind["closeHigh20"]
         res.values.high20 = high20
         res.checks.closeNear20dHigh = bool(closes[-1] >= 0.95 * high20)
 
-    if len(vols) >= 30:
-        avg5 = sum(vols[-5:]) / 5.0
-        avg30 = sum(vols[-30:]) / 30.0
+    if ind["avgVol5"] is not None and ind["avgVol30"] is not None:
+        avg5 = ind["avgVol5"]
+        avg30 = ind["avgVol30"]
         res.values.avgVol5 = avg5
         res.values.avgVol30 = avg30
         res.checks.volumeSurge = bool(avg5 > 1.2 * avg30) if avg30 > 0 else bool(avg5 > 0)
@@ -3694,7 +5332,7 @@ def _market_stock_trendok_one(
             # Risk penalties (points, negative): volatility + below EMA20
             penalty = 0.0
             # Volatility: ATR(14)/close. Map 0.015 -> 0, 0.05 -> 10 points.
-            atr14 = _atr14(highs, lows, closes, 14)
+            atr14 = ind["atr14"]
             if atr14 is not None and close > 0:
                 atr_ratio = float(atr14) / float(close)
                 p_vol = _clip01((atr_ratio - 0.015) / 0.035) * 10.0
@@ -3786,8 +5424,8 @@ def _market_stock_trendok_one(
             if res.values.avgVol5 is not None and res.values.avgVol30 is not None:
                 avg5v = float(res.values.avgVol5)
                 avg30v = float(res.values.avgVol30)
-                if len(hist) >= 4:
-                    h = [float(x) for x in hist[-4:]]
+                if ind["macdHist4"]:
+                    h = [float(x) for x in ind["macdHist4"]]
                     shrink_then_flip = (h[0] > h[1] > h[2] > 0.0) and (h[3] < 0.0)
                     vol_dry = avg30v > 0.0 and (avg5v < avg30v)
                     exit_check_vol_dry = bool(vol_dry)
@@ -3818,8 +5456,8 @@ def _market_stock_trendok_one(
                                 warn_reasons.append("momentum_warning:hist_shrinking")
             else:
                 # If volume averages are unavailable, still warn based on MACD histogram shrinking (best-effort).
-                if len(hist) >= 4:
-                    h = [float(x) for x in hist[-4:]]
+                if ind["macdHist4"]:
+                    h = [float(x) for x in ind["macdHist4"]]
                     shrink_cnt = 0
                     if h[1] < h[0]:
                         shrink_cnt += 1
@@ -3891,7 +5529,7 @@ def _market_stock_trendok_one(
                 stop_parts["atr_k"] = atr_k
                 stop_parts["max_loss_pct"] = max_loss_pct
 
-                atr14 = _atr14(highs, lows, closes, 14)
+                atr14 = ind["atr14"]
                 if atr14 is None:
                     res.stopLossPrice = None
                     res.missingData.append("atr14_unavailable")
@@ -3938,9 +5576,9 @@ def _market_stock_trendok_one(
                 buy_checks["vol_sma20"] = round(vol_sma20, 6) if vol_sma20 is not None else None
 
                 ema20_rising = False
-                if ema20s and len(ema20s) >= 2:
-                    ema20_rising = bool(ema20s[-1] > ema20s[-2])
-                macd_hist_now = float(hist[-1]) if hist else 0.0
+                if ind["ema20"] is not None and ind["ema20Prev"] is not None:
+                    ema20_rising = bool(ind["ema20"] > ind["ema20Prev"])
+                macd_hist_now = float(ind["macdHist"]) if ind["macdHist"] is not None else 0.0
                 in_trend = bool(
                     res.values.ema20 is not None
                     and close > float(res.values.ema20)
@@ -3956,7 +5594,9 @@ def _market_stock_trendok_one(
                     prev10_high = max(highs[-11:-1]) if n >= 11 else max(highs[:-1])
                     new_high = bool(close > prev10_high)
                     vol_ok = bool(vol_sma20 is not None and vol > vol_sma20 * 1.2)
-                    macd_inc = bool(len(hist) >= 2 and float(hist[-1]) > float(hist[-2]))
+                    # n >= 26 here, so the last 4 histogram values exist.
+                    h4 = ind["macdHist4"] or []
+                    macd_inc = bool(len(h4) >= 2 and float(h4[-1]) > float(h4[-2]))
                     rsi_ok = bool(res.values.rsi14 is not None and float(res.values.rsi14) < 80.0)
                     buy_checks["b_prev10_high"] = round(prev10_high, 6)
                     buy_checks["b_new_high"] = new_high
@@ -4053,6 +5693,19 @@ def _market_stock_trendok_one(
     return res
 
 
+def _trendok_kernel(
+    ref: BarMatrixRef, batch: list[tuple[str, str | None, dict[str, Any] | None]]
+) -> list[TrendOkResult]:
+    """
+    Compute-pool kernel: TrendOK for `(symbol, name, stored indicators)` over shared bars.
+    """
+    with ref.attach() as view:
+        return [
+            _market_stock_trendok_one(symbol=sym, name=name, bars=view.bar_tuples(sym), indicators=ind)
+            for sym, name, ind in batch
+        ]
+
+
 @app.get("/market/stocks/trendok", response_model=list[TrendOkResult])
 def market_stocks_trendok(
     symbols: Annotated[list[str] | None, Query()] = None,
@@ -4090,34 +5743,13 @@ def market_stocks_trendok(
                 # Best-effort: never fail the whole batch due to one symbol refresh.
                 pass
 
-    out: list[TrendOkResult] = []
-    with _connect() as conn:
-        for sym in syms:
-            # Pull the most recent 120 daily bars for indicators.
-            rows = conn.execute(
-                """
-                SELECT date, open, high, low, close, volume
-                FROM market_bars
-                WHERE symbol = ?
-                ORDER BY date ASC
-                """,
-                (sym,),
-            ).fetchall()
-            # Keep only the tail for performance.
-            tail = rows[-120:] if len(rows) > 120 else rows
-            bars = [
-                (
-                    str(r[0]),
-                    str(r[1]) if r[1] is not None else None,
-                    str(r[2]) if r[2] is not None else None,
-                    str(r[3]) if r[3] is not None else None,
-                    str(r[4]) if r[4] is not None else None,
-                    str(r[5]) if r[5] is not None else None,
-                )
-                for r in tail
-            ]
-            out.append(_market_stock_trendok_one(symbol=sym, name=by_name.get(sym), bars=bars))
-    return out
+    # The most recent 120 daily bars per symbol, in one query; indicators come from the daily
+    # feature store (same 120-bar window) or are computed in the compute pool.
+    bars_by_sym = _load_cached_bar_tuples(syms, days=120)
+    stored = _get_daily_features(syms)
+    return _compute_pool.map_bars(
+        _trendok_kernel, bars_by_sym, [(sym, by_name.get(sym), stored.get(sym)) for sym in syms]
+    )
 
 
 @app.get("/market/stocks/{symbol}/bars", response_model=MarketBarsResponse)
@@ -4138,28 +5770,23 @@ def market_stock_bars(symbol: str, days: int = 60, force: bool = False) -> Marke
 
     def _latest_expected_daily_bar_date(mkt: str) -> str:
         """
-        Best-effort expected latest completed daily bar date (YYYY-MM-DD).
+        Expected latest daily bar date (YYYY-MM-DD).
 
-        We intentionally avoid complex holiday calendars; we only handle weekends.
+        CN follows the exchange calendar and session (no refetch on holidays/weekends or
+        before the open); HK only knows about weekends (no HK holiday table yet).
         This is used to decide whether DB cache is stale and should be refreshed even
         when we already have enough cached rows.
         """
         if mkt == "HK":
-            tz = ZoneInfo("Asia/Hong_Kong")
-        else:
-            tz = ZoneInfo("Asia/Shanghai")
-        now_local = datetime.now(tz=tz).date()
-        # Weekend -> move back to Friday.
-        d0 = now_local
-        while d0.weekday() >= 5:
-            d0 = d0 - timedelta(days=1)
-        return d0.strftime("%Y-%m-%d")
+            d0 = datetime.now(tz=ZoneInfo("Asia/Hong_Kong")).date()
+            return _hk_trading_calendar().latest_trading_day(d0).isoformat()
+        return _cn_expected_daily_date_str()
 
     # Load cached bars first.
     with _connect() as conn:
         cached = conn.execute(
             """
-            SELECT date, open, high, low, close, volume, amount
+            SELECT date, open, high, low, close, volume, amount, updated_at
             FROM market_bars
             WHERE symbol = ?
             ORDER BY date DESC
@@ -4194,8 +5821,13 @@ def market_stock_bars(symbol: str, days: int = 60, force: bool = False) -> Marke
     cached_last = str(cached[0][0]) if cached else ""
     expected_last = _latest_expected_daily_bar_date(market)
     cache_stale = bool(cached_last and cached_last < expected_last)
+    if market == "CN" and cached_last and not cache_stale:
+        # Today's bar is partial until the close: refresh it on the session TTL only.
+        fr = _cache_freshness(DAILY_BAR, data_date=cached_last, updated_at=str(cached[0][7] or ""))
+        cache_stale = fr is not None and not fr.fresh
 
     if force or len(cached) < days2 or cache_stale:
+        cache_stats.miss("daily_bars")
         ts = now_iso()
         try:
             # Upstream endpoints can be flaky (e.g. remote disconnect). Retry once, then fall back to cache if available.
@@ -4224,9 +5856,7 @@ def market_stock_bars(symbol: str, days: int = 60, force: bool = False) -> Marke
                 raise HTTPException(status_code=500, detail=f"Bars fetch failed for {ticker}: {last_err}") from last_err
         except HTTPException:
             raise
-        with _connect() as conn:
-            _upsert_market_bars(conn, sym, bars, ts)
-            conn.commit()
+        _writes.run(lambda conn: _upsert_market_bars(conn, sym, bars, ts))
         out = [
             {
                 "date": b.date,
@@ -4248,6 +5878,7 @@ def market_stock_bars(symbol: str, days: int = 60, force: bool = False) -> Marke
             bars=out,
         )
 
+    cache_stats.hit("daily_bars")
     return _resp_from_cached(cached)
 
 
@@ -4285,13 +5916,15 @@ def market_stock_chips(symbol: str, days: int = 60, force: bool = False) -> Mark
             (sym, days2),
         ).fetchall()
 
-    # Auto-refresh if cache is stale (chips are daily; refresh when latest cached date lags).
+    # Auto-refresh if cache is stale (chips are daily and published after the close;
+    # refresh when latest cached date lags the latest published trading day).
     cached_last = str(cached[0][0]) if cached else ""
-    expected_last = _today_cn_date_str()
+    expected_last = _cn_expected_daily_date_str(eod_only=True)
     cache_stale = bool(cached_last and cached_last < expected_last)
 
     if (not force) and (not cache_stale) and len(cached) >= min(days2, 30):
-        items = [json.loads(str(r[1])) for r in reversed(cached)]
+        cache_stats.hit("chips")
+        items = [unpack_json(r[1]) for r in reversed(cached)]
         return MarketChipsResponse(
             symbol=sym,
             market=market,
@@ -4301,14 +5934,13 @@ def market_stock_chips(symbol: str, days: int = 60, force: bool = False) -> Mark
             items=items,
         )
 
+    cache_stats.miss("chips")
     ts = now_iso()
     try:
         items2 = fetch_cn_a_chip_summary(ticker, days=days2)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chip fetch failed for {ticker}: {e}") from e
-    with _connect() as conn:
-        _upsert_market_chips(conn, sym, items2, ts)
-        conn.commit()
+    _writes.run(lambda conn: _upsert_market_chips(conn, sym, items2, ts))
     return MarketChipsResponse(
         symbol=sym,
         market=market,
@@ -4353,13 +5985,15 @@ def market_stock_fund_flow(symbol: str, days: int = 60, force: bool = False) ->
             (sym, days2),
         ).fetchall()
 
-    # Auto-refresh if cache is stale (fund flow is daily; refresh when latest cached date lags).
+    # Auto-refresh if cache is stale (fund flow is daily and published after the close;
+    # refresh when latest cached date lags the latest published trading day).
     cached_last = str(cached[0][0]) if cached else ""
-    expected_last = _today_cn_date_str()
+    expected_last = _cn_expected_daily_date_str(eod_only=True)
     cache_stale = bool(cached_last and cached_last < expected_last)
 
     if (not force) and (not cache_stale) and len(cached) >= min(days2, 30):
-        items = [json.loads(str(r[1])) for r in reversed(cached)]
+        cache_stats.hit("fund_flow")
+        items = [unpack_json(r[1]) for r in reversed(cached)]
         return MarketFundFlowResponse(
             symbol=sym,
             market=market,
@@ -4369,14 +6003,13 @@ def market_stock_fund_flow(symbol: str, days: int = 60, force: bool = False) ->
             items=items,
         )
 
+    cache_stats.miss("fund_flow")
     ts = now_iso()
     try:
         items2 = fetch_cn_a_fund_flow(ticker, days=days2)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fund flow fetch failed for {ticker}: {e}") from e
-    with _connect() as conn:
-        _upsert_market_fund_flow(conn, sym, items2, ts)
-        conn.commit()
+    _writes.run(lambda conn: _upsert_market_fund_flow(conn, sym, items2, ts))
     return MarketFundFlowResponse(
         symbol=sym,
         market=market,
@@ -4445,16 +6078,23 @@ def market_cn_industry_fund_flow_sync(
     top_n = max(1, min(int(req.topN), 50))
     ts = now_iso()
 
+    # On a known non-trading day the provider returns the latest trading day's snapshot:
+    # label it with that day (and skip the upstream call entirely when it is already cached).
+    req_date = as_of.strftime("%Y-%m-%d")
+    cal = _cn_trading_calendar()
+    calendar_closed = cal.covers(as_of) and not cal.is_trading_day(as_of)
+    effective_date = cal.latest_trading_day(as_of).isoformat() if calendar_closed else req_date
+
     with _connect() as conn:
         if not req.force:
             row = conn.execute(
                 "SELECT COUNT(1) FROM market_cn_industry_fund_flow_daily WHERE date = ?",
-                (as_of.strftime("%Y-%m-%d"),),
+                (effective_date,),
             ).fetchone()
             if row and int(row[0] or 0) > 0:
                 return MarketCnIndustryFundFlowSyncResponse(
                     ok=True,
-                    asOfDate=as_of.strftime("%Y-%m-%d"),
+                    asOfDate=effective_date,
                     days=days,
                     rowsUpserted=0,
                     histRowsUpserted=0,
@@ -4467,14 +6107,21 @@ def market_cn_industry_fund_flow_sync(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Industry fund flow fetch failed: {e}") from e
 
-    # If the market is closed (holiday/weekend), the provider may return the SAME snapshot as the
-    # latest trading day. Detect it by comparing snapshot signatures and avoid storing a duplicate date.
-    req_date = as_of.strftime("%Y-%m-%d")
-    effective_date = req_date
     message: str | None = None
+    if calendar_closed:
+        for it in items:
+            it["date"] = effective_date
+        with _connect() as conn:
+            # Clean up previously cached holiday rows (if any) to prevent duplicates.
+            conn.execute("DELETE FROM market_cn_industry_fund_flow_daily WHERE date = ?", (req_date,))
+            conn.commit()
+        message = f"Market closed on {req_date}. Reused latest trading day snapshot: {effective_date}."
+
+    # Outside the calendar's covered years, fall back to snapshot signatures: if the provider returned
+    # the SAME snapshot as the latest cached trading day, avoid storing a duplicate date.
     with _connect() as conn:
         latest = _get_latest_cn_industry_fund_flow_date(conn)
-        if latest and latest < req_date:
+        if not calendar_closed and latest and latest < req_date:
             prev_rows = conn.execute(
                 "SELECT industry_code, net_inflow FROM market_cn_industry_fund_flow_daily WHERE date = ?",
                 (latest,),
@@ -5052,6 +6699,32 @@ def market_cn_sentiment(days: int = 10, asOfDate: str | None = None) -> MarketCn
     return MarketCnSentimentResponse(asOfDate=d, days=max(1, min(int(days), 30)), items=[MarketCnSentimentRow(**x) for x in items])
 
 
+def _rank_items_from_output(out: dict[str, Any]) -> list[RankItem]:
+    items0 = out.get("items")
+    items: list[Any] = items0 if isinstance(items0, list) else []
+    return [RankItem(**x) for x in items if isinstance(x, dict)]
+
+
+def _intraday_items_from_output(out: dict[str, Any]) -> list[IntradayRankItem]:
+    items0 = out.get("items")
+    items: list[Any] = items0 if isinstance(items0, list) else []
+    return [IntradayRankItem(**x) for x in items if isinstance(x, dict)]
+
+
+def _intraday_observations_from_output(out: dict[str, Any]) -> list[IntradayObservationRow]:
+    obs0 = out.get("observations")
+    obs: list[Any] = obs0 if isinstance(obs0, list) else []
+    return [IntradayObservationRow(**x) for x in obs if isinstance(x, dict)]
+
+
+def _mainline_themes_from_output(out: dict[str, Any]) -> tuple[MainlineTheme | None, list[MainlineTheme]]:
+    sel0 = out.get("selected")
+    themes0 = out.get("themesTopK")
+    themes: list[Any] = themes0 if isinstance(themes0, list) else []
+    selected = MainlineTheme(**sel0) if isinstance(sel0, dict) else None
+    return selected, [MainlineTheme(**x) for x in themes if isinstance(x, dict)]
+
+
 @app.get("/rank/cn/next2d", response_model=RankSnapshotResponse)
 def rank_cn_next2d(
     accountId: str | None = None,
@@ -5077,9 +6750,7 @@ def rank_cn_next2d(
         )
     out_raw = cached.get("output")
     out: dict[str, Any] = out_raw if isinstance(out_raw, dict) else {}
-    items_raw = out.get("items")
-    items0: list[Any] = items_raw if isinstance(items_raw, list) else []
-    items = items0[: max(1, min(int(limit), 200))]
+    items = _snapshot_models(cached, "rank_items", _rank_items_from_output)[: max(1, min(int(limit), 200))]
     return RankSnapshotResponse(
         id=str(cached.get("id") or ""),
         asOfTs=str(out.get("asOfTs") or "") or None,
@@ -5090,13 +6761,20 @@ def rank_cn_next2d(
         riskMode=str(out.get("riskMode") or "") or None,
         objective=str(out.get("objective") or "") or None,
         horizon=str(out.get("horizon") or "") or None,
-        items=[RankItem(**x) for x in items if isinstance(x, dict)],
+        items=items,
         debug=out.get("debug") if isinstance(out.get("debug"), dict) else None,
     )
 
 
 @app.post("/rank/cn/next2d/generate", response_model=RankSnapshotResponse)
 def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotResponse:
+    with _ai_response_cache_bypass(req.bypassAiCache), trace("rank_next2d", force=bool(req.force)) as sp:
+        resp = _rank_cn_next2d_generate(req)
+    _finish_pipeline_trace(sp, pipeline="rank_next2d", trade_date=resp.asOfDate, snapshot_id=resp.id or None)
+    return resp
+
+
+def _rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotResponse:
     as_of = (req.asOfDate or "").strip() or _today_cn_date_str()
     universe = (req.universeVersion or "").strip() or "v0"
     limit2 = max(1, min(int(req.limit), 200))
@@ -5108,9 +6786,7 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
     if cached is not None and not req.force:
         out_raw = cached.get("output")
         out: dict[str, Any] = out_raw if isinstance(out_raw, dict) else {}
-        items_raw = out.get("items")
-        items0: list[Any] = items_raw if isinstance(items_raw, list) else []
-        items = items0[:limit2]
+        items = _snapshot_models(cached, "rank_items", _rank_items_from_output)[:limit2]
         return RankSnapshotResponse(
             id=str(cached.get("id") or ""),
             asOfDate=str(out.get("asOfDate") or as_of),
@@ -5118,19 +6794,23 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
             createdAt=str(cached.get("createdAt") or ""),
             universeVersion=str(out.get("universeVersion") or universe),
             riskMode=str(out.get("riskMode") or "") or None,
-            items=[RankItem(**x) for x in items if isinstance(x, dict)],
+            items=items,
             debug=out.get("debug") if isinstance(out.get("debug"), dict) else None,
         )
 
     ts = now_iso()
-    # Run best-effort outcome labeling to keep calibration fresh.
-    try:
-        _label_quant_2d_outcomes_best_effort(account_id=aid, limit=500)
-    except Exception:
-        pass
+    trace_stage("label_outcomes")
+    # Outcome labeling keeps calibration fresh; the scheduler does it after the close, so only
+    # label inline when it is not running.
+    if not _scheduler.running:
+        try:
+            _label_quant_2d_outcomes_best_effort(account_id=aid, limit=500)
+        except Exception:
+            pass
 
     # Build a larger raw universe for learning; still return only `limit`.
     internal_limit = max(limit2, 80)
+    trace_stage("build_and_score", limit=internal_limit)
     raw_out = _rank_build_and_score(
         account_id=aid,
         as_of_date=as_of,
@@ -5139,32 +6819,23 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
         include_holdings=False,
     )
 
-    # Calibration (bucketed, cached).
-    calib_key = f"v0:{aid}:quant2d:bucket20"
-    calib_out: dict[str, Any] = {}
-    cached_cal = _get_quant_2d_calibration_cached(key=calib_key)
-    use_cache = False
-    if cached_cal is not None:
-        try:
-            updated = datetime.fromisoformat(str(cached_cal.get("updatedAt") or "")).replace(tzinfo=UTC)
-            age = (datetime.now(tz=UTC) - updated).total_seconds()
-            if age <= 6 * 3600:
-                out0 = cached_cal.get("output")
-                calib_out = out0 if isinstance(out0, dict) else {}
-                use_cache = True
-        except Exception:
-            use_cache = False
-    if not use_cache:
-        calib_out = _build_quant_2d_calibration(account_id=aid, buckets=20, lookback_days=180)
-        try:
-            _upsert_quant_2d_calibration_cached(key=calib_key, ts=ts, output=calib_out)
-        except Exception:
-            pass
+    # Calibration (bucketed, maintained incrementally). Never rebuild on the request path:
+    # serve the latest version and let stale/missing windows refresh in the background.
+    trace_stage("calibration")
+    calib_key = _quant2d_calibration_key(account_id=aid, buckets=20, lookback_days=180)
+    calib_snap = _get_quant_2d_calibration_snapshot(key=calib_key)
+    use_cache = calib_snap is not None
+    cache_stats.record("quant2d_calibration", bool(calib_snap is not None and not calib_snap.get("stale")))
+    if calib_snap is None or calib_snap.get("stale"):
+        _schedule_quant_2d_calibration_refresh(account_id=aid, buckets=20, lookback_days=180)
+        calib_snap = _get_quant_2d_calibration_snapshot(key=calib_key) or calib_snap
+    calib_out: dict[str, Any] = cast(dict[str, Any], calib_snap.get("output")) if calib_snap is not None else {}
 
     items_raw = raw_out.get("items")
     raw_items: list[Any] = items_raw if isinstance(items_raw, list) else []
 
     # Persist rank events for learning (cap).
+    trace_stage("rank_events", candidates=len(raw_items))
     try:
         ev_rows: list[dict[str, Any]] = []
         for r in raw_items[:80]:
@@ -5188,6 +6859,7 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
         pass
 
     # Apply calibration and compute base decision score (before LLM rerank).
+    trace_stage("score_items")
     final_items: list[dict[str, Any]] = []
     evidence_by_symbol: dict[str, dict[str, Any]] = {}
     calib_n_total = int((calib_out.get("n") or 0) if isinstance(calib_out, dict) else 0)
@@ -5256,6 +6928,7 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
             }
         )
 
+    trace_stage("llm_rerank")
     # LLM rerank + explain (best-effort): only adjust TopK candidates, and only when evidenceRefs are valid.
     llm_meta: dict[str, Any] = {"ok": False}
     try:
@@ -5355,6 +7028,8 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
             "raw": raw_out.get("debug") if isinstance(raw_out.get("debug"), dict) else {},
             "calibrationKey": calib_key,
             "calibrationCached": bool(use_cache),
+            "calibrationVersion": int(calib_snap.get("version") or 0) if calib_snap is not None else 0,
+            "calibrationStale": bool(calib_snap.get("stale")) if calib_snap is not None else False,
             "calibrationN": int((calib_out.get("n") or 0) if isinstance(calib_out, dict) else 0),
             "calibrationBuckets": len(calib_out.get("items") or []) if isinstance(calib_out.get("items"), list) else 0,
             "calibrationReady": bool(calib_ready),
@@ -5362,8 +7037,9 @@ def rank_cn_next2d_generate(req: RankNext2dGenerateRequest) -> RankSnapshotRespo
         },
     }
 
+    trace_stage("persist", items=len(final_items))
     snap_id = _upsert_cn_rank_snapshot(account_id=aid, as_of_date=as_of, universe_version=universe, ts=ts, output=output)
-    _prune_cn_rank_snapshots(keep_days=10)
+    _retention_manager.request("cn_rank_snapshots")
     return RankSnapshotResponse(
         id=snap_id,
         asOfTs=str(output.get("asOfTs") or "") or None,
@@ -5410,12 +7086,8 @@ def rank_cn_intraday(
         )
     out_raw = cached.get("output")
     out: dict[str, Any] = out_raw if isinstance(out_raw, dict) else {}
-    items_raw = out.get("items")
-    items0: list[Any] = items_raw if isinstance(items_raw, list) else []
-    items = items0[:limit2]
-    obs_raw = out.get("observations")
-    obs0: list[Any] = obs_raw if isinstance(obs_raw, list) else []
-    obs_items = [IntradayObservationRow(**x) for x in obs0 if isinstance(x, dict)]
+    items = _snapshot_models(cached, "intraday_items", _intraday_items_from_output)[:limit2]
+    obs_items = _snapshot_models(cached, "intraday_observations", _intraday_observations_from_output)
     return IntradayRankSnapshotResponse(
         id=str(cached.get("id") or ""),
         asOfTs=str(out.get("asOfTs") or ""),
@@ -5425,7 +7097,7 @@ def rank_cn_intraday(
         createdAt=str(cached.get("createdAt") or ""),
         universeVersion=str(out.get("universeVersion") or universe),
         riskMode=str(out.get("riskMode") or "") or None,
-        items=[IntradayRankItem(**x) for x in items if isinstance(x, dict)],
+        items=items,
         observations=obs_items,
         debug=out.get("debug") if isinstance(out.get("debug"), dict) else None,
     )
@@ -5459,12 +7131,8 @@ def rank_cn_intraday_generate(req: IntradayRankGenerateRequest) -> IntradayRankS
         if cached is not None:
             out_raw = cached.get("output")
             out: dict[str, Any] = out_raw if isinstance(out_raw, dict) else {}
-            items_raw = out.get("items")
-            items0: list[Any] = items_raw if isinstance(items_raw, list) else []
-            items = items0[:limit2]
-            obs_raw = out.get("observations")
-            obs0: list[Any] = obs_raw if isinstance(obs_raw, list) else []
-            obs_items = [IntradayObservationRow(**x) for x in obs0 if isinstance(x, dict)]
+            items = _snapshot_models(cached, "intraday_items", _intraday_items_from_output)[:limit2]
+            obs_items = _snapshot_models(cached, "intraday_observations", _intraday_observations_from_output)
             return IntradayRankSnapshotResponse(
                 id=str(cached.get("id") or ""),
                 asOfTs=str(out.get("asOfTs") or as_of_ts),
@@ -5474,7 +7142,7 @@ def rank_cn_intraday_generate(req: IntradayRankGenerateRequest) -> IntradayRankS
                 createdAt=str(cached.get("createdAt") or ""),
                 universeVersion=str(out.get("universeVersion") or universe),
                 riskMode=str(out.get("riskMode") or "") or None,
-                items=[IntradayRankItem(**x) for x in items if isinstance(x, dict)],
+                items=items,
                 observations=obs_items,
                 debug=out.get("debug") if isinstance(out.get("debug"), dict) else None,
             )
@@ -5496,7 +7164,7 @@ def rank_cn_intraday_generate(req: IntradayRankGenerateRequest) -> IntradayRankS
         ts=ts,
         output=output,
     )
-    _prune_cn_intraday_rank_snapshots(account_id=aid, keep_days=10)
+    _retention_manager.request("cn_intraday_rank_snapshots")
 
     out_items = output.get("items")
     items1: list[Any] = out_items if isinstance(out_items, list) else []
@@ -5538,7 +7206,7 @@ def _quant_morning_radar_build(
     # Spot snapshot for representative stocks.
     spot_rows: list[StockRow] = []
     try:
-        spot_rows = fetch_cn_a_spot()
+        spot_rows = _cn_spot_rows()
     except Exception:
         spot_rows = []
     spot_map: dict[str, StockRow] = {s.ticker: s for s in spot_rows if s.market == "CN" and s.ticker}
@@ -5856,6 +7524,7 @@ def _upsert_leader_stocks(*, date: str, items: list[dict[str, Any]], ts: str) ->
             )
             ids.append(rid)
         conn.commit()
+    _events.publish("leader.daily", {"date": date, "count": len(ids)})
     return ids
 
 
@@ -5918,24 +7587,7 @@ def _list_leader_stocks(*, days: int = 10) -> tuple[list[str], list[dict[str, An
 def _prune_leader_stocks_keep_last_n_days(*, keep_days: int = 10) -> None:
     keep2 = max(1, min(int(keep_days), 60))
     with _connect() as conn:
-        date_rows = conn.execute(
-            """
-            SELECT DISTINCT date
-            FROM leader_stocks
-            ORDER BY date DESC
-            LIMIT ?
-            """,
-            (keep2,),
-        ).fetchall()
-        keep_dates = [str(r[0]) for r in date_rows if r and r[0]]
-        if not keep_dates:
-            return
-        placeholders = ",".join(["?"] * len(keep_dates))
-        conn.execute(
-            f"DELETE FROM leader_stocks WHERE date NOT IN ({placeholders})",
-            tuple(keep_dates),
-        )
-        conn.commit()
+        prune(conn, RetentionPolicy("leader_stocks", "date", keep2))
 
 
 def _delete_leader_stocks_for_date(date: str) -> None:
@@ -5974,8 +7626,8 @@ def _upsert_leader_live_score(*, symbol: str, live_score: float, breakdown: dict
     sym = (symbol or "").strip()
     if not sym:
         return
-    with _connect() as conn:
-        conn.execute(
+    _writes.run(
+        lambda conn: conn.execute(
             """
             INSERT INTO leader_stock_scores(symbol, live_score, breakdown_json, updated_at)
             VALUES(?, ?, ?, ?)
@@ -5986,7 +7638,7 @@ def _upsert_leader_live_score(*, symbol: str, live_score: float, breakdown: dict
             """,
             (sym, float(live_score), json.dumps(breakdown or {}, ensure_ascii=False), ts),
         )
-        conn.commit()
+    )
 
 
 def _compute_leader_live_score(
@@ -6285,6 +7937,9 @@ def _refresh_leader_live_scores(*, symbols: list[str], ts: str, force_refresh_ma
         if len(syms) >= 30:
             break
 
+    # Gather inputs (DB / provider I/O), then score every symbol in one offloaded batch.
+    inputs: list[tuple[str, str, dict[str, Any] | None, dict[str, Any] | None, dict[str, Any] | None]] = []
+    bars_by_sym: dict[str, list[dict[str, str]]] = {}
     for sym in syms:
         try:
             # Determine market quickly
@@ -6301,7 +7956,7 @@ def _refresh_leader_live_scores(*, symbols: list[str], ts: str, force_refresh_ma
                     bars = market_stock_bars(sym, days=60, force=True).bars
                 except Exception:
                     bars = bars_cached
-            feats = _bars_features(bars or [])
+            bars_by_sym[sym] = bars if isinstance(bars, list) else []
 
             chips_summary: dict[str, Any] | None = None
             ff_breakdown: dict[str, Any] | None = None
@@ -6319,18 +7974,53 @@ def _refresh_leader_live_scores(*, symbols: list[str], ts: str, force_refresh_ma
                 except Exception:
                     ff_breakdown = None
 
-            breakdown = _compute_leader_live_score(
-                market=market,
-                feats=feats,
-                bars=bars if isinstance(bars, list) else None,
-                chips_summary=chips_summary,
-                ff_breakdown=ff_breakdown,
-            )
+            inputs.append((sym, market, chips_summary, ff_breakdown, None))
+        except Exception:
+            continue
+
+    try:
+        # Stored daily features replace `_bars_features` where they match the latest cached bar.
+        stored = _get_daily_features([x[0] for x in inputs])
+        inputs = [(*x[:4], stored.get(x[0])) for x in inputs]
+        scores = _compute_pool.map_bars(_leader_score_kernel, bars_by_sym, inputs)
+    except Exception:
+        return
+    for (sym, *_), breakdown in zip(inputs, scores, strict=True):
+        if breakdown is None:
+            continue
+        try:
             _upsert_leader_live_score(symbol=sym, live_score=float(breakdown.get("total") or 0.0), breakdown=breakdown, ts=ts)
         except Exception:
             continue
 
 
+def _leader_score_kernel(
+    ref: BarMatrixRef,
+    batch: list[tuple[str, str, dict[str, Any] | None, dict[str, Any] | None, dict[str, Any] | None]],
+) -> list[dict[str, Any] | None]:
+    """
+    Compute-pool kernel: `_compute_leader_live_score` per `(symbol, market, chips, fund flow,
+    stored daily features)` over shared bars (None where scoring failed).
+    """
+    out: list[dict[str, Any] | None] = []
+    with ref.attach() as view:
+        for sym, market, chips_summary, ff_breakdown, feats in batch:
+            try:
+                bars = view.bars(sym)
+                out.append(
+                    _compute_leader_live_score(
+                        market=market,
+                        feats=feats if feats is not None else _bars_features(bars),
+                        bars=bars,
+                        chips_summary=chips_summary,
+                        ff_breakdown=ff_breakdown,
+                    )
+                )
+            except Exception:
+                out.append(None)
+    return out
+
+
 def _entry_close_for_date(symbol: str, date_str: str) -> float | None:
     """
     Prefer close on the exact date; if unavailable (e.g., intraday / holiday / data delay),
@@ -6451,7 +8141,7 @@ def _insert_tv_snapshot(
         "rows": rows,
     }
     headers_json = json.dumps(headers, ensure_ascii=False)
-    rows_json = json.dumps(payload, ensure_ascii=False)
+    rows_json = pack_json(payload)
     with _connect() as conn:
         conn.execute(
             """
@@ -6478,7 +8168,7 @@ def _get_tv_snapshot(snapshot_id: str) -> TvScreenerSnapshotDetail | None:
         ).fetchone()
         if row is None:
             return None
-        payload = json.loads(str(row[4]))
+        payload = unpack_json(row[4])
         return TvScreenerSnapshotDetail(
             id=str(row[0]),
             screenerId=str(row[1]),
@@ -6572,7 +8262,7 @@ def _list_tv_snapshots_for_screener(
         if local_date not in keep_dates:
             continue
         try:
-            payload = json.loads(str(r[4]) or "{}")
+            payload = unpack_json(r[4], empty="{}")
             screen_title = str(payload.get("screenTitle") or "") or None
             filters = payload.get("filters") or []
             filters2 = [str(x) for x in filters if str(x).strip()] if isinstance(filters, list) else []
@@ -6926,13 +8616,9 @@ def import_pingan_broker_screenshots(req: BrokerImportRequest) -> BrokerImportRe
     account_id = (req.accountId or "").strip() or _seed_default_broker_account("pingan")
     out: list[BrokerSnapshotSummary] = []
 
-    for img in req.images:
-        media_type, raw = _parse_data_url(img.dataUrl)
-        sha = _sha256_hex(raw)
-
-        # Dedupe first (by sha256) before writing duplicates to disk.
+    def _existing(sha: str) -> Any:
         with _connect() as conn:
-            existing = conn.execute(
+            return conn.execute(
                 """
                 SELECT id, broker, account_id, captured_at, kind, created_at
                 FROM broker_snapshots
@@ -6940,21 +8626,36 @@ def import_pingan_broker_screenshots(req: BrokerImportRequest) -> BrokerImportRe
                 """,
                 ("pingan", account_id, sha),
             ).fetchone()
-            if existing is not None:
-                out.append(
-                    BrokerSnapshotSummary(
-                        id=str(existing[0]),
-                        broker=str(existing[1]),
-                        accountId=str(existing[2]) if existing[2] is not None else None,
-                        capturedAt=str(existing[3]),
-                        kind=str(existing[4]),
-                        createdAt=str(existing[5]),
-                    ),
-                )
-                continue
 
+    parsed: list[tuple[BrokerImportImage, str, bytes, str]] = []
+    for img in req.images:
+        media_type, raw = _parse_data_url(img.dataUrl)
+        parsed.append((img, media_type, raw, _sha256_hex(raw)))
+    # Extract every not-yet-imported image up front (concurrently, cached by sha256).
+    extracted_by_sha = _ai_extract_pingan_screenshots(
+        [(sha, img.dataUrl) for img, _, _, sha in parsed if _existing(sha) is None],
+    )
+
+    for img, media_type, raw, sha in parsed:
+        # Dedupe first (by sha256) before writing duplicates to disk.
+        existing = _existing(sha)
+        if existing is not None:
+            out.append(
+                BrokerSnapshotSummary(
+                    id=str(existing[0]),
+                    broker=str(existing[1]),
+                    accountId=str(existing[2]) if existing[2] is not None else None,
+                    capturedAt=str(existing[3]),
+                    kind=str(existing[4]),
+                    createdAt=str(existing[5]),
+                ),
+            )
+            continue
+
+        extracted = extracted_by_sha[sha]
+        if isinstance(extracted, Exception):
+            raise extracted
         image_path = _write_broker_image(broker="pingan", raw=raw, media_type=media_type)
-        extracted = _ai_extract_pingan_screenshot(image_data_url=img.dataUrl)
         # Attach minimal metadata for debugging and UI display.
         if isinstance(extracted, dict):
             meta = extracted.get("__meta")
@@ -7039,9 +8740,13 @@ def sync_pingan_account_from_screenshots(
             out_rows.append(r)
         return out_rows
 
-    for img in req.images:
-        # We intentionally do NOT write images to disk in the state-first design.
-        extracted = _ai_extract_pingan_screenshot(image_data_url=img.dataUrl)
+    # We intentionally do NOT write images to disk in the state-first design.
+    shas = [_image_sha256(img.dataUrl) for img in req.images]
+    extracted_by_sha = _ai_extract_pingan_screenshots([(sha, img.dataUrl) for sha, img in zip(shas, req.images, strict=True)])
+    for sha in shas:
+        extracted = extracted_by_sha[sha]
+        if isinstance(extracted, Exception):
+            raise extracted
         if not isinstance(extracted, dict):
             continue
         kind = str(extracted.get("kind") or "unknown")
@@ -7368,22 +9073,18 @@ def _list_strategy_reports(*, account_id: str, days: int = 10) -> list[dict[str,
 
 def _prune_strategy_reports_keep_last_n_days(*, account_id: str, keep_days: int = 10) -> None:
     keep = max(1, min(int(keep_days), 60))
+    policy = RetentionPolicy("strategy_reports", "date", keep, partition_by="account_id")
     with _connect() as conn:
-        rows = conn.execute(
-            "SELECT DISTINCT date FROM strategy_reports WHERE account_id = ? ORDER BY date DESC",
-            (account_id,),
-        ).fetchall()
-        dates = [str(r[0]) for r in rows if r and r[0]]
-        to_delete = dates[keep:]
-        for d in to_delete:
-            conn.execute(
-                "DELETE FROM strategy_reports WHERE account_id = ? AND date = ?",
-                (account_id, d),
-            )
-        conn.commit()
+        prune(conn, policy, partition=account_id, all_partitions=False)
 
 
 def _safe_float(v: Any) -> float:
+    if isinstance(v, str):
+        # float() already ignores surrounding whitespace.
+        try:
+            return float(v)
+        except ValueError:
+            return 0.0
     try:
         return float(str(v).strip())
     except Exception:
@@ -7591,6 +9292,10 @@ def _tv_snapshot_brief(snapshot_id: str, *, max_rows: int = 20) -> dict[str, Any
     snap = _get_tv_snapshot(snapshot_id)
     if snap is None:
         return {"snapshotId": snapshot_id, "status": "not_found"}
+    return _tv_snapshot_brief_of(snap, max_rows=max_rows)
+
+
+def _tv_snapshot_brief_of(snap: TvScreenerSnapshotDetail, *, max_rows: int = 20) -> dict[str, Any]:
     cols = _pick_tv_columns(snap.headers)
     rows = snap.rows[: max(0, int(max_rows))]
     # Project only selected columns to reduce token usage.
@@ -7706,6 +9411,81 @@ def _load_cached_bars(symbol: str, *, days: int) -> list[dict[str, str]]:
     return out
 
 
+def _load_cached_bar_tuples(
+    symbols: list[str], *, days: int
+) -> dict[str, list[tuple[str, str | None, str | None, str | None, str | None, str | None]]]:
+    """
+    DB-first batch load of the last `days` cached bars per symbol (chronological), shaped for
+    `_market_stock_trendok_one`. Symbols without cached bars are omitted.
+    """
+    syms = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    if not syms:
+        return {}
+    days2 = max(1, min(int(days), 200))
+    placeholders = ",".join(["?"] * len(syms))
+    with _connect() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT symbol, date, open, high, low, close, volume
+            FROM (
+              SELECT symbol, date, open, high, low, close, volume,
+                     ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY date DESC) AS rn
+              FROM market_bars
+              WHERE symbol IN ({placeholders})
+            )
+            WHERE rn <= ?
+            ORDER BY symbol, date ASC
+            """,
+            (*syms, days2),
+        ).fetchall()
+    out: dict[str, list[tuple[str, str | None, str | None, str | None, str | None, str | None]]] = {}
+    for r in rows:
+        o, h, lo, c, v = (str(x) if x not in (None, "") else None for x in r[2:7])
+        out.setdefault(str(r[0]), []).append((str(r[1]), o, h, lo, c, v))
+    return out
+
+
+def _load_cached_bars_many(symbols: list[str], *, days: int) -> dict[str, list[dict[str, str]]]:
+    """
+    DB-first batch variant of `_load_cached_bars` (same bar shape). Symbols without cached bars
+    are omitted.
+    """
+    syms = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    if not syms:
+        return {}
+    days2 = max(1, min(int(days), 200))
+    out: dict[str, list[dict[str, str]]] = {}
+    # One indexed (symbol, date DESC) LIMIT lookup per symbol: far cheaper than a window function
+    # over every bar of a few thousand symbols.
+    with _connect() as conn:
+        for sym in syms:
+            rows = conn.execute(
+                """
+                SELECT date, open, high, low, close, volume, amount
+                FROM market_bars
+                WHERE symbol = ?
+                ORDER BY date DESC
+                LIMIT ?
+                """,
+                (sym, days2),
+            ).fetchall()
+            if not rows:
+                continue
+            out[sym] = [
+                {
+                    "date": str(r[0]),
+                    "open": str(r[1] or ""),
+                    "high": str(r[2] or ""),
+                    "low": str(r[3] or ""),
+                    "close": str(r[4] or ""),
+                    "volume": str(r[5] or ""),
+                    "amount": str(r[6] or ""),
+                }
+                for r in reversed(rows)
+            ]
+    return out
+
+
 def _load_cached_chips(symbol: str, *, days: int) -> list[dict[str, str]]:
     """
     DB-first: load cached chip distribution rows from SQLite.
@@ -7726,7 +9506,7 @@ def _load_cached_chips(symbol: str, *, days: int) -> list[dict[str, str]]:
     out: list[dict[str, str]] = []
     for r in reversed(rows):
         try:
-            obj = json.loads(str(r[0]) or "{}")
+            obj = unpack_json(r[0], empty="{}")
             if isinstance(obj, dict):
                 out.append({str(k): str(v) for k, v in obj.items()})
         except Exception:
@@ -7754,7 +9534,7 @@ def _load_cached_fund_flow(symbol: str, *, days: int) -> list[dict[str, str]]:
     out: list[dict[str, str]] = []
     for r in reversed(rows):
         try:
-            obj = json.loads(str(r[0]) or "{}")
+            obj = unpack_json(r[0], empty="{}")
             if isinstance(obj, dict):
                 out.append({str(k): str(v) for k, v in obj.items()})
         except Exception:
@@ -7762,6 +9542,40 @@ def _load_cached_fund_flow(symbol: str, *, days: int) -> list[dict[str, str]]:
     return out
 
 
+def _load_cached_last_items(table: str, symbols: list[str]) -> dict[str, dict[str, str]]:
+    """
+    Latest cached item per symbol from `market_chips` or `market_fund_flow` (the item shape of
+    `_load_cached_chips` / `_load_cached_fund_flow`), in one query per 500 symbols.
+    """
+    if table not in ("market_chips", "market_fund_flow"):
+        raise ValueError(f"not a cached item table: {table}")
+    syms = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    out: dict[str, dict[str, str]] = {}
+    with _connect() as conn:
+        for i in range(0, len(syms), 500):
+            chunk = syms[i : i + 500]
+            rows = conn.execute(
+                f"""
+                SELECT t.symbol, t.raw_json
+                FROM {table} t
+                JOIN (
+                  SELECT symbol, MAX(date) AS d FROM {table}
+                  WHERE symbol IN ({",".join(["?"] * len(chunk))})
+                  GROUP BY symbol
+                ) m ON m.symbol = t.symbol AND m.d = t.date
+                """,
+                tuple(chunk),
+            ).fetchall()
+            for sym, raw in rows:
+                try:
+                    obj = unpack_json(raw, empty="{}")
+                except Exception:
+                    continue
+                if isinstance(obj, dict):
+                    out[str(sym)] = {str(k): str(v) for k, v in obj.items()}
+    return out
+
+
 def _bars_features(bars: list[dict[str, str]]) -> dict[str, Any]:
     closes = []
     highs = []
@@ -7817,6 +9631,206 @@ def _rank_bars_metrics(bars: list[dict[str, str]]) -> dict[str, Any]:
     }
 
 
+def _rank_metrics_kernel(ref: BarMatrixRef, batch: list[str]) -> list[tuple[int, dict[str, Any]]]:
+    """
+    Compute-pool kernel: `(bar count, _rank_bars_metrics)` per symbol over shared bars.
+    """
+    with ref.attach() as view:
+        out: list[tuple[int, dict[str, Any]]] = []
+        for sym in batch:
+            bars = view.bars(sym)
+            out.append((len(bars), _rank_bars_metrics(bars)))
+        return out
+
+
+# --- Daily feature store ---
+# Per-symbol features the scoring engines used to re-derive from bars on every request, computed
+# once per symbol per bar date after the EOD bar backfill (`daily_features` job) into
+# `market_features_daily`. Readers take the row of a symbol's latest cached bar date and fall back
+# to computing from bars when there is none, so results never depend on the job having run.
+_DAILY_FEATURES_BARS = 120  # bars behind each computed row: TrendOK, the deepest reader, uses 120
+_DAILY_FEATURES_CHUNK = 500  # symbols per bulk bar load / shared-memory block
+_DAILY_FEATURES_BACKFILL = 1  # most recent missing dates computed per symbol and run; readers use the latest
+
+# (column, feature key); keys are those of `_rank_bars_metrics` and `_trendok_indicators`.
+# `macdHist4` is stored as macd_hist_l3..l1 (oldest first) plus macd_hist.
+_DAILY_FEATURE_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("bar_count", "barCount"),
+    ("close", "lastClose"),
+    ("sma5", "sma5"),
+    ("sma10", "sma10"),
+    ("sma20", "sma20"),
+    ("high10", "high10"),
+    ("low10", "low10"),
+    ("high20", "high20"),
+    ("low20", "low20"),
+    ("vol_sma10", "volSma10"),
+    ("vol_sma20", "volSma20"),
+    ("volume", "lastVolume"),
+    ("amount", "lastAmount"),
+    ("amount_avg5", "amountAvg5"),
+    ("ret3d", "ret3d"),
+    ("ret5d", "ret5d"),
+    ("ema5", "ema5"),
+    ("ema20", "ema20"),
+    ("ema60", "ema60"),
+    ("ema20_prev", "ema20Prev"),
+    ("macd", "macd"),
+    ("macd_signal", "macdSignal"),
+    ("macd_hist", "macdHist"),
+    ("rsi14", "rsi14"),
+    ("close_high20", "closeHigh20"),
+    ("avg_vol5", "avgVol5"),
+    ("avg_vol30", "avgVol30"),
+    ("atr14", "atr14"),
+)
+_DAILY_FEATURE_HIST_COLUMNS = ("macd_hist_l3", "macd_hist_l2", "macd_hist_l1")
+
+
+def _daily_features(bars: list[dict[str, str]]) -> dict[str, Any]:
+    """
+    Stored features of the last bar in `bars` (chronological), over the same windows the
+    request-time readers use: rank/leader metrics over the last 60 bars, TrendOK over the last 120.
+    """
+    _dates, _opens, highs, lows, closes, vols = _trendok_series(
+        [(b["date"], *(b.get(k) or None for k in ("open", "high", "low", "close", "volume"))) for b in bars[-120:]]
+    )
+    metrics = _rank_bars_metrics(bars[-60:])
+    metrics.pop("close20", None)
+    return {
+        **metrics,
+        **_trendok_indicators(highs, lows, closes, vols),
+        "barCount": len(bars),
+        "amountAvg5": _bars_amount_avg(bars, 5),
+        "ret3d": _bars_ret_nd(bars, 3),
+        "ret5d": _bars_ret_nd(bars, 5),
+    }
+
+
+def _daily_features_kernel(ref: BarMatrixRef, batch: list[tuple[str, int]]) -> list[list[dict[str, Any]]]:
+    """
+    Compute-pool kernel: `_daily_features` rows (with their "date") for the last `n` bar dates of
+    each `(symbol, n)` over shared bars.
+    """
+    out: list[list[dict[str, Any]]] = []
+    with ref.attach() as view:
+        for sym, n in batch:
+            bars = view.bars(sym)
+            out.append(
+                [{"date": bars[i]["date"], **_daily_features(bars[: i + 1])} for i in range(max(0, len(bars) - n), len(bars))]
+            )
+    return out
+
+
+def _daily_features_pending(symbols: list[str] | None) -> dict[str, int]:
+    """
+    Symbol -> number of cached bar dates newer than its latest stored feature row.
+    """
+    where = ""
+    params: tuple[str, ...] = ()
+    if symbols is not None:
+        params = tuple(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+        if not params:
+            return {}
+        where = f"AND b.symbol IN ({','.join(['?'] * len(params))})"
+    with _connect() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT b.symbol, COUNT(1)
+            FROM market_bars b
+            LEFT JOIN (SELECT symbol, MAX(date) AS d FROM market_features_daily GROUP BY symbol) f
+              ON f.symbol = b.symbol
+            WHERE (f.d IS NULL OR b.date > f.d) {where}
+            GROUP BY b.symbol
+            """,
+            params,
+        ).fetchall()
+    return {str(r[0]): int(r[1]) for r in rows}
+
+
+def _insert_daily_features(
+    conn: sqlite3.Connection, *, rows: list[tuple[str, dict[str, Any]]], bars_seq: int, ts: str
+) -> int:
+    cols = [c for c, _k in _DAILY_FEATURE_COLUMNS] + list(_DAILY_FEATURE_HIST_COLUMNS)
+    sql = f"""
+        INSERT OR REPLACE INTO market_features_daily(symbol, date, {", ".join(cols)}, computed_at)
+        VALUES({", ".join(["?"] * (len(cols) + 3))})
+        """
+    n = 0
+    for sym, f in rows:
+        # Bars rewritten after they were loaded: the upsert already dropped this symbol's stale
+        # rows, and the next run recomputes them.
+        if _bars_written_seq.get(sym, 0) > bars_seq:
+            continue
+        hist4 = f.get("macdHist4")
+        lags = list(hist4[:3]) if isinstance(hist4, list) and len(hist4) == 4 else [None, None, None]
+        conn.execute(sql, (sym, f["date"], *(f.get(k) for _c, k in _DAILY_FEATURE_COLUMNS), *lags, ts))
+        n += 1
+    return n
+
+
+def _refresh_daily_features(
+    *, symbols: list[str] | None = None, backfill: int = _DAILY_FEATURES_BACKFILL
+) -> dict[str, Any]:
+    """
+    EOD feature pipeline: for every symbol (or `symbols`) with cached bars newer than its stored
+    features, compute rows for the missing dates (at most `backfill` most recent) in the compute
+    pool, chunk by chunk, and store them through the write queue.
+    """
+    t0 = time.perf_counter()
+    pending = _daily_features_pending(symbols)
+    todo = sorted(pending)
+    written = 0
+    for i in range(0, len(todo), _DAILY_FEATURES_CHUNK):
+        chunk = todo[i : i + _DAILY_FEATURES_CHUNK]
+        bars_seq = next(_bars_write_seq)
+        n_max = max(1, int(backfill))
+        bars_by_sym = _load_cached_bars_many(chunk, days=_DAILY_FEATURES_BARS + n_max - 1)
+        items = [(sym, min(pending[sym], n_max)) for sym in chunk if sym in bars_by_sym]
+        per_sym = _compute_pool.map_bars(_daily_features_kernel, bars_by_sym, items)
+        rows = [(sym, f) for (sym, _n), fs in zip(items, per_sym, strict=True) for f in fs]
+        if rows:
+            written += _writes.run(
+                functools.partial(_insert_daily_features, rows=rows, bars_seq=bars_seq, ts=now_iso())
+            )
+    return {"symbols": len(todo), "rows": written, "durationMs": round((time.perf_counter() - t0) * 1000.0, 1)}
+
+
+def _get_daily_features(symbols: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    Stored features (keyed like `_daily_features`, plus "date") at each symbol's latest cached bar
+    date. Symbols without a current row are omitted; callers compute those from bars.
+    """
+    syms = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    cols = [c for c, _k in _DAILY_FEATURE_COLUMNS]
+    out: dict[str, dict[str, Any]] = {}
+    with _connect() as conn:
+        for i in range(0, len(syms), _DAILY_FEATURES_CHUNK):
+            chunk = syms[i : i + _DAILY_FEATURES_CHUNK]
+            rows = conn.execute(
+                f"""
+                SELECT f.symbol, f.date, {", ".join(f"f.{c}" for c in cols)},
+                       {", ".join(f"f.{c}" for c in _DAILY_FEATURE_HIST_COLUMNS)}
+                FROM market_features_daily f
+                JOIN (
+                  SELECT symbol, MAX(date) AS d FROM market_bars
+                  WHERE symbol IN ({",".join(["?"] * len(chunk))})
+                  GROUP BY symbol
+                ) b ON b.symbol = f.symbol AND b.d = f.date
+                """,
+                tuple(chunk),
+            ).fetchall()
+            for r in rows:
+                f: dict[str, Any] = {"date": str(r[1])}
+                f.update(zip([k for _c, k in _DAILY_FEATURE_COLUMNS], r[2 : 2 + len(cols)], strict=True))
+                f["barCount"] = int(f["barCount"] or 0)
+                lags = list(r[2 + len(cols) :])
+                hist = f.get("macdHist")
+                f["macdHist4"] = [*lags, hist] if hist is not None and all(x is not None for x in lags) else None
+                out[str(r[0])] = f
+    return out
+
+
 def _chips_summary_last(x: Any) -> dict[str, Any]:
     d = x if isinstance(x, dict) else {}
     return {
@@ -7960,18 +9974,115 @@ def _rank_extract_holdings_pool(account_id: str) -> list[dict[str, Any]]:
         seen.add(sym)
         out.append(
             {
-                "symbol": sym,
-                "market": market,
-                "currency": currency,
-                "ticker": ticker,
-                "name": name,
+                "symbol": sym,
+                "market": market,
+                "currency": currency,
+                "ticker": ticker,
+                "name": name,
+                "sector": None,
+                "isHolding": True,
+            }
+        )
+    return out
+
+
+# `universeVersion` of the universe-wide next-2D mode: every liquid CN stock with recent cached
+# bars is scored, with the TradingView/holdings pool only deciding sectors and order. Any other
+# version keeps the pool as the candidate filter.
+RANK_UNIVERSE_ALL = "all"
+
+
+def _rank_extract_universe_pool(*, as_of_date: str, max_staleness_days: int = 10) -> list[dict[str, Any]]:
+    """
+    Every CN symbol whose latest cached daily bar is at most `max_staleness_days` before
+    `as_of_date` (suspended/delisted names drop out), in the pool item shape. Sectors are filled
+    in later for members of the hot industries (`_rank_hot_industry_members`).
+    """
+    try:
+        d = date.fromisoformat(as_of_date)
+    except ValueError:
+        d = date.fromisoformat(_today_cn_date_str())
+    since = (d - timedelta(days=max(0, int(max_staleness_days)))).isoformat()
+    with _connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT b.symbol, s.ticker, s.name
+            FROM (
+              SELECT symbol FROM market_bars
+              WHERE symbol LIKE 'CN:%'
+              GROUP BY symbol
+              HAVING MAX(date) >= ?
+            ) b
+            LEFT JOIN market_stocks s ON s.symbol = b.symbol
+            ORDER BY b.symbol
+            """,
+            (since,),
+        ).fetchall()
+    out: list[dict[str, Any]] = []
+    for sym, ticker, name in rows:
+        t = _norm_str(ticker or "") or str(sym).split(":", 1)[1]
+        out.append(
+            {
+                "symbol": str(sym),
+                "market": "CN",
+                "currency": "CNY",
+                "ticker": t,
+                "name": _norm_str(name or "") or t,
                 "sector": None,
-                "isHolding": True,
+                "isHolding": False,
             }
         )
     return out
 
 
+def _rank_hot_industry_members(hot_set: set[str], *, trade_date: str) -> tuple[dict[str, str], bool]:
+    """
+    Ticker -> hot industry for universe names (which carry no TradingView sector), from the theme
+    membership cache the `membership_warmup` job fills (fetched on a miss). The flag says whether
+    every hot industry resolved, i.e. whether a non-member is known to sit outside all of them.
+    """
+    by_ticker: dict[str, str] = {}
+    resolved = bool(hot_set)
+    for name in sorted(hot_set):
+        members, meta = _get_theme_members(kind="industry", name=name, trade_date=trade_date, force=False)
+        if meta.get("error") or not members:
+            resolved = False
+        for t in members:
+            by_ticker.setdefault(t, name)
+    return by_ticker, resolved
+
+
+def _rank_cn_quotes(tickers: list[str], *, as_of_date: str) -> tuple[dict[str, dict[str, str]], str]:
+    """
+    Quotes for buy prices/evidence without a full spot fetch: the minute collector's snapshot
+    while recent, else `market_quotes` rows last synced on `as_of_date` (CN time).
+    Returns (quote by ticker, source).
+    """
+    want = set(tickers)
+    rows = _cn_spot_rows(fetch=False)
+    if rows:
+        return {s.ticker: s.quote for s in rows if s.market == "CN" and s.ticker in want}, "collector"
+    syms = sorted(f"CN:{t}" for t in want)
+    out: dict[str, dict[str, str]] = {}
+    with _connect() as conn:
+        for i in range(0, len(syms), 500):
+            chunk = syms[i : i + 500]
+            for sym, updated_at, raw in conn.execute(
+                f"SELECT symbol, updated_at, raw_json FROM market_quotes WHERE symbol IN ({','.join(['?'] * len(chunk))})",
+                tuple(chunk),
+            ).fetchall():
+                try:
+                    synced = to_cn(datetime.fromisoformat(str(updated_at))).date().isoformat()
+                    quote = unpack_json(raw, empty="{}")
+                except (ValueError, TypeError):
+                    continue
+                if synced == as_of_date and isinstance(quote, dict):
+                    out[str(sym).split(":", 1)[1]] = {str(k): str(v) for k, v in quote.items()}
+    return out, "market_quotes"
+
+
+@traced("rank_build_and_score")
+@_profiled("rank_build_and_score")
 def _rank_build_and_score(
     *,
     account_id: str,
@@ -7983,8 +10094,10 @@ def _rank_build_and_score(
     """
     Rank CN candidates for next 1-2 days using deterministic factors, DB-first only.
     No external sync is triggered here (expects Dashboard Sync all / manual sync to refresh caches).
+    Candidates are the TV/holdings pool, or every liquid CN stock for `RANK_UNIVERSE_ALL`.
     """
     # Risk context (latest 5D).
+    trace_stage("risk_context")
     risk_mode: str | None = None
     failed_rate = 0.0
     premium = 0.0
@@ -8008,6 +10121,7 @@ def _rank_build_and_score(
         risk_penalty -= 0.05
 
     # Industry flow (names only) as a weak prior.
+    trace_stage("industry_flow")
     hot_set: set[str] = set()
     try:
         mat = _market_cn_industry_fund_flow_top_by_date(as_of_date=as_of_date, days=10, top_k=5)
@@ -8020,20 +10134,26 @@ def _rank_build_and_score(
     except Exception:
         hot_set = set()
 
-    # Best-effort spot snapshot for buyPrice/evidence (does not affect DB-first bars/chips/flow scoring).
-    spot_rows: list[StockRow] = []
-    try:
-        spot_rows = fetch_cn_a_spot()
-    except Exception:
-        spot_rows = []
-    spot_map: dict[str, StockRow] = {s.ticker: s for s in spot_rows if s.market == "CN" and s.ticker}
-
+    trace_stage("candidate_pool")
     tv_pool = _rank_extract_tv_pool(max_screeners=20, max_rows=160)
     holdings_pool = _rank_extract_holdings_pool(account_id) if include_holdings else []
-    # Merge: TV first, then holdings (ensure included).
+    universe_pool = (
+        _rank_extract_universe_pool(as_of_date=as_of_date) if universe_version == RANK_UNIVERSE_ALL else []
+    )
+    if universe_pool and hot_set:
+        # Universe names have no sector: place members of the hot industries so sectorHot is
+        # scored for them like for TradingView names.
+        hot_members, hot_resolved = _rank_hot_industry_members(hot_set, trade_date=as_of_date)
+        for it in universe_pool:
+            industry = hot_members.get(str(it["ticker"]))
+            if industry:
+                it["sector"] = industry
+            elif hot_resolved:
+                it["sectorNotHot"] = True
+    # Merge: TV first (it carries sectors), then holdings (ensure included), then the universe.
     pool: list[dict[str, Any]] = []
     seen: set[str] = set()
-    for it in tv_pool + holdings_pool:
+    for it in tv_pool + holdings_pool + universe_pool:
         sym = _norm_str(it.get("symbol") or "")
         if not sym or sym in seen:
             continue
@@ -8052,7 +10172,24 @@ def _rank_build_and_score(
     def clamp01(x: float) -> float:
         return max(0.0, min(1.0, float(x)))
 
-    scored: list[dict[str, Any]] = []
+    # Bar metrics for the whole pool: stored daily features, the rest (no row for the latest bar
+    # yet) in one offloaded batch over the last 60 bars; flows/chips stay DB-side below.
+    trace_stage("bar_metrics", pool=len(pool))
+    pool_syms = [str(it.get("symbol") or "") for it in pool if str(it.get("market") or "CN") == "CN"]
+    bar_metrics = {sym: (min(int(f["barCount"]), 60), f) for sym, f in _get_daily_features(pool_syms).items()}
+    missing = [sym for sym in pool_syms if sym not in bar_metrics]
+    bar_metrics.update(
+        zip(
+            missing,
+            _compute_pool.map_bars(_rank_metrics_kernel, _load_cached_bars_many(missing, days=60), missing),
+            strict=True,
+        )
+    )
+
+    # Pass 1: bar factors and filters over the whole pool (lookups and arithmetic only), so the
+    # per-symbol flow/chips/quote inputs below are only read for the few candidates left.
+    trace_stage("score_bars", pool=len(pool))
+    cands: list[dict[str, Any]] = []
     dropped = {"badName": 0, "noBars": 0, "lowLiquidity": 0, "notMomentum": 0}
     for it in pool:
         sym = str(it.get("symbol") or "")
@@ -8068,12 +10205,11 @@ def _rank_build_and_score(
             dropped["badName"] += 1
             continue
 
-        bars = _load_cached_bars(sym, days=60)
-        if len(bars) < 15:
+        n_bars, m = bar_metrics[sym]
+        if n_bars < 15:
             if not is_holding:
                 dropped["noBars"] += 1
                 continue
-        m = _rank_bars_metrics(bars)
         last_close = _finite_float(m.get("lastClose"), 0.0)
         sma5 = _finite_float(m.get("sma5"), 0.0)
         sma10 = _finite_float(m.get("sma10"), 0.0)
@@ -8113,10 +10249,50 @@ def _rank_build_and_score(
             dropped["notMomentum"] += 1
             continue
 
+        cands.append(
+            {
+                "symbol": sym,
+                "market": market,
+                "ticker": ticker,
+                "name": name,
+                "sector": sector,
+                "sectorNotHot": bool(it.get("sectorNotHot")),
+                "isHolding": is_holding,
+                "trend": trend,
+                "breakout": breakout,
+                "volume": volume,
+                "bars": {
+                    "lastClose": last_close,
+                    "sma5": sma5,
+                    "sma10": sma10,
+                    "sma20": sma20,
+                    "high20": high20,
+                    "lastAmount": last_amt,
+                    "lastVolume": last_vol,
+                    "relVol": rel_vol,
+                },
+            }
+        )
+
+    # Pass 2: cached flow/chips (latest row each, one query per table) and quotes for buy prices.
+    trace_stage("score_pool", candidates=len(cands))
+    cand_syms = [str(c["symbol"]) for c in cands]
+    flow_last = _load_cached_last_items("market_fund_flow", cand_syms)
+    chips_last_by_sym = _load_cached_last_items("market_chips", cand_syms)
+    quotes, quote_src = _rank_cn_quotes([str(c["ticker"]) for c in cands], as_of_date=as_of_date)
+    scored: list[dict[str, Any]] = []
+    for c in cands:
+        sym = str(c["symbol"])
+        ticker = str(c["ticker"])
+        name = str(c["name"])
+        sector = c["sector"]
+        trend = float(c["trend"])
+        breakout = float(c["breakout"])
+        volume = float(c["volume"])
+        last_close = float(c["bars"]["lastClose"])
+
         # Fund flow score (cached-only).
-        ff_items = _load_cached_fund_flow(sym, days=30)
-        ff_last = ff_items[-1] if ff_items else {}
-        ff = _fund_flow_breakdown_last(ff_last)
+        ff = _fund_flow_breakdown_last(flow_last.get(sym) or {})
         main_ratio = _finite_float(ff.get("mainNetRatio"), 0.0)
         super_ratio = _finite_float(ff.get("superNetRatio"), 0.0)
         large_ratio = _finite_float(ff.get("largeNetRatio"), 0.0)
@@ -8132,9 +10308,7 @@ def _rank_build_and_score(
         flow = clamp01(flow)
 
         # Chips score (cached-only).
-        chips_items = _load_cached_chips(sym, days=30)
-        chips_last = chips_items[-1] if chips_items else {}
-        ch = _chips_summary_last(chips_last)
+        ch = _chips_summary_last(chips_last_by_sym.get(sym) or {})
         pr = _finite_float(ch.get("profitRatio"), 0.0)
         avg_cost = _finite_float(ch.get("avgCost"), 0.0)
         chips = 0.30
@@ -8146,12 +10320,13 @@ def _rank_build_and_score(
             chips += 0.25
         chips = clamp01(chips)
 
-        # Sector hotness (weak prior).
+        # Sector hotness (weak prior). Universe names outside every hot industry score like a
+        # TradingView name with a cold sector.
         sector_hot = 0.0
         if sector and hot_set:
             sector_hot = 1.0 if sector in hot_set else 0.25
         elif hot_set:
-            sector_hot = 0.10
+            sector_hot = 0.25 if c["sectorNotHot"] else 0.10
         sector_hot = clamp01(sector_hot)
 
         breakdown = {
@@ -8185,8 +10360,8 @@ def _rank_build_and_score(
         if risk_mode:
             signals.append(f"Risk mode: {risk_mode}")
 
-        spot = spot_map.get(ticker)
-        buy_price = _finite_float((spot.quote.get("price") if spot else None), 0.0) if spot else 0.0
+        quote = quotes.get(ticker)
+        buy_price = _finite_float(quote.get("price"), 0.0) if quote else 0.0
         buy_src = "spot" if buy_price > 0 else "bars_close"
         if buy_price <= 0:
             buy_price = last_close
@@ -8203,24 +10378,15 @@ def _rank_build_and_score(
             "buyPriceSrc": buy_src,
             "spot": (
                 {
-                    "price": spot.quote.get("price"),
-                    "chgPct": spot.quote.get("change_pct"),
-                    "volRatio": spot.quote.get("vol_ratio"),
-                    "turnover": spot.quote.get("turnover"),
+                    "price": quote.get("price"),
+                    "chgPct": quote.get("change_pct"),
+                    "volRatio": quote.get("vol_ratio"),
+                    "turnover": quote.get("turnover"),
                 }
-                if spot
+                if quote
                 else {}
             ),
-            "bars": {
-                "lastClose": last_close,
-                "sma5": sma5,
-                "sma10": sma10,
-                "sma20": sma20,
-                "high20": high20,
-                "lastAmount": last_amt,
-                "lastVolume": last_vol,
-                "relVol": rel_vol,
-            },
+            "bars": c["bars"],
             "fundFlow": {
                 "mainNetRatio": main_ratio,
                 "superNetRatio": super_ratio,
@@ -8236,7 +10402,7 @@ def _rank_build_and_score(
         scored.append(
             {
                 "symbol": sym,
-                "market": market,
+                "market": c["market"],
                 "ticker": ticker,
                 "name": name,
                 "sector": sector,
@@ -8249,7 +10415,7 @@ def _rank_build_and_score(
                 "buyPrice": float(buy_price) if buy_price > 0 else None,
                 "buyPriceSrc": buy_src,
                 "evidence": evidence,
-                "isHolding": is_holding,
+                "isHolding": c["isHolding"],
             }
         )
 
@@ -8266,9 +10432,11 @@ def _rank_build_and_score(
             "poolSize": len(pool),
             "tvPool": len(tv_pool),
             "holdingsPool": len(holdings_pool),
+            "universePool": len(universe_pool),
             "scored": len(scored),
             "dropped": dropped,
-            "spotRows": len(spot_rows),
+            "spotRows": len(quotes),
+            "quoteSrc": quote_src,
         },
     }
 
@@ -8291,30 +10459,7 @@ def _quant2d_prob_band(prob_pct: float) -> str:
 
 
 def _quant2d_find_bucket(calib: dict[str, Any], raw_score: float) -> dict[str, Any] | None:
-    items = calib.get("items") if isinstance(calib, dict) else None
-    if not isinstance(items, list) or not items:
-        return None
-    s = float(raw_score or 0.0)
-    for it in items:
-        if not isinstance(it, dict):
-            continue
-        lo = _finite_float(it.get("minRawScore"), -1e9)
-        hi = _finite_float(it.get("maxRawScore"), 1e9)
-        if lo <= s <= hi:
-            return it
-    # Fallback: nearest by min/max distance.
-    best = None
-    best_dist = 1e18
-    for it in items:
-        if not isinstance(it, dict):
-            continue
-        lo = _finite_float(it.get("minRawScore"), 0.0)
-        hi = _finite_float(it.get("maxRawScore"), 0.0)
-        dist = min(abs(s - lo), abs(s - hi))
-        if dist < best_dist:
-            best_dist = dist
-            best = it
-    return best if isinstance(best, dict) else None
+    return find_bucket(calib, raw_score)
 
 
 def _quant2d_decision_score(
@@ -8399,23 +10544,24 @@ def _get_theme_members(
     name: str,
     trade_date: str,
     force: bool,
-    ttl_sec: int = 3600,
+    ttl_sec: int | None = None,
 ) -> tuple[list[str], dict[str, Any]]:
     """
     Resolve theme members (tickers) with a DB cache.
+    Freshness follows the session policy unless an explicit `ttl_sec` is given.
     """
     k = _theme_key(kind, name)
     cached = None if force else _get_theme_members_cached(theme_key=k, trade_date=trade_date)
     if cached is not None:
-        try:
-            updated = datetime.fromisoformat(str(cached.get("updatedAt") or "")).replace(tzinfo=UTC)
-            age = (datetime.now(tz=UTC) - updated).total_seconds()
-            if age <= float(ttl_sec):
-                mem0 = cached.get("members") or []
-                mem = [str(x).strip() for x in mem0 if str(x).strip()]
-                return mem, {"cached": True, "ageSec": age}
-        except Exception:
-            pass
+        updated_at = str(cached.get("updatedAt") or "")
+        fr = _cache_freshness(THEME_MEMBERS, data_date=trade_date, updated_at=updated_at)
+        fresh = fr is not None and (fr.fresh if ttl_sec is None else fr.age_sec <= float(ttl_sec))
+        if fr is not None and fresh:
+            cache_stats.hit("theme_members")
+            mem0 = cached.get("members") or []
+            mem = [str(x).strip() for x in mem0 if str(x).strip()]
+            return mem, {"cached": True, "ageSec": fr.age_sec}
+    cache_stats.miss("theme_members")
 
     try:
         if kind == "industry":
@@ -8476,127 +10622,66 @@ def _intraday_prob_band(score: float) -> str:
     return "Low"
 
 
-def _intraday_minute_features(bars: list[dict[str, Any]]) -> dict[str, float]:
-    """
-    Compute intraday features from minute bars (best-effort).
-    Bars are expected to be in chronological order; if not, we sort by ts.
-    """
-    if not bars:
-        return {
-            "vwapAboveRatio": 0.0,
-            "mom5": 0.0,
-            "mom15": 0.0,
-            "posMinutesRatio": 0.0,
-            "pullbackRatio": 1.0,
-            "closeNearHigh": 0.0,
-            "lateRet15": 0.0,
-            "lateRet30": 0.0,
-            "lateVolSpike": 0.0,
-        }
-    # Sort by timestamp string.
-    bs = sorted(bars, key=lambda x: str(x.get("ts") or ""))
-    closes = [_parse_num(x.get("close")) for x in bs]
-    highs = [_parse_num(x.get("high")) for x in bs]
-    vols = [_parse_num(x.get("volume")) for x in bs]
-    amts = [_parse_num(x.get("amount")) for x in bs]
-
-    # VWAP (cumulative amount / cumulative volume); fallback to close if amount unavailable.
-    cum_amt = 0.0
-    cum_vol = 0.0
-    above = 0
-    for i in range(len(bs)):
-        v = vols[i]
-        a = amts[i]
-        if v > 0:
-            cum_vol += v
-            cum_amt += a if a > 0 else (closes[i] * v)
-        vwap = (cum_amt / cum_vol) if cum_vol > 0 else closes[i]
-        if closes[i] >= vwap:
-            above += 1
-    vwap_above_ratio = float(above) / float(len(bs)) if bs else 0.0
-
-    def _mom(n: int) -> float:
-        if len(closes) <= n or closes[-1] <= 0 or closes[-1 - n] <= 0:
-            return 0.0
-        return (closes[-1] / closes[-1 - n] - 1.0) * 100.0
-
-    mom5 = _mom(5)
-    mom15 = _mom(15)
-
-    pos_minutes = 0
-    for i in range(1, len(closes)):
-        if closes[i] > closes[i - 1]:
-            pos_minutes += 1
-    pos_minutes_ratio = float(pos_minutes) / float(max(1, len(closes) - 1))
-
-    day_high = max(highs) if highs else 0.0
-    last_close = closes[-1] if closes else 0.0
-    close_near_high = 1.0 if (day_high > 0 and last_close >= day_high * 0.99) else 0.0
-
-    # Pullback ratio: (day_high - last_close) / max(1e-9, day_high - first_close)
-    first_close = closes[0] if closes else 0.0
-    denom = max(1e-9, (day_high - first_close))
-    pullback_ratio = (day_high - last_close) / denom if denom > 0 else 1.0
-    pullback_ratio = max(0.0, min(1.0, pullback_ratio))
-
-    # Late returns.
-    late_ret15 = _mom(15)
-    late_ret30 = _mom(30)
-
-    # Late volume spike: last 15m volume / avg 15m block volume.
-    block = 15
-    blocks = []
-    for i in range(0, len(vols), block):
-        blocks.append(sum(vols[i : i + block]))
-    last_block = blocks[-1] if blocks else 0.0
-    avg_block = (sum(blocks[:-1]) / max(1, len(blocks) - 1)) if len(blocks) > 1 else (blocks[0] if blocks else 0.0)
-    late_vol_spike = (last_block / avg_block) if (last_block > 0 and avg_block > 0) else 0.0
-
-    return {
-        "vwapAboveRatio": float(vwap_above_ratio),
-        "mom5": float(mom5),
-        "mom15": float(mom15),
-        "posMinutesRatio": float(pos_minutes_ratio),
-        "pullbackRatio": float(pullback_ratio),
-        "closeNearHigh": float(close_near_high),
-        "lateRet15": float(late_ret15),
-        "lateRet30": float(late_ret30),
-        "lateVolSpike": float(late_vol_spike),
-    }
-
-
-def _intraday_get_minute_bars(
+def _intraday_minute_series(
     *,
     symbol: str,
     trade_date: str,
     interval: str,
     force: bool,
-) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    ttl_sec: float | None = None,
+) -> tuple[MinuteSeries, dict[str, Any]]:
     """
-    DB-first minute bars for a single CN symbol.
-    Cache TTL is short because intraday data changes quickly.
+    DB-first running minute state for a single CN symbol.
+    Freshness follows the trading session: short TTL while the market is open (`ttl_sec`
+    overrides it), and bars fetched after the close (or for a closed day) are final and never
+    refetched. A refresh folds in only the minutes after the last stored one; `force` rebuilds the day.
     """
-    ttl_sec = 90
     now_ts = now_iso()
-    cached = None if force else _get_cn_minute_bars_cached(symbol=symbol, trade_date=trade_date, interval=interval)
-    if cached is not None:
-        try:
-            updated = datetime.fromisoformat(str(cached.get("updatedAt") or "")).replace(tzinfo=UTC)
-            age = (datetime.now(tz=UTC) - updated).total_seconds()
-            if age <= ttl_sec:
-                return list(cached.get("bars") or []), {"cached": True, "ageSec": age}
-        except Exception:
-            pass
-    # Fetch and cache.
+    stored = _get_cn_minute_series(symbol=symbol, trade_date=trade_date, interval=interval)
+    if stored is not None and not force:
+        series, updated_at = stored
+        fr = _cache_freshness(MINUTE_BARS, data_date=trade_date, updated_at=updated_at)
+        fresh = fr is not None and (fr.fresh if ttl_sec is None or fr.reason != "ttl" else fr.age_sec <= ttl_sec)
+        if fr is not None and fresh:
+            cache_stats.hit("minute_bars")
+            return series, {"cached": True, "ageSec": fr.age_sec, "freshness": fr.reason, "count": series.count}
+    else:
+        series = MinuteSeries()
+    cache_stats.miss("minute_bars")
+    # Fetch and append.
     ticker = symbol.split(":")[-1]
     try:
         bars = fetch_cn_a_minute_bars(ticker, trade_date=trade_date, interval=interval)
         if isinstance(bars, list):
-            _upsert_cn_minute_bars_cached(symbol=symbol, trade_date=trade_date, interval=interval, ts=now_ts, bars=bars)
-            return bars, {"cached": False, "fetched": True, "count": len(bars)}
+            appended = _append_cn_minute_bars(
+                symbol=symbol, trade_date=trade_date, interval=interval, ts=now_ts, series=series, bars=bars
+            )
+            return series, {"cached": False, "fetched": True, "count": series.count, "appended": appended}
     except Exception as e:
-        return [], {"cached": False, "error": str(e)}
-    return [], {"cached": False, "fetched": False}
+        return series, {"cached": False, "error": str(e), "count": series.count}
+    return series, {"cached": False, "fetched": False, "count": series.count}
+
+
+def _intraday_pool_minute_series(
+    symbol: str, *, trade_date: str, stored: tuple[MinuteSeries, str] | None
+) -> tuple[MinuteSeries, dict[str, Any]]:
+    """
+    Minute state for a rank pool member, given its bulk-loaded stored state. Symbols the collector
+    keeps current are served from SQLite even when slightly older than the minute-bar TTL.
+    """
+    if stored is not None:
+        series, updated_at = stored
+        fr = _cache_freshness(MINUTE_BARS, data_date=trade_date, updated_at=updated_at)
+        collected = _minute_collector.covers(symbol)
+        if (fr is not None and fr.fresh) or collected:
+            cache_stats.hit("minute_bars")
+            return series, {
+                "cached": True,
+                "collected": collected,
+                "ageSec": fr.age_sec if fr is not None else None,
+                "count": series.count,
+            }
+    return _intraday_minute_series(symbol=symbol, trade_date=trade_date, interval="1", force=False)
 
 
 def _intraday_rank_build_and_score(
@@ -8641,7 +10726,7 @@ def _intraday_rank_build_and_score(
 
     spot_rows: list[StockRow] = []
     try:
-        spot_rows = fetch_cn_a_spot()
+        spot_rows = _cn_spot_rows()
     except Exception:
         spot_rows = []
     spot_map: dict[str, StockRow] = {s.ticker: s for s in spot_rows if s.market == "CN" and s.ticker}
@@ -8661,7 +10746,12 @@ def _intraday_rank_build_and_score(
         return max(0.0, min(1.0, float(x)))
 
     scored: list[dict[str, Any]] = []
-    debug_fetch: dict[str, Any] = {"minuteBars": {"ok": 0, "err": 0}}
+    debug_fetch: dict[str, Any] = {"minuteBars": {"ok": 0, "err": 0}, "collector": _minute_collector.running}
+    # One read for every pre-collected series; only symbols the collector does not keep current
+    # (and whose stored bars are stale) are fetched here.
+    stored_minutes = _get_cn_minute_series_many(
+        symbols=[_norm_str(it.get("symbol") or "") for it in pool], trade_date=trade_date, interval="1"
+    )
     for it in pool:
         sym = _norm_str(it.get("symbol") or "")
         if not sym.startswith("CN:"):
@@ -8678,13 +10768,13 @@ def _intraday_rank_build_and_score(
         if (not is_holding) and turnover > 0 and turnover < 5e7:
             continue
 
-        bars, meta = _intraday_get_minute_bars(symbol=sym, trade_date=trade_date, interval="1", force=False)
-        if bars:
+        series, meta = _intraday_pool_minute_series(sym, trade_date=trade_date, stored=stored_minutes.get(sym))
+        if series.count:
             debug_fetch["minuteBars"]["ok"] += 1
         else:
             debug_fetch["minuteBars"]["err"] += 1
 
-        f = _intraday_minute_features(bars)
+        f = series.features()
         # Build slot-specific factors and score.
         factors: dict[str, float] = {}
         signals: list[str] = []
@@ -8728,59 +10818,438 @@ def _intraday_rank_build_and_score(
             if f["closeNearHigh"] >= 1.0:
                 signals.append("Close near day high")
 
-        # Risk penalty.
-        if risk_mode == "no_new_positions" and not is_holding:
-            score01 *= 0.75
-            signals.append("Risk mode: no_new_positions")
-        elif risk_mode == "caution" and not is_holding:
-            score01 *= 0.90
-            signals.append("Risk mode: caution")
+        # Risk penalty.
+        if risk_mode == "no_new_positions" and not is_holding:
+            score01 *= 0.75
+            signals.append("Risk mode: no_new_positions")
+        elif risk_mode == "caution" and not is_holding:
+            score01 *= 0.90
+            signals.append("Risk mode: caution")
+
+        score = max(0.0, min(100.0, score01 * 100.0))
+        scored.append(
+            {
+                "symbol": sym,
+                "market": "CN",
+                "ticker": ticker,
+                "name": name,
+                "score": round(score, 2),
+                "probBand": _intraday_prob_band(score),
+                "slot": slot,
+                "signals": signals[:6],
+                "factors": factors,
+                "notes": None,
+                "isHolding": is_holding,
+                "debug": {"spot": {"chgPct": chg_pct, "volRatio": vol_ratio}, "minuteMeta": meta},
+            }
+        )
+
+    scored.sort(key=lambda x: float(x.get("score") or 0.0), reverse=True)
+    top = scored[: max(1, min(int(limit), 200))]
+
+    # Observations: store a small diagnostic snapshot.
+    obs_raw = {
+        "slot": slot,
+        "topMovers": [
+            {"ticker": s.ticker, "name": s.name, "chgPct": _parse_pct(s.quote.get("change_pct") or ""), "volRatio": _parse_num(s.quote.get("vol_ratio") or "")}
+            for s in movers[:15]
+        ],
+    }
+    _append_cn_intraday_observation(trade_date=trade_date, ts=as_of_ts, kind="hourly_prep", raw=obs_raw)
+    obs_items = _list_cn_intraday_observations(trade_date=trade_date)
+
+    return {
+        "asOfTs": as_of_ts,
+        "tradeDate": trade_date,
+        "slot": slot,
+        "accountId": account_id,
+        "universeVersion": universe_version,
+        "riskMode": risk_mode,
+        "items": top,
+        "observations": obs_items,
+        "debug": {"poolSize": len(pool), "spotRows": len(spot_rows), "fetch": debug_fetch},
+    }
+
+
+# --- Intraday minute collector ---
+# During the session a background collector keeps minute bars (and the CN spot snapshot) current
+# for the symbols intraday ranking is likely to ask about: holdings, the pinned watchlist, the
+# latest screener pools and the top movers. Rank/radar builds then read SQLite instead of fetching
+# per symbol on the request path.
+MINUTE_COLLECTOR_WATCHLIST_KEY = "minute_collector_watchlist"
+
+_collected_spot: dict[str, tuple[float, list[StockRow]]] = {}
+_collected_spot_lock = threading.Lock()
+
+
+def _minute_collector_setting(name: str, default: float, lo: float, hi: float) -> float:
+    try:
+        return max(lo, min(float(os.getenv(name) or default), hi))
+    except ValueError:
+        return default
+
+
+def _cn_spot_rows(*, max_age_s: float | None = None, fetch: bool = True) -> list[StockRow]:
+    """
+    CN spot snapshot: the collector's latest one while it is recent (default: two collector
+    intervals), else a fresh `fetch_cn_a_spot()` (or nothing with `fetch=False`).
+    """
+    db_key = os.getenv("DATABASE_PATH", "") or "default"
+    max_age = 2.0 * _minute_collector.interval_s if max_age_s is None else float(max_age_s)
+    with _collected_spot_lock:
+        cached = _collected_spot.get(db_key)
+    if cached is not None and time.monotonic() - cached[0] <= max_age:
+        cache_stats.hit("cn_spot")
+        return cached[1]
+    cache_stats.miss("cn_spot")
+    return fetch_cn_a_spot() if fetch else []
+
+
+def _get_minute_collector_watchlist() -> list[str]:
+    try:
+        raw = json.loads(get_setting(MINUTE_COLLECTOR_WATCHLIST_KEY) or "[]")
+    except json.JSONDecodeError:
+        return []
+    return [str(x) for x in raw if isinstance(x, str)] if isinstance(raw, list) else []
+
+
+def _normalize_cn_collector_symbol(value: str) -> str | None:
+    v = _norm_str(value).upper()
+    ticker = v.split(":")[-1]
+    if v.startswith("HK:") or not (len(ticker) == 6 and ticker.isdigit()):
+        return None
+    return f"CN:{ticker}"
+
+
+def _minute_collector_universe() -> list[str]:
+    """
+    Symbols to keep current this cycle, in priority order and capped at
+    `MINUTE_COLLECTOR_MAX_SYMBOLS`. Refreshes the shared spot snapshot as a side effect.
+    """
+    max_symbols = int(_minute_collector_setting("MINUTE_COLLECTOR_MAX_SYMBOLS", 600, 1, 5000))
+    top_movers = int(_minute_collector_setting("MINUTE_COLLECTOR_TOP_MOVERS", 200, 0, 2000))
+    out: list[str] = []
+    seen: set[str] = set()
+
+    def add(value: str) -> None:
+        sym = _normalize_cn_collector_symbol(value)
+        if sym is not None and sym not in seen and len(out) < max_symbols:
+            seen.add(sym)
+            out.append(sym)
+
+    for acc in list_broker_accounts():
+        for it in _rank_extract_holdings_pool(acc.id):
+            add(str(it.get("symbol") or ""))
+    for sym in _get_minute_collector_watchlist():
+        add(sym)
+    for it in _rank_extract_tv_pool(max_screeners=20, max_rows=300):
+        if it.get("market") == "CN":
+            add(str(it.get("symbol") or ""))
+
+    try:
+        spot_rows = fetch_cn_a_spot()
+    except Exception:
+        spot_rows = []
+    if spot_rows:
+        with _collected_spot_lock:
+            _collected_spot[os.getenv("DATABASE_PATH", "") or "default"] = (time.monotonic(), spot_rows)
+        _events.publish_quotes({s.symbol: s.quote for s in spot_rows})
+    # Same liquidity floor as the intraday rank, so movers it would skip are not collected either.
+    movers = [
+        s
+        for s in spot_rows
+        if s.market == "CN" and s.ticker and _parse_num(s.quote.get("turnover") or "") >= 5e7
+    ]
+    movers.sort(key=lambda s: _parse_pct(s.quote.get("change_pct") or ""), reverse=True)
+    for s in movers[:top_movers]:
+        add(s.ticker)
+    return out
+
+
+def _collect_cn_minute_bars(symbol: str) -> int:
+    # ttl 0: refetch on every cycle until the half-day is final; only new minutes are written.
+    _series, meta = _intraday_minute_series(
+        symbol=symbol, trade_date=_today_cn_date_str(), interval="1", force=False, ttl_sec=0.0
+    )
+    if meta.get("error"):
+        raise RuntimeError(str(meta["error"]))
+    return int(meta.get("appended") or 0)
+
+
+def _minute_collector_active() -> bool:
+    """
+    Collect through the continuous session, plus a short window after the lunch break starts
+    and after the close so the final pass for each half-day lands (see cache/policy.py).
+    """
+    now = datetime.now(tz=UTC)
+    session = cn_session(now, _cn_trading_calendar())
+    if session == CONTINUOUS:
+        return True
+    n = to_cn(now)
+    hm = n.hour * 60 + n.minute
+    return (session == LUNCH_BREAK and hm < 11 * 60 + 45) or (session == POST_CLOSE and hm < 15 * 60 + 30)
+
+
+_minute_collector = MinuteCollector(
+    _minute_collector_universe,
+    _collect_cn_minute_bars,
+    is_active=_minute_collector_active,
+    workers=int(_minute_collector_setting("MINUTE_COLLECTOR_WORKERS", 6, 1, 16)),
+    rate_per_s=_minute_collector_setting("MINUTE_COLLECTOR_RATE", 8.0, 0.5, 50.0),
+    interval_s=_minute_collector_setting("MINUTE_COLLECTOR_INTERVAL_SEC", 60.0, 15.0, 3600.0),
+)
+
+
+def _should_start_minute_collector() -> bool:
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        return False
+    v = str(os.getenv("DISABLE_MINUTE_COLLECTOR", "") or "").strip().lower()
+    return v not in ("1", "true", "yes", "on")
+
+
+def _start_minute_collector() -> None:
+    if _should_start_minute_collector():
+        _minute_collector.start()
+
+
+def _minute_collector_status() -> MinuteCollectorStatusResponse:
+    return MinuteCollectorStatusResponse(
+        running=_minute_collector.running,
+        active=_minute_collector_active(),
+        intervalSec=_minute_collector.interval_s,
+        workers=_minute_collector.workers,
+        ratePerSec=_minute_collector.limiter.rate_per_s,
+        universeSize=len(_minute_collector.symbols),
+        watchlist=_get_minute_collector_watchlist(),
+        lastRun=_minute_collector.last_report,
+    )
+
+
+@app.get("/market/cn/minute-collector", response_model=MinuteCollectorStatusResponse)
+def get_minute_collector() -> MinuteCollectorStatusResponse:
+    return _minute_collector_status()
+
+
+@app.post("/market/cn/minute-collector/run", response_model=MinuteCollectorStatusResponse)
+def run_minute_collector() -> MinuteCollectorStatusResponse:
+    """
+    Run one collection cycle now (also outside the session, e.g. to backfill a closed day).
+    """
+    _minute_collector.run_once()
+    return _minute_collector_status()
+
+
+@app.put("/market/cn/minute-collector/watchlist", response_model=MinuteCollectorStatusResponse)
+def put_minute_collector_watchlist(req: MinuteCollectorWatchlistRequest) -> MinuteCollectorStatusResponse:
+    """
+    Pin symbols (e.g. the desktop watchlist) into the collector universe; replaces the list.
+    """
+    syms = [x for x in (_normalize_cn_collector_symbol(v) for v in req.symbols) if x is not None]
+    set_setting(MINUTE_COLLECTOR_WATCHLIST_KEY, json.dumps(list(dict.fromkeys(syms))))
+    _minute_collector.wake()
+    return _minute_collector_status()
+
+
+# --- Scheduler ---
+# Recurring work runs from one in-process cron scheduler (scheduler/, Asia/Shanghai): fires missed
+# while the app was closed or busy are caught up within each job's grace, a job never overlaps
+# itself, and every run/skip/miss is recorded in `scheduler_runs` (GET /scheduler).
+_INTRADAY_RANK_KINDS = {"09:15": "preopen_intent", "09:25": "opening_anchor"}
+
+
+def _is_cn_trading_day(d: date) -> bool:
+    return _cn_trading_calendar().is_trading_day(d)
+
+
+def _job_membership_warmup(scheduled_for: datetime) -> dict[str, Any]:
+    """
+    Pre-open: resolve candidate themes and their members so the first mainline/radar builds of
+    the day hit the membership cache.
+    """
+    trade_date = scheduled_for.strftime("%Y-%m-%d")
+    cands, _dbg = _mainline_step1_candidates(trade_date=trade_date, force_membership=False)
+    _mainline_step2_structure(trade_date=trade_date, candidates=cands[:12], force_membership=False)
+    return {"tradeDate": trade_date, "themes": min(len(cands), 12)}
+
+
+def _job_intraday_rank(scheduled_for: datetime) -> dict[str, Any]:
+    trade_date = scheduled_for.strftime("%Y-%m-%d")
+    kind = _INTRADAY_RANK_KINDS.get(scheduled_for.strftime("%H:%M"), "hourly_prep")
+    slot = _infer_intraday_slot(scheduled_for)
+    # Same internal account the rank endpoints read, so scheduled snapshots are served as cache hits.
+    aid = _global_quant_account_id()
+    as_of_ts = now_iso()
+    _append_cn_intraday_observation(
+        trade_date=trade_date,
+        ts=as_of_ts,
+        kind=kind,
+        raw={"note": "scheduled", "slot": slot, "scheduledFor": scheduled_for.isoformat()},
+    )
+    out = _intraday_rank_build_and_score(
+        account_id=aid, as_of_ts=as_of_ts, slot=slot, limit=30, universe_version="v0"
+    )
+    snap_id = _upsert_cn_intraday_rank_snapshot(
+        account_id=aid,
+        as_of_ts=as_of_ts,
+        trade_date=str(out.get("tradeDate") or trade_date),
+        slot=str(out.get("slot") or slot),
+        universe_version="v0",
+        ts=as_of_ts,
+        output=out,
+    )
+    _retention_manager.request("cn_intraday_rank_snapshots")
+    items = out.get("items")
+    return {"snapshotId": snap_id, "kind": kind, "slot": slot, "items": len(items) if isinstance(items, list) else 0}
+
+
+def _eod_bar_symbols(*, limit: int = 400) -> list[str]:
+    """
+    Symbols whose daily bars ranking and outcome labeling read: holdings, screener pools, recent
+    rank events and the minute collector's universe.
+    """
+    out: dict[str, None] = {}
+    for acc in list_broker_accounts():
+        for it in _rank_extract_holdings_pool(acc.id):
+            out[str(it.get("symbol") or "")] = None
+    for it in _rank_extract_tv_pool(max_screeners=20, max_rows=300):
+        out[str(it.get("symbol") or "")] = None
+    with _connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT symbol FROM quant_2d_rank_events
+            WHERE as_of_date >= (SELECT MIN(d) FROM (SELECT DISTINCT as_of_date AS d FROM quant_2d_rank_events ORDER BY d DESC LIMIT 5))
+            """,
+        ).fetchall()
+    for r in rows:
+        out[str(r[0])] = None
+    for sym in sorted(_minute_collector.symbols):
+        out[sym] = None
+    return [s for s in out if s][: max(1, int(limit))]
+
+
+def _job_eod_bars(_scheduled_for: datetime) -> dict[str, Any]:
+    ok = 0
+    errors: dict[str, str] = {}
+    syms = _eod_bar_symbols()
+    for sym in syms:
+        try:
+            # DB-first: only symbols whose cache lacks today's bar are fetched.
+            market_stock_bars(sym, days=60)
+            ok += 1
+        except Exception as e:
+            if len(errors) < 20:
+                errors[sym] = str(getattr(e, "detail", "") or e)
+    _events.publish("market.bars", {"symbols": ok})
+    return {"symbols": len(syms), "ok": ok, "failed": len(syms) - ok, "errors": errors}
+
+
+def _job_daily_features(_scheduled_for: datetime) -> dict[str, Any]:
+    return _refresh_daily_features()
+
+
+def _job_outcome_labels(_scheduled_for: datetime) -> dict[str, Any]:
+    return _label_quant_2d_outcomes_best_effort(account_id=_global_quant_account_id(), limit=5000)
+
+
+def _job_calibration_refresh(_scheduled_for: datetime) -> dict[str, Any]:
+    aid = _global_quant_account_id()
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT buckets, lookback_days FROM quant_2d_calibration_snapshots WHERE account_id = ?",
+            (aid,),
+        ).fetchall()
+    windows = {(20, 180)} | {(int(r[0]), int(r[1])) for r in rows}
+    for buckets, days in sorted(windows):
+        _refresh_quant_2d_calibration(account_id=aid, buckets=buckets, lookback_days=days)
+    return {"windows": len(windows)}
+
+
+def _job_retention(_scheduled_for: datetime) -> dict[str, Any]:
+    report = _retention_manager.run_once()
+    return {"deleted": report["deleted"], "freedPages": report["freedPages"], "errors": report["errors"]}
+
+
+def _scheduler_disabled_jobs() -> set[str]:
+    return {x.strip() for x in (os.getenv("SCHEDULER_DISABLED_JOBS") or "").split(",") if x.strip()}
 
-        score = max(0.0, min(100.0, score01 * 100.0))
-        scored.append(
-            {
-                "symbol": sym,
-                "market": "CN",
-                "ticker": ticker,
-                "name": name,
-                "score": round(score, 2),
-                "probBand": _intraday_prob_band(score),
-                "slot": slot,
-                "signals": signals[:6],
-                "factors": factors,
-                "notes": None,
-                "isHolding": is_holding,
-                "debug": {"spot": {"chgPct": chg_pct, "volRatio": vol_ratio}, "minuteMeta": meta},
-            }
+
+def _scheduler_jobs() -> list[Job]:
+    off = _scheduler_disabled_jobs()
+    specs: list[tuple[str, str | list[str], Callable[[datetime], dict[str, Any]], str, float, bool]] = [
+        ("membership_warmup", "50 8 * * *", _job_membership_warmup, "Pre-open theme membership warmup", 3600.0, True),
+        (
+            "intraday_rank",
+            ["15,25 9 * * *", "25 10,11 * * *", "55 13 * * *", "35 14 * * *"],
+            _job_intraday_rank,
+            "Intraday rank snapshots",
+            600.0,
+            True,
+        ),
+        ("eod_bars", "45 15 * * *", _job_eod_bars, "EOD daily bar backfill", 12 * 3600.0, True),
+        ("daily_features", "55 15 * * *", _job_daily_features, "Precompute daily features", 12 * 3600.0, True),
+        ("outcome_labels", "0 16 * * *", _job_outcome_labels, "Label next-2D rank outcomes", 24 * 3600.0, True),
+        ("calibration_refresh", "10 16 * * *", _job_calibration_refresh, "Rebuild next-2D calibration", 24 * 3600.0, True),
+        ("retention", "20 3 * * *", _job_retention, "Full retention pass + incremental vacuum", 24 * 3600.0, False),
+    ]
+    return [
+        job(
+            name,
+            schedule,
+            fn,
+            description=desc,
+            misfire_grace_s=grace,
+            day_filter=_is_cn_trading_day if trading_days else None,
+            enabled=name not in off,
         )
+        for name, schedule, fn, desc, grace, trading_days in specs
+    ]
 
-    scored.sort(key=lambda x: float(x.get("score") or 0.0), reverse=True)
-    top = scored[: max(1, min(int(limit), 200))]
 
-    # Observations: store a small diagnostic snapshot.
-    obs_raw = {
-        "slot": slot,
-        "topMovers": [
-            {"ticker": s.ticker, "name": s.name, "chgPct": _parse_pct(s.quote.get("change_pct") or ""), "volRatio": _parse_num(s.quote.get("vol_ratio") or "")}
-            for s in movers[:15]
-        ],
-    }
-    _append_cn_intraday_observation(trade_date=trade_date, ts=as_of_ts, kind="hourly_prep", raw=obs_raw)
-    obs_items = _list_cn_intraday_observations(trade_date=trade_date)
+_scheduler = Scheduler(_connect, _scheduler_jobs(), tz=ZoneInfo("Asia/Shanghai"))
 
-    return {
-        "asOfTs": as_of_ts,
-        "tradeDate": trade_date,
-        "slot": slot,
-        "accountId": account_id,
-        "universeVersion": universe_version,
-        "riskMode": risk_mode,
-        "items": top,
-        "observations": obs_items,
-        "debug": {"poolSize": len(pool), "spotRows": len(spot_rows), "fetch": debug_fetch},
-    }
+
+def _should_start_scheduler() -> bool:
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        return False
+    v = str(os.getenv("DISABLE_SCHEDULER", "") or "").strip().lower()
+    return v not in ("1", "true", "yes", "on")
+
+
+def _start_scheduler() -> None:
+    if _should_start_scheduler():
+        _scheduler.start()
+
+
+@app.get("/scheduler", response_model=SchedulerStatusResponse)
+def get_scheduler() -> SchedulerStatusResponse:
+    return SchedulerStatusResponse(
+        running=_scheduler.running,
+        timezone="Asia/Shanghai",
+        jobs=[SchedulerJobStatus(**x) for x in _scheduler.status()],
+    )
+
+
+@app.get("/scheduler/runs", response_model=SchedulerRunsResponse)
+def list_scheduler_runs(job: str | None = None, limit: int = 50) -> SchedulerRunsResponse:
+    return SchedulerRunsResponse(
+        items=[SchedulerRun(**x) for x in _scheduler.history(job_name=(job or "").strip() or None, limit=limit)]
+    )
+
+
+@app.post("/scheduler/jobs/{name}/run", response_model=SchedulerRun)
+def run_scheduler_job(name: str) -> SchedulerRun:
+    """
+    Run a job now and wait for it (recorded as a `manual` run; scheduled fires are unaffected).
+    """
+    if name not in _scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    run = _scheduler.run_job(name)
+    if run is None:
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return SchedulerRun(**run)
 
 
+@_profiled("mainline_step1_candidates")
 def _mainline_step1_candidates(
     *,
     trade_date: str,
@@ -8879,29 +11348,7 @@ def _mainline_step1_candidates(
     concept_names = _dedupe(concept_names)[:25]
 
     # Compute features per theme on a bounded subset (intersection with strong movers if possible).
-    def _ret3d_for_symbol(sym: str) -> float:
-        bars = _load_cached_bars(sym, days=10)
-        if len(bars) < 4:
-            return 0.0
-        try:
-            c0 = _finite_float(bars[-4].get("close"), 0.0)
-            c1 = _finite_float(bars[-1].get("close"), 0.0)
-            if c0 > 0 and c1 > 0:
-                return (c1 / c0 - 1.0) * 100.0
-        except Exception:
-            return 0.0
-        return 0.0
-
-    def _amount_5d_avg(sym: str) -> float:
-        bars = _load_cached_bars(sym, days=10)
-        vals = []
-        for b in bars[-5:]:
-            a = _finite_float(b.get("amount"), 0.0)
-            if a > 0:
-                vals.append(a)
-        return float(sum(vals) / len(vals)) if vals else 0.0
-
-    items: list[dict[str, Any]] = []
+    themes: list[tuple[str, str, list[str], dict[str, Any], list[str]]] = []
     membership_debug: dict[str, Any] = {"ok": 0, "err": 0}
     for kind, names in (("industry", industry_names), ("concept", concept_names)):
         for name in names:
@@ -8912,50 +11359,59 @@ def _mainline_step1_candidates(
                 membership_debug["err"] += 1
 
             # Bound computation cost.
-            mem_set = set(members)
             intersect = [t for t in members if t in strong_set]
-            sample = intersect[:60] if intersect else list(mem_set)[:60]
-
-            # Limit-up count.
-            limitup_count = len([t for t in mem_set if t in limitup_set])
-
-            # Followers (today > 5% or limit-up).
-            followers = 0
-            today_vals: list[float] = []
-            turnover_sum = 0.0
-            amt5_sum = 0.0
-            ret3_vals: list[float] = []
-            for t in sample:
-                s = spot_map.get(t)
-                if s is not None:
-                    chg = _parse_pct(s.quote.get("change_pct") or "")
-                    today_vals.append(chg)
-                    if chg >= 5.0:
-                        followers += 1
-                    turnover_sum += _parse_num(s.quote.get("turnover") or "")
-                if t in limitup_set:
+            sample = intersect[:60] if intersect else list(set(members))[:60]
+            themes.append((kind, name, members, meta, sample))
+
+    # 3D return / 5D average amount per sampled member: stored daily features, computed from one
+    # bulk bar load for members without a current row.
+    sample_syms = sorted({f"CN:{t}" for *_theme, sample in themes for t in sample})
+    member_feats = _get_daily_features(sample_syms)
+    for sym, bars in _load_cached_bars_many([x for x in sample_syms if x not in member_feats], days=10).items():
+        member_feats[sym] = {"ret3d": _bars_ret_nd(bars, 3), "amountAvg5": _bars_amount_avg(bars, 5)}
+
+    items: list[dict[str, Any]] = []
+    for kind, name, members, meta, sample in themes:
+        # Limit-up count.
+        limitup_count = len([t for t in set(members) if t in limitup_set])
+
+        # Followers (today > 5% or limit-up).
+        followers = 0
+        today_vals: list[float] = []
+        turnover_sum = 0.0
+        amt5_sum = 0.0
+        ret3_vals: list[float] = []
+        for t in sample:
+            s = spot_map.get(t)
+            if s is not None:
+                chg = _parse_pct(s.quote.get("change_pct") or "")
+                today_vals.append(chg)
+                if chg >= 5.0:
                     followers += 1
-                sym = f"CN:{t}"
-                ret3_vals.append(_ret3d_for_symbol(sym))
-                amt5_sum += _amount_5d_avg(sym)
+                turnover_sum += _parse_num(s.quote.get("turnover") or "")
+            if t in limitup_set:
+                followers += 1
+            f = member_feats.get(f"CN:{t}") or {}
+            ret3_vals.append(_finite_float(f.get("ret3d"), 0.0))
+            amt5_sum += _finite_float(f.get("amountAvg5"), 0.0)
 
-            today_strength = float(sum(today_vals) / len(today_vals)) if today_vals else 0.0
-            ret3d = float(sum(ret3_vals) / len(ret3_vals)) if ret3_vals else 0.0
-            vol_surge = (turnover_sum / amt5_sum) if (turnover_sum > 0 and amt5_sum > 0) else 0.0
+        today_strength = float(sum(today_vals) / len(today_vals)) if today_vals else 0.0
+        ret3d = float(sum(ret3_vals) / len(ret3_vals)) if ret3_vals else 0.0
+        vol_surge = (turnover_sum / amt5_sum) if (turnover_sum > 0 and amt5_sum > 0) else 0.0
 
-            items.append(
-                {
-                    "kind": kind,
-                    "name": name,
-                    "todayStrength": round(today_strength, 4),
-                    "ret3d": round(ret3d, 4),
-                    "volSurge": round(float(vol_surge), 4),
-                    "limitupCount": int(limitup_count),
-                    "followersCount": int(followers),
-                    "membershipMeta": meta,
-                    "sampleSize": int(len(sample)),
-                }
-            )
+        items.append(
+            {
+                "kind": kind,
+                "name": name,
+                "todayStrength": round(today_strength, 4),
+                "ret3d": round(ret3d, 4),
+                "volSurge": round(float(vol_surge), 4),
+                "limitupCount": int(limitup_count),
+                "followersCount": int(followers),
+                "membershipMeta": meta,
+                "sampleSize": int(len(sample)),
+            }
+        )
 
     debug["membership"] = membership_debug
 
@@ -9049,44 +11505,8 @@ def _mainline_step2_structure(
     def clamp01(x: float) -> float:
         return max(0.0, min(1.0, float(x)))
 
-    def _ret_nd(sym: str, n: int) -> float:
-        bars = _load_cached_bars(sym, days=max(10, n + 2))
-        if len(bars) <= n:
-            return 0.0
-        c0 = _finite_float(bars[-1 - n].get("close"), 0.0)
-        c1 = _finite_float(bars[-1].get("close"), 0.0)
-        if c0 > 0 and c1 > 0:
-            return (c1 / c0 - 1.0) * 100.0
-        return 0.0
-
-    def _returns_series(sym: str, n: int) -> list[float]:
-        bars = _load_cached_bars(sym, days=max(20, n + 2))
-        if len(bars) < (n + 1):
-            return []
-        closes = [_finite_float(b.get("close"), 0.0) for b in bars]
-        rets: list[float] = []
-        for i in range(len(closes) - n, len(closes)):
-            if i <= 0:
-                continue
-            c0 = closes[i - 1]
-            c1 = closes[i]
-            if c0 > 0 and c1 > 0:
-                rets.append(c1 / c0 - 1.0)
-        return rets
-
-    def _corr(a: list[float], b: list[float]) -> float:
-        if len(a) != len(b) or len(a) < 3:
-            return 0.0
-        ma = sum(a) / len(a)
-        mb = sum(b) / len(b)
-        num = sum((a[i] - ma) * (b[i] - mb) for i in range(len(a)))
-        da = math.sqrt(sum((x - ma) ** 2 for x in a))
-        db = math.sqrt(sum((x - mb) ** 2 for x in b))
-        if da <= 1e-9 or db <= 1e-9:
-            return 0.0
-        return float(num / (da * db))
-
-    out: list[dict[str, Any]] = []
+    # Pass 1 (I/O): theme members and the bounded sample of active members per theme.
+    prepared: list[tuple[dict[str, Any], list[str], dict[str, Any], list[tuple[str, float, float]]]] = []
     for it in candidates:
         kind = str(it.get("kind") or "").strip()
         name = str(it.get("name") or "").strip()
@@ -9096,7 +11516,7 @@ def _mainline_step2_structure(
         members, meta = _get_theme_members(kind=kind, name=name, trade_date=trade_date, force=force_membership)
         mem = [m for m in members if m]
         if not mem:
-            out.append({**it, "structureScore": 0.0, "leaderCandidate": None, "structureDebug": {"members": 0, "meta": meta}})
+            prepared.append((it, mem, meta, []))
             continue
 
         # Prefer evaluating a bounded set of active members.
@@ -9108,23 +11528,28 @@ def _mainline_step2_structure(
             vol_ratio = _parse_num(s.quote.get("vol_ratio") or "") if s is not None else 0.0
             ranked.append((t, turnover, chg, vol_ratio))
         ranked.sort(key=lambda x: (x[1], x[2], x[3]), reverse=True)
-        sample = [x[0] for x in ranked[:40]]
+        prepared.append((it, mem, meta, [(t, chg, vol_ratio) for t, _turnover, chg, vol_ratio in ranked[:40]]))
+
+    # Pass 2 (CPU): leader candidate + linkage for every theme in one offloaded batch.
+    samples = [rows for _it, mem, _meta, rows in prepared if mem]
+    sample_syms = sorted({f"CN:{t}" for rows in samples for t, _c, _v in rows})
+    ret5 = {sym: _finite_float(f.get("ret5d"), 0.0) for sym, f in _get_daily_features(sample_syms).items()}
+    leaders = iter(
+        _compute_pool.map_bars(
+            _mainline_structure_kernel, _load_cached_bars_many(sample_syms, days=20), samples, ret5, batch_size=4
+        )
+    )
 
-        # Leader candidate: highest combination of 5D return + today strength + vol_ratio.
-        best = None
-        best_score = -1.0
-        for t in sample:
-            sym = f"CN:{t}"
-            r5 = _ret_nd(sym, 5)
-            s = spot_map.get(t)
-            chg = _parse_pct(s.quote.get("change_pct") or "") if s is not None else 0.0
-            vol_ratio = _parse_num(s.quote.get("vol_ratio") or "") if s is not None else 0.0
-            # Map to 0..1 then weight.
-            sc = 0.45 * clamp01(r5 / 15.0) + 0.35 * clamp01(chg / 8.0) + 0.20 * clamp01(vol_ratio / 5.0)
-            if sc > best_score:
-                best_score = sc
-                best = t
+    out: list[dict[str, Any]] = []
+    for it, mem, meta, rows in prepared:
+        kind = str(it.get("kind") or "").strip()
+        name = str(it.get("name") or "").strip()
+        sample = [t for t, _c, _v in rows]
+        if not mem:
+            out.append({**it, "structureScore": 0.0, "leaderCandidate": None, "structureDebug": {"members": 0, "meta": meta}})
+            continue
 
+        best, best_score, best_ret5, linkage = next(leaders)
         leader_candidate = None
         if best:
             s = spot_map.get(best)
@@ -9135,7 +11560,7 @@ def _mainline_step2_structure(
                 "todayChgPct": _parse_pct(s.quote.get("change_pct") or "") if s is not None else 0.0,
                 "volRatio": _parse_num(s.quote.get("vol_ratio") or "") if s is not None else 0.0,
                 "turnover": _parse_num(s.quote.get("turnover") or "") if s is not None else 0.0,
-                "ret5d": round(_ret_nd(f"CN:{best}", 5), 4),
+                "ret5d": round(best_ret5, 4),
             }
 
         # Tiering: followers count + distribution.
@@ -9156,24 +11581,6 @@ def _mainline_step2_structure(
         gap = max(0.0, top1 - top5)
         tiering = clamp01(min(1.0, followers / 6.0) * 0.65 + clamp01(gap / 6.0) * 0.35)
 
-        # Linkage: corr between leader daily returns and average theme returns (sample-based).
-        linkage = 0.0
-        if best:
-            lead_rets = _returns_series(f"CN:{best}", 5)
-            if lead_rets:
-                # Build average return series for top M sample members.
-                m = 12
-                series_list = []
-                for t in sample[:m]:
-                    rs = _returns_series(f"CN:{t}", 5)
-                    if len(rs) == len(lead_rets):
-                        series_list.append(rs)
-                if series_list:
-                    avg = []
-                    for i2 in range(len(lead_rets)):
-                        avg.append(float(sum(rs[i2] for rs in series_list) / len(series_list)))
-                    linkage = clamp01((_corr(lead_rets, avg) + 1.0) / 2.0)
-
         # Leader strength uses best_score (0..1).
         leader_strength = clamp01(best_score if best_score > 0 else 0.0)
 
@@ -9203,6 +11610,272 @@ def _mainline_step2_structure(
     return out, debug
 
 
+def _bars_ret_nd(bars: list[dict[str, str]], n: int) -> float:
+    if len(bars) <= n:
+        return 0.0
+    c0 = _finite_float(bars[-1 - n].get("close"), 0.0)
+    c1 = _finite_float(bars[-1].get("close"), 0.0)
+    if c0 > 0 and c1 > 0:
+        return (c1 / c0 - 1.0) * 100.0
+    return 0.0
+
+
+def _bars_amount_avg(bars: list[dict[str, str]], n: int) -> float:
+    """
+    Mean of the positive amounts among the last `n` bars (0 when there are none).
+    """
+    vals = [a for a in (_finite_float(b.get("amount"), 0.0) for b in bars[-n:]) if a > 0]
+    return float(sum(vals) / len(vals)) if vals else 0.0
+
+
+def _bars_returns_series(bars: list[dict[str, str]], n: int) -> list[float]:
+    if len(bars) < (n + 1):
+        return []
+    closes = [_finite_float(b.get("close"), 0.0) for b in bars]
+    rets: list[float] = []
+    for i in range(len(closes) - n, len(closes)):
+        if i <= 0:
+            continue
+        c0 = closes[i - 1]
+        c1 = closes[i]
+        if c0 > 0 and c1 > 0:
+            rets.append(c1 / c0 - 1.0)
+    return rets
+
+
+def _corr(a: list[float], b: list[float]) -> float:
+    if len(a) != len(b) or len(a) < 3:
+        return 0.0
+    ma = sum(a) / len(a)
+    mb = sum(b) / len(b)
+    num = sum((a[i] - ma) * (b[i] - mb) for i in range(len(a)))
+    da = math.sqrt(sum((x - ma) ** 2 for x in a))
+    db = math.sqrt(sum((x - mb) ** 2 for x in b))
+    if da <= 1e-9 or db <= 1e-9:
+        return 0.0
+    return float(num / (da * db))
+
+
+def _mainline_structure_kernel(
+    ref: BarMatrixRef, batch: list[list[tuple[str, float, float]]], ret5: dict[str, float]
+) -> list[tuple[str | None, float, float, float]]:
+    """
+    Compute-pool kernel for mainline step2. Per theme sample `[(ticker, todayChgPct, volRatio)]`
+    (bars: last 20 daily bars per member; `ret5`: stored 5D returns by symbol) -> (leader ticker,
+    leader score 0..1, leader 5D return %, linkage 0..1).
+    """
+
+    def clamp01(x: float) -> float:
+        return max(0.0, min(1.0, float(x)))
+
+    out: list[tuple[str | None, float, float, float]] = []
+    with ref.attach() as view:
+        for rows in batch:
+            # Leader candidate: highest combination of 5D return + today strength + vol_ratio.
+            best = None
+            best_score = -1.0
+            for t, chg, vol_ratio in rows:
+                sym = f"CN:{t}"
+                r5 = ret5[sym] if sym in ret5 else _bars_ret_nd(view.bars(sym), 5)
+                # Map to 0..1 then weight.
+                sc = 0.45 * clamp01(r5 / 15.0) + 0.35 * clamp01(chg / 8.0) + 0.20 * clamp01(vol_ratio / 5.0)
+                if sc > best_score:
+                    best_score = sc
+                    best = t
+
+            # Linkage: corr between leader daily returns and average theme returns (sample-based).
+            linkage = 0.0
+            best_ret5 = 0.0
+            if best:
+                best_bars = view.bars(f"CN:{best}")
+                best_ret5 = ret5[f"CN:{best}"] if f"CN:{best}" in ret5 else _bars_ret_nd(best_bars, 5)
+                lead_rets = _bars_returns_series(best_bars, 5)
+                if lead_rets:
+                    # Build average return series for top M sample members.
+                    series_list = []
+                    for t, _chg, _vol_ratio in rows[:12]:
+                        rs = _bars_returns_series(view.bars(f"CN:{t}"), 5)
+                        if len(rs) == len(lead_rets):
+                            series_list.append(rs)
+                    if series_list:
+                        avg = []
+                        for i2 in range(len(lead_rets)):
+                            avg.append(float(sum(rs[i2] for rs in series_list) / len(series_list)))
+                        linkage = clamp01((_corr(lead_rets, avg) + 1.0) / 2.0)
+            out.append((best, best_score, best_ret5, linkage))
+    return out
+
+
+# --- ai-service response cache ---
+# LLM calls dominate report latency, and identical evidence payloads (e.g. `force=true`
+# regenerations over unchanged inputs) should not pay for a second round trip.
+_ai_cache_bypass: ContextVar[bool] = ContextVar("ai_cache_bypass", default=False)
+
+
+@contextmanager
+def _ai_response_cache_bypass(enabled: bool = True) -> Iterator[None]:
+    """
+    Skip cache reads (responses are still stored) for ai-service calls made inside the block.
+    """
+    token = _ai_cache_bypass.set(bool(enabled) or _ai_cache_bypass.get())
+    try:
+        yield
+    finally:
+        _ai_cache_bypass.reset(token)
+
+
+def _ai_response_cache_enabled() -> bool:
+    return str(os.getenv("AI_RESPONSE_CACHE", "1") or "").strip().lower() not in ("0", "false", "off", "no")
+
+
+def _ai_response_cache_max_bytes() -> int:
+    try:
+        mb = float(os.getenv("AI_RESPONSE_CACHE_MAX_MB", "64"))
+    except ValueError:
+        mb = 64.0
+    return max(0, int(mb * 1024 * 1024))
+
+
+def _ai_response_cache_key(endpoint: str, payload: dict[str, Any]) -> str:
+    try:
+        prompt = get_system_prompt().value
+    except Exception:
+        prompt = ""
+    return content_key(endpoint, payload, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+
+def _get_ai_response_cache(key: str) -> dict[str, Any] | None:
+    with _connect() as conn:
+        row = conn.execute("SELECT response_json FROM ai_response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE ai_response_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+            (now_iso(), key),
+        )
+        conn.commit()
+    try:
+        out = json.loads(str(row[0]) or "{}")
+    except Exception:
+        return None
+    return out if isinstance(out, dict) else None
+
+
+def _put_ai_response_cache(key: str, *, endpoint: str, response: dict[str, Any]) -> None:
+    body = json.dumps(response, ensure_ascii=False, default=str)
+    size = len(body.encode("utf-8"))
+    max_bytes = _ai_response_cache_max_bytes()
+    if size > max_bytes:
+        return
+    ts = now_iso()
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO ai_response_cache(key, endpoint, size_bytes, response_json, created_at, last_used_at, hits)
+            VALUES(?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(key) DO UPDATE SET
+              size_bytes = excluded.size_bytes,
+              response_json = excluded.response_json,
+              created_at = excluded.created_at,
+              last_used_at = excluded.last_used_at
+            """,
+            (key, endpoint, size, body, ts, ts),
+        )
+        # Size-based eviction: drop least recently used entries until under the cap.
+        total = int((conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM ai_response_cache").fetchone() or [0])[0])
+        if total > max_bytes:
+            for k, sz in conn.execute(
+                "SELECT key, size_bytes FROM ai_response_cache WHERE key != ? ORDER BY last_used_at ASC",
+                (key,),
+            ).fetchall():
+                conn.execute("DELETE FROM ai_response_cache WHERE key = ?", (k,))
+                total -= int(sz or 0)
+                if total <= max_bytes:
+                    break
+        conn.commit()
+
+
+def _ai_response_cache_stats() -> AiResponseCacheStatsResponse:
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT endpoint, COUNT(1), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(hits), 0) FROM ai_response_cache GROUP BY endpoint",
+        ).fetchall()
+    by_ep = {str(r[0]): {"entries": int(r[1]), "sizeBytes": int(r[2]), "hits": int(r[3])} for r in rows}
+    return AiResponseCacheStatsResponse(
+        enabled=_ai_response_cache_enabled(),
+        entries=sum(v["entries"] for v in by_ep.values()),
+        sizeBytes=sum(v["sizeBytes"] for v in by_ep.values()),
+        maxBytes=_ai_response_cache_max_bytes(),
+        hits=sum(v["hits"] for v in by_ep.values()),
+        byEndpoint=by_ep,
+    )
+
+
+@app.get("/cache/ai", response_model=AiResponseCacheStatsResponse)
+def get_ai_response_cache_stats() -> AiResponseCacheStatsResponse:
+    return _ai_response_cache_stats()
+
+
+@app.delete("/cache/ai", response_model=AiResponseCacheStatsResponse)
+def clear_ai_response_cache() -> AiResponseCacheStatsResponse:
+    with _connect() as conn:
+        conn.execute("DELETE FROM ai_response_cache")
+        conn.commit()
+    return _ai_response_cache_stats()
+
+
+# ai-service answers LLM failures with HTTP 200 placeholders (empty lists plus an `error`, or a
+# failure note in the usual text fields); those must never be served from the cache.
+_AI_FALLBACK_MARKERS = (
+    "Strategy generation failed",
+    "Candidates generation failed",
+    "Mainline analysis failed",
+)
+
+
+def _ai_response_is_fallback(out: dict[str, Any]) -> bool:
+    if out.get("error"):
+        return True
+    notes = out.get("riskNotes")
+    if isinstance(notes, list) and any(isinstance(n, str) and n.startswith(_AI_FALLBACK_MARKERS) for n in notes):
+        return True
+    themes = out.get("themes")
+    if isinstance(themes, list) and any(
+        isinstance(t, dict) and str(t.get("logicSummary") or "").startswith(_AI_FALLBACK_MARKERS) for t in themes
+    ):
+        return True
+    md = out.get("markdown")
+    return isinstance(md, str) and "## Error" in md and "Strategy generation failed" in md
+
+
+def _ai_post_cached(endpoint: str, payload: dict[str, Any], call: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    """
+    Serve `call()` from the persistent response cache keyed by endpoint, payload and system prompt.
+    Only successful responses are stored (see `_ai_response_is_fallback`).
+    """
+    if not _ai_response_cache_enabled():
+        with observe_upstream("ai-service", endpoint):
+            return call()
+    key = _ai_response_cache_key(endpoint, payload)
+    if not _ai_cache_bypass.get():
+        cached = _get_ai_response_cache(key)
+        if cached is not None and _ai_response_is_fallback(cached):
+            # Stored before fallbacks were filtered out: treat as a miss and overwrite below.
+            cached = None
+        cache_stats.record(f"ai:{endpoint}", cached is not None)
+        if cached is not None:
+            return cached
+    with observe_upstream("ai-service", endpoint):
+        out = call()
+    if isinstance(out, dict) and not _ai_response_is_fallback(out):
+        try:
+            _put_ai_response_cache(key, endpoint=endpoint, response=out)
+        except Exception:
+            # Best-effort: a cache write must never fail the AI call.
+            pass
+    return out
+
+
 def _ai_mainline_explain(*, payload: dict[str, Any]) -> dict[str, Any]:
     url = f"{_ai_service_base_url()}/mainline/explain"
     body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
@@ -9233,16 +11906,20 @@ def _ai_mainline_explain(*, payload: dict[str, Any]) -> dict[str, Any]:
         except TimeoutError as e:
             raise OSError(f"ai-service timeout while calling {url}: {e}") from e
 
-    try:
-        return _do()
-    except OSError as e:
-        msg = str(e)
-        if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
-            time.sleep(0.25)
+    def _call() -> dict[str, Any]:
+        try:
             return _do()
-        raise
+        except OSError as e:
+            msg = str(e)
+            if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
+                time.sleep(0.25)
+                return _do()
+            raise
 
+    return _ai_post_cached("/mainline/explain", payload, _call)
 
+
+@traced("build_mainline_snapshot")
 def _build_mainline_snapshot(
     *,
     account_id: str,
@@ -9253,6 +11930,7 @@ def _build_mainline_snapshot(
 ) -> dict[str, Any]:
     trade_date = _cn_trade_date_from_iso_ts(as_of_ts)
     # Risk context (latest sentiment).
+    trace_stage("risk_context")
     risk_mode: str | None = None
     try:
         items = _list_cn_sentiment_days(as_of_date=trade_date, days=5)
@@ -9261,11 +11939,14 @@ def _build_mainline_snapshot(
     except Exception:
         risk_mode = None
 
+    trace_stage("step1_candidates")
     cands1, dbg1 = _mainline_step1_candidates(trade_date=trade_date, force_membership=force)
     # Bound: structure analysis only on top Step1 candidates.
+    trace_stage("step2_structure", candidates=min(len(cands1), 12))
     cands2, dbg2 = _mainline_step2_structure(trade_date=trade_date, candidates=cands1[:12], force_membership=force)
 
     # AI logic layer (best-effort).
+    trace_stage("ai_logic")
     logic_map: dict[str, dict[str, Any]] = {}
     ai_error: str | None = None
     try:
@@ -9303,6 +11984,7 @@ def _build_mainline_snapshot(
         logic_map = {}
 
     # Merge + composite decision.
+    trace_stage("merge")
     spot_rows: list[StockRow] = []
     try:
         spot_rows = fetch_cn_a_spot()
@@ -9465,14 +12147,17 @@ def _ai_quant_rank_explain(*, payload: dict[str, Any]) -> dict[str, Any]:
         except TimeoutError as e:
             raise OSError(f"ai-service timeout while calling {url}: {e}") from e
 
-    try:
-        return _do()
-    except OSError as e:
-        msg = str(e)
-        if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
-            time.sleep(0.25)
+    def _call() -> dict[str, Any]:
+        try:
             return _do()
-        raise
+        except OSError as e:
+            msg = str(e)
+            if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
+                time.sleep(0.25)
+                return _do()
+            raise
+
+    return _ai_post_cached("/quant/rank/explain", payload, _call)
 
 
 def _get_by_dot_path(obj: dict[str, Any], path: str) -> Any:
@@ -9491,15 +12176,19 @@ def _get_by_dot_path(obj: dict[str, Any], path: str) -> Any:
 
 def _ai_strategy_daily(*, payload: dict[str, Any]) -> dict[str, Any]:
     body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    req = urllib.request.Request(
-        f"{_ai_service_base_url()}/strategy/daily",
-        data=body,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        raw = resp.read().decode("utf-8", errors="replace")
-        return json.loads(raw)
+
+    def _call() -> dict[str, Any]:
+        req = urllib.request.Request(
+            f"{_ai_service_base_url()}/strategy/daily",
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            raw = resp.read().decode("utf-8", errors="replace")
+            return json.loads(raw)
+
+    return _ai_post_cached("/strategy/daily", payload, _call)
 
 
 def _ai_strategy_candidates(*, payload: dict[str, Any]) -> dict[str, Any]:
@@ -9532,14 +12221,17 @@ def _ai_strategy_candidates(*, payload: dict[str, Any]) -> dict[str, Any]:
         except TimeoutError as e:
             raise OSError(f"ai-service timeout while calling {url}: {e}") from e
 
-    try:
-        return _do()
-    except OSError as e:
-        msg = str(e)
-        if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
-            time.sleep(0.25)
+    def _call() -> dict[str, Any]:
+        try:
             return _do()
-        raise
+        except OSError as e:
+            msg = str(e)
+            if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
+                time.sleep(0.25)
+                return _do()
+            raise
+
+    return _ai_post_cached("/strategy/candidates", payload, _call)
 
 
 def _ai_leader_daily(*, payload: dict[str, Any]) -> dict[str, Any]:
@@ -9572,14 +12264,17 @@ def _ai_leader_daily(*, payload: dict[str, Any]) -> dict[str, Any]:
         except TimeoutError as e:
             raise OSError(f"ai-service timeout while calling {url}: {e}") from e
 
-    try:
-        return _do()
-    except OSError as e:
-        msg = str(e)
-        if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
-            time.sleep(0.25)
+    def _call() -> dict[str, Any]:
+        try:
             return _do()
-        raise
+        except OSError as e:
+            msg = str(e)
+            if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
+                time.sleep(0.25)
+                return _do()
+            raise
+
+    return _ai_post_cached("/leader/daily", payload, _call)
 
 
 def _ai_strategy_daily_markdown(*, payload: dict[str, Any]) -> dict[str, Any]:
@@ -9613,14 +12308,124 @@ def _ai_strategy_daily_markdown(*, payload: dict[str, Any]) -> dict[str, Any]:
             raise OSError(f"ai-service timeout while calling {url}: {e}") from e
 
     # Retry once for transient disconnects (e.g. ai-service hot reload).
-    try:
-        return _do()
-    except OSError as e:
-        msg = str(e)
-        if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
-            time.sleep(0.25)
-            return _do()
-        raise
+    def _call() -> dict[str, Any]:
+        try:
+            out = _do()
+        except OSError as e:
+            msg = str(e)
+            if ("disconnected" in msg) or ("Connection reset" in msg) or ("timeout" in msg):
+                time.sleep(0.25)
+                out = _do()
+            else:
+                raise
+        # The JSON body always arrives whole; a cut-short generation shows up as its finishReason.
+        finish = str(out.get("finishReason") or "stop") if isinstance(out, dict) else ""
+        markdown = str(out.get("markdown") or "") if isinstance(out, dict) else ""
+        if not _ai_markdown_complete(markdown=markdown, finish=finish):
+            reason = finish if finish != "stop" else "empty markdown"
+            raise OSError(f"ai-service markdown incomplete ({reason}) while calling {url}")
+        return out
+
+    return _ai_post_cached("/strategy/daily-markdown", payload, _call)
+
+
+def _ai_markdown_complete(*, markdown: str, finish: str) -> bool:
+    """
+    Completion rule shared by the blocking and streaming daily-markdown calls: the report must be
+    non-empty and finished with "stop" ("length" means the model was cut off). Anything else is
+    never cached or stored as the day's report.
+    """
+    return bool(markdown.strip()) and finish == "stop"
+
+
+# ai-service ends `/strategy/daily-markdown/stream` with this separator plus a JSON trailer
+# ({"finishReason": ..., "error"?: ...}).
+_AI_STREAM_TRAILER_SEP = "\x1e"
+
+
+def _ai_strategy_daily_markdown_stream(*, payload: dict[str, Any], on_token: Callable[[str], None]) -> dict[str, Any]:
+    """
+    Streaming variant of `_ai_strategy_daily_markdown`: relays markdown chunks to `on_token` as
+    ai-service produces them and returns the same response shape once the stream ends.
+
+    Shares the response cache with the non-streaming call (a hit is relayed as one chunk), and
+    falls back to the non-streaming endpoint when ai-service has no stream route. The stream
+    ends with a completion trailer; without a clean finish the call raises `OSError`, so nothing
+    partial is cached or stored as the day's report.
+    """
+    url = f"{_ai_service_base_url()}/strategy/daily-markdown/stream"
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    relayed = {"any": False}
+
+    def relay(text: str) -> None:
+        if text:
+            relayed["any"] = True
+            on_token(text)
+
+    def _call() -> dict[str, Any]:
+        req = urllib.request.Request(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            resp = urllib.request.urlopen(req, timeout=180)
+        except urllib.error.HTTPError as e:
+            if getattr(e, "code", None) in (404, 405):
+                out0 = _ai_strategy_daily_markdown(payload=payload)
+                relay(str(out0.get("markdown") or "") if isinstance(out0, dict) else "")
+                return out0
+            raise OSError(f"ai-service HTTP {getattr(e, 'code', '?')} {getattr(e, 'reason', '')} while calling {url}") from e
+        except (urllib.error.URLError, http.client.RemoteDisconnected, TimeoutError) as e:
+            raise OSError(f"ai-service error while calling {url}: {e}") from e
+        parts: list[str] = []
+        trailer: list[str] = []
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        def take(text: str) -> None:
+            # Everything after the separator is the completion trailer, never relayed.
+            if trailer:
+                trailer.append(text)
+                return
+            head, sep, rest = text.partition(_AI_STREAM_TRAILER_SEP)
+            parts.append(head)
+            relay(head)
+            if sep:
+                trailer.append(rest)
+
+        with resp:
+            model_id = _norm_str(resp.headers.get("X-Model-Id") or "")
+            while True:
+                chunk = resp.read1(4096) if hasattr(resp, "read1") else resp.read(4096)
+                if not chunk:
+                    break
+                take(decoder.decode(chunk))
+            take(decoder.decode(b"", final=True))
+        markdown = "".join(parts).strip()
+        try:
+            done = json.loads("".join(trailer)) if trailer else {}
+        except ValueError:
+            done = {}
+        finish = str(done.get("finishReason") or "") if isinstance(done, dict) else ""
+        # A cut-short stream must fail the report instead of being cached and persisted as one.
+        if not _ai_markdown_complete(markdown=markdown, finish=finish):
+            err = str(done.get("error") or "") if isinstance(done, dict) else ""
+            raise OSError(
+                f"ai-service stream incomplete ({finish or 'no trailer'}{': ' + err if err else ''}) while calling {url}"
+            )
+        return {
+            "date": payload.get("date"),
+            "accountId": payload.get("accountId"),
+            "accountTitle": payload.get("accountTitle"),
+            "markdown": markdown,
+            "model": model_id or "unknown",
+        }
+
+    out = _ai_post_cached("/strategy/daily-markdown", payload, _call)
+    if not relayed["any"] and isinstance(out, dict):
+        relay(str(out.get("markdown") or ""))
+    return out
 
 
 def _normalize_strategy_markdown(md: str) -> str:
@@ -9699,6 +12504,152 @@ def get_strategy_reports(account_id: str, days: int = 10) -> ListStrategyReports
 
 @app.post("/strategy/accounts/{account_id}/daily", response_model=StrategyReportResponse)
 def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRequest) -> StrategyReportResponse:
+    with _ai_response_cache_bypass(req.bypassAiCache):
+        return _generate_strategy_daily_report(account_id, req)
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# --- Server push ---
+# Writers publish to `_events` when new data lands; the UI listens on GET /events (SSE) and
+# refetches only what changed instead of polling.
+EVENT_TOPICS = (
+    "rank.intraday",
+    "rank.next2d",
+    "leader.mainline",
+    "leader.daily",
+    "market.sync",
+    "market.bars",
+    QUOTES,
+)
+_events = EventBus()
+
+
+async def _event_stream(sub: Subscription, *, keepalive_s: float = 15.0) -> AsyncIterator[str]:
+    # Async so an open EventSource waits on the event loop instead of holding a threadpool worker
+    # that sync endpoints need; a client disconnect cancels the wait and unsubscribes.
+    try:
+        yield _sse_event("ready", {"topics": sorted(sub.topics) if sub.topics is not None else None})
+        while True:
+            ev = await sub.get_async(timeout=keepalive_s)
+            if ev is None:
+                yield ": keepalive\n\n"
+                continue
+            # Replayable events carry an id, so EventSource resumes with `Last-Event-ID`.
+            yield (f"id: {ev.id}\n" if ev.id is not None else "") + _sse_event(ev.topic, ev.data)
+    finally:
+        _events.unsubscribe(sub)
+
+
+@app.get("/events")
+def stream_events(request: Request, topics: str | None = None, symbols: str | None = None) -> StreamingResponse:
+    """
+    Server-Sent Events: `ready`, then one event per published topic (`data` says what changed;
+    fetch it from the usual endpoint). `quotes` carries changed quote fields for `symbols` only;
+    `resync` means events were lost and everything shown should be refetched.
+    """
+    wanted = [t.strip() for t in (topics or "").split(",") if t.strip()]
+    unknown = sorted(set(wanted) - set(EVENT_TOPICS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    syms = [x.strip().upper() for x in (symbols or "").split(",") if x.strip()]
+    last_id = request.headers.get("last-event-id") or ""
+    sub = _events.subscribe(
+        topics=wanted or None,
+        symbols=syms,
+        last_event_id=int(last_id) if last_id.isdigit() else None,
+    )
+    return StreamingResponse(
+        _event_stream(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _push_collector() -> list[str]:
+    return [
+        "# HELP quant_push_subscribers Open server-push (SSE) subscriptions.",
+        "# TYPE quant_push_subscribers gauge",
+        format_sample("quant_push_subscribers", {}, _events.subscriber_count),
+    ]
+
+
+registry.register_collector(_push_collector)
+
+
+@app.post("/strategy/accounts/{account_id}/daily/stream")
+def stream_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRequest) -> StreamingResponse:
+    """
+    Server-Sent Events variant of the daily report endpoint.
+
+    Events: `start`, `progress` (context sections / stages), `token` (stage-2 markdown chunks),
+    then either `report` (the persisted StrategyReportResponse) or `error`.
+    """
+    aid = (account_id or "").strip()
+    if not aid:
+        raise HTTPException(status_code=400, detail="account_id is required")
+    if _get_broker_account_row(aid) is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    events: queue.Queue[tuple[str, Any] | None] = queue.Queue()
+
+    def _emit(event: str, data: dict[str, Any]) -> None:
+        events.put((event, data))
+
+    def _worker() -> None:
+        try:
+            with _ai_response_cache_bypass(req.bypassAiCache):
+                rep = _generate_strategy_daily_report(aid, req, emit=_emit)
+            events.put(("report", rep.model_dump()))
+        except HTTPException as e:
+            events.put(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            events.put(("error", {"status": 500, "detail": str(e)}))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=_worker, name=f"strategy-daily-stream-{aid}", daemon=True).start()
+
+    def _iter() -> Iterator[str]:
+        yield _sse_event("start", {"accountId": aid, "date": (req.date or "").strip() or _today_cn_date_str()})
+        while True:
+            try:
+                item = events.get(timeout=15.0)
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle connection during slow AI stages.
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                return
+            yield _sse_event(item[0], item[1])
+
+    return StreamingResponse(
+        _iter(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_STRATEGY_STOCK_CTX_WORKERS = 8  # max concurrent per-symbol deep-context fetches
+
+
+def _generate_strategy_daily_report(
+    account_id: str,
+    req: StrategyDailyGenerateRequest,
+    *,
+    emit: Callable[[str, dict[str, Any]], None] | None = None,
+) -> StrategyReportResponse:
+    """
+    Build context, run the two AI stages and persist the report. When `emit` is given, progress
+    events are reported per context section and stage-2 markdown is streamed as `token` events.
+    """
+
+    def _progress(stage: str, **extra: Any) -> None:
+        if emit is not None:
+            emit("progress", {"stage": stage, **extra})
+
     aid = (account_id or "").strip()
     if not aid:
         raise HTTPException(status_code=400, detail="account_id is required")
@@ -9720,154 +12671,121 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
             input_snapshot=existing["inputSnapshot"] if isinstance(existing.get("inputSnapshot"), dict) else None,
         )
 
-    # Context assembly (v0)
-    strategy_prompt, _ = _get_strategy_prompt(aid)
-    state_row = _get_account_state_row(aid) or {
-        "accountId": aid,
-        "broker": str(acct["broker"]),
-        "updatedAt": now_iso(),
-        "overview": {},
-        "positions": [],
-    }
-    # Strategy context: keep it lean (overview + positions only).
-    if isinstance(state_row, dict):
-        state_row = {
-            "accountId": _norm_str(state_row.get("accountId") or aid),
-            "broker": _norm_str(state_row.get("broker") or acct["broker"]),
-            "updatedAt": _norm_str(state_row.get("updatedAt") or "") or now_iso(),
-            "overview": state_row.get("overview") if isinstance(state_row.get("overview"), dict) else {},
-            "positions": state_row.get("positions") if isinstance(state_row.get("positions"), list) else [],
+    # Context assembly: the sections below are independent, so they run concurrently. Each one
+    # records its wall time under `timingsMs` in the stored input snapshot.
+    timings_ms: dict[str, float] = {}
+
+    def _timed(section: str, fn: Callable[[], Any]) -> Any:
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            ms = round((time.perf_counter() - t0) * 1000.0, 1)
+            timings_ms[section] = ms
+            _progress(section, ms=ms)
+
+    def _account_state_ctx() -> tuple[str, dict[str, Any]]:
+        prompt, _ = _get_strategy_prompt(aid)
+        row = _get_account_state_row(aid) or {
+            "accountId": aid,
+            "broker": str(acct["broker"]),
+            "updatedAt": now_iso(),
+            "overview": {},
+            "positions": [],
+        }
+        # Strategy context: keep it lean (overview + positions only).
+        return prompt, {
+            "accountId": _norm_str(row.get("accountId") or aid),
+            "broker": _norm_str(row.get("broker") or acct["broker"]),
+            "updatedAt": _norm_str(row.get("updatedAt") or "") or now_iso(),
+            "overview": row.get("overview") if isinstance(row.get("overview"), dict) else {},
+            "positions": row.get("positions") if isinstance(row.get("positions"), list) else [],
         }
 
-    # Latest TradingView snapshots (all enabled screeners; capped).
-    snaps: list[TvScreenerSnapshotDetail] = []
-    tv_screeners_selected: list[dict[str, Any]] = []
-    if req.includeTradingView:
-        tv_screeners_selected = _list_enabled_tv_screeners(limit=6)
-        for sc in tv_screeners_selected:
+    def _trading_view_ctx() -> tuple[list[TvScreenerSnapshotDetail], list[dict[str, Any]]]:
+        # Latest TradingView snapshots (all enabled screeners; capped).
+        if not req.includeTradingView:
+            return [], []
+        out: list[TvScreenerSnapshotDetail] = []
+        for sc in _list_enabled_tv_screeners(limit=6):
             sid = _norm_str(sc.get("id") or "")
             if not sid:
                 continue
-            s = _latest_tv_snapshot_for_screener(sid)
-            if s is not None:
-                snaps.append(s)
-
-    # Include brief rows so debug can show tickers for newly-synced screeners.
-    tv_latest: list[dict[str, Any]] = [_tv_snapshot_brief(s.id, max_rows=20) for s in snaps]
-
-    watchlist_ctx: dict[str, Any] = {}
-    if req.includeWatchlist and isinstance(req.watchlist, dict):
+            snap = _latest_tv_snapshot_for_screener(sid)
+            if snap is not None:
+                out.append(snap)
+        # Include brief rows so debug can show tickers for newly-synced screeners.
+        # Built from the snapshots parsed above rather than re-reading each one.
+        return out, [_tv_snapshot_brief_of(snap, max_rows=20) for snap in out]
+
+    def _watchlist_ctx() -> dict[str, Any]:
+        if not (req.includeWatchlist and isinstance(req.watchlist, dict)):
+            return {}
         wl_items0 = req.watchlist.get("items")
-        wl_items: list[dict[str, Any]] = []
+        picked: list[tuple[str, str | None]] = []
         if isinstance(wl_items0, list):
             for it in wl_items0[:50]:
                 if not isinstance(it, dict):
                     continue
                 sym = _norm_str(it.get("symbol") or "")
-                if not sym:
-                    continue
-                name = _norm_str(it.get("name") or "") or None
-                # Enrich local watchlist items with real-time (cached) CN daily signals so the LLM
-                # can reason with actionable fields (TrendOK/Score/StopLoss/Buy).
-                enriched: dict[str, Any] = {"symbol": sym, "name": name}
-                try:
-                    bars = _load_cached_bars(sym, days=120)
-                    bars_tuples: list[
-                        tuple[str, str | None, str | None, str | None, str | None, str | None]
-                    ] = [
-                        (
-                            _norm_str(b.get("date") or ""),
-                            b.get("open") or None,
-                            b.get("high") or None,
-                            b.get("low") or None,
-                            b.get("close") or None,
-                            b.get("volume") or None,
-                        )
-                        for b in bars
-                        if isinstance(b, dict)
-                    ]
-                    t = _market_stock_trendok_one(symbol=sym, name=name, bars=bars_tuples)
-                    enriched.update(
-                        {
-                            "asOfDate": t.asOfDate,
-                            "close": t.values.close,
-                            "trendOk": t.trendOk,
-                            "score": t.score,
-                            "stopLossPrice": t.stopLossPrice,
-                            "buyMode": t.buyMode,
-                            "buyAction": t.buyAction,
-                            "buyZoneLow": t.buyZoneLow,
-                            "buyZoneHigh": t.buyZoneHigh,
-                            "missingData": list(t.missingData or []),
-                        }
-                    )
-                except Exception as e:
-                    enriched["enrichError"] = str(e)
-                wl_items.append(enriched)
-        watchlist_ctx = {
+                if sym:
+                    picked.append((sym, _norm_str(it.get("name") or "") or None))
+        # One query for every watchlist symbol instead of one per item.
+        bars_by_sym = _load_cached_bar_tuples([sym for sym, _ in picked], days=120)
+        wl_items: list[dict[str, Any]] = []
+        for sym, name in picked:
+            # Enrich local watchlist items with real-time (cached) CN daily signals so the LLM
+            # can reason with actionable fields (TrendOK/Score/StopLoss/Buy).
+            enriched: dict[str, Any] = {"symbol": sym, "name": name}
+            try:
+                t = _market_stock_trendok_one(symbol=sym, name=name, bars=bars_by_sym.get(sym, []))
+                enriched.update(
+                    {
+                        "asOfDate": t.asOfDate,
+                        "close": t.values.close,
+                        "trendOk": t.trendOk,
+                        "score": t.score,
+                        "stopLossPrice": t.stopLossPrice,
+                        "buyMode": t.buyMode,
+                        "buyAction": t.buyAction,
+                        "buyZoneLow": t.buyZoneLow,
+                        "buyZoneHigh": t.buyZoneHigh,
+                        "missingData": list(t.missingData or []),
+                    }
+                )
+            except Exception as e:
+                enriched["enrichError"] = str(e)
+            wl_items.append(enriched)
+        return {
             "version": int(req.watchlist.get("version") or 1),
             "generatedAt": _norm_str(req.watchlist.get("generatedAt") or "") or None,
             "count": len(wl_items),
             "items": wl_items,
         }
 
-    # Candidate pool = union of TV rows, capped.
-    pool: list[dict[str, str]] = []
-    seen_sym: set[str] = set()
-    if req.includeTradingView:
-        for s in snaps:
-            for c in _extract_tv_candidates(s):
-                sym = c["symbol"]
-                if sym in seen_sym:
-                    continue
-                seen_sym.add(sym)
-                pool.append(c)
-                if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
-                    break
-            if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
-                break
-
-    # Fallback candidate pool: include current holdings to ensure we can always generate a report.
-    if req.includeAccountState:
-        raw_positions = state_row.get("positions")
-        pos_list: list[Any] = raw_positions if isinstance(raw_positions, list) else []
-        for p in pos_list:
-            if not isinstance(p, dict):
-                continue
-            ticker = _norm_str(p.get("ticker") or p.get("Ticker") or p.get("symbol") or p.get("Symbol") or "")
-            if not ticker:
-                continue
-            name = _norm_str(p.get("name") or p.get("Name") or "")
-            market = "HK" if (len(ticker) in (4, 5)) else "CN"
-            currency = "HKD" if market == "HK" else "CNY"
-            sym = f"{market}:{ticker}"
-            if sym in seen_sym:
-                continue
-            seen_sym.add(sym)
-            pool.append({"symbol": sym, "market": market, "currency": currency, "ticker": ticker, "name": name})
-            if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
-                break
-
-    # CN industry fund flow context: screenshot-style Top5×Date (names only), DB-first with best-effort sync.
-    industry_flow_daily: dict[str, Any] = {"asOfDate": d, "days": 10, "topK": 5, "dates": [], "ranks": [], "matrix": [], "topByDate": []}
-    industry_flow_error: str | None = None
-    if req.includeIndustryFundFlow:
+    def _industry_flow_ctx() -> tuple[dict[str, Any], str | None]:
+        # CN industry fund flow context: screenshot-style Top5×Date (names only), DB-first with best-effort sync.
+        empty: dict[str, Any] = {"asOfDate": d, "days": 10, "topK": 5, "dates": [], "ranks": [], "matrix": [], "topByDate": []}
+        if not req.includeIndustryFundFlow:
+            return empty, None
         try:
-            industry_flow_daily = _market_cn_industry_fund_flow_top_by_date(as_of_date=d, days=10, top_k=5)
-            if not (industry_flow_daily.get("dates") or []):
+            daily = _market_cn_industry_fund_flow_top_by_date(as_of_date=d, days=10, top_k=5)
+            if not (daily.get("dates") or []):
                 try:
                     market_cn_industry_fund_flow_sync(
                         MarketCnIndustryFundFlowSyncRequest(date=d, days=10, topN=10, force=False)
                     )
                 except Exception:
                     pass
-                industry_flow_daily = _market_cn_industry_fund_flow_top_by_date(as_of_date=d, days=10, top_k=5)
+                daily = _market_cn_industry_fund_flow_top_by_date(as_of_date=d, days=10, top_k=5)
+            return daily, None
         except Exception as e:
-            industry_flow_error = str(e)
+            return empty, str(e)
 
-    # Leader stocks context: last 10 trading days leaders (DB-first), compact summary.
-    leader_ctx: dict[str, Any] = {}
-    if req.includeLeaders:
+    def _leaders_ctx() -> dict[str, Any]:
+        # Leader stocks context: last 10 trading days leaders (DB-first), compact summary.
+        if not req.includeLeaders:
+            return {}
         try:
             leader_dates, leader_rows = _list_leader_stocks(days=10)
             latest_date = leader_dates[-1] if leader_dates else ""
@@ -9946,31 +12864,33 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
                     }
                 )
 
-            leader_ctx = {"days": 10, "dates": leader_dates, "latestDate": latest_date, "leaders": leaders_out}
+            return {"days": 10, "dates": leader_dates, "latestDate": latest_date, "leaders": leaders_out}
         except Exception as e:
-            leader_ctx = {"days": 10, "dates": [], "leaders": [], "error": str(e)}
+            return {"days": 10, "dates": [], "leaders": [], "error": str(e)}
 
-    # Mainline snapshot context: DB-first (no generation), latest snapshot for the day.
-    mainline_ctx: dict[str, Any] = {}
-    if req.includeMainline:
+    def _mainline_ctx() -> dict[str, Any]:
+        # Mainline snapshot context: DB-first (no generation), latest snapshot for the day.
+        if not req.includeMainline:
+            return {}
         try:
             cached = _get_cn_mainline_snapshot_latest(account_id=aid, trade_date=d, universe_version="v0")
             if isinstance(cached, dict) and isinstance(cached.get("output"), dict):
                 out0 = cast(dict[str, Any], cached.get("output"))
-                mainline_ctx = {"id": str(cached.get("id") or ""), "createdAt": str(cached.get("createdAt") or "")}
-                mainline_ctx.update(out0)
-            else:
-                mainline_ctx = {}
+                ctx: dict[str, Any] = {"id": str(cached.get("id") or ""), "createdAt": str(cached.get("createdAt") or "")}
+                ctx.update(out0)
+                return ctx
+            return {}
         except Exception as e:
-            mainline_ctx = {"error": str(e)}
+            return {"error": str(e)}
 
-    # Quant (next2d) snapshot: optional context injection for Strategy.
-    quant2d_ctx: dict[str, Any] = {}
-    if req.includeQuant2d:
+    def _quant2d_ctx() -> dict[str, Any]:
+        # Quant (next2d) snapshot: optional context injection for Strategy.
+        if not req.includeQuant2d:
+            return {}
         try:
             cached_q = _get_cn_rank_snapshot(account_id=aid, as_of_date=d, universe_version="v0")
             if not isinstance(cached_q, dict) or not isinstance(cached_q.get("output"), dict):
-                quant2d_ctx = {"asOfDate": d, "status": "no_snapshot"}
+                return {"asOfDate": d, "status": "no_snapshot"}
             else:
                 outq = cast(dict[str, Any], cached_q.get("output"))
                 items0 = outq.get("items")
@@ -9997,7 +12917,7 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
                     )
                 dbg0 = outq.get("debug")
                 dbg: dict[str, Any] = dbg0 if isinstance(dbg0, dict) else {}
-                quant2d_ctx = {
+                return {
                     "id": str(cached_q.get("id") or ""),
                     "createdAt": str(cached_q.get("createdAt") or ""),
                     "asOfTs": str(outq.get("asOfTs") or "") or None,
@@ -10012,17 +12932,83 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
                     },
                 }
         except Exception as e:
-            quant2d_ctx = {"asOfDate": d, "error": str(e)}
+            return {"asOfDate": d, "error": str(e)}
 
-    # Stage 1: candidate selection WITHOUT per-stock deep context.
-    sentiment_ctx: dict[str, Any] = {}
-    if req.includeMarketSentiment:
+    def _sentiment_ctx() -> dict[str, Any]:
+        if not req.includeMarketSentiment:
+            return {}
         try:
             items = _list_cn_sentiment_days(as_of_date=d, days=5)
             latest = items[-1] if items else {}
-            sentiment_ctx = {"asOfDate": d, "days": 5, "latest": latest, "items": items}
+            return {"asOfDate": d, "days": 5, "latest": latest, "items": items}
         except Exception as e:
-            sentiment_ctx = {"asOfDate": d, "days": 5, "error": str(e), "items": []}
+            return {"asOfDate": d, "days": 5, "error": str(e), "items": []}
+
+    sections: dict[str, Callable[[], Any]] = {
+        "accountState": _account_state_ctx,
+        "tradingView": _trading_view_ctx,
+        "watchlist": _watchlist_ctx,
+        "industryFundFlow": _industry_flow_ctx,
+        "leaders": _leaders_ctx,
+        "mainline": _mainline_ctx,
+        "quant2d": _quant2d_ctx,
+        "marketSentiment": _sentiment_ctx,
+    }
+    t_ctx = time.perf_counter()
+    # Worker threads start with an empty context: run each task in a copy of ours so the active
+    # trace (spans of upstream fetches) and the AI cache bypass carry over.
+    with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="strategy-ctx") as pool_ex:
+        futs = {name: pool_ex.submit(contextvars.copy_context().run, _timed, name, fn) for name, fn in sections.items()}
+        gathered = {name: f.result() for name, f in futs.items()}
+    timings_ms["context"] = round((time.perf_counter() - t_ctx) * 1000.0, 1)
+
+    strategy_prompt, state_row = gathered["accountState"]
+    snaps, tv_latest = gathered["tradingView"]
+    watchlist_ctx: dict[str, Any] = gathered["watchlist"]
+    industry_flow_daily, industry_flow_error = gathered["industryFundFlow"]
+    leader_ctx: dict[str, Any] = gathered["leaders"]
+    mainline_ctx: dict[str, Any] = gathered["mainline"]
+    quant2d_ctx: dict[str, Any] = gathered["quant2d"]
+    sentiment_ctx: dict[str, Any] = gathered["marketSentiment"]
+
+    # Candidate pool = union of TV rows, capped.
+    pool: list[dict[str, str]] = []
+    seen_sym: set[str] = set()
+    if req.includeTradingView:
+        for s in snaps:
+            for c in _extract_tv_candidates(s):
+                sym = c["symbol"]
+                if sym in seen_sym:
+                    continue
+                seen_sym.add(sym)
+                pool.append(c)
+                if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
+                    break
+            if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
+                break
+
+    # Fallback candidate pool: include current holdings to ensure we can always generate a report.
+    if req.includeAccountState:
+        raw_positions = state_row.get("positions")
+        pos_list: list[Any] = raw_positions if isinstance(raw_positions, list) else []
+        for p in pos_list:
+            if not isinstance(p, dict):
+                continue
+            ticker = _norm_str(p.get("ticker") or p.get("Ticker") or p.get("symbol") or p.get("Symbol") or "")
+            if not ticker:
+                continue
+            name = _norm_str(p.get("name") or p.get("Name") or "")
+            market = "HK" if (len(ticker) in (4, 5)) else "CN"
+            currency = "HKD" if market == "HK" else "CNY"
+            sym = f"{market}:{ticker}"
+            if sym in seen_sym:
+                continue
+            seen_sym.add(sym)
+            pool.append({"symbol": sym, "market": market, "currency": currency, "ticker": ticker, "name": name})
+            if len(pool) >= max(1, min(int(req.maxCandidates), 20)):
+                break
+
+    # Stage 1: candidate selection WITHOUT per-stock deep context.
     base_snapshot: dict[str, Any] = {
         "date": d,
         "account": {
@@ -10060,6 +13046,8 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
     stage1_candidates: list[dict[str, Any]] = []
     stage1_leader: dict[str, Any] = {"symbol": "", "reason": ""}
     stage1_error: str | None = None
+    _progress("stage1", candidatePool=len(pool))
+    t_stage = time.perf_counter()
     try:
         stage1_resp = _ai_strategy_candidates(payload=stage1_req)
         c_in = stage1_resp.get("candidates")
@@ -10068,6 +13056,7 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
         stage1_leader = leader_in if isinstance(leader_in, dict) else stage1_leader
     except OSError as e:
         stage1_error = str(e)
+    timings_ms["stage1"] = round((time.perf_counter() - t_stage) * 1000.0, 1)
 
     # Decide which symbols to fetch deep context for stage 2.
     selected_syms: list[str] = []
@@ -10095,78 +13084,87 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
         _ensure_market_stock_basic(symbol=sym, market=market, ticker=ticker, name=name, currency=currency)
 
     # Stage 2: fetch deep context ONLY for selected symbols (if enabled).
-    stock_context: list[dict[str, Any]] = []
-    if req.includeStocks:
-        for sym in selected_syms:
-            meta = selected_meta.get(sym) or {}
-            market = _norm_str(meta.get("market") or sym.split(":")[0] if ":" in sym else "CN")
-            ticker = _norm_str(meta.get("ticker") or sym.split(":")[1] if ":" in sym else sym)
-            currency = _norm_str(meta.get("currency") or ("HKD" if market == "HK" else "CNY"))
-            name = _norm_str(meta.get("name") or "")
+    _progress("stocks", symbols=selected_syms)
+    def _stock_ctx(sym: str) -> dict[str, Any]:
+        meta = selected_meta.get(sym) or {}
+        market = _norm_str(meta.get("market") or sym.split(":")[0] if ":" in sym else "CN")
+        ticker = _norm_str(meta.get("ticker") or sym.split(":")[1] if ":" in sym else sym)
+        currency = _norm_str(meta.get("currency") or ("HKD" if market == "HK" else "CNY"))
+        name = _norm_str(meta.get("name") or "")
 
-            bars_cached = _load_cached_bars(sym, days=60)
+        bars_cached = _load_cached_bars(sym, days=60)
+        bars = bars_cached
+        bars_error: str | None = None
+        bars_forced = True
+        try:
+            bars_resp = market_stock_bars(sym, days=60, force=True)
+            bars = bars_resp.bars
+        except Exception as e:
+            # Fallback to cached bars if force refresh fails (AkShare may be flaky).
             bars = bars_cached
-            bars_error: str | None = None
-            bars_forced = True
-            try:
-                bars_resp = market_stock_bars(sym, days=60, force=True)
-                bars = bars_resp.bars
-            except Exception as e:
-                # Fallback to cached bars if force refresh fails (AkShare may be flaky).
-                bars = bars_cached
-                bars_error = str(e)
-            feats = _bars_features(bars)
+            bars_error = str(e)
+        feats = _bars_features(bars)
 
-            chips_cached = _load_cached_chips(sym, days=30)
-            fund_flow_cached = _load_cached_fund_flow(sym, days=30)
+        chips_cached = _load_cached_chips(sym, days=30)
+        fund_flow_cached = _load_cached_fund_flow(sym, days=30)
+        chips = chips_cached
+        fund_flow = fund_flow_cached
+        chips_error: str | None = None
+        fund_flow_error: str | None = None
+        try:
+            chips = market_stock_chips(sym, days=30, force=True).items
+        except Exception as e:
             chips = chips_cached
+            chips_error = str(e)
+        try:
+            fund_flow = market_stock_fund_flow(sym, days=30, force=True).items
+        except Exception as e:
             fund_flow = fund_flow_cached
-            chips_error: str | None = None
-            fund_flow_error: str | None = None
-            try:
-                chips = market_stock_chips(sym, days=30, force=True).items
-            except Exception as e:
-                chips = chips_cached
-                chips_error = str(e)
-            try:
-                fund_flow = market_stock_fund_flow(sym, days=30, force=True).items
-            except Exception as e:
-                fund_flow = fund_flow_cached
-                fund_flow_error = str(e)
+            fund_flow_error = str(e)
 
-            bars_tail = bars[-6:] if bars else []
-            chips_tail = chips[-3:] if chips else []
-            ff_tail = fund_flow[-5:] if fund_flow else []
-            chips_last = chips_tail[-1] if chips_tail else {}
-            ff_last = ff_tail[-1] if ff_tail else {}
+        bars_tail = bars[-6:] if bars else []
+        chips_tail = chips[-3:] if chips else []
+        ff_tail = fund_flow[-5:] if fund_flow else []
+        chips_last = chips_tail[-1] if chips_tail else {}
+        ff_last = ff_tail[-1] if ff_tail else {}
 
-            stock_context.append(
-                {
-                    "symbol": sym,
-                    "market": market,
-                    "ticker": ticker,
-                    "name": name,
-                    "currency": currency,
-                    "deep": True,
-                    "availability": {
-                        "forced": True,
-                        "barsCached": True if bars_cached else False,
-                        "chipsCached": True if chips_cached else False,
-                        "fundFlowCached": True if fund_flow_cached else False,
-                        "barsForced": bars_forced,
-                        "barsError": bars_error,
-                        "chipsError": chips_error,
-                        "fundFlowError": fund_flow_error,
-                    },
-                    "features": feats,
-                    # Deep context guarantees:
-                    "chipsSummary": _chips_summary_last(chips_last),
-                    "fundFlowBreakdown": _fund_flow_breakdown_last(ff_last),
-                    "barsTail": bars_tail,
-                    "chipsTail": chips_tail,
-                    "fundFlowTail": ff_tail,
-                },
-            )
+        return {
+            "symbol": sym,
+            "market": market,
+            "ticker": ticker,
+            "name": name,
+            "currency": currency,
+            "deep": True,
+            "availability": {
+                "forced": True,
+                "barsCached": True if bars_cached else False,
+                "chipsCached": True if chips_cached else False,
+                "fundFlowCached": True if fund_flow_cached else False,
+                "barsForced": bars_forced,
+                "barsError": bars_error,
+                "chipsError": chips_error,
+                "fundFlowError": fund_flow_error,
+            },
+            "features": feats,
+            # Deep context guarantees:
+            "chipsSummary": _chips_summary_last(chips_last),
+            "fundFlowBreakdown": _fund_flow_breakdown_last(ff_last),
+            "barsTail": bars_tail,
+            "chipsTail": chips_tail,
+            "fundFlowTail": ff_tail,
+        }
+
+    stock_context: list[dict[str, Any]] = []
+    t_stage = time.perf_counter()
+    if req.includeStocks and selected_syms:
+        # Per-symbol deep context is independent network/DB work; keep the stage-1 order.
+        # Each symbol can force several provider fetches (bars, chips, flows): cap the threads so a
+        # long selection doesn't open dozens of concurrent upstream requests at once.
+        workers = min(_STRATEGY_STOCK_CTX_WORKERS, len(selected_syms))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strategy-stock") as pool_ex:
+            stock_futs = [pool_ex.submit(contextvars.copy_context().run, _stock_ctx, sym) for sym in selected_syms]
+            stock_context = [f.result() for f in stock_futs]
+    timings_ms["stocks"] = round((time.perf_counter() - t_stage) * 1000.0, 1)
 
     # Stage 2 snapshot: includes stage1 results + deep context for selected symbols.
     input_snapshot: dict[str, Any] = {
@@ -10202,10 +13200,21 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
         "accountPrompt": strategy_prompt,
         "context": input_snapshot,
     }
+    _progress("stage2")
+    t_stage = time.perf_counter()
     try:
-        out = _ai_strategy_daily_markdown(payload=stage2_req)
+        if emit is not None:
+            out = _ai_strategy_daily_markdown_stream(
+                payload=stage2_req,
+                on_token=lambda text: emit("token", {"text": text}),
+            )
+        else:
+            out = _ai_strategy_daily_markdown(payload=stage2_req)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"ai-service request failed: {e}") from e
+    timings_ms["stage2"] = round((time.perf_counter() - t_stage) * 1000.0, 1)
+    # Timings are stored with the snapshot but kept out of the prompt (and the AI cache key).
+    input_snapshot = {**input_snapshot, "timingsMs": dict(timings_ms)}
 
     stage2_resp_raw: dict[str, Any] = out if isinstance(out, dict) else {"error": "Invalid strategy output", "raw": out}
     # Copy to avoid circular refs when attaching debug.
@@ -10235,7 +13244,7 @@ def generate_strategy_daily_report(account_id: str, req: StrategyDailyGenerateRe
     )
     # Keep last 10 days of reports per account (best-effort).
     try:
-        _prune_strategy_reports_keep_last_n_days(account_id=aid, keep_days=10)
+        _retention_manager.request("strategy_reports")
     except Exception:
         pass
     return _strategy_report_response(
@@ -10382,6 +13391,15 @@ def delete_trade_journal(journal_id: str) -> dict[str, Any]:
 
 @app.post("/leader/daily", response_model=LeaderDailyResponse)
 def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyResponse:
+    with _ai_response_cache_bypass(req.bypassAiCache), trace("leader_daily", force=bool(req.force)) as sp:
+        resp = _generate_leader_daily(req)
+    snap_id = sp.attrs.get("snapshotId")
+    _finish_pipeline_trace(sp, pipeline="leader_daily", trade_date=resp.date, snapshot_id=str(snap_id) if snap_id else None)
+    return resp
+
+
+@_profiled("generate_leader_daily")
+def _generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyResponse:
     d = (req.date or "").strip() or _today_cn_date_str()
     ts = now_iso()
 
@@ -10452,6 +13470,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
                 )
             return LeaderDailyResponse(date=d, leaders=leaders_out, debug=None)
 
+    trace_stage("tv_snapshots")
     # Build TradingView latest snapshots (enabled screeners).
     snaps: list[TvScreenerSnapshotDetail] = []
     tv_screeners_selected = _list_enabled_tv_screeners(limit=6)
@@ -10480,6 +13499,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
         if len(tv_pool) >= tv_cap:
             break
 
+    trace_stage("mainline")
     # Build mainline snapshot (best-effort) and adjust candidate universe if a clear mainline exists.
     mainline_out: dict[str, Any] | None = None
     mainline_selected: dict[str, Any] | None = None
@@ -10498,8 +13518,8 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
                     force=bool(req.force),
                     top_k=topk,
                 )
-                # Persist snapshot for UI/debug.
-                _insert_cn_mainline_snapshot(
+                # Persist snapshot for UI/debug; the leader trace links to it.
+                mainline_snap_id = _insert_cn_mainline_snapshot(
                     account_id=aid_mainline,
                     trade_date=str(mainline_out.get("tradeDate") or d),
                     as_of_ts=str(mainline_out.get("asOfTs") or ts),
@@ -10507,7 +13527,8 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
                     ts=ts,
                     output=mainline_out,
                 )
-                _prune_cn_mainline_snapshots(account_id=aid_mainline, keep_days=10)
+                annotate_trace(snapshotId=mainline_snap_id)
+                _retention_manager.request("cn_mainline_snapshots")
                 sel = mainline_out.get("selected")
                 mainline_selected = sel if isinstance(sel, dict) else None
                 dbg_ml = mainline_out.get("debug") if isinstance(mainline_out.get("debug"), dict) else {}
@@ -10587,6 +13608,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
         pool = list(tv_pool)
         seen = set(tv_seen)
 
+    trace_stage("quant_merge")
     # Merge Quant (next2d) top candidates into leader candidate universe (best-effort).
     # This reduces misses when a strong stock is not surfaced by enabled TV screeners.
     quant_score_map: dict[str, float] = {}
@@ -10643,6 +13665,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
     except Exception:
         pass
 
+    trace_stage("ordering")
     # Deterministic candidate ordering: avoid "randomness" from TV/member ordering.
     # Rank by a simple strength score (Quant2D score if present + spot strength proxies).
     spot_rows2: list[StockRow] = []
@@ -10683,6 +13706,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
 
     pool.sort(key=_cand_strength, reverse=True)
 
+    trace_stage("industry_flow")
     # Industry flow matrix (names only).
     industry_daily = _market_cn_industry_fund_flow_top_by_date(as_of_date=d, days=10, top_k=5)
 
@@ -10693,6 +13717,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
         for r in hist_rows
     ]
 
+    trace_stage("stock_summaries")
     # Market per-stock summaries (compact) for candidate universe.
     market_ctx: list[dict[str, Any]] = []
     top_n = max(1, min(int(req.maxCandidates), 20))
@@ -10764,6 +13789,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
         "market": market_ctx,
         "leaderHistory": leader_history,
     }
+    trace_stage("ai")
     stage_req = {"date": d, "context": context}
     stage_resp: dict[str, Any] = {}
     try:
@@ -10808,6 +13834,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
             }
         )
 
+    trace_stage("persist")
     # IMPORTANT: If generating again for the same date (e.g., AM/PM runs),
     # keep at most 2 leaders per day by REPLACING the day's records.
     # Only delete existing rows if we have new picks (avoid losing previous leaders on AI failure).
@@ -10815,8 +13842,9 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
         _delete_leader_stocks_for_date(d)
 
     _upsert_leader_stocks(date=d, items=picks, ts=ts)
-    _prune_leader_stocks_keep_last_n_days(keep_days=10)
+    _retention_manager.request("leader_stocks")
 
+    trace_stage("live_scores")
     # Refresh live score for all tracked leaders.
     # - When generating (force=true), we treat this as "refresh now" and force-refresh market data.
     # - Otherwise, keep it cached-only to reduce cost.
@@ -10827,6 +13855,7 @@ def generate_leader_daily(req: LeaderDailyGenerateRequest) -> LeaderDailyRespons
     except Exception:
         pass
 
+    trace_stage("response")
     # Build response with computed series.
     _, saved_rows = _list_leader_stocks(days=10)
     today_rows = [r for r in saved_rows if str(r.get("date") or "") == d]
@@ -10927,10 +13956,7 @@ def leader_mainline(
         )
     out_raw = cached.get("output")
     out: dict[str, Any] = out_raw if isinstance(out_raw, dict) else {}
-    themes_raw = out.get("themesTopK")
-    themes0: list[Any] = themes_raw if isinstance(themes_raw, list) else []
-    sel0 = out.get("selected")
-    selected = MainlineTheme(**sel0) if isinstance(sel0, dict) else None
+    selected, themes = _snapshot_models(cached, "mainline_themes", _mainline_themes_from_output)
     return MainlineSnapshotResponse(
         id=str(cached.get("id") or ""),
         tradeDate=str(out.get("tradeDate") or d or _today_cn_date_str()),
@@ -10940,13 +13966,20 @@ def leader_mainline(
         universeVersion=str(out.get("universeVersion") or universe),
         riskMode=str(out.get("riskMode") or "") or None,
         selected=selected,
-        themesTopK=[MainlineTheme(**x) for x in themes0 if isinstance(x, dict)],
+        themesTopK=themes,
         debug=out.get("debug") if isinstance(out.get("debug"), dict) else None,
     )
 
 
 @app.post("/leader/mainline/generate", response_model=MainlineSnapshotResponse)
 def leader_mainline_generate(req: MainlineGenerateRequest) -> MainlineSnapshotResponse:
+    with _ai_response_cache_bypass(req.bypassAiCache), trace("mainline", force=bool(req.force)) as sp:
+        resp = _leader_mainline_generate(req)
+    _finish_pipeline_trace(sp, pipeline="mainline", trade_date=resp.tradeDate, snapshot_id=resp.id or None)
+    return resp
+
+
+def _leader_mainline_generate(req: MainlineGenerateRequest) -> MainlineSnapshotResponse:
     universe = (req.universeVersion or "").strip() or "v0"
     top_k = max(1, min(int(req.topK), 10))
     as_of_ts = (req.asOfTs or "").strip() or now_iso()
@@ -10967,6 +14000,7 @@ def leader_mainline_generate(req: MainlineGenerateRequest) -> MainlineSnapshotRe
         force=bool(req.force),
         top_k=top_k,
     )
+    trace_stage("persist")
     snap_id = _insert_cn_mainline_snapshot(
         account_id=aid,
         trade_date=trade_date,
@@ -10975,7 +14009,7 @@ def leader_mainline_generate(req: MainlineGenerateRequest) -> MainlineSnapshotRe
         ts=ts,
         output=output,
     )
-    _prune_cn_mainline_snapshots(account_id=aid, keep_days=10)
+    _retention_manager.request("cn_mainline_snapshots")
 
     themes_raw = output.get("themesTopK")
     themes0: list[Any] = themes_raw if isinstance(themes_raw, list) else []
@@ -11106,7 +14140,9 @@ def dashboard_sync(req: DashboardSyncRequest) -> DashboardSyncResponse:
         except Exception as e:
             ok = False
             msg = str(e)
-        dur = int((time.perf_counter() - st) * 1000)
+        elapsed = time.perf_counter() - st
+        SYNC_STEP_SECONDS.observe(elapsed, step=name, ok="true" if ok else "false")
+        dur = int(elapsed * 1000)
         steps.append(DashboardSyncStep(name=name, ok=ok, durationMs=dur, message=msg, meta=meta))
         return {"ok": ok, "message": msg, "meta": meta}
 
@@ -11284,7 +14320,7 @@ def dashboard_sync(req: DashboardSyncRequest) -> DashboardSyncResponse:
                 ts=as_of_ts,
                 output=out,
             )
-            _prune_cn_mainline_snapshots(account_id=aid, keep_days=10)
+            _retention_manager.request("cn_mainline_snapshots")
             sel = out.get("selected") if isinstance(out, dict) else None
             meta = {
                 "tradeDate": str(out.get("tradeDate") or ""),
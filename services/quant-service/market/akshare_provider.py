@@ -12,6 +12,10 @@ from dataclasses import dataclass
 from datetime import date, timedelta
 from typing import Any
 
+from metrics import observe_upstream
+
+from .replay import call_upstream, upstream_mode
+
 
 def _ensure_no_proxy(host: str) -> None:
     """
@@ -78,7 +82,61 @@ class BarRow:
     amount: str
 
 
+class _MeteredAkShare:
+    """
+    Proxy over the `akshare` module that records latency/errors per AkShare function and routes
+    calls through the record/replay layer (`UPSTREAM_MODE`).
+    """
+
+    def __init__(self, ak: Any) -> None:
+        self._ak = ak
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._ak, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with observe_upstream("akshare", name):
+                return call_upstream(
+                    "akshare",
+                    name,
+                    {"args": list(args), "kwargs": kwargs},
+                    lambda: attr(*args, **kwargs),
+                )
+
+        return call
+
+
+class _ReplayAkShare:
+    """
+    Stand-in for the `akshare` module in replay mode: every function exists (so `hasattr`
+    fallbacks behave) but is only ever served from fixtures.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        def call(*_args: Any, **_kwargs: Any) -> Any:
+            raise RuntimeError(f"AkShare {name} called live in replay mode")
+
+        return call
+
+
+def _eastmoney_get(req: urllib.request.Request, *, op: str, key: dict[str, Any]) -> bytes:
+    """
+    GET a raw Eastmoney payload. `key` holds the identifying query params (not cache busters).
+    """
+
+    def _fetch() -> bytes:
+        with urllib.request.urlopen(req, timeout=15) as resp:
+            return resp.read()
+
+    with observe_upstream("eastmoney", op):
+        return call_upstream("eastmoney", op, key, _fetch)
+
+
 def _akshare():
+    if upstream_mode() == "replay":
+        return _MeteredAkShare(_ReplayAkShare())
     try:
         # AkShare CN history uses Eastmoney endpoints under the hood.
         # Make it more resilient by bypassing proxy for these hosts.
@@ -89,7 +147,7 @@ def _akshare():
         _ensure_no_proxy("push2his.eastmoney.com")
         import akshare as ak  # type: ignore
 
-        return ak
+        return _MeteredAkShare(ak)
     except Exception as e:
         raise RuntimeError(
             "AkShare is required for market data. Please install it in quant-service:\n"
@@ -475,6 +533,26 @@ def fetch_cn_limitup_pool(as_of: date) -> list[dict[str, Any]]:
     return out
 
 
+def fetch_cn_trade_dates() -> list[str]:
+    """
+    CN A-share exchange trading dates (YYYY-MM-DD), historical plus the published current year.
+    """
+    ak = _akshare()
+    if not hasattr(ak, "tool_trade_date_hist_sina"):
+        raise RuntimeError("AkShare missing tool_trade_date_hist_sina. Please upgrade AkShare.")
+    df = _with_retry(lambda: ak.tool_trade_date_hist_sina(), tries=3)  # type: ignore[attr-defined]
+    rows = _to_records(df)
+    out: list[str] = []
+    for r in rows:
+        v = r.get("trade_date") or r.get("date")
+        if v is None:
+            continue
+        s = str(v).strip()[:10]
+        if len(s) == 10:
+            out.append(s)
+    return sorted(set(out))
+
+
 def fetch_cn_industry_members(industry_name: str) -> list[str]:
     """
     Fetch industry board members (tickers) by industry name (best-effort).
@@ -887,8 +965,7 @@ def fetch_cn_industry_fund_flow_eod(as_of: date) -> list[dict[str, Any]]:
                 "Connection": "close",
             },
         )
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            raw = resp.read()
+        raw = _eastmoney_get(req, op="bkzj/getbkzj", key={"key": key, "code": code})
         j = json.loads(raw.decode("utf-8", errors="replace"))
         data = j.get("data") if isinstance(j, dict) else None
         diff = (data or {}).get("diff") if isinstance(data, dict) else None
@@ -988,8 +1065,7 @@ def _eastmoney_board_fund_flow_daykline(*, secid: str) -> list[dict[str, Any]]:
             "Connection": "close",
         },
     )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        raw = resp.read()
+    raw = _eastmoney_get(req, op="fflow/daykline", key={"secid": secid})
     j = json.loads(raw.decode("utf-8", errors="replace"))
     data = j.get("data") if isinstance(j, dict) else None
     klines = (data or {}).get("klines") if isinstance(data, dict) else None
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, timedelta
+
+# SSE/SZSE full-day closures that fall on weekdays (weekends are always closed).
+# Source: exchange holiday notices. Extend yearly, or sync from upstream at runtime
+# (see `TradingCalendar.from_trading_dates`).
+CN_EXCHANGE_HOLIDAYS: dict[int, tuple[str, ...]] = {
+    2024: (
+        "2024-01-01",
+        "2024-02-09", "2024-02-12", "2024-02-13", "2024-02-14", "2024-02-15", "2024-02-16",
+        "2024-04-04", "2024-04-05",
+        "2024-05-01", "2024-05-02", "2024-05-03",
+        "2024-06-10",
+        "2024-09-16", "2024-09-17",
+        "2024-10-01", "2024-10-02", "2024-10-03", "2024-10-04", "2024-10-07",
+    ),
+    2025: (
+        "2025-01-01",
+        "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31", "2025-02-03", "2025-02-04",
+        "2025-04-04",
+        "2025-05-01", "2025-05-02", "2025-05-05",
+        "2025-06-02",
+        "2025-10-01", "2025-10-02", "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08",
+    ),
+    2026: (
+        "2026-01-01", "2026-01-02",
+        "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20", "2026-02-23",
+        "2026-04-06",
+        "2026-05-01", "2026-05-04", "2026-05-05",
+        "2026-06-19",
+        "2026-09-25",
+        "2026-10-01", "2026-10-02", "2026-10-05", "2026-10-06", "2026-10-07",
+    ),
+}
+
+# Precomputed lookup range; dates outside fall back to the weekend-only rule.
+_RANGE_START = date(2000, 1, 1)
+_RANGE_END = date(2040, 12, 31)
+
+
+class TradingCalendar:
+    """
+    Exchange trading calendar with O(1) lookups.
+
+    On construction every day in [start, end] gets an open flag plus the ordinal of the next and
+    previous open day, so `is_trading_day`, `next_trading_day` and `prev_trading_day` are array
+    reads. Years listed in `covered_years` have authoritative holiday data; other years only know
+    about weekends (`covers()` lets callers decide whether to trust a "closed" answer).
+    """
+
+    def __init__(
+        self,
+        holidays: Iterable[date] = (),
+        *,
+        extra_open: Iterable[date] = (),
+        covered_years: Iterable[int] = (),
+        start: date = _RANGE_START,
+        end: date = _RANGE_END,
+    ) -> None:
+        self.holidays = frozenset(holidays)
+        self.extra_open = frozenset(extra_open)
+        self.covered_years = frozenset(int(y) for y in covered_years) | {d.year for d in self.holidays}
+        self._base = start.toordinal()
+        n = end.toordinal() - self._base + 1
+        self._open = bytearray(n)
+        for i in range(n):
+            d = date.fromordinal(self._base + i)
+            is_open = d.weekday() < 5 and d not in self.holidays
+            self._open[i] = 1 if (is_open or d in self.extra_open) else 0
+        # next_open[i]: first open index > i; prev_open[i]: last open index < i (-1/n if none).
+        self._next = [n] * n
+        self._prev = [-1] * n
+        nxt = n
+        for i in range(n - 1, -1, -1):
+            self._next[i] = nxt
+            if self._open[i]:
+                nxt = i
+        prv = -1
+        for i in range(n):
+            self._prev[i] = prv
+            if self._open[i]:
+                prv = i
+
+    @classmethod
+    def from_trading_dates(cls, trading_dates: Iterable[date], *, holidays: Iterable[date] = ()) -> TradingCalendar:
+        """
+        Build from an authoritative list of open days (e.g. an exchange trade-date feed): every
+        weekday inside the covered years that is missing from the list is treated as a holiday.
+        """
+        opens = set(trading_dates)
+        if not opens:
+            return cls(holidays)
+        years = {d.year for d in opens}
+        last = max(opens)
+        derived: set[date] = set(holidays)
+        for y in years:
+            d = date(y, 1, 1)
+            # Do not mark the not-yet-published tail of the latest year as closed.
+            end = min(date(y, 12, 31), last)
+            while d <= end:
+                if d.weekday() < 5 and d not in opens:
+                    derived.add(d)
+                d += timedelta(days=1)
+        return cls(derived, covered_years=years)
+
+    def _idx(self, d: date) -> int | None:
+        i = d.toordinal() - self._base
+        return i if 0 <= i < len(self._open) else None
+
+    def covers(self, d: date) -> bool:
+        return d.year in self.covered_years
+
+    def is_trading_day(self, d: date) -> bool:
+        i = self._idx(d)
+        if i is None:
+            return d.weekday() < 5
+        return bool(self._open[i])
+
+    def next_trading_day(self, d: date) -> date:
+        """
+        First trading day strictly after `d`.
+        """
+        i = self._idx(d)
+        if i is not None and self._next[i] < len(self._open):
+            return date.fromordinal(self._base + self._next[i])
+        cur = d + timedelta(days=1)
+        while cur.weekday() >= 5:
+            cur += timedelta(days=1)
+        return cur
+
+    def prev_trading_day(self, d: date) -> date:
+        """
+        Last trading day strictly before `d`.
+        """
+        i = self._idx(d)
+        if i is not None and self._prev[i] >= 0:
+            return date.fromordinal(self._base + self._prev[i])
+        cur = d - timedelta(days=1)
+        while cur.weekday() >= 5:
+            cur -= timedelta(days=1)
+        return cur
+
+    def latest_trading_day(self, d: date) -> date:
+        """
+        `d` itself when open, otherwise the previous trading day.
+        """
+        return d if self.is_trading_day(d) else self.prev_trading_day(d)
+
+    def next_trading_days(self, d: date, n: int) -> list[date]:
+        out: list[date] = []
+        cur = d
+        for _ in range(max(0, int(n))):
+            cur = self.next_trading_day(cur)
+            out.append(cur)
+        return out
+
+
+def embedded_cn_holidays() -> set[date]:
+    return {date.fromisoformat(x) for days in CN_EXCHANGE_HOLIDAYS.values() for x in days}
+
+
+def build_cn_calendar(
+    *,
+    holidays: Iterable[date] = (),
+    extra_open: Iterable[date] = (),
+    trading_dates: Iterable[date] = (),
+) -> TradingCalendar:
+    """
+    CN A-share calendar: embedded holiday table, plus synced trade dates and manual overrides
+    (`holidays` for ad-hoc closures, `extra_open` to correct a wrong closure).
+    """
+    manual = set(holidays)
+    hol = embedded_cn_holidays() | manual
+    years = set(CN_EXCHANGE_HOLIDAYS)
+    opens = set(trading_dates)
+    if opens:
+        synced = TradingCalendar.from_trading_dates(opens)
+        # Synced years are authoritative; keep embedded holidays for the rest.
+        hol = {d for d in hol if d.year not in synced.covered_years} | set(synced.holidays) | manual
+        years |= synced.covered_years
+    opened = set(extra_open)
+    return TradingCalendar(hol - opened, extra_open=opened, covered_years=years)
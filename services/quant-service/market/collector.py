@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import Any
+
+DEFAULT_WORKERS = 6
+DEFAULT_RATE_PER_S = 8.0
+DEFAULT_INTERVAL_S = 60.0
+# A symbol counts as kept current while its last successful collect is at most this many
+# intervals old (one missed cycle is tolerated; repeated failures or lagging cycles are not).
+COVER_INTERVALS = 2.0
+
+# Failed symbols kept in a cycle report (the count is always exact).
+MAX_ERROR_SAMPLES = 20
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all fetch workers: at most `rate_per_s` calls per second on average,
+    with bursts of up to `burst` calls after an idle period.
+    """
+
+    def __init__(self, rate_per_s: float, *, burst: int | None = None) -> None:
+        self.rate_per_s = max(0.01, float(rate_per_s))
+        self.burst = max(1, int(burst if burst is not None else round(self.rate_per_s)))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available; returns the seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.burst), self._tokens + (now - self._last) * self.rate_per_s
+                )
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate_per_s
+            time.sleep(delay)
+            waited += delay
+
+
+class MinuteCollector:
+    """
+    Keeps intraday minute bars current for a symbol universe off the request path. Each cycle
+    resolves `universe()` and runs `collect(symbol)` (which fetches and appends what is new and
+    returns the number of rows written) on a bounded pool behind a shared rate limiter. A daemon
+    thread repeats cycles every `interval_s` while `is_active()` holds.
+    """
+
+    def __init__(
+        self,
+        universe: Callable[[], Iterable[str]],
+        collect: Callable[[str], int],
+        *,
+        is_active: Callable[[], bool],
+        workers: int = DEFAULT_WORKERS,
+        rate_per_s: float = DEFAULT_RATE_PER_S,
+        interval_s: float = DEFAULT_INTERVAL_S,
+        on_cycle: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        self._universe = universe
+        self._collect = collect
+        self._is_active = is_active
+        self.workers = max(1, int(workers))
+        self.limiter = RateLimiter(rate_per_s)
+        self.interval_s = max(1.0, float(interval_s))
+        self._on_cycle = on_cycle
+        self._lock = threading.Lock()  # one cycle at a time (thread vs. manual runs)
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.symbols: frozenset[str] = frozenset()
+        self.last_report: dict[str, Any] | None = None
+        # symbol -> monotonic time of its last successful collect
+        self._last_ok: dict[str, float] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def covers(self, symbol: str) -> bool:
+        """
+        True while the background thread keeps `symbol` current: it is in the last universe and
+        was collected successfully within `COVER_INTERVALS` intervals.
+        """
+        if not self.running or symbol not in self.symbols:
+            return False
+        last = self._last_ok.get(symbol)
+        return last is not None and time.monotonic() - last <= COVER_INTERVALS * self.interval_s
+
+    def _one(self, symbol: str) -> tuple[str, int, str | None]:
+        self.limiter.acquire()
+        try:
+            return symbol, int(self._collect(symbol) or 0), None
+        except Exception as e:
+            return symbol, 0, str(e) or type(e).__name__
+
+    def run_once(self, symbols: Iterable[str] | None = None) -> dict[str, Any]:
+        t0 = time.perf_counter()
+        with self._lock:
+            wanted = list(dict.fromkeys(symbols if symbols is not None else self._universe()))
+            if symbols is None:
+                self.symbols = frozenset(wanted)
+                self._last_ok = {s: t for s, t in self._last_ok.items() if s in self.symbols}
+            ok = appended = 0
+            errors: dict[str, str] = {}
+            failed = 0
+            if wanted:
+                with ThreadPoolExecutor(
+                    max_workers=min(self.workers, len(wanted)), thread_name_prefix="minute-collect"
+                ) as pool:
+                    for sym, n, err in pool.map(self._one, wanted):
+                        if err is None:
+                            self._last_ok[sym] = time.monotonic()
+                            ok += 1
+                            appended += n
+                        else:
+                            failed += 1
+                            if len(errors) < MAX_ERROR_SAMPLES:
+                                errors[sym] = err
+        report = {
+            "ranAt": datetime.now(tz=UTC).isoformat(),
+            "durationMs": round((time.perf_counter() - t0) * 1000.0, 3),
+            "symbols": len(wanted),
+            "ok": ok,
+            "failed": failed,
+            "appended": appended,
+            "errors": errors,
+        }
+        self.last_report = report
+        if self._on_cycle is not None:
+            self._on_cycle(report)
+        return report
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                if self._is_active():
+                    self.run_once()
+            except Exception:
+                # Never let a failed cycle stop the collector.
+                pass
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._loop, name="minute-collector", daemon=True)
+            self._thread.start()
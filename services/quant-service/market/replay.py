@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+from datetime import time as dtime
+from pathlib import Path
+from typing import Any
+
+MODES = ("live", "record", "replay")
+
+# Values that look like trade dates (2026-01-07 / 20260107); see `FixtureStore.path`.
+_DATE_LIKE = re.compile(r"^\d{4}-?\d{2}-?\d{2}$")
+
+
+class FixtureMissingError(LookupError):
+    """
+    Replay mode found no recorded response for an upstream call.
+    """
+
+
+def upstream_mode() -> str:
+    """
+    `UPSTREAM_MODE`: live (default) calls upstreams; record calls them and writes fixtures;
+    replay serves fixtures only and never touches the network.
+    """
+    mode = (os.getenv("UPSTREAM_MODE") or "live").strip().lower()
+    return mode if mode in MODES else "live"
+
+
+def fixtures_dir() -> Path:
+    raw = (os.getenv("UPSTREAM_FIXTURES_DIR") or "").strip()
+    if raw:
+        return Path(raw)
+    return Path(__file__).resolve().parent.parent / "data" / "upstream_fixtures"
+
+
+def replay_latency_s(recorded_ms: float) -> float:
+    """
+    `UPSTREAM_REPLAY_LATENCY_MS`: unset/0 replays instantly, a number sleeps that long per call,
+    and `recorded` sleeps for the latency observed when the fixture was recorded.
+    """
+    raw = (os.getenv("UPSTREAM_REPLAY_LATENCY_MS") or "").strip().lower()
+    if not raw:
+        return 0.0
+    if raw == "recorded":
+        return max(0.0, float(recorded_ms)) / 1000.0
+    try:
+        return max(0.0, float(raw)) / 1000.0
+    except ValueError:
+        return 0.0
+
+
+def _encode_value(v: Any) -> Any:
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    # Timestamp subclasses datetime; keep it distinct so replayed frames hold the same type.
+    if type(v).__name__ == "Timestamp":
+        return {"$ts": v.isoformat()}
+    if isinstance(v, datetime):
+        return {"$dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"$date": v.isoformat()}
+    if isinstance(v, dtime):
+        return {"$time": v.isoformat()}
+    if isinstance(v, dict):
+        return {str(k): _encode_value(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_encode_value(x) for x in v]
+    if type(v).__name__ == "NaTType":
+        return None
+    if hasattr(v, "item"):
+        # numpy scalars (int64/float64/bool_).
+        return _encode_value(v.item())
+    return str(v)
+
+
+def _decode_value(v: Any) -> Any:
+    if isinstance(v, list):
+        return [_decode_value(x) for x in v]
+    if not isinstance(v, dict):
+        return v
+    if len(v) == 1:
+        ((tag, s),) = v.items()
+        if tag == "$ts":
+            import pandas as pd  # type: ignore
+
+            return pd.Timestamp(s)
+        if tag == "$dt":
+            return datetime.fromisoformat(s)
+        if tag == "$date":
+            return date.fromisoformat(s)
+        if tag == "$time":
+            return dtime.fromisoformat(s)
+    return {k: _decode_value(x) for k, x in v.items()}
+
+
+def encode_result(result: Any) -> dict[str, Any]:
+    """
+    Serialize an upstream result. DataFrames keep columns and row values (not the index; callers
+    only read records), bytes are base64'd, anything else must be JSON-like.
+    """
+    if isinstance(result, (bytes, bytearray)):
+        return {"kind": "bytes", "data": base64.b64encode(bytes(result)).decode("ascii")}
+    if hasattr(result, "to_dict") and hasattr(result, "columns"):
+        split = result.to_dict("split")
+        return {
+            "kind": "dataframe",
+            "columns": _encode_value(list(split.get("columns") or [])),
+            "data": _encode_value(split.get("data") or []),
+        }
+    return {"kind": "json", "data": _encode_value(result)}
+
+
+def decode_result(payload: dict[str, Any]) -> Any:
+    kind = payload.get("kind")
+    if kind == "bytes":
+        return base64.b64decode(str(payload.get("data") or ""))
+    if kind == "dataframe":
+        import pandas as pd  # type: ignore
+
+        return pd.DataFrame(
+            _decode_value(payload.get("data") or []),
+            columns=_decode_value(payload.get("columns") or []),
+        )
+    return _decode_value(payload.get("data"))
+
+
+def _digest(obj: Any) -> str:
+    raw = json.dumps(_encode_value(obj), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _loosen(obj: Any) -> Any:
+    if isinstance(obj, str) and _DATE_LIKE.match(obj):
+        return "*"
+    if isinstance(obj, date):
+        return "*"
+    if isinstance(obj, dict):
+        return {k: _loosen(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_loosen(v) for v in obj]
+    return obj
+
+
+class FixtureStore:
+    """
+    Recorded upstream responses: `<root>/<upstream>/<op>/<loose>-<exact>.json.gz`.
+
+    `exact` hashes the call arguments; `loose` hashes them with date-like values masked. Fetchers
+    derive date windows from today's date, so replay falls back to the newest fixture with the
+    same loose key when the exact one is missing (e.g. replaying yesterday's recording).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def _dir(self, upstream: str, op: str) -> Path:
+        safe_op = re.sub(r"[^A-Za-z0-9_.-]+", "_", op).strip("_") or "op"
+        return self.root / upstream / safe_op
+
+    def path(self, upstream: str, op: str, key: Any) -> Path:
+        return self._dir(upstream, op) / f"{_digest(_loosen(key))}-{_digest(key)}.json.gz"
+
+    def save(self, upstream: str, op: str, key: Any, result: Any, *, latency_ms: float) -> Path:
+        p = self.path(upstream, op, key)
+        doc = {
+            "upstream": upstream,
+            "op": op,
+            "key": _encode_value(key),
+            "recordedAt": datetime.now(tz=UTC).isoformat(),
+            "latencyMs": round(float(latency_ms), 3),
+            "result": encode_result(result),
+        }
+        raw = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # Per-thread temp file + atomic rename: concurrent recorders never see partial fixtures.
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        # mtime=0 keeps re-recordings of identical responses byte-identical.
+        tmp.write_bytes(gzip.compress(raw, mtime=0))
+        os.replace(tmp, p)
+        return p
+
+    def load(self, upstream: str, op: str, key: Any) -> dict[str, Any]:
+        p = self.path(upstream, op, key)
+        if not p.is_file():
+            loose = p.name.split("-", 1)[0]
+            candidates = sorted(
+                p.parent.glob(f"{loose}-*.json.gz"), key=lambda c: c.stat().st_mtime, reverse=True
+            )
+            if not candidates:
+                raise FixtureMissingError(
+                    f"No {upstream} fixture for {op} {key!r} under {self.root}"
+                )
+            p = candidates[0]
+        doc = json.loads(gzip.decompress(p.read_bytes()).decode("utf-8"))
+        if not isinstance(doc, dict):
+            raise FixtureMissingError(f"Corrupt fixture {p}")
+        return doc
+
+
+def call_upstream(upstream: str, op: str, key: Any, fetch: Callable[[], Any]) -> Any:
+    """
+    Route one upstream call through the current mode. `key` identifies the call (arguments,
+    without volatile values such as cache-busting timestamps).
+    """
+    mode = upstream_mode()
+    if mode == "live":
+        return fetch()
+    store = FixtureStore(fixtures_dir())
+    if mode == "record":
+        t0 = time.perf_counter()
+        result = fetch()
+        store.save(upstream, op, key, result, latency_ms=(time.perf_counter() - t0) * 1000.0)
+        return result
+    doc = store.load(upstream, op, key)
+    delay = replay_latency_s(float(doc.get("latencyMs") or 0.0))
+    if delay > 0:
+        time.sleep(delay)
+    return decode_result(doc.get("result") or {})
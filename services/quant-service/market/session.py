@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+from .calendar import TradingCalendar
+
+CN_TZ = ZoneInfo("Asia/Shanghai")
+
+# A-share sessions (Asia/Shanghai). The 09:15-09:25 call auction is treated as pre-open.
+CN_OPEN = time(9, 30)
+CN_LUNCH_START = time(11, 30)
+CN_LUNCH_END = time(13, 0)
+CN_CLOSE = time(15, 0)
+
+HOLIDAY = "holiday"
+PRE_OPEN = "pre_open"
+CONTINUOUS = "continuous"
+LUNCH_BREAK = "lunch_break"
+POST_CLOSE = "post_close"
+
+
+def cn_now() -> datetime:
+    return datetime.now(tz=CN_TZ)
+
+
+def to_cn(dt: datetime) -> datetime:
+    """
+    Convert to Asia/Shanghai; naive datetimes are assumed to be UTC (as stored by `now_iso()`).
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("UTC"))
+    return dt.astimezone(CN_TZ)
+
+
+def cn_session(now: datetime, cal: TradingCalendar) -> str:
+    """
+    Trading session phase for `now`: holiday | pre_open | continuous | lunch_break | post_close.
+    """
+    n = to_cn(now)
+    if not cal.is_trading_day(n.date()):
+        return HOLIDAY
+    t = n.time()
+    if t < CN_OPEN:
+        return PRE_OPEN
+    if t < CN_LUNCH_START:
+        return CONTINUOUS
+    if t < CN_LUNCH_END:
+        return LUNCH_BREAK
+    if t < CN_CLOSE:
+        return CONTINUOUS
+    return POST_CLOSE
+
+
+def cn_at(d: date, t: time) -> datetime:
+    return datetime.combine(d, t, tzinfo=CN_TZ)
@@ -0,0 +1,34 @@
+from .registry import DEFAULT_BUCKETS, Counter, Histogram, MetricsRegistry, format_sample, registry
+from .service import (
+    HTTP_REQUEST_SECONDS,
+    SQLITE_SECONDS,
+    SYNC_STEP_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_SECONDS,
+    cache_stats_collector,
+    observe_upstream,
+)
+from .tracing import Span, annotate, current_span, span, stage, trace, traced
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "HTTP_REQUEST_SECONDS",
+    "SQLITE_SECONDS",
+    "SYNC_STEP_SECONDS",
+    "UPSTREAM_ERRORS",
+    "UPSTREAM_SECONDS",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "Span",
+    "annotate",
+    "cache_stats_collector",
+    "current_span",
+    "format_sample",
+    "observe_upstream",
+    "registry",
+    "span",
+    "stage",
+    "trace",
+    "traced",
+]
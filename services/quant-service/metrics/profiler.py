@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from types import FrameType
+
+# Frames are labelled relative to this directory (the quant-service root).
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_INTERVAL_S = 0.01
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    try:
+        where = path.resolve().relative_to(SERVICE_ROOT).as_posix()
+    except (ValueError, OSError):
+        where = path.name
+    # First line of the function (not the current line) so samples merge per function.
+    return f"{code.co_name} ({where}:{code.co_firstlineno})"
+
+
+def _is_service_frame(frame: FrameType) -> bool:
+    fn = frame.f_code.co_filename
+    return fn.startswith(str(SERVICE_ROOT)) and "site-packages" not in fn
+
+
+@dataclass(frozen=True)
+class ProfileMeta:
+    id: str
+    name: str
+    kind: str  # operation | request | window
+    startedAt: str
+    durationMs: float
+    intervalMs: float
+    samples: int
+    stacks: int
+
+
+class SamplingProfiler:
+    """
+    Statistical stack sampler built on `sys._current_frames()` (no tracing hooks, no native deps).
+
+    With `thread_ids` set, only those threads are sampled. Otherwise every thread is sampled but
+    only stacks that pass through service code are kept, which drops idle pool/event-loop threads.
+    Output is the "folded stacks" format (`root;child;leaf count`) read by flamegraph.pl and
+    speedscope.
+    """
+
+    def __init__(
+        self,
+        *,
+        thread_ids: set[int] | None = None,
+        interval_s: float = DEFAULT_INTERVAL_S,
+    ) -> None:
+        self.thread_ids = thread_ids
+        self.interval_s = max(0.001, float(interval_s))
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+        self.started_at = ""
+        self.duration_s = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._t0 = 0.0
+
+    def _sample_once(self, own_ident: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if self.thread_ids is not None and ident not in self.thread_ids:
+                continue
+            stack: list[str] = []
+            has_service = False
+            f: FrameType | None = frame
+            while f is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(f))
+                has_service = has_service or _is_service_frame(f)
+                f = f.f_back
+            if self.thread_ids is None and not has_service:
+                continue
+            stack.append(f"thread:{names.get(ident, ident)}")
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            self._sample_once(own)
+
+    def start(self) -> SamplingProfiler:
+        self.started_at = datetime.now(tz=UTC).isoformat()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> SamplingProfiler:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration_s = time.perf_counter() - self._t0
+        return self
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+class ProfileStore:
+    """
+    Captured profiles on disk: `<id>.folded` plus a `<id>.json` metadata sidecar.
+    """
+
+    def __init__(self, root: Path, *, keep: int = 50) -> None:
+        self.root = Path(root)
+        self.keep = max(1, int(keep))
+
+    def save(self, prof: SamplingProfiler, *, name: str, kind: str) -> ProfileMeta:
+        self.root.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-")[:60] or "profile"
+        stamp = datetime.now(tz=UTC).strftime("%Y%m%dT%H%M%SZ")
+        meta = ProfileMeta(
+            id=f"{stamp}-{slug}-{uuid.uuid4().hex[:8]}",
+            name=name,
+            kind=kind,
+            startedAt=prof.started_at,
+            durationMs=round(prof.duration_s * 1000.0, 1),
+            intervalMs=round(prof.interval_s * 1000.0, 3),
+            samples=prof.samples,
+            stacks=len(prof.counts),
+        )
+        self.root.joinpath(f"{meta.id}.folded").write_text(prof.folded(), encoding="utf-8")
+        self.root.joinpath(f"{meta.id}.json").write_text(json.dumps(asdict(meta)), encoding="utf-8")
+        self._prune()
+        return meta
+
+    def list(self) -> list[ProfileMeta]:
+        if not self.root.is_dir():
+            return []
+        out: list[ProfileMeta] = []
+        for p in self.root.glob("*.json"):
+            try:
+                out.append(ProfileMeta(**json.loads(p.read_text(encoding="utf-8"))))
+            except (OSError, ValueError, TypeError):
+                continue
+        out.sort(key=lambda m: m.id, reverse=True)
+        return out
+
+    def path(self, profile_id: str) -> Path | None:
+        if not re.fullmatch(r"[A-Za-z0-9_.-]+", profile_id or ""):
+            return None
+        p = self.root.joinpath(f"{profile_id}.folded")
+        return p if p.is_file() else None
+
+    def _prune(self) -> None:
+        for meta in self.list()[self.keep :]:
+            for ext in (".folded", ".json"):
+                try:
+                    os.remove(self.root.joinpath(f"{meta.id}{ext}"))
+                except OSError:
+                    pass
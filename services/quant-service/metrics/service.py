@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from .registry import format_sample, registry
+from .tracing import span
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "quant_http_request_duration_seconds",
+    "FastAPI request latency by route template.",
+    ("method", "route", "status"),
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "quant_upstream_request_duration_seconds",
+    "Latency of calls to external data/AI services (one observation per attempt).",
+    ("upstream", "op"),
+)
+UPSTREAM_ERRORS = registry.counter(
+    "quant_upstream_errors_total",
+    "Failed calls to external data/AI services.",
+    ("upstream", "op"),
+)
+SQLITE_SECONDS = registry.histogram(
+    "quant_sqlite_duration_seconds",
+    "Time spent inside a `with _connect()` block, by calling helper.",
+    ("helper",),
+)
+SYNC_STEP_SECONDS = registry.histogram(
+    "quant_dashboard_sync_step_duration_seconds",
+    "Duration of each /dashboard/sync step.",
+    ("step", "ok"),
+)
+
+
+@contextmanager
+def observe_upstream(upstream: str, op: str) -> Iterator[None]:
+    """
+    Time one upstream call; exceptions are counted as errors and re-raised.
+    """
+    t0 = time.perf_counter()
+    try:
+        # Also a leaf span when a pipeline trace is active.
+        with span(f"{upstream}:{op}"):
+            yield
+    except BaseException:
+        UPSTREAM_ERRORS.inc(upstream=upstream, op=op)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, upstream=upstream, op=op)
+
+
+def cache_stats_collector(
+    snapshot: Callable[[], dict[str, dict[str, Any]]],
+) -> Callable[[], list[str]]:
+    """
+    Expose a `CacheStats.snapshot()`-shaped source as hit/miss counters and a hit-ratio gauge.
+    """
+
+    def collect() -> list[str]:
+        snap = snapshot()
+        total = [
+            "# HELP quant_cache_requests_total Cache lookups by cache name and result.",
+            "# TYPE quant_cache_requests_total counter",
+        ]
+        ratio = [
+            "# HELP quant_cache_hit_ratio Hits / lookups since process start.",
+            "# TYPE quant_cache_hit_ratio gauge",
+        ]
+        for name, s in sorted(snap.items()):
+            total.append(
+                format_sample(
+                    "quant_cache_requests_total",
+                    {"cache": name, "result": "hit"},
+                    s.get("hits") or 0,
+                )
+            )
+            total.append(
+                format_sample(
+                    "quant_cache_requests_total",
+                    {"cache": name, "result": "miss"},
+                    s.get("misses") or 0,
+                )
+            )
+            if s.get("hitRatio") is not None:
+                ratio.append(format_sample("quant_cache_hit_ratio", {"cache": name}, s["hitRatio"]))
+        return total + ratio
+
+    return collect
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from typing import Any
+
+# Bound a single span's fan-out (e.g. one AkShare call per symbol) to keep stored traces small.
+MAX_CHILDREN = 200
+
+
+class Span:
+    """
+    One timed stage: name, wall-clock start, duration, free-form attributes and child spans.
+    """
+
+    __slots__ = (
+        "name",
+        "attrs",
+        "start",
+        "t0",
+        "duration_ms",
+        "parent",
+        "children",
+        "dropped",
+        "error",
+        "stage",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        attrs: dict[str, Any] | None = None,
+        *,
+        parent: Span | None = None,
+        stage: bool = False,
+    ) -> None:
+        self.name = name
+        self.attrs: dict[str, Any] = dict(attrs or {})
+        self.start = datetime.now(tz=UTC).isoformat()
+        self.t0 = time.perf_counter()
+        self.duration_ms: float | None = None
+        self.parent = parent
+        self.children: list[Span] = []
+        self.dropped = 0
+        self.error: str | None = None
+        self.stage = stage
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def _add(self, child: Span) -> bool:
+        if len(self.children) >= MAX_CHILDREN:
+            self.dropped += 1
+            return False
+        self.children.append(child)
+        return True
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if self.duration_ms is not None:
+            return
+        for c in self.children:
+            c.finish()
+        self.duration_ms = round((time.perf_counter() - self.t0) * 1000.0, 3)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self, *, origin: float | None = None) -> dict[str, Any]:
+        base = self.t0 if origin is None else origin
+        out: dict[str, Any] = {
+            "name": self.name,
+            "start": self.start,
+            "startOffsetMs": round((self.t0 - base) * 1000.0, 3),
+            "durationMs": self.duration_ms,
+            "attrs": self.attrs,
+            "children": [c.to_dict(origin=base) for c in self.children],
+        }
+        if self.error:
+            out["error"] = self.error
+        if self.dropped:
+            out["droppedChildren"] = self.dropped
+        return out
+
+
+_current: ContextVar[Span | None] = ContextVar("trace_current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def _enter(sp: Span) -> Iterator[Span]:
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.finish(e)
+        raise
+    finally:
+        sp.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Span]:
+    """
+    Start a trace. Inside another trace this nests as a child span, so a pipeline that runs a
+    sub-pipeline (leader -> mainline) gets one tree while the sub-pipeline can still be stored alone.
+    """
+    parent = _current.get()
+    sp = Span(name, attrs, parent=parent)
+    if parent is not None:
+        parent._add(sp)
+    with _enter(sp):
+        yield sp
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    """
+    Child span of the current one; a no-op (yields None) when no trace is active.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    sp = Span(name, attrs, parent=parent)
+    if not parent._add(sp):
+        yield None
+        return
+    with _enter(sp):
+        yield sp
+
+
+def stage(name: str, **attrs: Any) -> Span | None:
+    """
+    Mark the start of the next sequential stage, closing the previous one.
+
+    Stages avoid re-indenting long pipeline bodies: spans opened while a stage is current nest
+    under it, and the enclosing trace/span closes the last stage on exit.
+    """
+    cur = _current.get()
+    if cur is None:
+        return None
+    owner = cur
+    if cur.stage and cur.parent is not None:
+        cur.finish()
+        owner = cur.parent
+    sp = Span(name, attrs, parent=owner, stage=True)
+    if not owner._add(sp):
+        return None
+    _current.set(sp)
+    return sp
+
+
+def annotate(**attrs: Any) -> Span | None:
+    """
+    Set attributes on the span that owns the current stage (the enclosing trace or span), e.g. a
+    result id known only part-way through a pipeline. A no-op without an active trace.
+    """
+    cur = _current.get()
+    if cur is None:
+        return None
+    owner = cur.parent if cur.stage and cur.parent is not None else cur
+    owner.set(**attrs)
+    return owner
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator form of `span`.
+    """
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
@@ -0,0 +1,3 @@
+from .bus import QUOTE_FIELDS, QUOTES, RESYNC, Event, EventBus, Subscription
+
+__all__ = ["QUOTE_FIELDS", "QUOTES", "RESYNC", "Event", "EventBus", "Subscription"]
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+QUOTES = "quotes"
+# Sent instead of events a subscriber can no longer receive (queue overflow, replay gap):
+# the client should refetch whatever it shows.
+RESYNC = "resync"
+
+# Quote fields pushed in deltas (provider `StockRow.quote` keys).
+QUOTE_FIELDS = ("price", "change_pct", "volume", "turnover", "vol_ratio")
+
+
+@dataclass(frozen=True)
+class Event:
+    topic: str
+    data: dict[str, Any]
+    id: int | None = None  # None: not replayable (per-subscriber quote deltas, resync)
+    ts: float = 0.0
+
+
+class Subscription:
+    """
+    One client's view of the bus: an optional topic filter, the symbols it wants quote deltas
+    for, and a bounded queue. A subscriber that falls behind gets a single `resync` event
+    instead of an ever-growing backlog.
+    """
+
+    def __init__(
+        self, topics: Iterable[str] | None, symbols: Iterable[str], *, maxsize: int
+    ) -> None:
+        self.topics = frozenset(topics) if topics is not None else None
+        self.symbols = frozenset(symbols)
+        self._queue: queue.Queue[Event] = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._lock = threading.Lock()
+        self._notify: Callable[[], None] | None = None  # wakes a pending `get_async`
+
+    def wants(self, topic: str) -> bool:
+        if topic == RESYNC:
+            return True
+        if topic == QUOTES:
+            return bool(self.symbols) and (self.topics is None or QUOTES in self.topics)
+        return self.topics is None or topic in self.topics
+
+    def offer(self, ev: Event) -> None:
+        with self._lock:
+            try:
+                self._queue.put_nowait(ev)
+            except queue.Full:
+                pass
+            else:
+                self._wake()
+                return
+            # Overflow: drop the backlog, keep one resync marker.
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(Event(RESYNC, {"reason": "overflow"}, ts=time.time()))
+            self._wake()
+
+    def _wake(self) -> None:
+        if self._notify is None:
+            return
+        try:
+            self._notify()
+        except RuntimeError:
+            # The waiting loop is already closed (client gone).
+            pass
+
+    def get(self, timeout: float | None = None) -> Event | None:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def get_async(self, timeout: float | None = None) -> Event | None:
+        """
+        `get()` for event-loop consumers: waits without holding a thread. Publishers (any thread)
+        wake the loop through `call_soon_threadsafe`.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        with self._lock:
+            try:
+                return self._queue.get_nowait()
+            except queue.Empty:
+                self._notify = lambda: loop.call_soon_threadsafe(ready.set)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._notify = None
+        return self.get(0)
+
+
+class EventBus:
+    """
+    In-process pub/sub for server-push (SSE). Topic events get increasing ids and are kept in a
+    short history, so a reconnecting client (`Last-Event-ID`) replays what it missed. Quote deltas
+    are computed against the last pushed values and sent only for each subscriber's symbols.
+    """
+
+    def __init__(self, *, history: int = 256, queue_size: int = 256) -> None:
+        self.queue_size = int(queue_size)
+        self._lock = threading.Lock()
+        self._subs: list[Subscription] = []
+        self._history: deque[Event] = deque(maxlen=max(1, int(history)))
+        self._next_id = 1
+        self._last_quotes: dict[str, dict[str, Any]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def subscribe(
+        self,
+        *,
+        topics: Iterable[str] | None = None,
+        symbols: Iterable[str] = (),
+        last_event_id: int | None = None,
+    ) -> Subscription:
+        sub = Subscription(topics, symbols, maxsize=self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._history[0].id if self._history else self._next_id
+                # A gap, or ids from before a restart (they start over at 1).
+                if last_event_id >= self._next_id or (
+                    oldest is not None and last_event_id + 1 < oldest
+                ):
+                    sub.offer(Event(RESYNC, {"reason": "replay_gap"}, ts=time.time()))
+                for ev in self._history:
+                    if ev.id is not None and ev.id > last_event_id and sub.wants(ev.topic):
+                        sub.offer(ev)
+            self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def publish(self, topic: str, data: Mapping[str, Any]) -> Event:
+        with self._lock:
+            ev = Event(topic, dict(data), id=self._next_id, ts=time.time())
+            self._next_id += 1
+            self._history.append(ev)
+            subs = [s for s in self._subs if s.wants(topic)]
+        for s in subs:
+            s.offer(ev)
+        return ev
+
+    def publish_quotes(self, quotes: Mapping[str, Mapping[str, Any]]) -> int:
+        """
+        `{symbol: quote}` -> per-subscriber `quotes` events holding only changed fields of
+        subscribed symbols. Returns the number of subscribers notified.
+        """
+        with self._lock:
+            subs = [s for s in self._subs if s.wants(QUOTES)]
+            wanted = frozenset().union(*(s.symbols for s in subs)) if subs else frozenset()
+            changes: dict[str, dict[str, Any]] = {}
+            for sym in wanted:
+                q = quotes.get(sym)
+                if q is None:
+                    continue
+                new = {k: q.get(k) for k in QUOTE_FIELDS if q.get(k) not in (None, "")}
+                prev = self._last_quotes.get(sym) or {}
+                diff = {k: v for k, v in new.items() if prev.get(k) != v}
+                if diff:
+                    changes[sym] = diff
+                self._last_quotes[sym] = new
+            # Forget symbols nobody watches any more.
+            for sym in [s for s in self._last_quotes if s not in wanted]:
+                del self._last_quotes[sym]
+        notified = 0
+        now = time.time()
+        for s in subs:
+            payload = {sym: changes[sym] for sym in s.symbols if sym in changes}
+            if payload:
+                s.offer(Event(QUOTES, {"quotes": payload}, ts=now))
+                notified += 1
+        return notified
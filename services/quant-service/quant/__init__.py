@@ -0,0 +1,5 @@
+from .calibration import CalibrationState, find_bucket
+from .intraday import MinuteSeries
+from .sketch import QuantileSketch
+
+__all__ = ["CalibrationState", "MinuteSeries", "QuantileSketch", "find_bucket"]
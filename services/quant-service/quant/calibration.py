@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any
+
+from .sketch import QuantileSketch
+
+# Sketch sizes: edges need accuracy across the whole score range, p10 only in the lower tail.
+EDGE_COMPRESSION = 200.0
+RET_COMPRESSION = 60.0
+
+
+class _Bucket:
+    __slots__ = ("n", "wins", "sum_ret", "sum_dd", "min_raw", "max_raw", "ret_sketch")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.wins = 0
+        self.sum_ret = 0.0
+        self.sum_dd = 0.0
+        self.min_raw: float | None = None
+        self.max_raw: float | None = None
+        self.ret_sketch = QuantileSketch(RET_COMPRESSION)
+
+    def add(self, raw: float, win: int, ret: float, dd: float) -> None:
+        self.n += 1
+        self.wins += 1 if win else 0
+        self.sum_ret += ret
+        self.sum_dd += dd
+        self.min_raw = raw if self.min_raw is None else min(self.min_raw, raw)
+        self.max_raw = raw if self.max_raw is None else max(self.max_raw, raw)
+        self.ret_sketch.add(ret)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "wins": self.wins,
+            "sumRet": self.sum_ret,
+            "sumDd": self.sum_dd,
+            "minRaw": self.min_raw,
+            "maxRaw": self.max_raw,
+            "ret": self.ret_sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> _Bucket:
+        b = cls()
+        b.n = int(d.get("n") or 0)
+        b.wins = int(d.get("wins") or 0)
+        b.sum_ret = float(d.get("sumRet") or 0.0)
+        b.sum_dd = float(d.get("sumDd") or 0.0)
+        b.min_raw = None if d.get("minRaw") is None else float(d["minRaw"])
+        b.max_raw = None if d.get("maxRaw") is None else float(d["maxRaw"])
+        b.ret_sketch = QuantileSketch.from_dict(d.get("ret"))
+        return b
+
+
+class CalibrationState:
+    """
+    Incrementally maintained quant2d calibration for one (account, lookback, buckets) window.
+
+    Bucket edges are equal-frequency cut points taken from a raw-score sketch when the state is
+    (re)built. New outcomes are then routed into the existing buckets by binary search, so each
+    labeled outcome costs O(log buckets) instead of a full re-read and re-sort of the window.
+    Edges drift as the score distribution shifts; `needs_rebalance()` tells the owner when a
+    rebuild is worthwhile.
+    """
+
+    def __init__(self, *, buckets: int, edges: list[float] | None = None) -> None:
+        self.buckets = int(buckets)
+        self.edges: list[float] = list(edges or [])
+        self.score_sketch = QuantileSketch(EDGE_COMPRESSION)
+        self.items: list[_Bucket] = [_Bucket() for _ in range(len(self.edges) + 1)]
+        self.n = 0
+        self.built_n = 0
+
+    @classmethod
+    def build(cls, points: list[tuple[float, int, float, float]], *, buckets: int) -> CalibrationState:
+        """
+        Two streaming passes: sketch raw scores to derive edges, then route points into buckets.
+        """
+        sk = QuantileSketch(EDGE_COMPRESSION)
+        for raw, _, _, _ in points:
+            sk.add(raw)
+        edges: list[float] = []
+        if points:
+            for i in range(1, int(buckets)):
+                e = sk.quantile(i / float(buckets))
+                if not edges or e > edges[-1]:
+                    edges.append(e)
+        st = cls(buckets=buckets, edges=edges)
+        st.score_sketch = sk
+        for raw, win, ret, dd in points:
+            st._route(raw, win, ret, dd)
+        st.built_n = st.n
+        return st
+
+    def _route(self, raw: float, win: int, ret: float, dd: float) -> None:
+        self.items[bisect_right(self.edges, raw)].add(raw, win, ret, dd)
+        self.n += 1
+
+    def observe(self, raw: float, win: int, ret: float, dd: float) -> None:
+        self.score_sketch.add(raw)
+        self._route(raw, win, ret, dd)
+
+    def needs_rebalance(self) -> bool:
+        """
+        True when buckets are no longer roughly equal-frequency (largest bucket > 2x the target),
+        or when the window was built from too few points to cut all buckets and has since doubled.
+        """
+        nb = len(self.items)
+        if nb < self.buckets and self.n >= 2 * max(self.built_n, self.buckets):
+            return True
+        if self.n < 2 * nb or nb <= 1:
+            return False
+        target = self.n / float(nb)
+        return max(b.n for b in self.items) > 2.0 * target
+
+    def to_output(self) -> dict[str, Any]:
+        """
+        Output compatible with the original calibration payload, plus sorted bucket bounds for lookup.
+        """
+        items: list[dict[str, Any]] = []
+        los: list[float] = []
+        his: list[float] = []
+        for b in self.items:
+            if b.n <= 0 or b.min_raw is None or b.max_raw is None:
+                continue
+            p10 = b.ret_sketch.quantile(0.10) if b.n >= 2 else b.sum_ret / b.n
+            items.append(
+                {
+                    "minRawScore": float(b.min_raw),
+                    "maxRawScore": float(b.max_raw),
+                    "n": int(b.n),
+                    "probWin": float(b.wins) / float(b.n),  # 0..1
+                    "ev2dPct": float(b.sum_ret) / float(b.n),
+                    "p10Ret2dPct": float(p10),
+                    "dd2dPct": float(b.sum_dd) / float(b.n),
+                }
+            )
+            los.append(float(b.min_raw))
+            his.append(float(b.max_raw))
+        return {"buckets": self.buckets, "n": self.n, "items": items, "bucketLo": los, "bucketHi": his}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": self.buckets,
+            "edges": self.edges,
+            "n": self.n,
+            "builtN": self.built_n,
+            "scores": self.score_sketch.to_dict(),
+            "items": [b.to_dict() for b in self.items],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> CalibrationState:
+        edges0 = d.get("edges")
+        edges = [float(x) for x in edges0] if isinstance(edges0, list) else []
+        st = cls(buckets=int(d.get("buckets") or 20), edges=edges)
+        st.n = int(d.get("n") or 0)
+        st.built_n = int(d.get("builtN") or 0)
+        st.score_sketch = QuantileSketch.from_dict(d.get("scores"))
+        items0 = d.get("items")
+        items = [_Bucket.from_dict(x) for x in items0 if isinstance(x, dict)] if isinstance(items0, list) else []
+        if len(items) == len(edges) + 1:
+            st.items = items
+        return st
+
+
+def find_bucket(calib: dict[str, Any], raw_score: float) -> dict[str, Any] | None:
+    """
+    Binary search over sorted, non-overlapping bucket bounds; nearest bucket if outside all.
+    """
+    items = calib.get("items") if isinstance(calib, dict) else None
+    if not isinstance(items, list) or not items:
+        return None
+    los = calib.get("bucketLo")
+    his = calib.get("bucketHi")
+    if not isinstance(los, list) or not isinstance(his, list) or len(los) != len(items) or len(his) != len(items):
+        # Legacy payloads without precomputed bounds.
+        rows = [it for it in items if isinstance(it, dict)]
+        if len(rows) != len(items):
+            return None
+        los = [float(it.get("minRawScore") or 0.0) for it in rows]
+        his = [float(it.get("maxRawScore") or 0.0) for it in rows]
+    s = float(raw_score or 0.0)
+    i = bisect_right(los, s) - 1
+    if i >= 0 and s <= float(his[i]):
+        return items[i]
+    # Between buckets (or outside the range): pick the closer neighbour.
+    cands = [j for j in (i, i + 1) if 0 <= j < len(items)]
+    best = min(cands, key=lambda j: min(abs(s - float(los[j])), abs(s - float(his[j]))))
+    return items[best]
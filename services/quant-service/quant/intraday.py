@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+# Longest lookback any feature needs (lateRet30 compares against 30 minutes back).
+MAX_LOOKBACK = 30
+VOLUME_BLOCK = 15
+
+EMPTY_FEATURES: dict[str, float] = {
+    "vwapAboveRatio": 0.0,
+    "mom5": 0.0,
+    "mom15": 0.0,
+    "posMinutesRatio": 0.0,
+    "pullbackRatio": 1.0,
+    "closeNearHigh": 0.0,
+    "lateRet15": 0.0,
+    "lateRet30": 0.0,
+    "lateVolSpike": 0.0,
+}
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(str(v).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def normalize_bar(bar: dict[str, Any]) -> dict[str, Any]:
+    """
+    Provider minute bar (strings or numbers) -> {"ts", "open", "high", "low", "close", "volume", "amount"}.
+    """
+    return {
+        "ts": str(bar.get("ts") or ""),
+        "open": _num(bar.get("open")),
+        "high": _num(bar.get("high")),
+        "low": _num(bar.get("low")),
+        "close": _num(bar.get("close")),
+        "volume": _num(bar.get("volume")),
+        "amount": _num(bar.get("amount")),
+    }
+
+
+class _Acc:
+    """
+    Running aggregates over sealed minutes: cumulative VWAP inputs, up-minute count, day high,
+    the last `MAX_LOOKBACK + 1` closes and 15-minute volume blocks.
+    """
+
+    __slots__ = (
+        "n",
+        "cum_amt",
+        "cum_vol",
+        "above",
+        "pos",
+        "first_close",
+        "day_high",
+        "closes",
+        "blocks",
+    )
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.cum_amt = 0.0
+        self.cum_vol = 0.0
+        self.above = 0
+        self.pos = 0
+        self.first_close = 0.0
+        self.day_high: float | None = None
+        self.closes: deque[float] = deque(maxlen=MAX_LOOKBACK + 1)
+        self.blocks: list[float] = []
+
+    def copy(self) -> _Acc:
+        c = _Acc()
+        for name in ("n", "cum_amt", "cum_vol", "above", "pos", "first_close", "day_high"):
+            setattr(c, name, getattr(self, name))
+        c.closes = deque(self.closes, maxlen=MAX_LOOKBACK + 1)
+        c.blocks = list(self.blocks)
+        return c
+
+    def push(self, b: dict[str, Any]) -> None:
+        close, v, a = b["close"], b["volume"], b["amount"]
+        if v > 0:
+            self.cum_vol += v
+            self.cum_amt += a if a > 0 else (close * v)
+        vwap = (self.cum_amt / self.cum_vol) if self.cum_vol > 0 else close
+        if close >= vwap:
+            self.above += 1
+        if self.n == 0:
+            self.first_close = close
+        elif close > self.closes[-1]:
+            self.pos += 1
+        self.day_high = b["high"] if self.day_high is None else max(self.day_high, b["high"])
+        if self.n % VOLUME_BLOCK == 0:
+            self.blocks.append(0.0)
+        self.blocks[-1] += v
+        self.closes.append(close)
+        self.n += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "cumAmt": self.cum_amt,
+            "cumVol": self.cum_vol,
+            "above": self.above,
+            "pos": self.pos,
+            "firstClose": self.first_close,
+            "dayHigh": self.day_high,
+            "closes": list(self.closes),
+            "blocks": self.blocks,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> _Acc:
+        c = cls()
+        c.n = int(d.get("n") or 0)
+        c.cum_amt = float(d.get("cumAmt") or 0.0)
+        c.cum_vol = float(d.get("cumVol") or 0.0)
+        c.above = int(d.get("above") or 0)
+        c.pos = int(d.get("pos") or 0)
+        c.first_close = float(d.get("firstClose") or 0.0)
+        c.day_high = None if d.get("dayHigh") is None else float(d["dayHigh"])
+        c.closes = deque((float(x) for x in d.get("closes") or []), maxlen=MAX_LOOKBACK + 1)
+        c.blocks = [float(x) for x in d.get("blocks") or []]
+        return c
+
+
+class MinuteSeries:
+    """
+    One symbol's session, maintained incrementally. Every minute but the latest is folded into
+    running aggregates; the latest stays provisional because an open session keeps revising it.
+    `extend()` and `features()` cost O(new minutes), never O(session).
+    """
+
+    def __init__(self) -> None:
+        self._acc = _Acc()
+        self.tail: dict[str, Any] | None = None
+
+    @property
+    def count(self) -> int:
+        return self._acc.n + (1 if self.tail is not None else 0)
+
+    @property
+    def last_ts(self) -> str:
+        return str(self.tail["ts"]) if self.tail is not None else ""
+
+    def extend(self, bars: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Apply a (full or partial) minute list; returns the normalized bars that are new or revise
+        the provisional latest minute. Minutes older than the latest are already sealed and skipped.
+        """
+        changed: list[dict[str, Any]] = []
+        for b in sorted((normalize_bar(x) for x in bars), key=lambda x: x["ts"]):
+            if not b["ts"]:
+                continue
+            if self.tail is not None:
+                if b["ts"] < self.tail["ts"]:
+                    continue
+                if b["ts"] == self.tail["ts"]:
+                    if b != self.tail:
+                        self.tail = b
+                        changed.append(b)
+                    continue
+                self._acc.push(self.tail)
+            self.tail = b
+            changed.append(b)
+        return changed
+
+    def features(self) -> dict[str, float]:
+        if self.tail is None:
+            return dict(EMPTY_FEATURES)
+        acc = self._acc.copy()
+        acc.push(self.tail)
+        closes = acc.closes
+
+        def _mom(n: int) -> float:
+            if acc.n <= n or closes[-1] <= 0 or closes[-1 - n] <= 0:
+                return 0.0
+            return (closes[-1] / closes[-1 - n] - 1.0) * 100.0
+
+        day_high = acc.day_high or 0.0
+        last_close = closes[-1]
+        # Pullback ratio: (day_high - last_close) / max(1e-9, day_high - first_close)
+        denom = max(1e-9, (day_high - acc.first_close))
+        pullback_ratio = max(0.0, min(1.0, (day_high - last_close) / denom))
+        blocks = acc.blocks
+        last_block = blocks[-1]
+        avg_block = (sum(blocks[:-1]) / (len(blocks) - 1)) if len(blocks) > 1 else blocks[0]
+        return {
+            "vwapAboveRatio": float(acc.above) / float(acc.n),
+            "mom5": float(_mom(5)),
+            "mom15": float(_mom(15)),
+            "posMinutesRatio": float(acc.pos) / float(max(1, acc.n - 1)),
+            "pullbackRatio": float(pullback_ratio),
+            "closeNearHigh": 1.0 if (day_high > 0 and last_close >= day_high * 0.99) else 0.0,
+            "lateRet15": float(_mom(15)),
+            "lateRet30": float(_mom(30)),
+            "lateVolSpike": (last_block / avg_block) if (last_block > 0 and avg_block > 0) else 0.0,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"acc": self._acc.to_dict(), "tail": self.tail}
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> MinuteSeries:
+        s = cls()
+        acc = d.get("acc")
+        s._acc = _Acc.from_dict(acc if isinstance(acc, dict) else {})
+        tail = d.get("tail")
+        s.tail = normalize_bar(tail) if isinstance(tail, dict) else None
+        return s
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (merging t-digest, k1 scale function).
+
+    Memory is bounded by `compression` centroids regardless of how many values are added,
+    while tail quantiles (p10/p90) stay accurate because centroids near q=0/1 are kept small.
+    Small inputs (n < compression) are represented exactly as singleton centroids.
+    """
+
+    def __init__(self, compression: float = 100.0) -> None:
+        self.compression = max(10.0, float(compression))
+        self._means: list[float] = []
+        self._weights: list[float] = []
+        self._buffer: list[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        x = float(value)
+        w = float(weight)
+        if not math.isfinite(x) or w <= 0:
+            return
+        self._buffer.append(x)
+        self._buffer.append(w)
+        self.count += w
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self._buffer) >= int(self.compression) * 10:
+            self._compress()
+
+    def merge(self, other: QuantileSketch) -> None:
+        other._compress()
+        for m, w in zip(other._means, other._weights, strict=True):
+            self._buffer.append(m)
+            self._buffer.append(w)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k_limit(self, q0: float) -> float:
+        # k1(q) = delta/(2*pi) * asin(2q - 1); return q where k grows by exactly 1.
+        d = self.compression
+        k = d / (2.0 * math.pi) * math.asin(max(-1.0, min(1.0, 2.0 * q0 - 1.0))) + 1.0
+        if k >= d / 4.0:
+            return 1.0
+        return (math.sin(2.0 * math.pi * k / d) + 1.0) / 2.0
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        pts = list(zip(self._means, self._weights, strict=True))
+        pts.extend((self._buffer[i], self._buffer[i + 1]) for i in range(0, len(self._buffer), 2))
+        self._buffer = []
+        pts.sort(key=lambda p: p[0])
+        total = sum(w for _, w in pts)
+        means: list[float] = []
+        weights: list[float] = []
+        cur_m, cur_w = pts[0]
+        done = 0.0
+        q_limit = self._k_limit(0.0) * total
+        for m, w in pts[1:]:
+            if done + cur_w + w <= q_limit:
+                cur_m = cur_m + (m - cur_m) * w / (cur_w + w)
+                cur_w += w
+                continue
+            means.append(cur_m)
+            weights.append(cur_w)
+            done += cur_w
+            q_limit = self._k_limit(done / total) * total
+            cur_m, cur_w = m, w
+        means.append(cur_m)
+        weights.append(cur_w)
+        self._means = means
+        self._weights = weights
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        if not self._means:
+            return 0.0
+        if len(self._means) == 1:
+            return self._means[0]
+        target = max(0.0, min(1.0, float(q))) * self.count
+        # Interpolate between centroid centers (cumulative weight at each centroid's midpoint).
+        cum = 0.0
+        prev_center = 0.0
+        prev_mean = self.min
+        for m, w in zip(self._means, self._weights, strict=True):
+            center = cum + w / 2.0
+            if target < center:
+                span = center - prev_center
+                t = (target - prev_center) / span if span > 0 else 0.0
+                return prev_mean + (m - prev_mean) * t
+            prev_center = center
+            prev_mean = m
+            cum += w
+        span = self.count - prev_center
+        t = (target - prev_center) / span if span > 0 else 1.0
+        return prev_mean + (self.max - prev_mean) * min(1.0, t)
+
+    def to_dict(self) -> dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if math.isfinite(self.min) else None,
+            "max": self.max if math.isfinite(self.max) else None,
+            "means": [round(m, 6) for m in self._means],
+            "weights": list(self._weights),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any] | None) -> QuantileSketch:
+        src = d if isinstance(d, dict) else {}
+        sk = cls(compression=float(src.get("compression") or 100.0))
+        means = src.get("means") if isinstance(src.get("means"), list) else []
+        weights = src.get("weights") if isinstance(src.get("weights"), list) else []
+        if len(means) == len(weights):
+            sk._means = [float(x) for x in means]
+            sk._weights = [float(x) for x in weights]
+        sk.count = float(sum(sk._weights))
+        mn = src.get("min")
+        mx = src.get("max")
+        sk.min = float(mn) if mn is not None else math.inf
+        sk.max = float(mx) if mx is not None else -math.inf
+        return sk
@@ -0,0 +1,31 @@
+from .cron import CronSpec
+from .runner import (
+    CATCHUP,
+    ERROR,
+    MANUAL,
+    MISSED,
+    OK,
+    RUNNING,
+    RUNS_TABLE,
+    SCHEDULE,
+    SKIPPED,
+    Job,
+    Scheduler,
+    job,
+)
+
+__all__ = [
+    "CATCHUP",
+    "ERROR",
+    "MANUAL",
+    "MISSED",
+    "OK",
+    "RUNNING",
+    "RUNS_TABLE",
+    "SCHEDULE",
+    "SKIPPED",
+    "CronSpec",
+    "Job",
+    "Scheduler",
+    "job",
+]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+# How far `next_after`/`prev_at_or_before` search before giving up (a spec can match nothing,
+# e.g. "0 0 31 2 *", or a day filter can reject every day).
+MAX_SEARCH_DAYS = 400
+
+_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(text: str, lo: int, hi: int, *, dow: bool = False) -> tuple[frozenset[int], bool]:
+    """
+    One cron field -> (allowed values, restricted). Supports `*`, `a`, `a-b`, lists and `/step`.
+    """
+    values: set[int] = set()
+    for part in text.split(","):
+        body, _, step_s = part.partition("/")
+        step = int(step_s) if step_s else 1
+        if step <= 0:
+            raise ValueError(f"Invalid step in cron field {text!r}")
+        if body == "*":
+            start, end = lo, hi
+        elif "-" in body:
+            a, b = body.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(body)
+            end = hi if step_s else start
+        if not (lo <= start <= hi and lo <= end <= hi and start <= end):
+            raise ValueError(f"Cron field {text!r} out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    if dow and 7 in values:
+        # Both 0 and 7 mean Sunday.
+        values = (values - {7}) | {0}
+    return frozenset(values), text != "*"
+
+
+@dataclass(frozen=True)
+class CronSpec:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week, 0/7 = Sunday),
+    evaluated in the timezone of the datetimes passed in. As in cron, when both day fields are
+    restricted a day matches if either does.
+    """
+
+    expr: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    days_restricted: bool
+    weekdays_restricted: bool
+
+    @classmethod
+    def parse(cls, expr: str) -> CronSpec:
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expr!r}")
+        parsed = [
+            _parse_field(f, lo, hi, dow=(i == 4))
+            for i, (f, (lo, hi)) in enumerate(zip(fields, _RANGES, strict=True))
+        ]
+        return cls(
+            expr=" ".join(fields),
+            minutes=parsed[0][0],
+            hours=parsed[1][0],
+            days=parsed[2][0],
+            months=parsed[3][0],
+            weekdays=parsed[4][0],
+            days_restricted=parsed[2][1],
+            weekdays_restricted=parsed[4][1],
+        )
+
+    def matches_day(self, d: date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = (d.isoweekday() % 7) in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_after(
+        self, dt: datetime, *, day_filter: Callable[[date], bool] | None = None
+    ) -> datetime | None:
+        """
+        First firing time strictly after `dt`, or None if nothing fires within `MAX_SEARCH_DAYS`.
+        """
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        hours = sorted(self.hours)
+        minutes = sorted(self.minutes)
+        for _ in range(MAX_SEARCH_DAYS):
+            d = t.date()
+            if self.matches_day(d) and (day_filter is None or day_filter(d)):
+                for h in hours:
+                    if h < t.hour:
+                        continue
+                    for m in minutes:
+                        if h == t.hour and m < t.minute:
+                            continue
+                        return t.replace(hour=h, minute=m)
+            t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+        return None
+
+    def prev_at_or_before(
+        self, dt: datetime, *, day_filter: Callable[[date], bool] | None = None
+    ) -> datetime | None:
+        """
+        Latest firing time at or before `dt`, or None if nothing fired within `MAX_SEARCH_DAYS`.
+        """
+        t = dt.replace(second=0, microsecond=0)
+        hours = sorted(self.hours, reverse=True)
+        minutes = sorted(self.minutes, reverse=True)
+        for _ in range(MAX_SEARCH_DAYS):
+            d = t.date()
+            if self.matches_day(d) and (day_filter is None or day_filter(d)):
+                for h in hours:
+                    if h > t.hour:
+                        continue
+                    for m in minutes:
+                        if h == t.hour and m > t.minute:
+                            continue
+                        return t.replace(hour=h, minute=m)
+            t = (t - timedelta(days=1)).replace(hour=23, minute=59)
+        return None
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any
+
+from .cron import CronSpec
+
+# Run history lives in this table (schema created by the service's `_connect()`).
+RUNS_TABLE = "scheduler_runs"
+
+# A fire handled later than this after its scheduled minute is reported as a catch-up.
+CATCHUP_AFTER = timedelta(seconds=60)
+
+SCHEDULE = "schedule"
+CATCHUP = "catchup"
+MANUAL = "manual"
+
+RUNNING = "running"
+OK = "ok"
+ERROR = "error"
+SKIPPED = "skipped"  # due while the previous run was still going
+MISSED = "missed"  # found later than its misfire grace allows
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    A recurring job: `fn(scheduled_for)` runs at every firing time of any of `schedule` (cron
+    expressions in the scheduler's timezone) on days accepted by `day_filter`. A fire found late
+    (process asleep, stopped or busy) still runs if at most `misfire_grace_s` late; several missed
+    fires of one job coalesce into a single run.
+    """
+
+    name: str
+    schedule: tuple[CronSpec, ...]
+    fn: Callable[[datetime], dict[str, Any] | None]
+    description: str = ""
+    misfire_grace_s: float = 600.0
+    day_filter: Callable[[date], bool] | None = field(default=None, compare=False)
+    enabled: bool = True
+
+    def prev_fire(self, now: datetime) -> datetime | None:
+        fires = [s.prev_at_or_before(now, day_filter=self.day_filter) for s in self.schedule]
+        return max((f for f in fires if f is not None), default=None)
+
+    def next_fire(self, now: datetime) -> datetime | None:
+        fires = [s.next_after(now, day_filter=self.day_filter) for s in self.schedule]
+        return min((f for f in fires if f is not None), default=None)
+
+
+def job(
+    name: str,
+    schedule: str | Sequence[str],
+    fn: Callable[[datetime], dict[str, Any] | None],
+    **kwargs: Any,
+) -> Job:
+    exprs = [schedule] if isinstance(schedule, str) else list(schedule)
+    return Job(name=name, schedule=tuple(CronSpec.parse(e) for e in exprs), fn=fn, **kwargs)
+
+
+def _run_row(r: Sequence[Any]) -> dict[str, Any]:
+    try:
+        result = json.loads(str(r[9])) if r[9] else None
+    except json.JSONDecodeError:
+        result = None
+    return {
+        "id": int(r[0]),
+        "job": str(r[1]),
+        "scheduledFor": str(r[2]),
+        "trigger": str(r[3]),
+        "status": str(r[4]),
+        "startedAt": r[5],
+        "finishedAt": r[6],
+        "durationMs": r[7],
+        "error": r[8],
+        "result": result,
+    }
+
+
+_RUN_COLUMNS = "id, job, scheduled_for, trigger, status, started_at, finished_at, duration_ms, error, result_json"
+
+
+class Scheduler:
+    """
+    In-process cron scheduler. A daemon thread calls `tick()` every `tick_s`; each tick compares
+    every job's latest due fire with the last one it handled (persisted in `scheduler_runs`, so
+    fires missed while the process was down are caught up on restart). Due jobs run on a small
+    pool; a job never overlaps itself, and every run, skip and miss is recorded.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        jobs: Iterable[Job],
+        *,
+        tz: tzinfo,
+        workers: int = 2,
+        tick_s: float = 15.0,
+    ) -> None:
+        self._connect = connect
+        self.jobs = {j.name: j for j in jobs}
+        self.tz = tz
+        self.tick_s = max(1.0, float(tick_s))
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, int(workers)), thread_name_prefix="scheduler-job"
+        )
+        self._lock = threading.Lock()
+        self._running_jobs: set[str] = set()
+        self._last_fire: dict[str, datetime] | None = None
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _now(self, now: datetime | None) -> datetime:
+        return (now or datetime.now(tz=self.tz)).astimezone(self.tz)
+
+    def _load_last_fire(self) -> dict[str, datetime]:
+        """
+        Last handled fire per job from history. Runs left `running` by a previous process died
+        with it and are closed as errors.
+        """
+        if self._last_fire is not None:
+            return self._last_fire
+        out: dict[str, datetime] = {}
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE {RUNS_TABLE} SET status = ?, error = 'interrupted' WHERE status = ?",
+                (ERROR, RUNNING),
+            )
+            rows = conn.execute(
+                f"SELECT job, MAX(scheduled_for) FROM {RUNS_TABLE} WHERE trigger != ? GROUP BY job",
+                (MANUAL,),
+            ).fetchall()
+            conn.commit()
+        for name, last in rows:
+            try:
+                out[str(name)] = datetime.fromisoformat(str(last)).astimezone(self.tz)
+            except ValueError:
+                continue
+        self._last_fire = out
+        return out
+
+    def _insert_run(
+        self, name: str, scheduled_for: datetime, trigger: str, status: str, **cols: Any
+    ) -> int:
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"""
+                INSERT INTO {RUNS_TABLE}(job, scheduled_for, trigger, status, started_at, finished_at, duration_ms, error)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    name,
+                    scheduled_for.isoformat(),
+                    trigger,
+                    status,
+                    cols.get("started_at"),
+                    cols.get("finished_at"),
+                    cols.get("duration_ms"),
+                    cols.get("error"),
+                ),
+            )
+            conn.commit()
+            return int(cur.lastrowid or 0)
+
+    def _execute(self, j: Job, scheduled_for: datetime, trigger: str, run_id: int) -> None:
+        t0 = time.perf_counter()
+        status, error, result = OK, None, None
+        try:
+            result = j.fn(scheduled_for)
+        except Exception as e:
+            status, error = ERROR, f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._running_jobs.discard(j.name)
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                UPDATE {RUNS_TABLE}
+                SET status = ?, finished_at = ?, duration_ms = ?, error = ?, result_json = ?
+                WHERE id = ?
+                """,
+                (
+                    status,
+                    datetime.now(tz=self.tz).isoformat(),
+                    round((time.perf_counter() - t0) * 1000.0, 3),
+                    error,
+                    None if result is None else json.dumps(result, ensure_ascii=False, default=str),
+                    run_id,
+                ),
+            )
+            conn.commit()
+
+    def _launch(self, j: Job, scheduled_for: datetime, trigger: str, *, wait: bool) -> int | None:
+        """
+        Start `j` unless it is already running; returns the run id (None when skipped).
+        """
+        with self._lock:
+            if j.name in self._running_jobs:
+                return None
+            self._running_jobs.add(j.name)
+        try:
+            run_id = self._insert_run(
+                j.name,
+                scheduled_for,
+                trigger,
+                RUNNING,
+                started_at=datetime.now(tz=self.tz).isoformat(),
+            )
+        except BaseException:
+            with self._lock:
+                self._running_jobs.discard(j.name)
+            raise
+        if wait:
+            self._execute(j, scheduled_for, trigger, run_id)
+        else:
+            self._pool.submit(self._execute, j, scheduled_for, trigger, run_id)
+        return run_id
+
+    def tick(self, now: datetime | None = None, *, wait: bool = False) -> list[dict[str, Any]]:
+        """
+        Handle every job whose latest fire at or before `now` was not handled yet. Returns one
+        `{job, scheduledFor, action}` entry per handled fire (run | catchup | skipped | missed).
+        """
+        n = self._now(now)
+        last = self._load_last_fire()
+        handled: list[dict[str, Any]] = []
+        for j in self.jobs.values():
+            if not j.enabled:
+                continue
+            fire = j.prev_fire(n)
+            if fire is None or (j.name in last and fire <= last[j.name]):
+                continue
+            last[j.name] = fire
+            late = n - fire
+            if late.total_seconds() > j.misfire_grace_s:
+                self._insert_run(
+                    j.name, fire, CATCHUP, MISSED, error=f"late by {int(late.total_seconds())}s"
+                )
+                action = MISSED
+            else:
+                trigger = CATCHUP if late > CATCHUP_AFTER else SCHEDULE
+                run_id = self._launch(j, fire, trigger, wait=wait)
+                if run_id is None:
+                    self._insert_run(
+                        j.name, fire, trigger, SKIPPED, error="previous run still in progress"
+                    )
+                    action = SKIPPED
+                else:
+                    action = "run" if trigger == SCHEDULE else CATCHUP
+            handled.append({"job": j.name, "scheduledFor": fire.isoformat(), "action": action})
+        return handled
+
+    def run_job(self, name: str, *, wait: bool = True) -> dict[str, Any] | None:
+        """
+        Manual trigger (does not count as handling a scheduled fire). Returns the run record, or
+        None when the job is already running. Raises KeyError for an unknown job.
+        """
+        j = self.jobs[name]
+        run_id = self._launch(j, self._now(None), MANUAL, wait=wait)
+        if run_id is None:
+            return None
+        return self.get_run(run_id)
+
+    def get_run(self, run_id: int) -> dict[str, Any] | None:
+        with self._connect() as conn:
+            r = conn.execute(
+                f"SELECT {_RUN_COLUMNS} FROM {RUNS_TABLE} WHERE id = ?", (run_id,)
+            ).fetchone()
+        return None if r is None else _run_row(r)
+
+    def history(self, *, job_name: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        where, args = ("WHERE job = ?", [job_name]) if job_name else ("", [])
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_RUN_COLUMNS} FROM {RUNS_TABLE} {where} ORDER BY id DESC LIMIT ?",
+                (*args, max(1, min(int(limit), 1000))),
+            ).fetchall()
+        return [_run_row(r) for r in rows]
+
+    def status(self, now: datetime | None = None) -> list[dict[str, Any]]:
+        n = self._now(now)
+        with self._connect() as conn:
+            latest = {
+                str(r[1]): _run_row(r)
+                for r in conn.execute(
+                    f"""
+                    SELECT {_RUN_COLUMNS} FROM {RUNS_TABLE}
+                    WHERE id IN (SELECT MAX(id) FROM {RUNS_TABLE} GROUP BY job)
+                    """
+                ).fetchall()
+            }
+        with self._lock:
+            busy = set(self._running_jobs)
+        out: list[dict[str, Any]] = []
+        for j in self.jobs.values():
+            nxt = j.next_fire(n) if j.enabled else None
+            out.append(
+                {
+                    "name": j.name,
+                    "description": j.description,
+                    "schedule": [s.expr for s in j.schedule],
+                    "enabled": j.enabled,
+                    "misfireGraceSec": j.misfire_grace_s,
+                    "running": j.name in busy,
+                    "nextRunAt": nxt.isoformat() if nxt is not None else None,
+                    "lastRun": latest.get(j.name),
+                }
+            )
+        return out
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                # Never let a failed tick stop the scheduler.
+                pass
+            time.sleep(self.tick_s)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
@@ -7,6 +7,7 @@ Packaging-friendly entrypoint for quant-service.
 
 from __future__ import annotations
 
+import multiprocessing
 import os
 
 import uvicorn
@@ -23,6 +24,8 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Frozen builds: let compute-pool worker processes (spawn) run instead of the server.
+    multiprocessing.freeze_support()
     main()
 
 
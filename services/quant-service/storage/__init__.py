@@ -0,0 +1,47 @@
+from .blob import (
+    DICTIONARIES,
+    blob_codec,
+    column_size,
+    is_packed,
+    pack_json,
+    pack_text,
+    recompress_column,
+    unpack_json,
+    unpack_text,
+)
+from .retention import (
+    DEFAULT_BATCH_ROWS,
+    DEFAULT_VACUUM_PAGES,
+    RetentionManager,
+    RetentionPolicy,
+    database_size,
+    enable_incremental_vacuum,
+    incremental_vacuum,
+    prune,
+    retention_cutoff,
+)
+from .writer import DEFAULT_MAX_BATCH, DEFAULT_MAX_DELAY_S, WriteQueue
+
+__all__ = [
+    "DEFAULT_BATCH_ROWS",
+    "DEFAULT_MAX_BATCH",
+    "DEFAULT_MAX_DELAY_S",
+    "DEFAULT_VACUUM_PAGES",
+    "DICTIONARIES",
+    "RetentionManager",
+    "RetentionPolicy",
+    "WriteQueue",
+    "blob_codec",
+    "column_size",
+    "database_size",
+    "enable_incremental_vacuum",
+    "incremental_vacuum",
+    "is_packed",
+    "pack_json",
+    "pack_text",
+    "prune",
+    "recompress_column",
+    "retention_cutoff",
+    "unpack_json",
+    "unpack_text",
+]
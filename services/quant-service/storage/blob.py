@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+# Packed values are BLOBs starting with a NUL byte (never the first byte of JSON text), then a
+# one-byte format tag. Anything else is a legacy/plain UTF-8 JSON string and is read as-is.
+_MARK = b"\x00"
+TAG_ZLIB = b"z"
+TAG_ZLIB_DICT = b"d"  # + one byte: dictionary id (see `DICTIONARIES`)
+TAG_ZSTD = b"s"
+
+# Values shorter than this stay plain text: compression would not pay for the header.
+MIN_PACK_BYTES = 64
+
+# Preset dictionaries for small per-row payloads that repeat the same keys. Ids are part of the
+# stored format: never change or reuse an entry, only append new ones.
+DICTIONARIES: dict[str, tuple[int, bytes]] = {
+    "quote": (
+        1,
+        b'{"price": "", "change_pct": "", "open_pct": "", "vol_ratio": "", "volume": "", '
+        b'"turnover": "", "market_cap": ""}',
+    ),
+    "chips": (
+        2,
+        b'{"date": "", "profitRatio": "", "avgCost": "", "cost90Low": "", "cost90High": "", '
+        b'"cost90Conc": "", "cost70Low": "", "cost70High": "", "cost70Conc": ""}',
+    ),
+    "fund_flow": (
+        3,
+        b'{"date": "", "close": "", "changePct": "", "mainNetAmount": "", "mainNetRatio": "", '
+        b'"superNetAmount": "", "superNetRatio": "", "largeNetAmount": "", "largeNetRatio": "", '
+        b'"mediumNetAmount": "", "mediumNetRatio": "", "smallNetAmount": "", "smallNetRatio": ""}',
+    ),
+}
+_DICT_BY_ID = {i: d for i, d in DICTIONARIES.values()}
+
+
+def _zstd() -> Any | None:
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        return None
+    return zstandard
+
+
+def blob_codec() -> str:
+    """
+    `BLOB_CODEC`: zlib (default), zstd (needs the optional `zstandard` package; falls back to
+    zlib without it) or none (store plain JSON text). Reading handles every format regardless.
+    """
+    codec = (os.getenv("BLOB_CODEC") or "zlib").strip().lower()
+    if codec == "zstd" and _zstd() is None:
+        return "zlib"
+    return codec if codec in ("zlib", "zstd", "none") else "zlib"
+
+
+def pack_text(text: str, *, dictionary: str | None = None) -> str | bytes:
+    """
+    Compress serialized JSON for storage. Returns `text` unchanged when it is small, the codec is
+    `none`, or compression does not save space.
+    """
+    raw = text.encode("utf-8")
+    codec = blob_codec()
+    if codec == "none" or len(raw) < MIN_PACK_BYTES:
+        return text
+    if dictionary is not None:
+        # Preset dictionaries only help short rows; they are a zlib feature here.
+        dict_id, zdict = DICTIONARIES[dictionary]
+        c = zlib.compressobj(level=6, zdict=zdict)
+        packed = _MARK + TAG_ZLIB_DICT + bytes([dict_id]) + c.compress(raw) + c.flush()
+    elif codec == "zstd":
+        packed = _MARK + TAG_ZSTD + _zstd().ZstdCompressor(level=3).compress(raw)
+    else:
+        packed = _MARK + TAG_ZLIB + zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+
+def pack_json(
+    obj: Any, *, dictionary: str | None = None, default: Callable[[Any], Any] | None = None
+) -> str | bytes:
+    return pack_text(json.dumps(obj, ensure_ascii=False, default=default), dictionary=dictionary)
+
+
+def is_packed(value: Any) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:1]) == _MARK
+
+
+def unpack_text(value: Any) -> str:
+    """
+    Stored column value (packed BLOB, plain TEXT or NULL) -> JSON text.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    data = bytes(value)
+    if not data.startswith(_MARK):
+        return data.decode("utf-8")
+    tag = data[1:2]
+    if tag == TAG_ZLIB:
+        return zlib.decompress(data[2:]).decode("utf-8")
+    if tag == TAG_ZLIB_DICT:
+        d = zlib.decompressobj(zdict=_DICT_BY_ID[data[2]])
+        return (d.decompress(data[3:]) + d.flush()).decode("utf-8")
+    if tag == TAG_ZSTD:
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("zstd-packed value but the `zstandard` package is not installed")
+        return zstd.ZstdDecompressor().decompress(data[2:]).decode("utf-8")
+    raise ValueError(f"Unknown blob format tag {tag!r}")
+
+
+def unpack_json(value: Any, *, empty: str = "null") -> Any:
+    """
+    Stored column value -> parsed JSON; NULL/empty values parse as `empty`.
+    """
+    return json.loads(unpack_text(value) or empty)
+
+
+def column_size(conn: sqlite3.Connection, table: str, column: str) -> dict[str, int]:
+    """
+    Rows, packed rows and stored bytes of one JSON column.
+    """
+    row = conn.execute(
+        f"""
+        SELECT
+          COUNT(1),
+          COALESCE(SUM(CASE WHEN typeof({column}) = 'blob' THEN 1 ELSE 0 END), 0),
+          COALESCE(SUM(length(CAST({column} AS BLOB))), 0)
+        FROM {table}
+        """,
+    ).fetchone()
+    return {"rows": int(row[0]), "packedRows": int(row[1]), "bytes": int(row[2])}
+
+
+def recompress_column(
+    conn: sqlite3.Connection,
+    table: str,
+    column: str,
+    *,
+    dictionary: str | None = None,
+    batch_rows: int = 500,
+) -> dict[str, int]:
+    """
+    Pack every plain-text value of `table.column` in place (rowid batches, one commit each);
+    returns rows rewritten and stored bytes before/after for those rows.
+    """
+    batch = max(1, int(batch_rows))
+    last = 0
+    rewritten = before = after = 0
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT rowid, {column} FROM {table}
+            WHERE rowid > ? AND typeof({column}) = 'text'
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (last, batch),
+        ).fetchall()
+        if not rows:
+            break
+        updates: list[tuple[Any, int]] = []
+        for rowid, text in rows:
+            last = int(rowid)
+            packed = pack_text(str(text), dictionary=dictionary)
+            if isinstance(packed, str):
+                continue
+            before += len(str(text).encode("utf-8"))
+            after += len(packed)
+            updates.append((packed, int(rowid)))
+        if updates:
+            conn.executemany(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates)
+            rewritten += len(updates)
+        conn.commit()
+    return {"rows": rewritten, "bytesBefore": before, "bytesAfter": after}
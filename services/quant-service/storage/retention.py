@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+# Rows per DELETE statement; each batch commits on its own so readers and the request path never
+# wait behind one long write transaction.
+DEFAULT_BATCH_ROWS = 2000
+# Pages released per `PRAGMA incremental_vacuum` step (4 KiB pages => 8 MiB).
+DEFAULT_VACUUM_PAGES = 2048
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Keep the newest `keep_dates` distinct dates of `table` (per `partition_by` value, if set).
+
+    `column` holds a date (YYYY-MM-DD), or an ISO timestamp when `timestamp=True` (dates are then
+    its first ten characters). Everything older than the oldest kept date goes in one range delete.
+    """
+
+    table: str
+    column: str
+    keep_dates: int
+    partition_by: str | None = None
+    timestamp: bool = False
+
+
+def _partitions(conn: sqlite3.Connection, policy: RetentionPolicy) -> list[Any]:
+    if not policy.partition_by:
+        return [None]
+    rows = conn.execute(
+        f"SELECT DISTINCT {policy.partition_by} FROM {policy.table}",
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _scope(policy: RetentionPolicy, partition: Any) -> tuple[str, tuple[Any, ...]]:
+    if policy.partition_by is None:
+        return ("", ())
+    return (f" AND {policy.partition_by} = ?", (partition,))
+
+
+def retention_cutoff(
+    conn: sqlite3.Connection, policy: RetentionPolicy, *, partition: Any = None
+) -> str | None:
+    """
+    Oldest date kept under `policy`, or None when there are no more than `keep_dates` dates.
+    """
+    keep = max(1, int(policy.keep_dates))
+    where, args = _scope(policy, partition)
+    # Plain date columns stay bare so the DESC index on them serves the scan.
+    expr = f"substr({policy.column}, 1, 10)" if policy.timestamp else policy.column
+    row = conn.execute(
+        f"""
+        SELECT DISTINCT {expr} AS d
+        FROM {policy.table}
+        WHERE {policy.column} IS NOT NULL{where}
+        ORDER BY d DESC
+        LIMIT 1 OFFSET ?
+        """,
+        (*args, keep - 1),
+    ).fetchone()
+    # ISO timestamps of the cutoff day compare >= the bare date, so they are kept.
+    return str(row[0]) if row and row[0] else None
+
+
+def prune(
+    conn: sqlite3.Connection,
+    policy: RetentionPolicy,
+    *,
+    partition: Any = None,
+    all_partitions: bool = True,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> int:
+    """
+    Apply `policy` with batched range deletes; returns the number of rows removed.
+
+    With `partition_by` set, every partition is pruned unless `all_partitions=False`, in which
+    case only `partition` is.
+    """
+    parts = _partitions(conn, policy) if all_partitions else [partition]
+    batch = max(1, int(batch_rows))
+    deleted = 0
+    for part in parts:
+        cutoff = retention_cutoff(conn, policy, partition=part)
+        if cutoff is None:
+            continue
+        where, args = _scope(policy, part)
+        while True:
+            cur = conn.execute(
+                f"""
+                DELETE FROM {policy.table}
+                WHERE rowid IN (
+                  SELECT rowid FROM {policy.table}
+                  WHERE {policy.column} < ?{where}
+                  LIMIT ?
+                )
+                """,
+                (cutoff, *args, batch),
+            )
+            conn.commit()
+            n = int(cur.rowcount or 0)
+            deleted += n
+            if n < batch:
+                break
+    return deleted
+
+
+def database_size(conn: sqlite3.Connection, *, per_table: bool = False) -> dict[str, Any]:
+    """
+    File usage from page counts; `per_table` adds bytes per table/index when SQLite was built
+    with the `dbstat` virtual table (omitted otherwise).
+    """
+    page_size = int(conn.execute("PRAGMA page_size").fetchone()[0])
+    page_count = int(conn.execute("PRAGMA page_count").fetchone()[0])
+    freelist = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    auto_vacuum = int(conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+    out: dict[str, Any] = {
+        "pageSize": page_size,
+        "pageCount": page_count,
+        "freelistCount": freelist,
+        "bytes": page_size * page_count,
+        "freeBytes": page_size * freelist,
+        "autoVacuum": {0: "none", 1: "full", 2: "incremental"}.get(auto_vacuum, str(auto_vacuum)),
+    }
+    if per_table:
+        try:
+            rows = conn.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC",
+            ).fetchall()
+            out["tables"] = {str(r[0]): int(r[1] or 0) for r in rows}
+        except sqlite3.Error:
+            pass
+    return out
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Switch an existing database to `auto_vacuum=INCREMENTAL`. That takes one full VACUUM (the file
+    is rewritten); returns True if it ran. New databases get the mode from `_connect()` instead.
+    """
+    if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) == 2:
+        return False
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn: sqlite3.Connection, *, max_pages: int = DEFAULT_VACUUM_PAGES) -> int:
+    """
+    Return up to `max_pages` free pages to the filesystem; returns the number released (0 unless
+    the database is in incremental auto-vacuum mode).
+    """
+    if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) != 2:
+        return 0
+    before = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    if before <= 0:
+        return 0
+    # The pragma returns one row per freed page; it only runs while they are being stepped.
+    conn.execute(f"PRAGMA incremental_vacuum({max(1, int(max_pages))})").fetchall()
+    conn.commit()
+    after = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    return max(0, before - after)
+
+
+class RetentionManager:
+    """
+    Applies retention policies off the request path: a daemon thread runs every `interval_s`
+    (or sooner when `request()` is called), prunes each table in batches, then releases free
+    pages with an incremental vacuum. Without a running thread `request()` prunes inline.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        policies: Iterable[RetentionPolicy],
+        *,
+        interval_s: float = 900.0,
+        vacuum_pages: int = DEFAULT_VACUUM_PAGES,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        on_pruned: Callable[[str, int], None] | None = None,
+    ) -> None:
+        self._connect = connect
+        self.policies = list(policies)
+        self.interval_s = max(1.0, float(interval_s))
+        self.vacuum_pages = int(vacuum_pages)
+        self.batch_rows = int(batch_rows)
+        self._on_pruned = on_pruned
+        self._lock = threading.Lock()  # one pass at a time (thread vs. inline/manual runs)
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: set[str] = set()
+        self._thread: threading.Thread | None = None
+        self.last_report: dict[str, Any] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(
+        self, *, tables: Iterable[str] | None = None, vacuum: bool = True
+    ) -> dict[str, Any]:
+        wanted = set(tables) if tables is not None else None
+        t0 = time.perf_counter()
+        deleted: dict[str, int] = {}
+        errors: dict[str, str] = {}
+        freed = 0
+        with self._lock:
+            with self._connect() as conn:
+                for p in self.policies:
+                    if wanted is not None and p.table not in wanted:
+                        continue
+                    try:
+                        n = prune(conn, p, batch_rows=self.batch_rows)
+                    except sqlite3.Error as e:
+                        errors[p.table] = str(e)
+                        continue
+                    deleted[p.table] = deleted.get(p.table, 0) + n
+                    if n and self._on_pruned is not None:
+                        self._on_pruned(p.table, n)
+                if vacuum:
+                    try:
+                        freed = incremental_vacuum(conn, max_pages=self.vacuum_pages)
+                    except sqlite3.Error as e:
+                        errors["incremental_vacuum"] = str(e)
+                size = database_size(conn)
+        report = {
+            "ranAt": datetime.now(tz=UTC).isoformat(),
+            "durationMs": round((time.perf_counter() - t0) * 1000.0, 3),
+            "deleted": deleted,
+            "freedPages": freed,
+            "errors": errors,
+            "size": size,
+        }
+        self.last_report = report
+        return report
+
+    def request(self, table: str) -> None:
+        """
+        Note that `table` just grew. The background thread prunes it on its next wake-up; with no
+        thread running (tests, manager disabled) it is pruned now.
+        """
+        if not self.running:
+            self.run_once(tables=[table], vacuum=False)
+            return
+        with self._pending_lock:
+            self._pending.add(table)
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            woke = self._wake.wait(self.interval_s)
+            self._wake.clear()
+            with self._pending_lock:
+                pending, self._pending = self._pending, set()
+            try:
+                # An early wake-up only handles the tables that asked; timeouts run everything.
+                self.run_once(tables=pending if woke and pending else None, vacuum=not woke)
+            except Exception:
+                # Never let a failed pass stop the manager.
+                pass
+
+    def start(self) -> None:
+        with self._pending_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._loop, name="retention-manager", daemon=True
+            )
+            self._thread.start()
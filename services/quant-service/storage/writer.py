@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Ops folded into one transaction at most, and how long the writer lingers after the first queued
+# op for more to arrive. A queued write is committed within about `max_delay_s` plus one commit.
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY_S = 0.005
+
+WriteOp = Callable[[sqlite3.Connection], Any]
+
+
+class WriteQueue:
+    """
+    Single-writer queue for SQLite. Write ops (`op(conn)`, which must not commit) are queued and run
+    by one thread on its own connection; everything queued together goes into one transaction,
+    each op under a savepoint so a failing op rolls back alone. `submit()` returns a future that
+    resolves once the op's transaction committed (or with the op's error).
+
+    Readers keep opening their own WAL connections. Until `start()`, ops run inline on a fresh
+    connection, one commit each, so callers behave the same with or without the thread.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        *,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_delay_s: float = DEFAULT_MAX_DELAY_S,
+    ) -> None:
+        self._connect = connect
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay_s = max(0.0, float(max_delay_s))
+        self._queue: queue.Queue[tuple[WriteOp, Future[Any]]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._stats = {"ops": 0, "failedOps": 0, "batches": 0, "failedBatches": 0, "maxBatch": 0}
+        self._last_commit_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, op: Callable[[sqlite3.Connection], T]) -> Future[T]:
+        fut: Future[T] = Future()
+        if threading.current_thread() is self._thread and self._conn is not None:
+            # Op queued from inside another op: it joins the open transaction.
+            _run_op(self._conn, op, fut, savepoint="nested")
+            return fut
+        if not self.running:
+            with self._connect() as conn:
+                if _run_op(conn, op, fut):
+                    conn.commit()
+                else:
+                    conn.rollback()
+            self._count(1, 0 if fut.exception() is None else 1, batch=1)
+            return fut
+        self._queue.put((op, fut))
+        return fut
+
+    def run(self, op: Callable[[sqlite3.Connection], T], *, timeout: float | None = None) -> T:
+        """
+        `submit()` and wait for the commit; re-raises the op's error.
+        """
+        return self.submit(op).result(timeout=timeout)
+
+    def _count(self, ops: int, failed: int, *, batch: int) -> None:
+        with self._lock:
+            self._stats["ops"] += ops
+            self._stats["failedOps"] += failed
+            self._stats["batches"] += 1
+            self._stats["maxBatch"] = max(self._stats["maxBatch"], batch)
+
+    def _take_batch(self) -> list[tuple[WriteOp, Future[Any]]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay_s
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit_batch(
+        self, conn: sqlite3.Connection, batch: list[tuple[WriteOp, Future[Any]]]
+    ) -> None:
+        t0 = time.perf_counter()
+        done: list[tuple[Future[Any], Any]] = []
+        failed = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for i, (op, fut) in enumerate(batch):
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                conn.execute(f"SAVEPOINT op{i}")
+                try:
+                    result = op(conn)
+                except BaseException as e:
+                    conn.execute(f"ROLLBACK TO op{i}")
+                    conn.execute(f"RELEASE op{i}")
+                    fut.set_exception(e)
+                    failed += 1
+                    continue
+                conn.execute(f"RELEASE op{i}")
+                done.append((fut, result))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            # The whole transaction is lost (BEGIN/COMMIT failed): fail every op still pending.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _op, fut in batch:
+                if fut.done():
+                    continue
+                if fut.running() or fut.set_running_or_notify_cancel():
+                    fut.set_exception(e)
+            with self._lock:
+                self._stats["failedBatches"] += 1
+            self._count(len(batch), len(batch), batch=len(batch))
+            return
+        self._last_commit_ms = round((time.perf_counter() - t0) * 1000.0, 3)
+        for fut, result in done:
+            fut.set_result(result)
+        self._count(len(batch), failed, batch=len(batch))
+
+    def _loop(self) -> None:
+        conn = self._connect()
+        # Explicit BEGIN/COMMIT below; never let the driver open transactions on its own.
+        conn.isolation_level = None
+        self._conn = conn
+        while True:
+            batch = self._take_batch()
+            try:
+                self._commit_batch(conn, batch)
+            except Exception:
+                # Never let a failed batch stop the writer.
+                pass
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "queueDepth": self.depth,
+                "lastCommitMs": self._last_commit_ms,
+                **self._stats,
+            }
+
+
+def _run_op(
+    conn: sqlite3.Connection, op: WriteOp, fut: Future[Any], *, savepoint: str | None = None
+) -> bool:
+    """
+    Unbatched execution; returns whether the op succeeded. With `savepoint`, a failed op's
+    writes are rolled back inside the caller's transaction.
+    """
+    fut.set_running_or_notify_cancel()
+    if savepoint:
+        conn.execute(f"SAVEPOINT {savepoint}")
+    try:
+        result = op(conn)
+    except BaseException as e:
+        if savepoint:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        fut.set_exception(e)
+        return False
+    if savepoint:
+        conn.execute(f"RELEASE {savepoint}")
+    fut.set_result(result)
+    return True
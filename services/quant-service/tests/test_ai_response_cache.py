@@ -0,0 +1,154 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_ai_response_cache_hits_bypass_and_prompt_key(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    calls = {"n": 0}
+
+    def call() -> dict:
+        calls["n"] += 1
+        return {"themes": [{"name": "AI", "n": calls["n"]}]}
+
+    payload = {"date": "2026-01-07", "themes": [{"name": "AI"}], "context": {"riskMode": "normal"}}
+    r1 = main._ai_post_cached("/mainline/explain", payload, call)
+    # Key order does not matter: the hash is over canonical JSON.
+    r2 = main._ai_post_cached("/mainline/explain", dict(reversed(list(payload.items()))), call)
+    assert r1 == r2
+    assert calls["n"] == 1
+
+    # Explicit bypass always calls through (and refreshes the stored response).
+    with main._ai_response_cache_bypass():
+        r3 = main._ai_post_cached("/mainline/explain", payload, call)
+    assert calls["n"] == 2
+    assert main._ai_post_cached("/mainline/explain", payload, call) == r3
+
+    # Changing the active system prompt changes the key.
+    client.put("/settings/system-prompt", json={"value": "Be terse."})
+    main._ai_post_cached("/mainline/explain", payload, call)
+    assert calls["n"] == 3
+
+    stats = client.get("/cache/ai").json()
+    assert stats["entries"] == 2
+    assert stats["byEndpoint"]["/mainline/explain"]["hits"] == 2
+
+    assert client.delete("/cache/ai").json()["entries"] == 0
+
+
+def test_ai_response_cache_evicts_by_size(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    # ~2.5 KB cap: room for two ~1 KB responses.
+    monkeypatch.setenv("AI_RESPONSE_CACHE_MAX_MB", str(2500 / (1024 * 1024)))
+    for i in range(3):
+        main._ai_post_cached("/leader/daily", {"date": str(i)}, lambda: {"text": "x" * 1000})
+    with main._connect() as conn:
+        keys = [r[0] for r in conn.execute("SELECT key FROM ai_response_cache").fetchall()]
+    assert len(keys) == 2
+    assert main._ai_response_cache_key("/leader/daily", {"date": "0"}) not in keys
+
+
+def test_ai_response_cache_skips_fallback_responses(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    payload = {"date": "2026-01-07"}
+    responses = [
+        {"date": "2026-01-07", "leaders": [], "error": "Leader generation failed: timeout"},
+        {"date": "2026-01-07", "leaders": [{"symbol": "CN:000001"}], "model": "m"},
+    ]
+    calls = {"n": 0}
+
+    def call() -> dict:
+        calls["n"] += 1
+        return responses[min(calls["n"], len(responses)) - 1]
+
+    # A failed generation is returned but not stored: the next call goes back to ai-service.
+    assert main._ai_post_cached("/leader/daily", payload, call)["error"]
+    assert main._ai_post_cached("/leader/daily", payload, call) == responses[1]
+    assert main._ai_post_cached("/leader/daily", payload, call) == responses[1]
+    assert calls["n"] == 2
+
+    md = {"markdown": "# Daily Strategy Report\n\n## Error\n\nStrategy generation failed: boom\n"}
+    themes = {"themes": [{"name": "AI", "logicSummary": "Mainline analysis failed: boom"}]}
+    for endpoint, out in (("/strategy/daily-markdown", md), ("/mainline/explain", themes)):
+        main._ai_post_cached(endpoint, payload, lambda out=out: out)
+    with main._connect() as conn:
+        assert conn.execute("SELECT COUNT(1) FROM ai_response_cache").fetchone()[0] == 1
+
+
+class _FakeStream:
+    def __init__(self, chunks: list[bytes]) -> None:
+        self.headers = {"X-Model-Id": "m"}
+        self._chunks = list(chunks)
+
+    def read1(self, _n: int) -> bytes:
+        return self._chunks.pop(0) if self._chunks else b""
+
+    def read(self) -> bytes:
+        out, self._chunks = b"".join(self._chunks), []
+        return out
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def test_ai_markdown_stream_rejects_incomplete_output(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    payload = {"date": "2026-01-07", "accountId": "a"}
+    streams = [
+        # Model error mid-stream: partial text, then an error trailer.
+        [b"# Daily ", b"Strat", b'\x1e{"finishReason": "error", "error": "boom"}'],
+        # Connection closed without a trailer.
+        [b"# Daily Strategy"],
+        # Hit the token limit: the text is cut off.
+        [b"# Daily ", b"Strat", b'\x1e{"finishReason": "length"}'],
+        [b"# Daily ", b"Strategy Report\n", b'\x1e{"finishReason": "stop"}'],
+    ]
+    monkeypatch.setattr(
+        main.urllib.request, "urlopen", lambda *_a, **_kw: _FakeStream(streams.pop(0))
+    )
+
+    for expected in ("boom", "no trailer", "length"):
+        tokens: list[str] = []
+        with pytest.raises(OSError, match=expected):
+            main._ai_strategy_daily_markdown_stream(payload=payload, on_token=tokens.append)
+        assert "\x1e" not in "".join(tokens)
+        with main._connect() as conn:
+            assert conn.execute("SELECT COUNT(1) FROM ai_response_cache").fetchone()[0] == 0
+
+    tokens = []
+    out = main._ai_strategy_daily_markdown_stream(payload=payload, on_token=tokens.append)
+    assert (
+        out["markdown"] == "# Daily Strategy Report"
+        and "".join(tokens) == "# Daily Strategy Report\n"
+    )
+    # Only the complete report is cached, and the blocking call is served from it.
+    assert main._ai_strategy_daily_markdown(payload=payload)["markdown"] == out["markdown"]
+
+
+def test_ai_markdown_blocking_rejects_truncated_output(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    payload = {"date": "2026-01-07", "accountId": "a"}
+    bodies = [
+        b'{"markdown": "# Daily Strat", "finishReason": "length"}',
+        b'{"markdown": ""}',
+        b'{"markdown": "# Daily Strategy Report", "finishReason": "stop"}',
+    ]
+    monkeypatch.setattr(
+        main.urllib.request, "urlopen", lambda *_a, **_kw: _FakeStream([bodies.pop(0)])
+    )
+
+    # Same rule as the stream: a cut-off or empty report fails and is never cached.
+    for expected in ("length", "empty markdown"):
+        with pytest.raises(OSError, match=f"incomplete \\({expected}\\)"):
+            main._ai_strategy_daily_markdown(payload=payload)
+        with main._connect() as conn:
+            assert conn.execute("SELECT COUNT(1) FROM ai_response_cache").fetchone()[0] == 0
+
+    out = main._ai_strategy_daily_markdown(payload=payload)
+    assert out["markdown"] == "# Daily Strategy Report"
+    assert main._ai_strategy_daily_markdown(payload=payload) == out
@@ -0,0 +1,99 @@
+from datetime import date
+
+import main
+from bench.run import CASE_NAMES, CaseResult, compare, run_cases
+from bench.synthetic import PROVIDER_NAMES, SyntheticMarket, UniverseSpec, trade_dates
+
+
+def test_synthetic_universe_is_deterministic() -> None:
+    spec = UniverseSpec(symbols=30, days=20, seed=3, end_date="2026-01-09", themes=40)
+    a = SyntheticMarket(spec)
+    b = SyntheticMarket(spec)
+    t = a.stocks[5].ticker
+    assert a.bars(t) == b.bars(t)
+    assert a.fetch_cn_a_spot() == b.fetch_cn_a_spot()
+    assert a.dates == trade_dates("2026-01-09", 20)
+    assert a.dates[-1] == "2026-01-09" and "2026-01-04" not in a.dates  # weekdays only
+    assert len(a.concepts) == 10
+    assert SyntheticMarket(UniverseSpec(symbols=30, days=20, seed=4, end_date="2026-01-09")).bars(t) != a.bars(t)
+
+
+def test_bench_cases_run_on_seeded_db(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "bench.sqlite3"))
+    monkeypatch.setenv("UPSTREAM_MODE", "replay")
+    monkeypatch.setenv("UPSTREAM_FIXTURES_DIR", str(tmp_path / "fixtures"))
+    market = SyntheticMarket(
+        UniverseSpec(symbols=120, hk_symbols=15, days=40, themes=60, screener_snapshots=6, screeners=3)
+    )
+    with main._connect() as conn:
+        assert not market.seeded(conn)
+        market.write(conn)
+        assert market.seeded(conn)
+        assert conn.execute("SELECT COUNT(1) FROM market_bars").fetchone()[0] == (120 + 15) * 40
+        assert conn.execute("SELECT COUNT(1) FROM market_quotes").fetchone()[0] == 135
+        assert conn.execute("SELECT COUNT(1) FROM market_stocks WHERE market = 'HK'").fetchone()[0] == 15
+        assert conn.execute("SELECT COUNT(1) FROM market_chips").fetchone()[0] == 120 * 40
+        assert conn.execute("SELECT COUNT(1) FROM market_cn_industry_fund_flow_daily").fetchone()[0] == 30 * 40
+        assert conn.execute("SELECT COUNT(1) FROM market_cn_sentiment_daily").fetchone()[0] == 39
+        assert conn.execute("SELECT COUNT(1) FROM cn_theme_membership_cache").fetchone()[0] == 60
+        assert conn.execute("SELECT COUNT(1) FROM tv_screener_snapshots").fetchone()[0] == 6
+    for name, fn in market.providers().items():
+        monkeypatch.setattr(main, name, fn)
+
+    results = run_cases(main, market, repeat=1, warmup=0)
+    assert [r.name for r in results] == list(CASE_NAMES)
+    assert all(r.medianMs > 0 for r in results)
+
+    ranked = main._rank_build_and_score(
+        account_id="bench",
+        as_of_date=market.spec.end_date,
+        limit=20,
+        universe_version="v0",
+        include_holdings=False,
+    )
+    assert ranked["items"]
+
+
+def test_compare_flags_regressions_over_threshold() -> None:
+    results = [
+        CaseResult(name="a", runs=3, medianMs=130.0, minMs=120.0, maxMs=140.0),
+        CaseResult(name="b", runs=3, medianMs=110.0, minMs=100.0, maxMs=120.0),
+        CaseResult(name="c", runs=3, medianMs=500.0, minMs=400.0, maxMs=600.0),
+    ]
+    baseline = {"results": {"a": {"medianMs": 100.0}, "b": {"medianMs": 100.0}}}
+    regs = compare(results, baseline, threshold=0.25)
+    assert [(g.name, g.ratio) for g in regs] == [("a", 1.3)]
+
+
+def test_synthetic_fakes_match_provider_shapes() -> None:
+    market = SyntheticMarket(UniverseSpec(symbols=200, hk_symbols=10, days=30, seed=5, end_date="2026-01-09"))
+    assert set(market.providers()) == set(PROVIDER_NAMES)
+    d = date(2026, 1, 9)
+
+    hk = market.fetch_hk_spot()
+    assert len(hk) == 10 and hk[0].market == "HK" and hk[0].currency == "HKD"
+    assert len(market.fetch_hk_daily_bars(hk[0].ticker, days=5)) == 5
+    assert market.fetch_cn_a_daily_bars(hk[0].ticker) == []
+
+    t = market.stocks[0].ticker
+    assert len(market.fetch_cn_a_chip_summary(t, days=10)) == 10
+    assert market.fetch_cn_a_fund_flow(t, days=10)[-1]["date"] == "2026-01-09"
+
+    breadth = market.fetch_cn_market_breadth_eod(d)
+    assert breadth["total_count"] == 200
+    assert breadth["up_count"] + breadth["down_count"] + breadth["flat_count"] == 200
+    assert breadth["total_turnover_cny"] > 0
+
+    limitups = market.fetch_cn_limitup_pool(d)
+    failed = market.fetch_cn_failed_limitup_rate(d)
+    assert failed["close_count"] == len(limitups) <= failed["ever_count"]
+    assert 0.0 <= failed["failed_rate"] <= 100.0
+    assert market.fetch_cn_yesterday_limitup_premium(d)["date"] == "2026-01-09"
+
+    flows = market.fetch_cn_industry_fund_flow_eod(d)
+    assert len(flows) == 30
+    hist = market.fetch_cn_industry_fund_flow_hist(
+        flows[0]["industry_name"], industry_code=flows[0]["industry_code"], days=5
+    )
+    assert [h["net_inflow"] for h in hist][-1] == flows[0]["net_inflow"]
+    assert market.fetch_cn_trade_dates()[-1] == "2026-01-09"
@@ -0,0 +1,70 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from storage import is_packed, pack_json, pack_text, unpack_json, unpack_text
+
+
+def test_pack_roundtrip_and_legacy_text(monkeypatch) -> None:
+    payload = {"rows": [{"Symbol": f"60{i:04d}\n合成", "Price": "10.5 CNY"} for i in range(50)]}
+    packed = pack_json(payload)
+    assert is_packed(packed)
+    assert len(packed) < len(json.dumps(payload, ensure_ascii=False).encode("utf-8")) / 3
+    assert unpack_json(packed) == payload
+    # Rows written before compression (plain TEXT) and NULLs read unchanged.
+    assert unpack_json(json.dumps(payload)) == payload
+    assert unpack_json(None, empty="[]") == []
+
+    chip = {"date": "2026-01-09", "profitRatio": "0.4521", "avgCost": "12.31", "cost90Low": "10.2"}
+    small = pack_json(chip, dictionary="chips")
+    assert is_packed(small) and unpack_json(small) == chip
+    assert pack_text('{"a": 1}') == '{"a": 1}'  # too small to pay for the header
+
+    monkeypatch.setenv("BLOB_CODEC", "none")
+    assert isinstance(pack_json(payload), str)
+    monkeypatch.setenv("BLOB_CODEC", "zstd")  # falls back to zlib without `zstandard`
+    assert unpack_text(pack_json(payload)) == json.dumps(payload, ensure_ascii=False)
+
+
+def test_snapshot_reads_mixed_rows_and_recompress(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    rows = [{"Symbol": f"00{i:04d}\nName", "Price": "1.00 CNY"} for i in range(40)]
+    legacy = {"screenTitle": "Legacy", "filters": [], "url": "", "headers": ["Symbol", "Price"], "rows": rows}
+    with main._connect() as conn:
+        conn.execute(
+            "INSERT INTO tv_screeners(id, name, url, enabled, created_at, updated_at) VALUES('s1', 'S1', 'u', 1, 't', 't')"
+        )
+        conn.execute(
+            """
+            INSERT INTO tv_screener_snapshots(id, screener_id, captured_at, row_count, headers_json, rows_json)
+            VALUES('old', 's1', '2026-01-08T07:00:00+00:00', 40, '[]', ?)
+            """,
+            (json.dumps(legacy),),
+        )
+        conn.commit()
+    new_id = main._insert_tv_snapshot(
+        screener_id="s1",
+        captured_at="2026-01-09T07:00:00+00:00",
+        screen_title="New",
+        filters=[],
+        url="",
+        headers=["Symbol", "Price"],
+        rows=rows,
+    )
+    with main._connect() as conn:
+        kinds = dict(conn.execute("SELECT id, typeof(rows_json) FROM tv_screener_snapshots").fetchall())
+    assert kinds == {"old": "text", new_id: "blob"}
+    assert main._get_tv_snapshot("old").rows == main._get_tv_snapshot(new_id).rows
+
+    before = client.get("/storage/blobs").json()
+    tv0 = next(x for x in before["items"] if x["table"] == "tv_screener_snapshots")
+    assert (tv0["rows"], tv0["packedRows"]) == (2, 1)
+
+    out = client.post("/storage/blobs/recompress").json()
+    tv1 = next(x for x in out["items"] if x["table"] == "tv_screener_snapshots")
+    assert (tv1["packedRows"], tv1["rewrittenRows"]) == (2, 1)
+    assert tv1["bytes"] < tv0["bytes"]
+    assert out["savedBytes"] == tv1["bytesBefore"] - tv1["bytesAfter"] > 0
+    assert main._get_tv_snapshot("old").screenTitle == "Legacy"
@@ -79,3 +79,43 @@ def test_broker_import_dedupes_by_sha256_and_scopes_by_account(tmp_path, monkeyp
     assert detail["extracted"]["kind"] == "positions"
 
 
+
+
+def test_broker_extraction_fans_out_and_is_cached_by_sha256(tmp_path, monkeypatch) -> None:
+    import base64
+    import threading
+
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setenv("BROKER_EXTRACT_CONCURRENCY", "3")
+
+    # All three extractions must be in flight at once to pass the barrier.
+    barrier = threading.Barrier(3, timeout=5)
+    calls: list[str] = []
+
+    def fake_extract(*, image_data_url: str) -> dict:
+        calls.append(image_data_url)
+        barrier.wait()
+        return {"kind": "positions", "data": {"positions": [{"ticker": image_data_url[-6:]}]}}
+
+    monkeypatch.setattr(main, "_ai_extract_pingan_screenshot", fake_extract)
+
+    def img(i: int) -> dict:
+        raw = b"\x89PNG\r\n\x1a\n" + bytes([i]) * 32
+        url = "data:image/png;base64," + base64.b64encode(raw).decode("ascii")
+        return {"id": str(i), "name": f"{i}.png", "mediaType": "image/png", "dataUrl": url}
+
+    client = TestClient(main.app)
+    aid = client.post("/broker/accounts", json={"broker": "pingan", "title": "A"}).json()["id"]
+    images = [img(1), img(2), img(3)]
+
+    resp = client.post("/broker/pingan/import", json={"accountId": aid, "images": images})
+    assert resp.status_code == 200
+    assert [x["kind"] for x in resp.json()["items"]] == ["positions"] * 3
+    assert len(calls) == 3
+
+    # Syncing the same screenshots reuses the cached extractions: no AI call, same order.
+    resp = client.post(f"/broker/pingan/accounts/{aid}/sync", json={"images": images})
+    assert resp.status_code == 200
+    assert len(calls) == 3
+    tickers = [p["ticker"] for p in resp.json()["positions"]]
+    assert tickers == [x["dataUrl"][-6:] for x in images]
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+
+import main
+from cache import DAILY_BAR, MINUTE_BARS, THEME_MEMBERS, expected_daily_date, is_fresh
+from market.calendar import build_cn_calendar
+from market.session import CN_TZ, CONTINUOUS, HOLIDAY, LUNCH_BREAK, POST_CLOSE, PRE_OPEN, cn_session
+
+CAL = build_cn_calendar()
+
+
+def _cn(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=CN_TZ)
+
+
+def test_cn_session_phases() -> None:
+    assert cn_session(_cn("2026-01-07T09:20:00"), CAL) == PRE_OPEN
+    assert cn_session(_cn("2026-01-07T10:00:00"), CAL) == CONTINUOUS
+    assert cn_session(_cn("2026-01-07T12:00:00"), CAL) == LUNCH_BREAK
+    assert cn_session(_cn("2026-01-07T14:59:00"), CAL) == CONTINUOUS
+    assert cn_session(_cn("2026-01-07T15:30:00"), CAL) == POST_CLOSE
+    assert cn_session(_cn("2026-01-10T10:00:00"), CAL) == HOLIDAY  # Saturday
+    assert cn_session(_cn("2026-01-02T10:00:00"), CAL) == HOLIDAY  # New Year closure
+
+
+def test_minute_bars_freshness_follows_session() -> None:
+    d = date(2026, 1, 7)
+    # Continuous session: short TTL.
+    assert is_fresh(MINUTE_BARS, data_date=d, updated_at=_cn("2026-01-07T10:00:00"), now=_cn("2026-01-07T10:01:00"), cal=CAL).fresh
+    assert not is_fresh(MINUTE_BARS, data_date=d, updated_at=_cn("2026-01-07T10:00:00"), now=_cn("2026-01-07T10:05:00"), cal=CAL).fresh
+    # Lunch break: a fetch after 11:30 is final until the afternoon session.
+    assert is_fresh(MINUTE_BARS, data_date=d, updated_at=_cn("2026-01-07T11:40:00"), now=_cn("2026-01-07T12:50:00"), cal=CAL).fresh
+    # After the close, bars fetched post-close never expire; earlier fetches refresh once.
+    assert is_fresh(MINUTE_BARS, data_date=d, updated_at=_cn("2026-01-07T15:10:00"), now=_cn("2026-01-09T20:00:00"), cal=CAL).fresh
+    assert not is_fresh(MINUTE_BARS, data_date=d, updated_at=_cn("2026-01-07T14:50:00"), now=_cn("2026-01-07T15:30:00"), cal=CAL).fresh
+    # Closed day: nothing can change.
+    assert is_fresh(MINUTE_BARS, data_date=date(2026, 1, 10), updated_at=_cn("2026-01-10T09:00:00"), now=_cn("2026-01-10T23:00:00"), cal=CAL).fresh
+    # Theme membership: longer TTL outside the session.
+    assert is_fresh(THEME_MEMBERS, data_date=d, updated_at=_cn("2026-01-07T15:00:00"), now=_cn("2026-01-07T19:00:00"), cal=CAL).fresh
+    assert not is_fresh(THEME_MEMBERS, data_date=d, updated_at=_cn("2026-01-07T09:40:00"), now=_cn("2026-01-07T11:00:00"), cal=CAL).fresh
+    assert is_fresh(DAILY_BAR, data_date=date(2026, 1, 6), updated_at=_cn("2026-01-06T16:00:00"), now=_cn("2026-01-07T10:00:00"), cal=CAL).fresh
+
+
+def test_expected_daily_date() -> None:
+    # Weekend -> Friday; holiday -> previous trading day; pre-open -> previous trading day.
+    assert expected_daily_date(_cn("2026-01-10T12:00:00"), CAL) == date(2026, 1, 9)
+    assert expected_daily_date(_cn("2026-01-02T12:00:00"), CAL) == date(2025, 12, 31)
+    assert expected_daily_date(_cn("2026-01-07T08:00:00"), CAL) == date(2026, 1, 6)
+    assert expected_daily_date(_cn("2026-01-07T10:00:00"), CAL) == date(2026, 1, 7)
+    # EOD-only datasets are published after the close.
+    assert expected_daily_date(_cn("2026-01-07T10:00:00"), CAL, eod_only=True) == date(2026, 1, 6)
+    assert expected_daily_date(_cn("2026-01-07T16:00:00"), CAL, eod_only=True) == date(2026, 1, 7)
+
+
+def test_cache_stats_endpoint(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    main.cache_stats.reset()
+    main.cache_stats.hit("minute_bars")
+    main.cache_stats.miss("minute_bars")
+    client = TestClient(main.app)
+    data = client.get("/cache/stats").json()
+    assert data["session"] in (PRE_OPEN, CONTINUOUS, LUNCH_BREAK, POST_CLOSE, HOLIDAY)
+    assert data["caches"]["minute_bars"] == {"hits": 1, "misses": 1, "hitRatio": 0.5}
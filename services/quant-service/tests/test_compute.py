@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from compute import BarMatrix, ComputePool, LocalBars
+
+
+def _seed_bars(symbol: str, n: int, base: float) -> None:
+    d0 = date(2026, 1, 1)
+    with main._connect() as conn:
+        for i in range(n):
+            close = base + i * 0.15 + (0.4 if i % 3 == 0 else 0.0)
+            conn.execute(
+                """
+                INSERT INTO market_bars(symbol, date, open, high, low, close, volume, amount, updated_at)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    symbol,
+                    (d0 + timedelta(days=i)).isoformat(),
+                    str(close - 0.1),
+                    str(close + 0.2),
+                    "" if i == 5 else str(close - 0.3),
+                    str(close),
+                    str(1000 + i * 25),
+                    str(2e8),
+                    "t",
+                ),
+            )
+        conn.commit()
+
+
+def test_bar_matrix_round_trips_bar_shapes() -> None:
+    bars = {
+        "CN:000001": [
+            {
+                "date": "2026-01-05",
+                "open": "10.5",
+                "high": "11",
+                "low": "",
+                "close": "10.8",
+                "volume": "100",
+                "amount": "1e8",
+            },
+            {
+                "date": "2026-01-06",
+                "open": "10.8",
+                "high": "x",
+                "low": "10.1",
+                "close": "10.2",
+                "volume": "",
+                "amount": "",
+            },
+        ],
+        "CN:000002": [("2026-01-06", "5", None, "4.5", "4.9", "300")],
+        "CN:000003": [],
+    }
+    with BarMatrix(bars) as m:
+        assert m.rows == 3
+        with m.ref.attach() as view:
+            got = view.bars("CN:000001")
+            assert got[0] == {
+                "date": "2026-01-05",
+                "open": "10.5",
+                "high": "11.0",
+                "low": "",
+                "close": "10.8",
+                "volume": "100.0",
+                "amount": "100000000.0",
+            }
+            assert got[1]["high"] == "" and got[1]["volume"] == ""
+            assert view.bar_tuples("CN:000002") == [
+                ("2026-01-06", "5.0", None, "4.5", "4.9", "300.0")
+            ]
+            assert view.bars("CN:000003") == [] and view.bars("CN:404") == []
+    # The owner freed the block on exit.
+    with pytest.raises(FileNotFoundError):
+        m.ref.attach()
+
+
+def test_local_bars_serve_bars_as_given() -> None:
+    dict_bar = {"date": "2026-01-05", "open": "10.5", "high": "11", "low": "", "close": "10.8"}
+    tuple_bar = ("2026-01-06", "5", None, "4.5", "4.9", "300")
+    with LocalBars({"CN:000001": [dict_bar], "CN:000002": [tuple_bar]}).attach() as view:
+        assert view.bars("CN:000001") == [dict_bar]
+        assert view.bar_tuples("CN:000002") == [tuple_bar]
+        # Shape conversions go through the same packing as `BarMatrix`.
+        assert view.bar_tuples("CN:000001") == [("2026-01-05", "10.5", "11.0", None, "10.8", None)]
+        assert view.bars("CN:000002")[0]["volume"] == "300.0" and view.bars("CN:404") == []
+
+
+def test_trendok_matches_inline_when_run_in_process_pool(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    _seed_bars("CN:000001", 90, 10.0)
+    _seed_bars("CN:000002", 40, 20.0)
+    params = {"symbols": ["CN:000001", "CN:000002", "CN:000404"]}
+
+    inline = client.get("/market/stocks/trendok", params=params).json()
+    assert [r["symbol"] for r in inline] == params["symbols"]
+    assert inline[0]["score"] is not None and "no_bars" in inline[2]["missingData"]
+
+    pool = ComputePool(1, batch_size=2)
+    pool.start()
+    monkeypatch.setattr(main, "_compute_pool", pool)
+    try:
+        pooled = client.get("/market/stocks/trendok", params=params).json()
+        st = pool.status()
+    finally:
+        pool.shutdown()
+    assert pooled == inline
+    assert st["spawned"] and st["batches"] == 2 and st["inlineBatches"] == 0
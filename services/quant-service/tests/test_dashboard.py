@@ -212,3 +212,40 @@ def test_dashboard_summary_shape(tmp_path, monkeypatch) -> None:
     assert isinstance(data.get("screeners"), list)
 
 
+
+
+def test_dashboard_summary_conditional_get(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    client.post("/broker/accounts", json={"broker": "pingan", "title": "Main"})
+    # The first read seeds the default screeners (a watermark change of its own).
+    client.get("/dashboard/summary")
+
+    calls = {"n": 0}
+    orig = main._list_enabled_tv_screeners
+
+    def counting(*, limit: int = 50):
+        calls["n"] += 1
+        return orig(limit=limit)
+
+    monkeypatch.setattr(main, "_list_enabled_tv_screeners", counting)
+    main.cache_stats.reset()
+
+    r1 = client.get("/dashboard/summary")
+    assert r1.status_code == 200
+    etag = r1.headers["etag"]
+    assert calls["n"] == 1
+
+    # Unchanged data: 304 without running the assembly code.
+    r2 = client.get("/dashboard/summary", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["etag"] == etag
+    assert calls["n"] == 1
+    assert main.cache_stats.snapshot()["etag:/dashboard/summary"]["hits"] == 1
+
+    # A new account moves the watermark.
+    client.post("/broker/accounts", json={"broker": "pingan", "title": "Second"})
+    r3 = client.get("/dashboard/summary", headers={"If-None-Match": etag})
+    assert r3.status_code == 200
+    assert r3.headers["etag"] != etag
+    assert calls["n"] == 2
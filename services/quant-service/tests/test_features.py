@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from market.akshare_provider import BarRow
+
+
+def _bar(d: date, i: int, base: float) -> BarRow:
+    close = base + i * 0.15 + (0.4 if i % 3 == 0 else 0.0)
+    return BarRow(
+        date=d.isoformat(),
+        open=str(close - 0.1),
+        high=str(close + 0.2),
+        low="" if i == 5 else str(close - 0.3),
+        close=str(close),
+        volume=str(1000 + i * 25 + (300 if i % 4 == 0 else 0)),
+        amount=str(2e8 + i * 1e6),
+    )
+
+
+def _seed_bars(symbol: str, n: int, base: float) -> None:
+    d0 = date(2026, 1, 1)
+    bars = [_bar(d0 + timedelta(days=i), i, base) for i in range(n)]
+    with main._connect() as conn:
+        main._upsert_market_bars(conn, symbol, bars, "2026-01-10T00:00:00+00:00")
+        conn.commit()
+
+
+def test_daily_features_match_request_time_values(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    _seed_bars("CN:000001", 150, 10.0)
+    _seed_bars("CN:000002", 40, 20.0)
+    syms = ["CN:000001", "CN:000002"]
+
+    before = client.get("/market/stocks/trendok", params={"symbols": syms}).json()
+    assert before[0]["score"] is not None
+    assert main._get_daily_features(syms) == {}
+
+    report = main._refresh_daily_features()
+    assert (report["symbols"], report["rows"]) == (2, 2 * main._DAILY_FEATURES_BACKFILL)
+    assert main._refresh_daily_features()["rows"] == 0
+
+    stored = main._get_daily_features(syms)
+    assert set(stored) == set(syms)
+    for sym in syms:
+        bars = main._load_cached_bars(sym, days=60)
+        expected = main._rank_bars_metrics(bars)
+        expected.pop("close20")
+        assert {k: stored[sym][k] for k in expected} == expected
+        assert stored[sym]["ret3d"] == main._bars_ret_nd(bars, 3)
+        assert stored[sym]["amountAvg5"] == main._bars_amount_avg(bars, 5)
+    assert (
+        stored["CN:000001"]["date"] == "2026-05-30" and len(stored["CN:000001"]["macdHist4"]) == 4
+    )
+
+    # TrendOK reads the stored indicators and returns exactly what it computed from bars.
+    def _no_recompute(*_a, **_kw):
+        raise AssertionError("indicators recomputed")
+
+    with monkeypatch.context() as m:
+        m.setattr(main, "_trendok_indicators", _no_recompute)
+        assert client.get("/market/stocks/trendok", params={"symbols": syms}).json() == before
+
+    # A new bar invalidates the symbol until the pipeline catches up (one new date).
+    with main._connect() as conn:
+        main._upsert_market_bars(conn, "CN:000002", [_bar(date(2026, 2, 10), 40, 20.0)], "t")
+        conn.commit()
+    assert set(main._get_daily_features(syms)) == {"CN:000001"}
+    assert main._refresh_daily_features(symbols=syms)["rows"] == 1
+    assert main._get_daily_features(syms)["CN:000002"]["date"] == "2026-02-10"
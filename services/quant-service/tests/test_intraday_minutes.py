@@ -0,0 +1,91 @@
+import json
+import sqlite3
+
+import main
+from quant.intraday import MinuteSeries
+
+
+def _bars(n: int, *, last_close_bump: float = 0.0) -> list[dict]:
+    out = []
+    for i in range(n):
+        close = 10 + (i % 7) * 0.03 + i * 0.01 + (last_close_bump if i == n - 1 else 0.0)
+        out.append(
+            {
+                "ts": f"2026-01-05 {9 + (30 + i) // 60:02d}:{(30 + i) % 60:02d}:00",
+                "open": str(close - 0.01),
+                "high": str(close + 0.02),
+                "low": str(close - 0.02),
+                "close": str(close),
+                "volume": str(1000 + (i % 15) * 40),
+                "amount": str(close * (1000 + (i % 15) * 40)),
+            }
+        )
+    return out
+
+
+def test_incremental_features_match_full_recompute() -> None:
+    full = MinuteSeries()
+    full.extend(list(reversed(_bars(95))))  # any order
+    f = full.features()
+    assert 0.0 < f["vwapAboveRatio"] <= 1.0 and f["lateVolSpike"] > 0
+
+    inc = MinuteSeries()
+    inc.extend(_bars(20))
+    # Open session: the latest minute is revised before the next one arrives.
+    revised = inc.extend(_bars(20, last_close_bump=0.5))
+    assert [b["ts"] for b in revised] == [_bars(20)[-1]["ts"]]
+    assert inc.extend(_bars(20, last_close_bump=0.5)) == []
+    for n in (21, 48, 95):
+        changed = inc.extend(_bars(n))
+        assert changed[-1]["ts"] == _bars(n)[-1]["ts"]
+    assert inc.features() == f
+    assert MinuteSeries.from_dict(json.loads(json.dumps(inc.to_dict()))).features() == f
+    assert MinuteSeries().features()["pullbackRatio"] == 1.0
+
+
+def test_minute_series_appends_only_new_minutes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    session = {"n": 30}
+    monkeypatch.setattr(main, "fetch_cn_a_minute_bars", lambda ticker, *, trade_date, interval="1": _bars(session["n"]))
+    # Every read is stale: each call refetches and folds in what is new.
+    monkeypatch.setattr(main, "_cache_freshness", lambda *a, **k: None)
+
+    s1, m1 = main._intraday_minute_series(symbol="CN:000001", trade_date="2026-01-05", interval="1", force=False)
+    assert (s1.count, m1["appended"]) == (30, 30)
+    session["n"] = 45
+    s2, m2 = main._intraday_minute_series(symbol="CN:000001", trade_date="2026-01-05", interval="1", force=False)
+    assert (s2.count, m2["appended"]) == (45, 15)
+
+    with main._connect() as conn:
+        rows = conn.execute("SELECT COUNT(1), MAX(ts) FROM market_cn_minute_bar_rows").fetchone()
+        state = conn.execute("SELECT bar_count, last_ts FROM market_cn_minute_state").fetchone()
+    assert rows == (45, _bars(45)[-1]["ts"])
+    assert state == (45, _bars(45)[-1]["ts"])
+    full = MinuteSeries()
+    full.extend(_bars(45))
+    assert s2.features() == full.features()
+
+
+def test_legacy_minute_blobs_are_migrated(tmp_path, monkeypatch) -> None:
+    db = tmp_path / "legacy.sqlite3"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            """
+            CREATE TABLE market_cn_minute_bars (
+              symbol TEXT NOT NULL, trade_date TEXT NOT NULL, interval TEXT NOT NULL,
+              updated_at TEXT NOT NULL, bars_json TEXT NOT NULL,
+              PRIMARY KEY(symbol, trade_date, interval)
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO market_cn_minute_bars VALUES('CN:000002', '2026-01-05', '1', '2026-01-05T07:10:00+00:00', ?)",
+            (json.dumps(_bars(12)),),
+        )
+    monkeypatch.setenv("DATABASE_PATH", str(db))
+    with main._connect() as conn:
+        assert conn.execute("SELECT COUNT(1) FROM market_cn_minute_bar_rows").fetchone()[0] == 12
+        legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'market_cn_minute_bars'").fetchone()
+    assert legacy is None
+    stored = main._get_cn_minute_series(symbol="CN:000002", trade_date="2026-01-05", interval="1")
+    assert stored is not None and stored[0].count == 12
@@ -0,0 +1,69 @@
+import types
+
+from fastapi.testclient import TestClient
+
+import main
+from market import akshare_provider as p
+from metrics import UPSTREAM_ERRORS, UPSTREAM_SECONDS, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    reg = MetricsRegistry()
+    h = reg.histogram("t_seconds", "Test.", ("op",), buckets=(0.1, 1.0))
+    assert isinstance(h, Histogram)
+    assert reg.histogram("t_seconds", "Test.", ("op",)) is h
+    h.observe(0.05, op="a")
+    h.observe(0.1, op="a")
+    h.observe(3.0, op="a")
+    reg.counter("t_errors_total", "Errors.", ("op",)).inc(op='x"y')
+
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{op="a",le="0.1"} 2' in text
+    assert 't_seconds_bucket{op="a",le="1"} 2' in text
+    assert 't_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="a"} 3' in text
+    assert 't_errors_total{op="x\\"y"} 1' in text
+
+
+def test_metrics_endpoint_reports_routes_sqlite_upstreams_and_caches(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    client = TestClient(main.app)
+
+    assert client.get("/cache/stats").status_code == 200
+    assert client.get("/market/stocks/CN:000001/bars", params={"days": 10}).status_code == 404
+    main.cache_stats.record("metrics_test", True)
+
+    # AkShare calls are timed per function through the proxy returned by `_akshare()`.
+    def _fail(**_k):
+        raise RuntimeError("blocked")
+
+    fake = types.SimpleNamespace(stock_zh_a_hist=_fail, stock_zh_a_daily=_fail)
+    monkeypatch.setattr(p, "_with_retry", lambda fn, **_k: fn())
+    monkeypatch.setattr(p, "_akshare", lambda: p._MeteredAkShare(fake))
+    errors0 = UPSTREAM_ERRORS.value(upstream="akshare", op="stock_zh_a_hist")
+    try:
+        p.fetch_cn_a_daily_bars("002170", days=60)
+    except Exception:
+        pass
+    assert UPSTREAM_ERRORS.value(upstream="akshare", op="stock_zh_a_hist") == errors0 + 1
+
+    # ai-service calls are timed per endpoint (cache misses only).
+    monkeypatch.setenv("AI_RESPONSE_CACHE", "0")
+    calls0 = UPSTREAM_SECONDS.count(upstream="ai-service", op="/metrics/test")
+    main._ai_post_cached("/metrics/test", {"x": 1}, lambda: {"ok": True})
+    assert UPSTREAM_SECONDS.count(upstream="ai-service", op="/metrics/test") == calls0 + 1
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert 'route="/cache/stats",status="200"' in text
+    # Path parameters are collapsed into the route template.
+    assert 'route="/market/stocks/{symbol}/bars",status="404"' in text
+    assert "CN:000001" not in text
+    assert 'quant_sqlite_duration_seconds_count{helper="market_stock_bars"}' in text
+    assert 'quant_sqlite_duration_seconds_count{helper="_connect"}' in text
+    assert 'quant_upstream_request_duration_seconds_count{upstream="akshare",op="stock_zh_a_hist"}' in text
+    assert 'quant_cache_requests_total{cache="metrics_test",result="hit"}' in text
@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import UTC, datetime
+
+from fastapi.testclient import TestClient
+
+import main
+from market.collector import MinuteCollector, RateLimiter
+
+
+def test_collector_cycle_is_bounded_and_reports_failures() -> None:
+    active = {"n": 0, "max": 0}
+    lock = threading.Lock()
+
+    def collect(sym: str) -> int:
+        with lock:
+            active["n"] += 1
+            active["max"] = max(active["max"], active["n"])
+        time.sleep(0.01)
+        with lock:
+            active["n"] -= 1
+        if sym == "CN:000003":
+            raise RuntimeError("upstream down")
+        return 2
+
+    universe = [f"CN:{i:06d}" for i in range(12)] + ["CN:000001"]
+    mgr = MinuteCollector(
+        lambda: universe, collect, is_active=lambda: True, workers=3, rate_per_s=1000.0
+    )
+    report = mgr.run_once()
+    assert (report["symbols"], report["ok"], report["failed"], report["appended"]) == (
+        12,
+        11,
+        1,
+        22,
+    )
+    assert report["errors"] == {"CN:000003": "upstream down"}
+    assert active["max"] <= 3
+    assert mgr.symbols == frozenset(universe) and mgr.last_report is report
+    # Only the background thread keeps symbols current.
+    assert not mgr.covers("CN:000001")
+
+    limiter = RateLimiter(20.0, burst=1)
+    t0 = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - t0 >= 4 / 20.0 * 0.9
+
+
+def test_collector_feeds_intraday_rank_without_request_path_fetches(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+
+    def spot() -> list[main.StockRow]:
+        return [
+            main.StockRow(
+                symbol=f"CN:00000{i}",
+                market="CN",
+                ticker=f"00000{i}",
+                name=f"S{i}",
+                currency="CNY",
+                quote={
+                    "change_pct": str(5 - i),
+                    "vol_ratio": "2.0",
+                    "turnover": "100000000" if i < 3 else "1000",
+                },
+            )
+            for i in range(1, 5)
+        ]
+
+    def minutes(ticker: str, *, trade_date: str, interval: str = "1") -> list[dict]:
+        return [
+            {
+                "ts": f"{trade_date} 09:{30 + i:02d}",
+                "open": 10,
+                "high": 10.1,
+                "low": 9.9,
+                "close": 10 + i * 0.01,
+                "volume": 100,
+                "amount": 1000,
+            }
+            for i in range(25)
+        ]
+
+    monkeypatch.setattr(main, "fetch_cn_a_spot", spot)
+    monkeypatch.setattr(main, "fetch_cn_a_minute_bars", minutes)
+    monkeypatch.setattr(main, "_today_cn_date_str", lambda: "2026-01-02")
+
+    status = client.put(
+        "/market/cn/minute-collector/watchlist", json={"symbols": ["600519", "HK:00700", "x"]}
+    ).json()
+    assert status["watchlist"] == ["CN:600519"]
+    status = client.post("/market/cn/minute-collector/run").json()
+    # Watchlist first, then liquid top movers; the illiquid mover is skipped.
+    assert status["lastRun"]["symbols"] == 3 and status["lastRun"]["appended"] == 75
+    assert status["universeSize"] == 3 and status["running"] is False
+
+    upstream_calls: list[str] = []
+
+    def offline(*a, **_k):
+        upstream_calls.append(str(a))
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(main, "fetch_cn_a_spot", offline)
+    monkeypatch.setattr(main, "fetch_cn_a_minute_bars", offline)
+    as_of_ts = datetime(2026, 1, 2, 1, 40, tzinfo=UTC).isoformat()
+    out = client.post("/rank/cn/intraday/generate", json={"asOfTs": as_of_ts, "force": True}).json()
+    assert out["debug"]["spotRows"] == 4
+    assert out["debug"]["fetch"]["minuteBars"] == {"ok": 2, "err": 0}
+    assert upstream_calls == []
+
+
+def test_collector_stops_covering_failing_or_stale_symbols(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+
+    def collect(sym: str) -> int:
+        if sym == "CN:000002":
+            raise RuntimeError("upstream down")
+        return 1
+
+    mgr = MinuteCollector(
+        lambda: ["CN:000001", "CN:000002"],
+        collect,
+        is_active=lambda: False,
+        rate_per_s=1000.0,
+        interval_s=60.0,
+    )
+    mgr.start()  # idle thread: cycles below are run by hand
+    mgr.run_once()
+    assert mgr.covers("CN:000001")
+    # In the universe but never collected successfully.
+    assert not mgr.covers("CN:000002")
+
+    # Covered but stale: the last success is older than two intervals (cycles falling behind).
+    mgr._last_ok["CN:000001"] -= 2 * mgr.interval_s + 1
+    assert not mgr.covers("CN:000001")
+
+    # The rank path then refetches instead of serving the stored minutes as fresh.
+    monkeypatch.setattr(main, "_minute_collector", mgr)
+    # No usable update time: only collector coverage could make the stored minutes servable.
+    stored = (main.MinuteSeries(), "")
+    fetched: list[str] = []
+
+    def fetch(*, symbol: str, **_kw):
+        fetched.append(symbol)
+        return stored[0], {"cached": False}
+
+    monkeypatch.setattr(main, "_intraday_minute_series", fetch)
+    _series, info = main._intraday_pool_minute_series(
+        "CN:000001", trade_date="2026-01-02", stored=stored
+    )
+    assert fetched == ["CN:000001"] and info == {"cached": False}
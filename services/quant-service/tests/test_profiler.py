@@ -0,0 +1,73 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _busy_loop(seconds: float) -> int:
+    n = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_profiled_operation_writes_folded_stacks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setenv("PROFILES_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "2")
+
+    op = main._profiled("unit_op")(_busy_loop)
+    op(0.05)
+    assert list((tmp_path / "profiles").glob("*")) == []
+
+    monkeypatch.setenv("PROFILE_OPERATIONS", "unit_op")
+    assert op(0.2) > 0
+
+    client = TestClient(main.app)
+    listed = client.get("/profiles").json()
+    assert listed["operations"] == list(main.PROFILED_OPERATIONS)
+    assert listed["enabledOperations"] == []
+    items = listed["items"]
+    assert len(items) == 1
+    assert items[0]["name"] == "unit_op"
+    assert items[0]["kind"] == "operation"
+    assert items[0]["samples"] > 0
+
+    folded = client.get(f"/profiles/{items[0]['id']}")
+    assert folded.status_code == 200
+    lines = folded.text.strip().splitlines()
+    # `root;...;leaf count`, restricted to the calling thread.
+    assert all(ln.rsplit(" ", 1)[1].isdigit() for ln in lines)
+    assert any("_busy_loop (tests/test_profiler.py:" in ln for ln in lines)
+    assert client.get("/profiles/../main.py").status_code == 404
+    assert client.get("/profiles/nope").status_code == 404
+
+
+def test_profile_per_request_and_window(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setenv("PROFILES_DIR", str(tmp_path / "profiles"))
+    client = TestClient(main.app)
+
+    plain = client.get("/cache/stats")
+    assert "X-Profile-Id" not in plain.headers
+    resp = client.get("/cache/stats", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    pid = resp.headers["X-Profile-Id"]
+    items = client.get("/profiles").json()["items"]
+    assert [(it["id"], it["name"], it["kind"]) for it in items] == [(pid, "GET /cache/stats", "request")]
+
+    started = client.post("/profiles/capture", json={"name": "idle window", "seconds": 0.2, "intervalMs": 5})
+    assert started.status_code == 200
+    assert started.json()["status"] == "started"
+    assert client.post("/profiles/capture", json={"seconds": 1}).status_code == 409
+
+    deadline = time.time() + 5
+    while client.get("/profiles").json()["windowActive"] and time.time() < deadline:
+        time.sleep(0.05)
+    items = client.get("/profiles").json()["items"]
+    window = [it for it in items if it["kind"] == "window"]
+    assert len(window) == 1
+    assert window[0]["name"] == "idle window"
+    assert window[0]["samples"] > 0
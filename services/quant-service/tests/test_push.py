@@ -0,0 +1,87 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from push import QUOTES, RESYNC, EventBus
+
+
+def test_bus_replay_overflow_and_quote_deltas() -> None:
+    bus = EventBus(history=3, queue_size=2)
+    for i in range(4):
+        bus.publish("rank.next2d", {"n": i})
+    # Reconnect after id 2: ids 3 and 4 are still in history.
+    sub = bus.subscribe(topics=["rank.next2d"], last_event_id=2)
+    assert [sub.get(0).data["n"], sub.get(0).data["n"], sub.get(0)] == [2, 3, None]
+    # Id 1 was already evicted: the client is told to resync.
+    gap = bus.subscribe(last_event_id=0)
+    assert gap.get(0).topic == RESYNC
+
+    for i in range(3):
+        bus.publish("rank.next2d", {"n": i})
+    events = [sub.get(0), sub.get(0)]
+    assert [e.topic for e in events if e is not None] == [RESYNC]
+
+    watcher = bus.subscribe(topics=[QUOTES], symbols=["CN:000001"])
+    other = bus.subscribe(topics=["leader.daily"], symbols=["CN:000001"])
+    quotes = {
+        "CN:000001": {"price": "10.0", "change_pct": "1.0", "volume": "100", "name": "x"},
+        "CN:000002": {"price": "5.0"},
+    }
+    assert bus.publish_quotes(quotes) == 1
+    assert watcher.get(0).data == {"quotes": {"CN:000001": {"price": "10.0", "change_pct": "1.0", "volume": "100"}}}
+    assert bus.publish_quotes(quotes) == 0  # nothing changed
+    quotes["CN:000001"] = {**quotes["CN:000001"], "price": "10.2"}
+    bus.publish_quotes(quotes)
+    assert watcher.get(0).data == {"quotes": {"CN:000001": {"price": "10.2"}}}
+    assert other.get(0) is None
+
+    bus.unsubscribe(watcher)
+    assert bus.subscriber_count == 3
+
+
+def test_snapshot_writers_publish_and_sse_framing(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "_events", EventBus())
+    sub = main._events.subscribe(topics=["rank.intraday", "market.sync", QUOTES], symbols=["CN:000001"])
+
+    spot = [
+        main.StockRow(
+            symbol="CN:000001",
+            market="CN",
+            ticker="000001",
+            name="Alpha",
+            currency="CNY",
+            quote={"price": "10.1", "change_pct": "2.0", "turnover": "100000000"},
+        )
+    ]
+    monkeypatch.setattr(main, "fetch_cn_a_spot", lambda: spot)
+    monkeypatch.setattr(main, "fetch_hk_spot", lambda: [])
+    monkeypatch.setattr(main, "fetch_cn_a_minute_bars", lambda *a, **k: [])
+    assert client.post("/market/sync").status_code == 200
+    snap = client.post("/rank/cn/intraday/generate", json={"force": True}).json()
+
+    got = [sub.get(0) for _ in range(3)]
+    assert [e.topic for e in got] == ["market.sync", QUOTES, "rank.intraday"]
+    assert got[1].data["quotes"]["CN:000001"]["price"] == "10.1"
+    assert got[2].data["id"] == snap["id"] and got[2].id is not None
+
+    async def _drive() -> str:
+        stream = main._event_stream(main._events.subscribe(topics=["leader.daily"]), keepalive_s=0.05)
+        assert (await anext(stream)).startswith("event: ready\n")
+        assert await anext(stream) == ": keepalive\n\n"
+        # Writers publish from worker threads; the waiting stream is woken on its loop.
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.to_thread(main._upsert_leader_stocks, date="2026-01-05", items=[], ts="t")
+        frame = await asyncio.wait_for(pending, 5)
+        while frame == ": keepalive\n\n":
+            frame = await asyncio.wait_for(anext(stream), 5)
+        await stream.aclose()
+        return frame
+
+    frame = asyncio.run(_drive())
+    assert frame.startswith("id: ") and "event: leader.daily\n" in frame
+    assert main._events.subscriber_count == 1
+
+    assert client.get("/events", params={"topics": "rank.intraday,nope"}).status_code == 400
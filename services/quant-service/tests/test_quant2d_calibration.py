@@ -36,14 +36,14 @@ def test_quant2d_outcome_label_and_calibration(tmp_path, monkeypatch) -> None:
     account_id = acc["id"]
 
     # Event date is a Thursday so next 2 trading days are Fri + Mon.
-    as_of_date = "2026-01-01"
-    as_of_ts = "2026-01-01T03:00:00Z"
+    as_of_date = "2026-01-08"
+    as_of_ts = "2026-01-08T03:00:00Z"
     sym = "CN:000001"
     main._ensure_market_stock_basic(symbol=sym, market="CN", ticker="000001", name="Alpha", currency="CNY")
 
     # Seed next 2 trading days bars: close up, with a small pullback low.
-    _seed_bar(sym, "2026-01-02", close=10.5, low=9.7)
-    _seed_bar(sym, "2026-01-05", close=10.2, low=9.8)
+    _seed_bar(sym, "2026-01-09", close=10.5, low=9.7)
+    _seed_bar(sym, "2026-01-12", close=10.2, low=9.8)
 
     main._upsert_quant_2d_rank_events(
         account_id=account_id,
@@ -287,3 +287,58 @@ def test_quant2d_llm_adjust_requires_valid_evidence_refs(tmp_path, monkeypatch)
     # LLM adjustment should not be applied; whyBullets should not be replaced by invalid ref bullet.
     assert "invalid ref" not in " ".join(top1.get("whyBullets") or [])
 
+
+
+def test_quant2d_calibration_sketch_and_bucket_lookup() -> None:
+    from quant import CalibrationState, QuantileSketch
+
+    sk = QuantileSketch(compression=100)
+    for i in range(10000):
+        sk.add(float(i))
+    assert abs(sk.quantile(0.10) - 1000.0) < 50.0
+    assert abs(sk.quantile(0.50) - 5000.0) < 100.0
+
+    pts = [(float(i % 100), 1 if i % 3 else 0, float(i % 7) - 3.0, -1.0) for i in range(2000)]
+    st = CalibrationState.build(pts, buckets=10)
+    out = st.to_output()
+    assert out["n"] == 2000
+    assert len(out["items"]) == 10
+    assert all(150 <= it["n"] <= 250 for it in out["items"])
+    assert main._quant2d_find_bucket(out, 5.0) is out["items"][0]
+    assert main._quant2d_find_bucket(out, 95.0) is out["items"][-1]
+    # Out-of-range scores fall back to the nearest bucket.
+    assert main._quant2d_find_bucket(out, 500.0) is out["items"][-1]
+    assert main._quant2d_find_bucket(out, -5.0) is out["items"][0]
+
+
+def test_quant2d_calibration_incremental_snapshot(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+
+    client = TestClient(main.app)
+    acc = client.post("/broker/accounts", json={"broker": "pingan", "title": "Main"}).json()
+    account_id = acc["id"]
+
+    v1 = main._refresh_quant_2d_calibration(account_id=account_id, buckets=10, lookback_days=30)
+    key = main._quant2d_calibration_key(account_id=account_id, buckets=10, lookback_days=30)
+    snap = main._get_quant_2d_calibration_snapshot(key=key)
+    assert snap is not None and snap["version"] == v1
+    assert snap["output"]["n"] == 0
+
+    sym = "CN:000001"
+    main._ensure_market_stock_basic(symbol=sym, market="CN", ticker="000001", name="Alpha", currency="CNY")
+    _seed_bar(sym, "2026-01-09", close=10.5, low=9.7)
+    _seed_bar(sym, "2026-01-12", close=10.2, low=9.8)
+    main._upsert_quant_2d_rank_events(
+        account_id=account_id,
+        as_of_ts="2026-01-08T03:00:00Z",
+        as_of_date="2026-01-08",
+        rows=[{"symbol": sym, "ticker": "000001", "name": "Alpha", "buyPrice": 10.0, "rawScore": 70.0}],
+    )
+    main._label_quant_2d_outcomes_best_effort(account_id=account_id, limit=50)
+
+    snap2 = main._get_quant_2d_calibration_snapshot(key=key)
+    assert snap2 is not None
+    assert snap2["version"] > v1
+    assert snap2["output"]["n"] == 1
+    assert snap2["output"]["items"][0]["minRawScore"] == 70.0
@@ -3,6 +3,7 @@ from datetime import date, timedelta
 from fastapi.testclient import TestClient
 
 import main
+from cache import CacheStats, LRUCache
 
 
 def _seed_tv_snapshot(*, db_path, screener_id: str, rows: list[dict[str, str]]) -> None:
@@ -262,3 +263,140 @@ def test_rank_next2d_generate_and_read(tmp_path, monkeypatch) -> None:
     assert len(data2["items"]) >= 1
 
 
+
+
+def test_rank_next2d_universe_mode_scores_beyond_tv_pool(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    TestClient(main.app)
+    monkeypatch.setattr(main, "fetch_cn_a_spot", lambda: (_ for _ in ()).throw(AssertionError("spot fetch")))
+
+    _seed_tv_snapshot(db_path=db_path, screener_id="falcon", rows=[{"Symbol": "000001\nInPool\nD", "Sector": "Bank"}])
+    for sym, name in (
+        ("CN:000001", "InPool"),
+        ("CN:000004", "OffPool"),
+        ("CN:000005", "Illiquid"),
+        ("CN:000006", "Stale"),
+        ("CN:000007", "OffPoolCold"),
+    ):
+        _seed_cn_stock_basic(sym, sym[3:], name)
+    _seed_bars("CN:000001", start="2025-12-10", n=25, close0=10.0, step=0.2, amount=2e8, vol0=1000)
+    _seed_bars("CN:000004", start="2025-12-10", n=25, close0=20.0, step=0.4, amount=3e8, vol0=1000)
+    _seed_bars("CN:000007", start="2025-12-10", n=25, close0=20.0, step=0.4, amount=3e8, vol0=1000)
+    _seed_bars("CN:000005", start="2025-12-10", n=25, close0=10.0, step=0.2, amount=2e7, vol0=1000)
+    _seed_bars("CN:000006", start="2025-11-01", n=25, close0=10.0, step=0.2, amount=2e8, vol0=1000)
+    _seed_flow("CN:000004", d="2026-01-07", main_ratio=3.0)
+    # Stored features for part of the universe; the rest is computed from bars.
+    main._refresh_daily_features(symbols=["CN:000004"])
+    with main._connect() as conn:
+        main._upsert_market_quote(
+            conn,
+            main.StockRow(symbol="CN:000004", market="CN", ticker="000004", name="OffPool", currency="CNY", quote={"price": "30.5"}),
+            "2026-01-07T02:00:00+00:00",
+        )
+        conn.commit()
+
+    # Hot industries come from industry flow; universe names get sectors from the warmed
+    # membership cache (never refetched here).
+    monkeypatch.setattr(
+        main,
+        "_market_cn_industry_fund_flow_top_by_date",
+        lambda **_kw: {"topByDate": [{"topIndustries": ["Semis", "Autos"]}]},
+    )
+    monkeypatch.setattr(main, "fetch_cn_industry_members", lambda name: (_ for _ in ()).throw(AssertionError(name)))
+    for industry, members in (("Semis", ["000004", "688001"]), ("Autos", ["600000"])):
+        main._upsert_theme_members_cached(
+            theme_key=f"industry:{industry}", trade_date="2026-01-07", ts=main.now_iso(), members=members
+        )
+
+    def build(universe: str) -> dict:
+        return main._rank_build_and_score(
+            account_id="global", as_of_date="2026-01-07", limit=30, universe_version=universe, include_holdings=False
+        )
+
+    assert [x["ticker"] for x in build("v0")["items"]] == ["000001"]
+    out = build(main.RANK_UNIVERSE_ALL)
+    by_ticker = {x["ticker"]: x for x in out["items"]}
+    assert set(by_ticker) == {"000001", "000004", "000007"}
+    assert out["debug"]["universePool"] == 4 and out["debug"]["dropped"]["lowLiquidity"] == 1
+    assert by_ticker["000001"]["sector"] == "Bank" and by_ticker["000004"]["sector"] == "Semis"
+    # A hot-industry member scores like a TV name in a hot sector; a non-member like a cold one.
+    assert by_ticker["000004"]["breakdown"]["sectorHot"] == 1.0
+    assert by_ticker["000007"]["sector"] is None and by_ticker["000007"]["breakdown"]["sectorHot"] == 0.25
+    assert by_ticker["000001"]["breakdown"]["sectorHot"] == 0.25
+    assert (by_ticker["000004"]["buyPrice"], by_ticker["000004"]["buyPriceSrc"]) == (30.5, "spot")
+    assert by_ticker["000004"]["breakdown"]["flow"] == 1.0
+    assert by_ticker["000001"]["buyPriceSrc"] == "bars_close"
+
+
+def test_rank_next2d_snapshot_payload_cache(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    aid = main._global_quant_account_id()
+    item = {"symbol": "CN:000001", "market": "CN", "ticker": "000001", "name": "A", "score": 50.0}
+    main._upsert_cn_rank_snapshot(
+        account_id=aid,
+        as_of_date="2026-01-07",
+        universe_version="v0",
+        ts="2026-01-07T08:00:00Z",
+        output={"asOfDate": "2026-01-07", "items": [item]},
+    )
+    main.cache_stats.reset()
+
+    r1 = client.get("/rank/cn/next2d?asOfDate=2026-01-07").json()
+    r2 = client.get("/rank/cn/next2d?asOfDate=2026-01-07").json()
+    assert r1 == r2
+    assert [x["ticker"] for x in r1["items"]] == ["000001"]
+    assert main.cache_stats.snapshot()["snapshot_payloads"] == {"hits": 1, "misses": 1, "hitRatio": 0.5}
+
+    # An upsert replaces the row (new id + created_at), so the next read sees the new payload.
+    main._upsert_cn_rank_snapshot(
+        account_id=aid,
+        as_of_date="2026-01-07",
+        universe_version="v0",
+        ts="2026-01-07T09:00:00Z",
+        output={"asOfDate": "2026-01-07", "items": [{**item, "ticker": "000002", "symbol": "CN:000002"}]},
+    )
+    r3 = client.get("/rank/cn/next2d?asOfDate=2026-01-07").json()
+    assert r3["id"] != r1["id"]
+    assert [x["ticker"] for x in r3["items"]] == ["000002"]
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    stats = CacheStats()
+    lru = LRUCache(2, name="t", stats=stats)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.invalidate(lambda k: k == "a") == 1
+    assert len(lru) == 1
+    assert stats.snapshot()["t"]["misses"] == 1
+
+
+def test_rank_next2d_etag_follows_snapshot(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    aid = main._global_quant_account_id()
+
+    def upsert(ts: str) -> None:
+        main._upsert_cn_rank_snapshot(
+            account_id=aid,
+            as_of_date="2026-01-07",
+            universe_version="v0",
+            ts=ts,
+            output={"asOfDate": "2026-01-07", "items": []},
+        )
+
+    upsert("2026-01-07T08:00:00Z")
+    etag = client.get("/rank/cn/next2d?asOfDate=2026-01-07").headers["etag"]
+    assert client.get("/rank/cn/next2d?asOfDate=2026-01-07", headers={"If-None-Match": etag}).status_code == 304
+    # Different query parameters never share a tag.
+    assert client.get("/rank/cn/next2d?asOfDate=2026-01-07&limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+    upsert("2026-01-07T09:00:00Z")
+    r = client.get("/rank/cn/next2d?asOfDate=2026-01-07", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
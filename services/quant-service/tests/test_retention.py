@@ -0,0 +1,96 @@
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+import main
+from storage import RetentionManager, RetentionPolicy, prune, retention_cutoff
+
+
+def _snapshot_db(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("CREATE TABLE snaps (id INTEGER PRIMARY KEY, screener TEXT, captured_at TEXT, body TEXT)")
+    rows = []
+    for day in range(1, 21):
+        for screener in ("a", "b"):
+            if screener == "b" and day > 5:
+                continue  # `b` stopped syncing early; it must keep its own recent history
+            for h in range(3):
+                rows.append((screener, f"2026-01-{day:02d}T0{h}:00:00+00:00", "x" * 2000))
+    conn.executemany("INSERT INTO snaps(screener, captured_at, body) VALUES(?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def test_prune_keeps_newest_dates_per_partition_in_batches(tmp_path) -> None:
+    conn = _snapshot_db(tmp_path / "r.sqlite3")
+    policy = RetentionPolicy("snaps", "captured_at", 4, partition_by="screener", timestamp=True)
+    assert retention_cutoff(conn, policy, partition="a") == "2026-01-17"
+
+    deleted = prune(conn, policy, batch_rows=7)
+    assert deleted == (20 - 4) * 3 + (5 - 4) * 3
+    kept = conn.execute(
+        "SELECT screener, MIN(substr(captured_at, 1, 10)), COUNT(1) FROM snaps GROUP BY screener"
+    ).fetchall()
+    assert kept == [("a", "2026-01-17", 12), ("b", "2026-01-02", 12)]
+    # Already within policy: nothing more to delete.
+    assert prune(conn, policy) == 0
+
+
+def test_manager_prunes_vacuums_and_reports(tmp_path) -> None:
+    db = tmp_path / "m.sqlite3"
+    _snapshot_db(db).close()
+    pruned: list[tuple[str, int]] = []
+    mgr = RetentionManager(
+        lambda: sqlite3.connect(db),
+        [RetentionPolicy("snaps", "captured_at", 2, timestamp=True)],
+        on_pruned=lambda t, n: pruned.append((t, n)),
+    )
+    report = mgr.run_once()
+    assert report["deleted"] == {"snaps": 18 * 3 + 15}
+    assert pruned == [("snaps", 69)]
+    assert report["freedPages"] > 0
+    assert report["size"]["autoVacuum"] == "incremental"
+    assert report["size"]["freelistCount"] == 0
+    assert mgr.last_report is report
+
+    # No background thread: `request()` prunes inline.
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO snaps(screener, captured_at, body) VALUES('a', '2026-02-01T00:00:00', '')")
+    mgr.request("snaps")
+    with sqlite3.connect(db) as conn:
+        dates = conn.execute("SELECT DISTINCT substr(captured_at, 1, 10) FROM snaps ORDER BY 1").fetchall()
+    assert dates == [("2026-01-20",), ("2026-02-01",)]
+
+
+def test_storage_retention_endpoints(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+    with main._connect() as conn:
+        for i in range(15):
+            conn.execute(
+                """
+                INSERT INTO cn_intraday_observations(id, trade_date, ts, kind, raw_json, created_at)
+                VALUES(?, ?, ?, 'scheduled', '{}', ?)
+                """,
+                (f"o{i}", f"2025-{1 + i // 28:02d}-{1 + i % 28:02d}", "t", "t"),
+            )
+        conn.commit()
+    monkeypatch.setattr(
+        main,
+        "_retention_manager",
+        RetentionManager(main._connect, [RetentionPolicy("cn_intraday_observations", "trade_date", 5)]),
+    )
+
+    resp = client.post("/storage/retention/run")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["lastRun"]["deleted"] == {"cn_intraday_observations": 10}
+    assert body["size"]["autoVacuum"] == "incremental"
+    assert body["size"]["bytes"] > 0
+    with main._connect() as conn:
+        assert conn.execute("SELECT COUNT(1) FROM cn_intraday_observations").fetchone()[0] == 5
+
+    status = client.get("/storage/retention").json()
+    assert {p["table"] for p in status["policies"]} >= {"tv_screener_snapshots", "market_cn_minute_bar_rows"}
+    assert "quant_sqlite_bytes" in client.get("/metrics").text
@@ -0,0 +1,117 @@
+import threading
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from fastapi.testclient import TestClient
+
+import main
+from scheduler import CronSpec, Scheduler, job
+
+CN = ZoneInfo("Asia/Shanghai")
+
+
+def test_cron_next_and_prev_fires() -> None:
+    spec = CronSpec.parse("25 10,11 * * 1-5")
+    fri = datetime(2026, 1, 2, 11, 26, tzinfo=CN)
+    assert spec.prev_at_or_before(fri) == datetime(2026, 1, 2, 11, 25, tzinfo=CN)
+    assert spec.next_after(fri) == datetime(2026, 1, 5, 10, 25, tzinfo=CN)  # skips the weekend
+    assert spec.next_after(datetime(2026, 1, 5, 10, 25, 30, tzinfo=CN)) == datetime(
+        2026, 1, 5, 11, 25, tzinfo=CN
+    )
+    # Holidays come from a day filter (e.g. the trading calendar).
+    closed = {date(2026, 1, 5)}
+    assert spec.next_after(fri, day_filter=lambda d: d not in closed) == datetime(
+        2026, 1, 6, 10, 25, tzinfo=CN
+    )
+
+    assert CronSpec.parse("*/20 * * * *").minutes == {0, 20, 40}
+    assert CronSpec.parse("0 9 * * 7").weekdays == {0}
+    # Both day fields restricted: either matches (cron semantics).
+    either = CronSpec.parse("0 0 1 * 1")
+    assert either.matches_day(date(2026, 1, 1)) and either.matches_day(date(2026, 1, 5))
+    assert not either.matches_day(date(2026, 1, 6))
+
+
+def test_catchup_misfire_and_history_survive_restart(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    calls: list[datetime] = []
+
+    def jobs() -> list:
+        return [
+            job(
+                "daily",
+                "0 9 * * *",
+                lambda fire: calls.append(fire) or {"n": len(calls)},
+                misfire_grace_s=3600,
+            )
+        ]
+
+    s1 = Scheduler(main._connect, jobs(), tz=CN)
+    assert s1.tick(datetime(2026, 1, 5, 9, 0, 20, tzinfo=CN), wait=True) == [
+        {"job": "daily", "scheduledFor": "2026-01-05T09:00:00+08:00", "action": "run"}
+    ]
+    assert s1.tick(datetime(2026, 1, 5, 9, 1, tzinfo=CN), wait=True) == []
+
+    # The process was down over the next fire; a restart catches it up within the grace.
+    s2 = Scheduler(main._connect, jobs(), tz=CN)
+    assert s2.tick(datetime(2026, 1, 6, 9, 40, tzinfo=CN), wait=True)[0]["action"] == "catchup"
+    # Too late: recorded as missed, not run.
+    assert s2.tick(datetime(2026, 1, 7, 12, 0, tzinfo=CN), wait=True)[0]["action"] == "missed"
+    assert len(calls) == 2
+
+    runs = s2.history(job_name="daily")
+    assert [(r["trigger"], r["status"]) for r in runs] == [
+        ("catchup", "missed"),
+        ("catchup", "ok"),
+        ("schedule", "ok"),
+    ]
+    assert runs[1]["result"] == {"n": 2} and runs[1]["durationMs"] is not None
+    status = s2.status(datetime(2026, 1, 7, 12, 0, tzinfo=CN))[0]
+    assert status["nextRunAt"] == "2026-01-08T09:00:00+08:00"
+    assert status["lastRun"]["status"] == "missed"
+
+
+def test_job_never_overlaps_itself(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(_fire: datetime) -> None:
+        started.set()
+        release.wait(5)
+
+    s = Scheduler(main._connect, [job("slow", "*/5 * * * *", slow)], tz=CN)
+    t0 = datetime(2026, 1, 5, 10, 0, 5, tzinfo=CN)
+    assert s.tick(t0)[0]["action"] == "run"
+    assert started.wait(5)
+    assert s.tick(t0 + timedelta(minutes=5))[0]["action"] == "skipped"
+    assert s.run_job("slow") is None
+    release.set()
+    s._pool.shutdown(wait=True)
+    assert [r["status"] for r in s.history()] == ["skipped", "ok"]
+
+
+def test_scheduler_endpoints(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    client = TestClient(main.app)
+
+    status = client.get("/scheduler").json()
+    names = {j["name"] for j in status["jobs"]}
+    assert {
+        "membership_warmup",
+        "intraday_rank",
+        "eod_bars",
+        "outcome_labels",
+        "calibration_refresh",
+        "retention",
+    } <= names
+    assert status["running"] is False
+
+    run = client.post("/scheduler/jobs/retention/run").json()
+    assert (run["job"], run["trigger"], run["status"]) == ("retention", "manual", "ok")
+    assert "deleted" in run["result"]
+    assert (
+        client.get("/scheduler/runs", params={"job": "retention"}).json()["items"][0]["id"]
+        == run["id"]
+    )
+    assert client.post("/scheduler/jobs/nope/run").status_code == 404
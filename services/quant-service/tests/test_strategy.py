@@ -1,3 +1,4 @@
+import json
 from datetime import date, timedelta
 
 from fastapi.testclient import TestClient
@@ -338,6 +339,165 @@ def test_strategy_optional_quant2d_context(tmp_path, monkeypatch) -> None:
     assert (q2.get("top3") or [])[0]["ticker"] == "300308"
 
 
+def test_strategy_context_batches_watchlist_bars_and_records_timings(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+
+    client = TestClient(main.app)
+    acc = client.post("/broker/accounts", json={"broker": "pingan", "title": "Main"}).json()
+    account_id = acc["id"]
+
+    start = date(2025, 6, 2)
+    with main._connect() as conn:
+        for sym, n in (("CN:000001", 130), ("CN:000002", 5)):
+            for i in range(n):
+                px = f"{10 + i * 0.1:.2f}"
+                conn.execute(
+                    """
+                    INSERT INTO market_bars(symbol, date, open, high, low, close, volume, amount, updated_at)
+                    VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (sym, (start + timedelta(days=i)).isoformat(), px, px, px, px, "1000", "", "2025-12-21T00:00:00Z"),
+                )
+        conn.commit()
+
+    batch = main._load_cached_bar_tuples(["CN:000001", "CN:000002", "CN:404404"], days=120)
+    assert set(batch) == {"CN:000001", "CN:000002"}
+    assert len(batch["CN:000001"]) == 120
+    single = main._load_cached_bars("CN:000001", days=120)
+    assert [b[0] for b in batch["CN:000001"]] == [b["date"] for b in single]
+    assert batch["CN:000001"][-1][4] == single[-1]["close"]
+    # (date, open, high, low, close, volume), the shape `_market_stock_trendok_one` expects.
+    assert batch["CN:000002"][0] == ("2025-06-02", "10.00", "10.00", "10.00", "10.00", "1000")
+
+    def fake_ai_strategy_candidates(*, payload):
+        return {"candidates": [], "leader": {"symbol": "", "reason": ""}, "model": "test-model"}
+
+    captured = {}
+
+    def fake_ai_strategy_daily_markdown(*, payload):
+        captured["stage2"] = payload
+        return {"markdown": "# Daily Strategy Report\n", "model": "test-model"}
+
+    monkeypatch.setattr(main, "_ai_strategy_candidates", fake_ai_strategy_candidates)
+    monkeypatch.setattr(main, "_ai_strategy_daily_markdown", fake_ai_strategy_daily_markdown)
+    monkeypatch.setattr(main, "_get_cn_mainline_snapshot_latest", lambda *args, **kwargs: None)
+
+    resp = client.post(
+        f"/strategy/accounts/{account_id}/daily",
+        json={
+            "date": "2025-12-21",
+            "force": True,
+            "includeTradingView": False,
+            "includeIndustryFundFlow": False,
+            "includeMarketSentiment": False,
+            "includeLeaders": False,
+            "includeStocks": False,
+            "includeWatchlist": True,
+            "watchlist": {
+                "version": 1,
+                "items": [
+                    {"symbol": "CN:000001", "name": "A"},
+                    {"symbol": "CN:000002", "name": "B"},
+                    {"symbol": "CN:404404", "name": "Missing"},
+                ],
+            },
+        },
+    )
+    assert resp.status_code == 200
+    snap = resp.json()["inputSnapshot"]
+    wl = snap["watchlist"]["items"]
+    assert [it["symbol"] for it in wl] == ["CN:000001", "CN:000002", "CN:404404"]
+    assert wl[0]["asOfDate"] == (start + timedelta(days=129)).isoformat()
+    assert wl[0]["close"] is not None
+    assert wl[2].get("asOfDate") is None
+
+    timings = snap["timingsMs"]
+    for key in ("accountState", "tradingView", "watchlist", "leaders", "context", "stage1", "stocks", "stage2"):
+        assert isinstance(timings[key], float)
+    # Timings are persisted but not sent to the model.
+    assert "timingsMs" not in captured["stage2"]["context"]
+
+
+def test_strategy_daily_report_stream(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+
+    client = TestClient(main.app)
+    acc = client.post("/broker/accounts", json={"broker": "pingan", "title": "Main"}).json()
+    account_id = acc["id"]
+
+    def fake_ai_strategy_candidates(*, payload):
+        return {
+            "date": "2025-12-21",
+            "accountId": account_id,
+            "accountTitle": "Main",
+            "candidates": [],
+            "leader": {"symbol": "", "reason": ""},
+            "model": "test-model",
+        }
+
+    def fake_ai_strategy_daily_markdown_stream(*, payload, on_token):
+        chunks = ["# Daily ", "Strategy Report\n\n", "- ok\n"]
+        for c in chunks:
+            on_token(c)
+        return {
+            "date": "2025-12-21",
+            "accountId": account_id,
+            "accountTitle": "Main",
+            "markdown": "".join(chunks),
+            "model": "test-model",
+        }
+
+    monkeypatch.setattr(main, "_ai_strategy_candidates", fake_ai_strategy_candidates)
+    monkeypatch.setattr(main, "_ai_strategy_daily_markdown_stream", fake_ai_strategy_daily_markdown_stream)
+    monkeypatch.setattr(main, "_get_cn_mainline_snapshot_latest", lambda *args, **kwargs: None)
+
+    resp = client.post(
+        f"/strategy/accounts/{account_id}/daily/stream",
+        json={
+            "date": "2025-12-21",
+            "force": True,
+            "includeTradingView": False,
+            "includeIndustryFundFlow": False,
+            "includeMarketSentiment": False,
+            "includeLeaders": False,
+            "includeStocks": False,
+            "includeMainline": False,
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in resp.text.split("\n\n"):
+        lines = [ln for ln in block.split("\n") if ln and not ln.startswith(":")]
+        if not lines:
+            continue
+        name = lines[0].removeprefix("event: ")
+        data = json.loads(lines[1].removeprefix("data: "))
+        events.append((name, data))
+
+    names = [n for n, _ in events]
+    assert names[0] == "start"
+    assert names[-1] == "report"
+    assert "progress" in names
+    assert {d["stage"] for n, d in events if n == "progress"} >= {"accountState", "stage1", "stage2"}
+    tokens = [d["text"] for n, d in events if n == "token"]
+    assert "".join(tokens) == "# Daily Strategy Report\n\n- ok\n"
+    report = events[-1][1]
+    assert "Daily Strategy Report" in report["markdown"]
+
+    # The streamed report is persisted like the non-streaming one.
+    got = client.get(f"/strategy/accounts/{account_id}/daily", params={"date": "2025-12-21"})
+    assert got.status_code == 200
+    assert got.json()["id"] == report["id"]
+    assert got.json()["markdown"] == report["markdown"]
+
+    missing = client.post("/strategy/accounts/nope/daily/stream", json={"date": "2025-12-21"})
+    assert missing.status_code == 404
+
+
 def test_strategy_reports_prune_keeps_last_10_days(tmp_path, monkeypatch) -> None:
     db_path = tmp_path / "test.sqlite3"
     monkeypatch.setenv("DATABASE_PATH", str(db_path))
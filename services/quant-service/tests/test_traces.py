@@ -0,0 +1,94 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import main
+from metrics import annotate, current_span, span, stage, trace, traced
+
+
+def test_stages_nest_and_close_in_order() -> None:
+    # Without an active trace, spans and stages are no-ops.
+    with span("orphan") as sp:
+        assert sp is None
+    assert stage("orphan") is None
+
+    @traced("inner")
+    def _inner() -> None:
+        stage("a")
+        with span("fetch", n=1):
+            pass
+        stage("b")
+
+    with trace("pipeline", force=True) as root:
+        stage("first")
+        _inner()
+        stage("second")
+        assert current_span() is not None
+    assert current_span() is None
+
+    tree = root.to_dict()
+    assert tree["attrs"] == {"force": True}
+    assert [c["name"] for c in tree["children"]] == ["first", "second"]
+    first = tree["children"][0]
+    assert [c["name"] for c in first["children"]] == ["inner"]
+    inner = first["children"][0]
+    assert [c["name"] for c in inner["children"]] == ["a", "b"]
+    assert inner["children"][0]["children"][0]["name"] == "fetch"
+    assert all(c["durationMs"] is not None for c in tree["children"])
+    assert tree["children"][1]["startOffsetMs"] >= first["startOffsetMs"] + first["durationMs"]
+
+
+def test_worker_threads_join_trace_and_annotate_sets_owner() -> None:
+    assert annotate(snapshotId="x") is None
+
+    def _fetch(i: int) -> None:
+        with span("fetch", i=i):
+            pass
+
+    with trace("pipeline") as root:
+        stage("fan_out")
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            futs = [ex.submit(contextvars.copy_context().run, _fetch, i) for i in range(3)]
+            for f in futs:
+                f.result()
+        # Set from inside a stage: lands on the trace, not on the stage.
+        assert annotate(snapshotId="snap-1") is root
+
+    tree = root.to_dict()
+    assert tree["attrs"] == {"snapshotId": "snap-1"}
+    assert sorted(c["attrs"]["i"] for c in tree["children"][0]["children"]) == [0, 1, 2]
+
+
+def test_rank_generate_stores_trace(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(main, "fetch_cn_a_spot", lambda: [])
+    monkeypatch.setattr(main, "_ai_quant_rank_explain", lambda *, payload: {"items": [], "model": "test-model"})
+    client = TestClient(main.app)
+
+    resp = client.post("/rank/cn/next2d/generate", json={"asOfDate": "2026-01-07", "force": True})
+    assert resp.status_code == 200
+    snap_id = resp.json()["id"]
+    # Serving the cached snapshot runs no stages and stores no trace.
+    assert client.post("/rank/cn/next2d/generate", json={"asOfDate": "2026-01-07"}).status_code == 200
+
+    items = client.get("/traces", params={"pipeline": "rank_next2d"}).json()["items"]
+    assert len(items) == 1
+    it = items[0]
+    assert it["tradeDate"] == "2026-01-07"
+    assert it["snapshotId"] == snap_id
+    assert list(it["stages"]) == [
+        "label_outcomes",
+        "build_and_score",
+        "calibration",
+        "rank_events",
+        "score_items",
+        "llm_rerank",
+        "persist",
+    ]
+    assert client.get("/traces", params={"pipeline": "mainline"}).json()["items"] == []
+
+    detail = client.get(f"/traces/{it['id']}").json()
+    build = next(c for c in detail["trace"]["children"] if c["name"] == "build_and_score")
+    assert build["children"][0]["name"] == "rank_build_and_score"
+    assert client.get("/traces/missing").status_code == 404
@@ -0,0 +1,50 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+import main
+from market.calendar import TradingCalendar, build_cn_calendar
+
+
+def test_cn_calendar_skips_holidays() -> None:
+    cal = build_cn_calendar()
+    # 2026-01-01/02 are New Year closures; 2026-01-03/04 is a weekend.
+    assert not cal.is_trading_day(date(2026, 1, 1))
+    assert not cal.is_trading_day(date(2026, 1, 2))
+    assert cal.next_trading_days(date(2025, 12, 31), 2) == [date(2026, 1, 5), date(2026, 1, 6)]
+    assert cal.prev_trading_day(date(2026, 1, 5)) == date(2025, 12, 31)
+    assert cal.latest_trading_day(date(2025, 10, 8)) == date(2025, 9, 30)
+    assert cal.covers(date(2026, 6, 1))
+    # Outside the precomputed range: weekend-only fallback.
+    assert cal.next_trading_day(date(2050, 1, 7)) == date(2050, 1, 10)
+
+
+def test_calendar_from_trading_dates_derives_holidays() -> None:
+    opens = [date(2030, 1, 2), date(2030, 1, 3), date(2030, 1, 7)]
+    cal = TradingCalendar.from_trading_dates(opens)
+    assert not cal.is_trading_day(date(2030, 1, 1))
+    assert not cal.is_trading_day(date(2030, 1, 4))
+    assert cal.next_trading_day(date(2030, 1, 3)) == date(2030, 1, 7)
+    # Days after the last published trade date are not assumed closed.
+    assert cal.is_trading_day(date(2030, 1, 8))
+
+
+def test_calendar_manual_overrides_and_sync(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "test.sqlite3"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    main._invalidate_trading_calendar()
+    client = TestClient(main.app)
+
+    resp = client.put("/market/calendar/cn/days", json={"dates": ["2026-03-10"], "isOpen": False})
+    assert resp.status_code == 200
+    assert "2026-03-10" in resp.json()["holidays"]
+    assert main._cn_next_trade_dates(as_of_date="2026-03-09", n=1) == ["2026-03-11"]
+
+    monkeypatch.setattr(main, "fetch_cn_trade_dates", lambda: ["2031-01-02", "2031-01-06"])
+    resp2 = client.post("/market/calendar/cn/sync")
+    assert resp2.status_code == 200
+    assert resp2.json()["coveredYears"] == [2031]
+    assert main._cn_next_trade_dates(as_of_date="2031-01-02", n=1) == ["2031-01-06"]
+    # Manual closures survive a sync.
+    assert main._cn_next_trade_dates(as_of_date="2026-03-09", n=1) == ["2026-03-11"]
+    main._invalidate_trading_calendar()
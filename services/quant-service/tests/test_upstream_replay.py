@@ -0,0 +1,90 @@
+import io
+import json
+import time
+import types
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from market import akshare_provider as p
+from market.replay import FixtureMissingError
+
+
+def _bars_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "日期": [date(2026, 1, 6), date(2026, 1, 7)],
+            "开盘": [10.0, 10.5],
+            "收盘": [10.4, float("nan")],
+            "最高": [10.6, 10.9],
+            "最低": [9.9, 10.3],
+            "成交量": [1200, 1500],
+            "成交额": [1.2e7, 1.6e7],
+        }
+    )
+
+
+def test_akshare_record_then_replay(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("UPSTREAM_FIXTURES_DIR", str(tmp_path / "fixtures"))
+    calls: list[dict] = []
+
+    def _hist(**kwargs):
+        calls.append(kwargs)
+        return _bars_frame()
+
+    fake = types.SimpleNamespace(stock_zh_a_hist=_hist)
+    monkeypatch.setattr(p, "_akshare", lambda: p._MeteredAkShare(fake))
+
+    monkeypatch.setenv("UPSTREAM_MODE", "record")
+    live = p.fetch_cn_a_daily_bars("002170", days=60)
+    assert len(calls) == 1
+    assert list((tmp_path / "fixtures" / "akshare" / "stock_zh_a_hist").glob("*.json.gz"))
+
+    # Replay never reaches the module: use the real `_akshare()` replay stand-in.
+    monkeypatch.undo()
+    monkeypatch.setenv("UPSTREAM_FIXTURES_DIR", str(tmp_path / "fixtures"))
+    monkeypatch.setenv("UPSTREAM_MODE", "replay")
+    assert p.fetch_cn_a_daily_bars("002170", days=60) == live
+    assert live[0].date == "2026-01-06"
+    assert live[-1].close == "nan"
+
+    # A later day shifts the start/end window; replay falls back to the same call's fixture.
+    class _Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today().replace(year=date.today().year + 1)
+
+    monkeypatch.setattr(p, "date", _Tomorrow)
+    assert p.fetch_cn_a_daily_bars("002170", days=60) == live
+
+    # Unknown calls fail (callers' fallbacks see an exception, never a live request).
+    with pytest.raises(FixtureMissingError):
+        p._akshare().stock_zh_a_hist(symbol="600000", period="daily", adjust="")
+
+
+def test_eastmoney_replay_with_latency(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("UPSTREAM_FIXTURES_DIR", str(tmp_path / "fixtures"))
+    body = json.dumps({"data": {"klines": ["2026-01-07,123450000", "2026-01-08,-5.2亿"]}}).encode()
+    urls: list[str] = []
+
+    def _urlopen(req, timeout=0):
+        urls.append(req.full_url)
+        return io.BytesIO(body)
+
+    monkeypatch.setattr(p.urllib.request, "urlopen", _urlopen)
+    monkeypatch.setenv("UPSTREAM_MODE", "record")
+    live = p._eastmoney_board_fund_flow_daykline(secid="90.BK0475")
+    assert len(urls) == 1
+
+    def _blocked(*_a, **_k):
+        raise AssertionError("network call in replay mode")
+
+    monkeypatch.setattr(p.urllib.request, "urlopen", _blocked)
+    monkeypatch.setenv("UPSTREAM_MODE", "replay")
+    monkeypatch.setenv("UPSTREAM_REPLAY_LATENCY_MS", "30")
+    t0 = time.perf_counter()
+    # The `_` cache-buster differs per call; it is not part of the fixture key.
+    assert p._eastmoney_board_fund_flow_daykline(secid="90.BK0475") == live
+    assert time.perf_counter() - t0 >= 0.03
+    assert [r["date"] for r in live] == ["2026-01-07", "2026-01-08"]
@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+
+import pytest
+
+from storage import WriteQueue
+
+
+def _connect_to(path):
+    def connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("CREATE TABLE IF NOT EXISTS t (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+        conn.commit()
+        return conn
+
+    return connect
+
+
+def _insert(k: str, v: int = 0):
+    return lambda conn: conn.execute("INSERT INTO t(k, v) VALUES(?, ?)", (k, v)).rowcount
+
+
+def _rows(connect) -> dict[str, int]:
+    with connect() as conn:
+        return {str(k): int(v) for k, v in conn.execute("SELECT k, v FROM t").fetchall()}
+
+
+def test_writer_group_commits_and_isolates_failed_ops(tmp_path) -> None:
+    connect = _connect_to(tmp_path / "w.sqlite3")
+    wq = WriteQueue(connect, max_delay_s=0.05)
+    wq.start()
+
+    # Hold the writer inside one op so the next ones queue up behind it.
+    started, release = threading.Event(), threading.Event()
+
+    def block(conn: sqlite3.Connection) -> bool:
+        started.set()
+        return release.wait(5)
+
+    blocker = wq.submit(block)
+    assert started.wait(5)
+
+    def boom(conn: sqlite3.Connection) -> None:
+        conn.execute("INSERT INTO t(k, v) VALUES('bad', 1)")
+        raise ValueError("boom")
+
+    def nested(conn: sqlite3.Connection) -> int:
+        # Submitted from the writer thread: joins the open transaction instead of deadlocking.
+        return wq.submit(_insert("inner", 7)).result(timeout=1) + 1
+
+    futures = [wq.submit(_insert(f"k{i}", i)) for i in range(50)]
+    bad = wq.submit(boom)
+    dup = wq.submit(_insert("k0"))
+    outer = wq.submit(nested)
+    release.set()
+
+    assert blocker.result(timeout=5) is True
+    assert [f.result(timeout=5) for f in futures] == [1] * 50
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        dup.result(timeout=5)
+    assert outer.result(timeout=5) == 2
+
+    rows = _rows(connect)
+    assert len(rows) == 51 and rows["k49"] == 49 and rows["inner"] == 7 and "bad" not in rows
+    st = wq.status()
+    assert st["running"] and st["ops"] == 54 and st["failedOps"] == 2
+    # Everything queued behind the blocker went out in one commit.
+    assert st["batches"] == 2 and st["maxBatch"] == 53
+
+
+def test_writer_runs_inline_until_started(tmp_path) -> None:
+    connect = _connect_to(tmp_path / "w.sqlite3")
+    wq = WriteQueue(connect)
+
+    def partial_then_fail(conn: sqlite3.Connection) -> None:
+        conn.execute("INSERT INTO t(k, v) VALUES('half', 1)")
+        raise RuntimeError("nope")
+
+    assert wq.run(_insert("a", 1)) == 1
+    with pytest.raises(RuntimeError):
+        wq.run(partial_then_fail)
+    assert _rows(connect) == {"a": 1}
+    assert not wq.running and wq.status()["batches"] == 2
+
+
+def test_writer_fails_every_pending_op_when_begin_fails(tmp_path) -> None:
+    class _LockedConnection(sqlite3.Connection):
+        def execute(self, sql, *args):
+            if sql == "BEGIN IMMEDIATE":
+                raise sqlite3.OperationalError("database is locked")
+            return super().execute(sql, *args)
+
+    path = tmp_path / "w.sqlite3"
+    _connect_to(path)().close()
+    # A long batching window so all five ops land in the same (failing) transaction.
+    wq = WriteQueue(lambda: sqlite3.connect(path, factory=_LockedConnection), max_delay_s=1.0)
+    wq.start()
+    futures = [wq.submit(_insert(f"k{i}", i)) for i in range(5)]
+    for f in futures:
+        with pytest.raises(sqlite3.OperationalError):
+            f.result(timeout=5)
+
+    assert _rows(_connect_to(path)) == {}
+    st = wq.status()
+    # Failed ops still count as ops, so ok = ops - failedOps never goes negative.
+    assert st["ops"] == 5 and st["failedOps"] == 5
+    assert st["batches"] == 1 and st["failedBatches"] == 1 and st["maxBatch"] == 5